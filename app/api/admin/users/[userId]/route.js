@@ -2,7 +2,7 @@ import { NextResponse } from 'next/server'
 import { supabase, supabaseAdmin } from '@/lib/supabase'
 import { getServerSession } from 'next-auth'
 import { authOptions } from '@/app/api/auth/[...nextauth]/route'
-import { canManageUsers, getUserRole } from '@/lib/permissions'
+import { canManageUsers, getUserRole, parsePermissionList } from '@/lib/permissions'
 
 export async function PUT(request, { params }) {
   try {
@@ -99,7 +99,7 @@ export async function PUT(request, { params }) {
     // Parse permissions back to array for response
     const responseUser = {
       ...updatedUser,
-      permissions: typeof updatedUser.permissions === 'string' ? JSON.parse(updatedUser.permissions) : (updatedUser.permissions || [])
+      permissions: parsePermissionList(updatedUser.permissions)
     }
 
     return NextResponse.json({ 
@@ -1,7 +1,7 @@
 import { NextResponse } from 'next/server'
 import { getServerSession } from 'next-auth'
 import { authOptions } from '@/app/api/auth/[...nextauth]/route'
-import { canManageUsers, getUserRole } from '@/lib/permissions'
+import { canManageUsers, getUserRole, parsePermissionList } from '@/lib/permissions'
 import { getUsers } from '@/lib/database-utils'
 
 // Make this endpoint dynamic to connect to real database
@@ -28,12 +28,10 @@ export async function GET() {
       timeout: 15000 // 15 second timeout
     })
 
-    // Process user permissions
+    // Process user permissions (identical stored lists are parsed once)
     const users = result.data.map(user => ({
       ...user,
-      permissions: typeof user.permissions === 'string' ? 
-        JSON.parse(user.permissions) : 
-        (user.permissions || [])
+      permissions: parsePermissionList(user.permissions)
     }))
 
     return NextResponse.json({ 
@@ -96,6 +96,7 @@ export const authOptions = {
               
               // Use database values
               token.role = data.role
+              token.permissions = data.permissions ?? null
               token.userId = data.id
               token.isMaster = isUserMaster
               token.dbConnectionStatus = 'connected'
@@ -130,6 +131,7 @@ export const authOptions = {
     },
     async session({ session, token }) {
       session.user.role = token.role ?? DEFAULT_ROLE
+      session.user.permissions = token.permissions ?? null
       session.user.userId = token.userId
       session.user.isMaster = token.isMaster
       return session
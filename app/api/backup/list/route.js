@@ -69,7 +69,7 @@ export async function GET(request) {
           {
             success: table.success,
             record_count: table.record_count,
-            has_data: table.data && table.data !== '[DATA_REMOVED]',
+            has_data: Boolean(table.file) || Boolean(table.data && table.data !== '[DATA_REMOVED]'),
             error: table.error || null
           }
         ])
@@ -1,5 +1,6 @@
 import { NextResponse } from 'next/server'
 import { supabase, supabaseAdmin } from '@/lib/supabase'
+import { FINANCE_QUERY_INDEXES, FINANCE_QUERY_FUNCTIONS } from '@/lib/finance-query'
 
 export async function POST(request) {
   try {
@@ -96,7 +97,10 @@ export async function POST(request) {
         idx_finances_composite_summary: {
           sql: 'CREATE INDEX IF NOT EXISTS idx_finances_composite_summary ON finances(created_by, status, amount) WHERE amount IS NOT NULL;',
           purpose: 'Optimize financial summary calculations per user'
-        }
+        },
+
+        // Server-side finance filtering, sorting and keyset pagination
+        ...FINANCE_QUERY_INDEXES
       }
 
       result.optimizations.indexes = {}
@@ -216,7 +220,10 @@ export async function POST(request) {
             FROM users u;
           `,
           purpose: 'User activity and performance summary for admin dashboard'
-        }
+        },
+
+        // Filtered finance aggregates for summary-only requests
+        ...FINANCE_QUERY_FUNCTIONS
       }
 
       result.optimizations.views = {}
@@ -1,5 +1,6 @@
 import { NextResponse } from 'next/server'
 import { supabase, supabaseAdmin } from '@/lib/supabase'
+import { FINANCE_QUERY_FUNCTIONS } from '@/lib/finance-query'
 
 export async function POST(request) {
   try {
@@ -202,6 +203,39 @@ export async function POST(request) {
       })
     }
 
+    // Step 2b: Create finance query functions (summary cards and reports)
+    console.log('📊 Creating finance query functions...')
+
+    for (const [functionName, config] of Object.entries(FINANCE_QUERY_FUNCTIONS)) {
+      try {
+        const { error } = await client.rpc('exec_sql', { sql: config.sql })
+
+        if (error) {
+          console.error(`Failed to create function ${functionName}:`, error)
+          result.steps.push({
+            step: `create_function_${functionName}`,
+            success: false,
+            error: error.message,
+            manual_sql: config.sql
+          })
+        } else {
+          console.log(`✅ Function ${functionName} created successfully`)
+          result.steps.push({
+            step: `create_function_${functionName}`,
+            success: true
+          })
+        }
+      } catch (err) {
+        console.error(`Exception creating function ${functionName}:`, err)
+        result.steps.push({
+          step: `create_function_${functionName}`,
+          success: false,
+          error: err.message,
+          manual_sql: config.sql
+        })
+      }
+    }
+
     // Step 3: Create performance indexes
     if (createIndexes) {
       console.log('🚀 Creating performance indexes...')
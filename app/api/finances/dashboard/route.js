@@ -1,101 +1,62 @@
 import { NextResponse } from 'next/server'
+import { getServerSession } from 'next-auth'
+import { authOptions } from '@/app/api/auth/[...nextauth]/route'
+import { handleSupabaseError } from '@/lib/supabase'
+import { canViewAllFinances, canManageOwnFinances, getUserRole } from '@/lib/permissions'
+import { getFinanceDashboard } from '@/lib/finance-rollups'
+import { resolveFinanceScope } from '@/lib/finance-query'
 
-export async function GET() {
+export async function GET(request) {
   try {
     console.log('Fetching financial dashboard data')
 
-    // Mock comprehensive dashboard data
-    const dashboardData = {
-      summary: {
-        totalReceivables: 1775000,
-        totalReceived: 1200000,
-        pendingAmount: 500000,
-        overdueAmount: 75000,
-        totalProperties: 5,
-        activeClients: 8,
-        totalTransactions: 15,
-        thisMonthRevenue: 350000
-      },
-      recentTransactions: [
-        {
-          id: 'finance-1',
-          client_name: 'John Doe',
-          amount: 500000,
-          status: 'pending',
-          due_date: '2025-09-15',
-          property_name: 'Modern 3BHK Apartment'
-        },
-        {
-          id: 'finance-2',
-          client_name: 'Jane Smith', 
-          amount: 1200000,
-          status: 'paid',
-          due_date: '2025-09-10',
-          property_name: 'Luxury Villa'
-        },
-        {
-          id: 'finance-3',
-          client_name: 'Bob Johnson',
-          amount: 75000,
-          status: 'overdue',
-          due_date: '2025-08-30',
-          property_name: 'Modern 3BHK Apartment'
-        }
-      ],
-      upcomingPayments: [
-        {
-          id: 'finance-4',
-          client_name: 'Alice Brown',
-          amount: 250000,
-          due_date: '2025-09-20',
-          property_name: 'Commercial Space'
-        },
-        {
-          id: 'finance-5',
-          client_name: 'Mike Wilson',
-          amount: 180000,
-          due_date: '2025-09-25',
-          property_name: 'Studio Apartment'
-        }
-      ],
-      monthlyRevenue: [
-        { month: 'Jan', revenue: 450000, target: 500000 },
-        { month: 'Feb', revenue: 380000, target: 500000 },
-        { month: 'Mar', revenue: 520000, target: 500000 },
-        { month: 'Apr', revenue: 410000, target: 500000 },
-        { month: 'May', revenue: 390000, target: 500000 },
-        { month: 'Jun', revenue: 460000, target: 500000 },
-        { month: 'Jul', revenue: 480000, target: 500000 },
-        { month: 'Aug', revenue: 350000, target: 500000 }
-      ],
-      paymentStatus: [
-        { status: 'Paid', count: 8, amount: 1200000 },
-        { status: 'Pending', count: 4, amount: 500000 },
-        { status: 'Overdue', count: 2, amount: 75000 },
-        { status: 'Partial', count: 1, amount: 0 }
-      ],
-      topClients: [
-        { name: 'Jane Smith', totalPaid: 1200000, properties: 1 },
-        { name: 'John Doe', totalPaid: 500000, properties: 1 },
-        { name: 'Alice Brown', totalPaid: 250000, properties: 2 },
-        { name: 'Mike Wilson', totalPaid: 180000, properties: 1 },
-        { name: 'Bob Johnson', totalPaid: 75000, properties: 1 }
-      ]
+    // Same access rules as /api/finances
+    const session = await getServerSession(authOptions)
+    if (!session?.user) {
+      return NextResponse.json({
+        error: 'Unauthorized access. Please sign in to view the financial dashboard.'
+      }, { status: 401 })
     }
 
-    console.log('Financial dashboard data prepared')
+    const userRole = getUserRole(session.user)
+
+    if (!canViewAllFinances(userRole) && !canManageOwnFinances(userRole)) {
+      return NextResponse.json({
+        error: 'Access denied. You do not have permission to view financial records.'
+      }, { status: 403 })
+    }
+
+    // Editors only ever see their own records; masters see everything or a chosen user
+    const { searchParams } = new URL(request.url)
+    const createdBy = resolveFinanceScope(session.user, searchParams)
+
+    const { data: dashboardData, error } = await getFinanceDashboard({ createdBy })
+
+    if (error) {
+      const errorInfo = handleSupabaseError(error, 'finance dashboard fetch')
+      console.error('Database error fetching finance dashboard:', errorInfo.message)
+
+      return NextResponse.json({
+        error: errorInfo.message,
+        type: errorInfo.type,
+        message: 'Failed to load financial dashboard. Run POST /api/finances/rollups if the rollup tables are missing.'
+      }, { status: 500 })
+    }
+
+    console.log(`Financial dashboard data prepared from rollups for user role: ${userRole}`)
 
     return NextResponse.json({
       ...dashboardData,
       message: 'Financial dashboard data retrieved successfully',
-      note: 'Using mock financial dashboard data - replace with real calculations when database is stable'
+      source: 'rollups',
+      userRole
     })
 
   } catch (error) {
     console.error('Finance dashboard API error:', error)
-    return NextResponse.json({ 
+    return NextResponse.json({
       error: 'Internal server error',
       details: error.message
     }, { status: 500 })
   }
-}
\ No newline at end of file
+}
@@ -0,0 +1,121 @@
+import { NextResponse } from 'next/server'
+import { getServerSession } from 'next-auth'
+import { authOptions } from '@/app/api/auth/[...nextauth]/route'
+import { handleSupabaseError } from '@/lib/supabase'
+import { canViewAllFinances, canManageOwnFinances, getUserRole } from '@/lib/permissions'
+import { parseFinanceQuery, resolveFinanceScope } from '@/lib/finance-query'
+import { openFinanceExport, EXPORT_CONTENT_TYPES } from '@/lib/finance-export-stream'
+import { DEFAULT_PRESETS } from '@/lib/export-presets'
+import { EXPORT_FORMATS } from '@/lib/export'
+
+/**
+ * Finance Export API
+ *
+ * GET /api/finances/export?format=csv|xlsx - Stream finance records as a download
+ *
+ * Accepts the same filters and scope as /api/finances (dateFrom, dateTo,
+ * person, status, paymentType, propertyId, sortBy, createdBy/userId).
+ * `preset` applies one of the default export presets; explicit parameters
+ * override the preset's values.
+ * `showSensitive=false` hides amounts and notes, `filename` names the file.
+ */
+
+const PRESET_PARAMS = ['dateFrom', 'dateTo', 'person', 'status', 'paymentType']
+
+function withPreset(searchParams) {
+  const presetId = searchParams.get('preset')
+  if (!presetId) {
+    return searchParams
+  }
+
+  const preset = DEFAULT_PRESETS.find(p => p.id === presetId)
+  if (!preset) {
+    return null
+  }
+
+  const merged = new URLSearchParams()
+  for (const key of PRESET_PARAMS) {
+    if (preset.filters[key]) merged.set(key, preset.filters[key])
+  }
+  merged.set('sortBy', preset.sortBy)
+
+  for (const [key, value] of searchParams) {
+    merged.set(key, value)
+  }
+  return merged
+}
+
+const safeFilename = (value) => (value || '').replace(/[^\w.-]+/g, '-').replace(/^-+|-+$/g, '').slice(0, 100)
+
+export async function GET(request) {
+  try {
+    const session = await getServerSession(authOptions)
+    if (!session?.user) {
+      return NextResponse.json({
+        error: 'Unauthorized access. Please sign in to export financial records.'
+      }, { status: 401 })
+    }
+
+    const userRole = getUserRole(session.user)
+
+    if (!canViewAllFinances(userRole) && !canManageOwnFinances(userRole)) {
+      return NextResponse.json({
+        error: 'Access denied. You do not have permission to export financial records.'
+      }, { status: 403 })
+    }
+
+    const { searchParams } = new URL(request.url)
+
+    const format = searchParams.get('format') || EXPORT_FORMATS.CSV
+    if (!EXPORT_CONTENT_TYPES[format]) {
+      return NextResponse.json({
+        error: `Unsupported export format: ${format}. Use csv or xlsx.`
+      }, { status: 400 })
+    }
+
+    const params = withPreset(searchParams)
+    if (!params) {
+      return NextResponse.json({
+        error: `Unknown export preset: ${searchParams.get('preset')}`
+      }, { status: 400 })
+    }
+
+    const { filters, sortBy } = parseFinanceQuery(params, { defaultSortBy: 'DATE_DESC' })
+    const createdBy = resolveFinanceScope(session.user, params)
+    const showSensitive = params.get('showSensitive') !== 'false'
+
+    console.log(`📤 Streaming ${format} finance export for user role: ${userRole}`)
+
+    let exportStream
+    try {
+      exportStream = await openFinanceExport({ format, showSensitive, createdBy, filters, sortBy })
+    } catch (error) {
+      const errorInfo = handleSupabaseError(error, 'finance export')
+      console.error('Database error starting finance export:', errorInfo.message)
+
+      return NextResponse.json({
+        error: errorInfo.message,
+        type: errorInfo.type,
+        message: 'Failed to export financial records'
+      }, { status: 500 })
+    }
+
+    const filename = `${safeFilename(params.get('filename')) || `finance-records-${new Date().toISOString().split('T')[0]}`}.${format}`
+
+    return new Response(exportStream.stream, {
+      headers: {
+        'Content-Type': exportStream.contentType,
+        'Content-Disposition': `attachment; filename="${filename}"`,
+        'Cache-Control': 'no-store',
+        'X-Content-Type-Options': 'nosniff'
+      }
+    })
+
+  } catch (error) {
+    console.error('Finance export API error:', error)
+    return NextResponse.json({
+      error: 'Internal server error',
+      details: error.message
+    }, { status: 500 })
+  }
+}
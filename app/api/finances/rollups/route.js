@@ -0,0 +1,111 @@
+import { NextResponse } from 'next/server'
+import { supabaseAdmin, supabase } from '@/lib/supabase'
+import { getServerSession } from 'next-auth'
+import { authOptions } from '@/app/api/auth/[...nextauth]/route'
+import { getUserRole, ROLES } from '@/lib/permissions'
+import { setupFinanceRollups, compactFinanceRollups } from '@/lib/finance-rollups'
+
+/**
+ * Finance Rollups API
+ *
+ * POST /api/finances/rollups - Setup rollups ({ action: 'setup' }), run the
+ *   compaction job ({ action: 'compact' }) or fully rebuild ({ action: 'rebuild' })
+ * GET /api/finances/rollups - Check rollup table status
+ */
+
+export async function POST(request) {
+  try {
+    const session = await getServerSession(authOptions)
+    if (!session?.user) {
+      return NextResponse.json(
+        { error: 'Authentication required' },
+        { status: 401 }
+      )
+    }
+
+    if (getUserRole(session.user) !== ROLES.MASTER) {
+      return NextResponse.json(
+        { error: 'Insufficient permissions. Only master users can manage finance rollups.' },
+        { status: 403 }
+      )
+    }
+
+    const body = await request.json().catch(() => ({}))
+    const { action = 'setup' } = body
+
+    console.log(`📊 Finance rollups ${action} requested by: ${session.user.email}`)
+
+    let result
+    switch (action) {
+      case 'setup':
+        result = await setupFinanceRollups()
+        break
+      case 'compact':
+        result = await compactFinanceRollups()
+        break
+      case 'rebuild':
+        result = await compactFinanceRollups({ rebuild: true })
+        break
+      default:
+        return NextResponse.json(
+          { error: `Unknown action: ${action}. Use setup, compact or rebuild.` },
+          { status: 400 }
+        )
+    }
+
+    return NextResponse.json({
+      ...result,
+      action,
+      timestamp: new Date().toISOString(),
+      message: result.success
+        ? `Finance rollups ${action} completed successfully`
+        : `Finance rollups ${action} completed with some issues`
+    }, { status: result.success ? 200 : 206 })
+
+  } catch (error) {
+    console.error('❌ Finance rollups operation failed:', error)
+    return NextResponse.json({
+      success: false,
+      error: 'Finance rollups operation failed',
+      details: error.message
+    }, { status: 500 })
+  }
+}
+
+export async function GET() {
+  try {
+    const client = supabaseAdmin || supabase
+    const status = {
+      timestamp: new Date().toISOString(),
+      overall_status: 'unknown',
+      tables: {}
+    }
+
+    for (const tableName of ['finance_daily_rollup', 'finance_client_rollup']) {
+      const { count, error } = await client
+        .from(tableName)
+        .select('*', { count: 'exact', head: true })
+
+      status.tables[tableName] = {
+        accessible: !error,
+        rows: count || 0,
+        error: error?.message
+      }
+    }
+
+    const ready = Object.values(status.tables).every(t => t.accessible)
+    status.overall_status = ready ? 'ready' : 'incomplete'
+    status.recommendations = ready
+      ? ['✅ Finance rollups are set up', 'Schedule POST /api/finances/rollups { action: "compact" } to prune empty buckets']
+      : ['⚠️ Finance rollup tables are missing', 'POST /api/finances/rollups to create and backfill them']
+
+    return NextResponse.json(status)
+  } catch (error) {
+    console.error('❌ Finance rollups status check failed:', error)
+    return NextResponse.json({
+      timestamp: new Date().toISOString(),
+      overall_status: 'error',
+      error: error.message
+    }, { status: 500 })
+  }
+}
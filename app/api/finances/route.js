@@ -1,16 +1,22 @@
 import { NextResponse } from 'next/server'
-import { supabase, PERMISSIONS, getUserPermissions, hasPermission, handleSupabaseError } from '@/lib/supabase'
-import { getServerSession } from 'next-auth'
-import { authOptions } from '@/app/api/auth/[...nextauth]/route'
-import { canViewAllFinances, canManageOwnFinances, getUserRole } from '@/lib/permissions'
+import { supabase, handleSupabaseError } from '@/lib/supabase'
+import { getAuthContext } from '@/lib/auth-context'
+import {
+  parseFinanceQuery,
+  resolveFinanceScope,
+  applyFinanceFilters,
+  applyFinanceSort,
+  encodeCursor,
+  fetchFinanceSummary
+} from '@/lib/finance-query'
 
 export async function GET(request) {
   try {
     console.log('Finance API called - fetching financial records')
 
-    // Get user session for role-based access control
-    const session = await getServerSession(authOptions)
-    if (!session?.user) {
+    // Session, role and compiled permissions for role-based access control
+    const auth = await getAuthContext(request)
+    if (!auth.authenticated) {
       return NextResponse.json({ 
         error: 'Unauthorized access. Please sign in to view financial records.',
         finances: [],
@@ -18,11 +24,10 @@ export async function GET(request) {
       }, { status: 401 })
     }
 
-    const userRole = getUserRole(session.user)
-    const userId = session.user.userId
+    const userRole = auth.role
 
     // Check if user has permission to view finances
-    if (!canViewAllFinances(userRole) && !canManageOwnFinances(userRole)) {
+    if (!auth.can('finance_all') && !auth.can('finance_own')) {
       return NextResponse.json({ 
         error: 'Access denied. You do not have permission to view financial records.',
         finances: [],
@@ -30,66 +35,58 @@ export async function GET(request) {
       }, { status: 403 })
     }
 
-    // Get query parameters for filtering
+    // Get query parameters for filtering, sorting and pagination
     const { searchParams } = new URL(request.url)
-    const propertyId = searchParams.get('propertyId')
-    const status = searchParams.get('status')
-    const clientName = searchParams.get('clientName')
-    const startDate = searchParams.get('startDate')
-    const endDate = searchParams.get('endDate')
-    const createdBy = searchParams.get('createdBy')
-    const userIdParam = searchParams.get('userId') // New parameter for user-specific reports
-
-    // Build Supabase query with role-based filtering
-    let query = supabase
-      .from('finances')
-      .select(`
-        *,
-        properties:property_id(id, name)
-      `)
-      .order('updated_at', { ascending: false })
+    const { filters, sortBy, limit, cursor, summaryOnly } = parseFinanceQuery(searchParams)
 
-    // Apply role-based filtering
-    if (userRole === 'editor') {
-      // Editors can only see their own financial records
-      query = query.eq('created_by', userId)
-    }
-    // Masters can see all records or specific user's records
-    // Viewers are blocked above
+    // Editors only see their own records; masters see all or a specific user's records
+    const createdBy = resolveFinanceScope(auth.user, searchParams)
 
-    // If a specific userId is provided, filter by that user
-    if (userIdParam && (canViewAllFinances(userRole) || userIdParam === session.user.userId)) {
-      query = query.eq('created_by', userIdParam)
-    }
+    // Aggregates are computed in the database over the whole filtered set
+    const summaryPromise = (summaryOnly || !cursor)
+      ? fetchFinanceSummary(supabase, filters, createdBy)
+      : Promise.resolve({ data: null, error: null })
 
-    // Apply additional filters
-    if (propertyId) {
-      query = query.eq('property_id', propertyId)
-    }
+    if (summaryOnly) {
+      const { data: summary, error } = await summaryPromise
 
-    if (status && status !== 'all') {
-      query = query.eq('status', status)
-    }
+      if (error) {
+        const errorInfo = handleSupabaseError(error, 'finance summary')
+        console.error('Database error fetching finance summary:', errorInfo.message)
 
-    if (clientName) {
-      query = query.ilike('client_name', `%${clientName}%`)
-    }
+        return NextResponse.json({
+          error: errorInfo.message,
+          type: errorInfo.type,
+          summary: {},
+          message: 'Failed to compute financial summary'
+        }, { status: 500 })
+      }
 
-    if (startDate) {
-      query = query.gte('created_at', startDate)
+      return NextResponse.json({
+        summary,
+        message: `Summary of ${summary?.totalRecords || 0} financial records`,
+        source: 'database',
+        userRole: userRole
+      })
     }
 
-    if (endDate) {
-      query = query.lte('created_at', endDate)
-    }
+    // Build Supabase query with role-based filtering; fetch one extra row to detect more pages
+    let query = supabase
+      .from('finances')
+      .select(`
+        *,
+        properties:property_id(id, name)
+      `)
 
-    // Master-only filter by creator
-    if (userRole !== 'editor' && createdBy) {
+    if (createdBy) {
       query = query.eq('created_by', createdBy)
     }
 
+    query = applyFinanceFilters(query, filters)
+    query = applyFinanceSort(query, sortBy, cursor).limit(limit + 1)
+
     // Execute query
-    const { data: finances, error } = await query
+    const [{ data: rows, error }, summaryResult] = await Promise.all([query, summaryPromise])
 
     if (error) {
       const errorInfo = handleSupabaseError(error, 'finances fetch')
@@ -103,33 +100,26 @@ export async function GET(request) {
       }, { status: 500 })
     }
 
-    // Calculate financial summary
-    const totalReceivables = finances.reduce((sum, f) => sum + (f.amount || 0), 0)
-    const totalReceived = finances
-      .filter(f => f.status === 'paid')
-      .reduce((sum, f) => sum + (f.amount || 0), 0)
-    const pendingAmount = finances
-      .filter(f => f.status === 'pending')
-      .reduce((sum, f) => sum + (f.amount || 0), 0)
-    const overdueAmount = finances
-      .filter(f => f.status === 'overdue')
-      .reduce((sum, f) => sum + (f.amount || 0), 0)
+    const hasMore = rows.length > limit
+    const finances = hasMore ? rows.slice(0, limit) : rows
+    const nextCursor = hasMore ? encodeCursor(finances[finances.length - 1], sortBy) : null
+
+    if (summaryResult.error) {
+      console.warn('Finance summary unavailable:', summaryResult.error.message)
+    }
 
     console.log(`Successfully fetched ${finances.length} financial records from database for user role: ${userRole}`)
 
     return NextResponse.json({
-      finances: finances || [],
-      summary: {
-        totalReceivables,
-        totalReceived,
-        pendingAmount,
-        overdueAmount,
-        totalRecords: finances?.length || 0,
-        paidRecords: finances?.filter(f => f.status === 'paid').length || 0,
-        pendingRecords: finances?.filter(f => f.status === 'pending').length || 0,
-        overdueRecords: finances?.filter(f => f.status === 'overdue').length || 0
+      finances,
+      summary: summaryResult.data || null,
+      pagination: {
+        limit,
+        sortBy,
+        hasMore,
+        nextCursor
       },
-      message: `Found ${finances?.length || 0} financial records`,
+      message: `Found ${finances.length} financial records`,
       source: 'database',
       userRole: userRole
     })
@@ -148,19 +138,19 @@ export async function POST(request) {
   try {
     console.log('Creating new financial record')
 
-    // Get user session for role-based access control
-    const session = await getServerSession(authOptions)
-    if (!session?.user) {
+    // Session, role and compiled permissions for role-based access control
+    const auth = await getAuthContext(request)
+    if (!auth.authenticated) {
       return NextResponse.json({ 
         error: 'Unauthorized access. Please sign in to create financial records.'
       }, { status: 401 })
     }
 
-    const userRole = getUserRole(session.user)
-    const userId = session.user.userId
+    const userRole = auth.role
+    const userId = auth.user.userId
 
     // Check if user has permission to create finances
-    if (!canViewAllFinances(userRole) && !canManageOwnFinances(userRole)) {
+    if (!auth.can('finance_all') && !auth.can('finance_own')) {
       return NextResponse.json({ 
         error: 'Access denied. You do not have permission to create financial records.'
       }, { status: 403 })
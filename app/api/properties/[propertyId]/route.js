@@ -3,6 +3,7 @@ import { supabase, handleSupabaseError } from '@/lib/supabase'
 import { getServerSession } from 'next-auth/next'
 import { authOptions } from '@/app/api/auth/[...nextauth]/route'
 import { getUserRole, ROLES } from '@/lib/permissions'
+import { invalidateSharedProperties } from '@/lib/share-cache'
 
 export async function GET(request, { params }) {
   try {
@@ -172,6 +173,9 @@ export async function PUT(request, { params }) {
 
     console.log('Property updated successfully:', property.id)
 
+    // Shared links must not keep serving the old details
+    invalidateSharedProperties([propertyId])
+
     return NextResponse.json({ 
       property,
       message: 'Property updated successfully'
@@ -215,6 +219,8 @@ export async function DELETE(request, { params }) {
 
     console.log('Property deleted successfully:', propertyId)
 
+    invalidateSharedProperties([propertyId])
+
     return NextResponse.json({ 
       message: 'Property deleted successfully'
     })
@@ -1,8 +1,7 @@
 import { NextResponse } from 'next/server'
-import { propertySharingSystem } from '@/lib/property-sharing'
+import { z } from 'zod'
+import { propertySharingSystem, SHARE_STATUSES } from '@/lib/property-sharing'
 import { withAuthenticatedSecurity } from '@/lib/security-middleware'
-import { getServerSession } from 'next-auth'
-import { authOptions } from '@/app/api/auth/[...nextauth]/route'
 import { canManageProperties } from '@/lib/permissions'
 
 /**
@@ -12,9 +11,19 @@ import { canManageProperties } from '@/lib/permissions'
  * GET /api/properties/[propertyId]/share - List sharing links for property
  */
 
-async function createSharingLink(request, { params }) {
+const createSharingLinkSchema = z.object({
+  expiryHours: z.coerce.number().positive().optional(),
+  clientEmail: z.string().email().nullable().optional(),
+  clientName: z.string().max(200).nullable().optional(),
+  allowedViews: z.coerce.number().int().positive().nullable().optional(),
+  requireClientInfo: z.boolean().optional(),
+  allowDownloads: z.boolean().optional(),
+  customMessage: z.string().max(2000).nullable().optional()
+})
+
+async function createSharingLink(request, { params, body = {}, auth }) {
   try {
-    const session = await getServerSession(authOptions)
+    const { session } = auth
     const { propertyId } = params
 
     // Check if user can manage properties
@@ -25,7 +34,6 @@ async function createSharingLink(request, { params }) {
       )
     }
 
-    const body = await request.json().catch(() => ({}))
     const {
       expiryHours = 168, // 7 days default
       clientEmail = null,
@@ -90,9 +98,9 @@ async function createSharingLink(request, { params }) {
   }
 }
 
-async function listSharingLinks(request, { params }) {
+async function listSharingLinks(request, { params, auth }) {
   try {
-    const session = await getServerSession(authOptions)
+    const { session } = auth
     const { propertyId } = params
 
     // Check if user can manage properties
@@ -105,7 +113,17 @@ async function listSharingLinks(request, { params }) {
 
     const { searchParams } = new URL(request.url)
     const isActive = searchParams.get('active')
-    const limit = parseInt(searchParams.get('limit')) || 20
+    const status = searchParams.get('status')
+    const cursor = searchParams.get('cursor')
+    const limit = Math.min(parseInt(searchParams.get('limit')) || 20, 100)
+
+    const statuses = status ? status.split(',').map(value => value.trim().toUpperCase()) : null
+    if (statuses && statuses.some(value => !SHARE_STATUSES.includes(value))) {
+      return NextResponse.json({
+        success: false,
+        error: `Invalid status filter. Use one or more of: ${SHARE_STATUSES.join(', ')}`
+      }, { status: 400 })
+    }
 
     console.log(`📋 Listing sharing links for property ${propertyId}`)
 
@@ -113,6 +131,8 @@ async function listSharingLinks(request, { params }) {
     const result = await propertySharingSystem.listSharingLinks({
       propertyId,
       isActive: isActive !== null ? isActive === 'true' : null,
+      statuses,
+      cursor,
       limit
     })
 
@@ -120,7 +140,7 @@ async function listSharingLinks(request, { params }) {
       return NextResponse.json({
         success: false,
         error: result.error
-      }, { status: 500 })
+      }, { status: result.error === 'Invalid pagination cursor' ? 400 : 500 })
     }
 
     return NextResponse.json({
@@ -128,8 +148,14 @@ async function listSharingLinks(request, { params }) {
       property_id: propertyId,
       sharing_links: result.shares,
       total_count: result.total,
+      pagination: {
+        limit,
+        next_cursor: result.nextCursor,
+        has_more: result.hasMore
+      },
       filters: {
         active: isActive,
+        status: statuses,
         limit
       }
     })
@@ -147,6 +173,7 @@ async function listSharingLinks(request, { params }) {
 
 export const POST = withAuthenticatedSecurity(createSharingLink, {
   requiredRole: 'editor',
+  bodySchema: createSharingLinkSchema,
   logAccess: true,
   sensitiveEndpoint: true
 })
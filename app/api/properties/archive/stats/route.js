@@ -1,27 +1,25 @@
 import { NextResponse } from 'next/server'
-import { getServerSession } from 'next-auth'
-import { authOptions } from '@/app/api/auth/[...nextauth]/route'
-import { getUserRole, canAccessArchive } from '@/lib/permissions'
+import { canAccessArchive } from '@/lib/permissions'
 import { supabase, supabaseAdmin } from '@/lib/supabase'
-import { getUserByEmail } from '@/lib/optimized-queries'
+import { getAuthContext } from '@/lib/auth-context'
 
-export async function GET() {
+export async function GET(request) {
   try {
     console.log('📊 Fetching archive statistics...')
 
     // Authentication check
-    const session = await getServerSession(authOptions)
-    if (!session?.user) {
+    const auth = await getAuthContext(request)
+    if (!auth.authenticated) {
       return NextResponse.json({ error: 'Unauthorized' }, { status: 401 })
     }
 
     // Get user info
-    const userResult = await getUserByEmail(session.user.email)
-    if (userResult.error || !userResult.data) {
+    const userRecord = await auth.getUserRecord()
+    if (!userRecord) {
       return NextResponse.json({ error: 'Could not find user' }, { status: 403 })
     }
 
-    const userRole = getUserRole(session.user)
+    const userRole = auth.role
 
     // Permission check - archive statistics are master-only
     if (!canAccessArchive(userRole)) {
@@ -226,12 +224,12 @@ export async function GET() {
 export async function POST(request) {
   try {
     // This endpoint can be used to refresh archive statistics
-    const session = await getServerSession(authOptions)
-    if (!session?.user) {
+    const auth = await getAuthContext(request)
+    if (!auth.authenticated) {
       return NextResponse.json({ error: 'Unauthorized' }, { status: 401 })
     }
 
-    const userRole = getUserRole(session.user)
+    const userRole = auth.role
     if (!canAccessArchive(userRole)) {
       return NextResponse.json({ 
         error: 'Archive statistics are restricted to master users only' 
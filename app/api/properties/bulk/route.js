@@ -1,28 +1,27 @@
 import { NextResponse } from 'next/server'
-import { getServerSession } from 'next-auth'
-import { authOptions } from '@/app/api/auth/[...nextauth]/route'
-import { getUserRole, canAccessArchive } from '@/lib/permissions'
+import { canAccessArchive } from '@/lib/permissions'
 import { supabase, supabaseAdmin } from '@/lib/supabase'
-import { getUserByEmail } from '@/lib/optimized-queries'
+import { getAuthContext } from '@/lib/auth-context'
+import { invalidateSharedProperties } from '@/lib/share-cache'
 
 export async function POST(request) {
   try {
     console.log('🔄 Bulk properties operation requested')
 
     // Authentication check
-    const session = await getServerSession(authOptions)
-    if (!session?.user) {
+    const auth = await getAuthContext(request)
+    if (!auth.authenticated) {
       return NextResponse.json({ error: 'Unauthorized' }, { status: 401 })
     }
 
     // Get user info
-    const userResult = await getUserByEmail(session.user.email)
-    if (userResult.error || !userResult.data) {
+    const userRecord = await auth.getUserRecord()
+    if (!userRecord) {
       return NextResponse.json({ error: 'Could not find user' }, { status: 403 })
     }
 
-    const userId = userResult.data.id
-    const userRole = getUserRole(session.user)
+    const userRole = auth.role
+    const userId = userRecord.id
 
     // Permission check - bulk operations are master-only
     if (!canAccessArchive(userRole)) {
@@ -135,6 +134,9 @@ export async function POST(request) {
         }, { status: 400 })
     }
 
+    // Shared links must not keep serving the old details
+    invalidateSharedProperties(allowedPropertyIds)
+
     console.log(`Bulk ${action} completed: ${results.successful}/${results.totalRequested} successful`)
 
     return NextResponse.json({
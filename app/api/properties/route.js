@@ -1,27 +1,26 @@
 import { NextResponse } from 'next/server'
 import { supabase, handleSupabaseError } from '@/lib/supabase'
-import { getServerSession } from 'next-auth/next'
-import { authOptions } from '../auth/[...nextauth]/route'
-import { getUserRole, ROLES } from '@/lib/permissions'
-import { getOptimizedProperties, getUserByEmail } from '@/lib/optimized-queries'
+import { ROLES } from '@/lib/permissions'
+import { getOptimizedProperties } from '@/lib/optimized-queries'
+import { getAuthContext } from '@/lib/auth-context'
 
 export async function GET(request) {
   try {
     console.log('Properties API called - fetching properties (optimized)')
 
-    const session = await getServerSession(authOptions)
-    if (!session) {
+    const auth = await getAuthContext(request)
+    if (!auth.authenticated) {
       return NextResponse.json({ error: 'Unauthorized' }, { status: 401 })
     }
 
     // Get current user info using optimized query
-    const userResult = await getUserByEmail(session.user.email)
-    if (userResult.error || !userResult.data) {
+    const userRecord = await auth.getUserRecord()
+    if (!userRecord) {
       return NextResponse.json({ error: 'Could not find user' }, { status: 403 })
     }
 
-    const userId = userResult.data.id
-    const userRole = getUserRole(session.user)
+    const userId = userRecord.id
+    const userRole = auth.role
 
     // Get query parameters for filtering
     const { searchParams } = new URL(request.url)
@@ -94,15 +93,15 @@ export async function POST(request) {
     console.log('Creating new property')
 
     // Get the current user's session
-    const session = await getServerSession(authOptions)
+    const auth = await getAuthContext(request)
     
-    if (!session) {
+    if (!auth.authenticated) {
       return NextResponse.json({ 
         error: 'Authentication required to create a property' 
       }, { status: 401 })
     }
 
-    const userRole = getUserRole(session.user)
+    const userRole = auth.role
     const body = await request.json()
     const { 
       name, 
@@ -131,13 +130,9 @@ export async function POST(request) {
     }
 
     // Fetch user ID from Supabase to ensure we have the correct user reference
-    const { data: userData, error: userError } = await supabase
-      .from('users')
-      .select('id')
-      .eq('email', session.user.email)
-      .single()
+    const userData = await auth.getUserRecord()
 
-    if (userError || !userData) {
+    if (!userData) {
       return NextResponse.json({ 
         error: 'Could not find user information' 
       }, { status: 403 })
@@ -1,5 +1,11 @@
 import { NextResponse } from 'next/server'
 import { securitySystem, withAuthentication, withRateLimit } from '@/lib/security-system'
+import { getEventSinkMetrics } from '@/lib/event-sink'
+import { shareTokenGuard } from '@/lib/share-token-guard'
+import { shareExpirySweeper } from '@/lib/share-expiry-sweeper'
+import { shareEmailQueue } from '@/lib/share-email'
+import { securityExpiry } from '@/lib/expiring-map'
+import { auditLogRetention } from '@/lib/audit-log-retention'
 import { getServerSession } from 'next-auth'
 import { authOptions } from '@/app/api/auth/[...nextauth]/route'
 
@@ -45,6 +51,7 @@ export async function GET(request) {
     console.log(`📊 Security monitoring requested by: ${authResult.user.email}`)
 
     // Get real-time security data
+    const eventRates = securitySystem.securityEvents.getRates()
     const monitoringData = {
       timestamp: new Date().toISOString(),
       system_status: {
@@ -52,27 +59,30 @@ export async function GET(request) {
           active_limits: securitySystem.rateLimitStore.size,
           blocked_ips: Array.from(securitySystem.blockedIPs),
           blocked_ips_count: securitySystem.blockedIPs.size,
-          suspicious_activities: securitySystem.suspiciousActivities.size
+          suspicious_activities: securitySystem.suspiciousActivities.size,
+          state_store: securitySystem.stateStore.getMetrics(),
+          expiry: securityExpiry.getMetrics()
         },
         security_events: {
-          total_events: securitySystem.securityEvents.length,
-          recent_events: securitySystem.securityEvents.slice(-10),
-          events_by_severity: securitySystem.securityEvents.reduce((acc, event) => {
-            acc[event.severity] = (acc[event.severity] || 0) + 1
-            return acc
-          }, {}),
-          events_by_type: securitySystem.securityEvents.reduce((acc, event) => {
-            acc[event.type] = (acc[event.type] || 0) + 1
-            return acc
-          }, {})
+          total_events: securitySystem.securityEvents.size,
+          total_logged: securitySystem.securityEvents.totalLogged,
+          recent_events: securitySystem.securityEvents.recent(10),
+          events_by_severity: securitySystem.securityEvents.countsBySeverity(),
+          events_by_type: securitySystem.securityEvents.countsByType(),
+          rates: eventRates
         },
+        event_sinks: getEventSinkMetrics(),
+        share_token_guard: shareTokenGuard.getStats(),
+        share_expiry_sweeper: shareExpirySweeper.getMetrics(),
+        share_email_queue: shareEmailQueue.getMetrics(),
+        audit_log_retention: auditLogRetention.getMetrics(),
         configuration: {
           rate_limit: securitySystem.config.rateLimit,
           security: securitySystem.config.security,
           validation: securitySystem.config.validation
         }
       },
-      alerts: generateSecurityAlerts(),
+      alerts: generateSecurityAlerts(eventRates),
       recommendations: generateRealTimeRecommendations()
     }
 
@@ -145,8 +155,7 @@ export async function POST(request) {
         break
 
       case 'clear_blocked_ips':
-        const clearedCount = securitySystem.blockedIPs.size
-        securitySystem.blockedIPs.clear()
+        const clearedCount = await securitySystem.clearBlockedIPs()
         
         result = {
           message: `Cleared ${clearedCount} blocked IPs`,
@@ -155,19 +164,17 @@ export async function POST(request) {
         break
 
       case 'reset_rate_limits':
-        const resetCount = securitySystem.rateLimitStore.size
-        securitySystem.rateLimitStore.clear()
-        securitySystem.suspiciousActivities.clear()
+        // Count is null with a shared store, where keys are not tracked locally
+        const resetCount = await securitySystem.resetRateLimits()
         
         result = {
-          message: `Reset rate limits for ${resetCount} IPs`,
+          message: resetCount === null ? 'Reset rate limits' : `Reset rate limits for ${resetCount} keys`,
           reset_count: resetCount
         }
         break
 
       case 'clear_security_events':
-        const eventsCount = securitySystem.securityEvents.length
-        securitySystem.securityEvents.length = 0
+        const eventsCount = securitySystem.securityEvents.clear()
         
         result = {
           message: `Cleared ${eventsCount} security events from memory`,
@@ -216,10 +223,9 @@ export async function POST(request) {
 }
 
 // Helper functions
-function generateSecurityAlerts() {
+function generateSecurityAlerts(eventRates) {
   const alerts = []
-  const now = Date.now()
-  const oneHourAgo = now - 60 * 60 * 1000
+  const lastHour = eventRates.last_1h
 
   // Check for blocked IPs
   if (securitySystem.blockedIPs.size > 0) {
@@ -232,30 +238,26 @@ function generateSecurityAlerts() {
   }
 
   // Check for recent high-severity events
-  const recentHighSeverityEvents = securitySystem.securityEvents.filter(
-    event => event.severity === 'HIGH' || event.severity === 'CRITICAL'
-  ).filter(event => new Date(event.timestamp).getTime() > oneHourAgo)
+  const highSeverityCount = lastHour.by_severity.HIGH + lastHour.by_severity.CRITICAL
 
-  if (recentHighSeverityEvents.length > 0) {
+  if (highSeverityCount > 0) {
     alerts.push({
       type: 'HIGH_SEVERITY_EVENTS',
       severity: 'HIGH',
-      message: `${recentHighSeverityEvents.length} high/critical severity events in the last hour`,
+      message: `${highSeverityCount} high/critical severity events in the last hour`,
       timestamp: new Date().toISOString(),
-      events: recentHighSeverityEvents.slice(0, 5)
+      events: securitySystem.securityEvents.recentHighSeverity(60 * 60 * 1000, 5)
     })
   }
 
   // Check for excessive rate limiting
-  const rateLimitEvents = securitySystem.securityEvents.filter(
-    event => event.type === 'RATE_LIMIT_EXCEEDED'
-  ).filter(event => new Date(event.timestamp).getTime() > oneHourAgo)
+  const rateLimitCount = lastHour.by_type.RATE_LIMIT_EXCEEDED || 0
 
-  if (rateLimitEvents.length > 10) {
+  if (rateLimitCount > 10) {
     alerts.push({
       type: 'EXCESSIVE_RATE_LIMITING',
       severity: 'MEDIUM',
-      message: `${rateLimitEvents.length} rate limit violations in the last hour`,
+      message: `${rateLimitCount} rate limit violations in the last hour`,
       timestamp: new Date().toISOString()
     })
   }
@@ -275,7 +277,7 @@ function generateRealTimeRecommendations() {
     })
   }
 
-  if (securitySystem.securityEvents.length > 500) {
+  if (securitySystem.securityEvents.size > 500) {
     recommendations.push({
       priority: 'MEDIUM',
       message: 'High number of security events in memory',
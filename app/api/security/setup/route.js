@@ -2,6 +2,7 @@ import { NextResponse } from 'next/server'
 import { supabaseAdmin } from '@/lib/supabase'
 import { getServerSession } from 'next-auth'
 import { authOptions } from '@/app/api/auth/[...nextauth]/route'
+import { partitionLogTableSQL } from '@/lib/audit-log-retention'
 
 /**
  * Security System Setup API
@@ -45,15 +46,16 @@ export async function POST(request) {
     
     const auditTableSQL = `
       CREATE TABLE IF NOT EXISTS security_audit_log (
-        id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+        id UUID NOT NULL DEFAULT gen_random_uuid(),
         event_type VARCHAR(100) NOT NULL,
         severity VARCHAR(20) NOT NULL DEFAULT 'LOW',
         details JSONB DEFAULT '{}',
         ip_address INET,
         user_email VARCHAR(255),
         user_agent TEXT,
-        created_at TIMESTAMP DEFAULT NOW()
-      );
+        created_at TIMESTAMP NOT NULL DEFAULT NOW(),
+        PRIMARY KEY (id, created_at)
+      ) PARTITION BY RANGE (created_at);
     `
 
     try {
@@ -95,6 +97,29 @@ export async function POST(request) {
       })
     }
 
+    // Step 1b: Partition the security_audit_log table by month (converts an existing table in place)
+    console.log('🗂️ Partitioning security_audit_log by month...')
+
+    const partitionSQL = partitionLogTableSQL('security_audit_log')
+
+    try {
+      const { error } = await supabaseAdmin.rpc('exec_sql', { sql: partitionSQL })
+
+      setupResult.steps.push({
+        step: 'partition_audit_table',
+        success: !error,
+        error: error?.message,
+        manual_sql: error ? partitionSQL : undefined
+      })
+    } catch (err) {
+      setupResult.steps.push({
+        step: 'partition_audit_table',
+        success: false,
+        error: err.message,
+        manual_sql: partitionSQL
+      })
+    }
+
     // Step 2: Create security configuration table
     console.log('⚙️ Creating security configuration table...')
     
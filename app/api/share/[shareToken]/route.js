@@ -1,14 +1,80 @@
 import { NextResponse } from 'next/server'
+import { z } from 'zod'
 import { propertySharingSystem } from '@/lib/property-sharing'
 import { withPublicSecurity } from '@/lib/security-middleware'
+import { shareCache } from '@/lib/share-cache'
 
 /**
  * Public Property Sharing API
  * 
  * GET /api/share/[shareToken] - Get shared property data (public access)
  * POST /api/share/[shareToken] - Submit client info and get property data
+ *
+ * Shares without a view limit or required client info are served from the
+ * share payload cache with an ETag; the page counts the view separately via
+ * POST /api/share/[shareToken]/view.
  */
 
+const errorStatus = (errorCode) => errorCode === 'INVALID_SHARE_TOKEN' ? 404 :
+                                   errorCode === 'EXPIRED_LINK' ? 410 :
+                                   errorCode === 'VIEW_LIMIT_EXCEEDED' ? 429 :
+                                   errorCode === 'CLIENT_INFO_REQUIRED' ? 422 :
+                                   errorCode === 'SYSTEM_ERROR' ? 500 : 400
+
+async function loadShareContent(shareToken) {
+  const content = await propertySharingSystem.getShareContent(shareToken)
+
+  if (!content.success || content.gated) {
+    return { cacheable: false, ...content }
+  }
+
+  return {
+    cacheable: true,
+    share: {
+      shareId: content.shareInfo.id,
+      propertyId: content.propertyId,
+      expiresAt: content.shareInfo.expiresAt
+    },
+    body: {
+      success: true,
+      property: content.property,
+      share_info: {
+        id: content.shareInfo.id,
+        expires_at: content.shareInfo.expiresAt,
+        custom_message: content.shareInfo.customMessage,
+        allow_downloads: content.shareInfo.allowDownloads,
+        allowed_views: content.shareInfo.allowedViews,
+        client_name: content.shareInfo.clientName
+      },
+      view_beacon: `/api/share/${shareToken}/view`
+    }
+  }
+}
+
+function matchesEtag(request, etag) {
+  const header = request.headers.get('if-none-match')
+  if (!header) return false
+  return header.split(',').some(tag => tag.trim().replace(/^W\//, '') === etag)
+}
+
+// Public caches may keep serving a payload for s-maxage + stale-while-revalidate
+// after the share is deactivated or expires early (see lib/share-cache);
+// invalidation only reaches this instance's in-memory cache
+function cachedShareResponse(request, entry) {
+  const headers = {
+    'ETag': entry.etag,
+    'Cache-Control': shareCache.cacheControl(entry)
+  }
+
+  if (matchesEtag(request, entry.etag)) {
+    return new NextResponse(null, { status: 304, headers })
+  }
+
+  return new NextResponse(entry.json, {
+    headers: { ...headers, 'Content-Type': 'application/json' }
+  })
+}
+
 async function getSharedProperty(request, { params }) {
   try {
     const { shareToken } = params
@@ -22,21 +88,34 @@ async function getSharedProperty(request, { params }) {
 
     console.log(`🔗 Accessing shared property with token: ${shareToken.substring(0, 8)}...`)
 
-    // Get the shared property data
+    // Ungated shares: cached payload, view counted by the beacon
+    if (!clientInfo.name && !clientInfo.email) {
+      const { entry, result: content } = await shareCache.getOrLoad(shareToken, () => loadShareContent(shareToken))
+
+      if (entry) {
+        return cachedShareResponse(request, entry)
+      }
+
+      if (!content.success) {
+        return NextResponse.json({
+          success: false,
+          error: content.error,
+          error_code: content.errorCode,
+          requires_client_info: false
+        }, { status: errorStatus(content.errorCode), headers: { 'Cache-Control': 'no-store' } })
+      }
+    }
+
+    // Gated shares (view limit / client info): validate and count in one call
     const result = await propertySharingSystem.getSharedProperty(shareToken, clientInfo)
 
     if (!result.success) {
-      const statusCode = result.errorCode === 'INVALID_SHARE_TOKEN' ? 404 :
-                         result.errorCode === 'EXPIRED_LINK' ? 410 :
-                         result.errorCode === 'VIEW_LIMIT_EXCEEDED' ? 429 :
-                         result.errorCode === 'CLIENT_INFO_REQUIRED' ? 422 : 400
-
       return NextResponse.json({
         success: false,
         error: result.error,
         error_code: result.errorCode,
         requires_client_info: result.requiresClientInfo || false
-      }, { status: statusCode })
+      }, { status: errorStatus(result.errorCode), headers: { 'Cache-Control': 'no-store' } })
     }
 
     // Return the property data with sharing information
@@ -57,7 +136,7 @@ async function getSharedProperty(request, { params }) {
         accessed_at: new Date().toISOString(),
         client_provided: !!(clientInfo.name || clientInfo.email)
       }
-    })
+    }, { headers: { 'Cache-Control': 'no-store' } })
 
   } catch (error) {
     console.error('❌ Failed to get shared property:', error)
@@ -66,15 +145,20 @@ async function getSharedProperty(request, { params }) {
       success: false,
       error: 'Failed to load shared property',
       error_code: 'SYSTEM_ERROR'
-    }, { status: 500 })
+    }, { status: 500, headers: { 'Cache-Control': 'no-store' } })
   }
 }
 
-async function submitClientInfo(request, { params }) {
+// Presence and format are checked in the handler, which returns specific error codes
+const clientInfoSchema = z.object({
+  name: z.string().max(200).optional(),
+  email: z.string().max(320).optional(),
+  phone: z.string().max(40).nullable().optional()
+})
+
+async function submitClientInfo(request, { params, body = {} }) {
   try {
     const { shareToken } = params
-    const body = await request.json().catch(() => ({}))
-    
     const { name, email, phone } = body
 
     // Validate required client information
@@ -106,15 +190,11 @@ async function submitClientInfo(request, { params }) {
     })
 
     if (!result.success) {
-      const statusCode = result.errorCode === 'INVALID_SHARE_TOKEN' ? 404 :
-                         result.errorCode === 'EXPIRED_LINK' ? 410 :
-                         result.errorCode === 'VIEW_LIMIT_EXCEEDED' ? 429 : 400
-
       return NextResponse.json({
         success: false,
         error: result.error,
         error_code: result.errorCode
-      }, { status: statusCode })
+      }, { status: errorStatus(result.errorCode), headers: { 'Cache-Control': 'no-store' } })
     }
 
     return NextResponse.json({
@@ -134,7 +214,7 @@ async function submitClientInfo(request, { params }) {
         email,
         access_granted_at: new Date().toISOString()
       }
-    })
+    }, { headers: { 'Cache-Control': 'no-store' } })
 
   } catch (error) {
     console.error('❌ Failed to submit client info:', error)
@@ -154,5 +234,7 @@ export const GET = withPublicSecurity(getSharedProperty, {
 
 export const POST = withPublicSecurity(submitClientInfo, {
   rateLimitOptions: { maxRequests: 10, windowMs: 60000 }, // 10 submissions per minute
-  validateInput: true
+  validateInput: true,
+  bodySchema: clientInfoSchema,
+  bodyLimits: { maxBytes: 16 * 1024 }
 })
@@ -0,0 +1,53 @@
+import { NextResponse } from 'next/server'
+import { propertySharingSystem } from '@/lib/property-sharing'
+import { withPublicSecurity } from '@/lib/security-middleware'
+
+/**
+ * Share View Beacon API
+ *
+ * POST /api/share/[shareToken]/view - Count a view of a cached share payload
+ *
+ * Sent by the share page after it renders a property from GET /api/share/[shareToken].
+ * Returns the updated view count; never returns property data.
+ */
+
+async function recordView(request, { params }) {
+  try {
+    const { shareToken } = params
+
+    const result = await propertySharingSystem.recordShareView(shareToken)
+
+    if (!result.success) {
+      const statusCode = result.errorCode === 'INVALID_SHARE_TOKEN' ? 404 :
+                         result.errorCode === 'EXPIRED_LINK' ? 410 :
+                         result.errorCode === 'VIEW_LIMIT_EXCEEDED' ? 429 :
+                         result.errorCode === 'CLIENT_INFO_REQUIRED' ? 422 : 500
+
+      return NextResponse.json({
+        success: false,
+        error: result.error,
+        error_code: result.errorCode
+      }, { status: statusCode, headers: { 'Cache-Control': 'no-store' } })
+    }
+
+    return NextResponse.json({
+      success: true,
+      view_count: result.viewCount,
+      allowed_views: result.allowedViews
+    }, { headers: { 'Cache-Control': 'no-store' } })
+
+  } catch (error) {
+    console.error('❌ Failed to record share view:', error)
+
+    return NextResponse.json({
+      success: false,
+      error: 'Failed to record view',
+      error_code: 'SYSTEM_ERROR'
+    }, { status: 500 })
+  }
+}
+
+export const POST = withPublicSecurity(recordView, {
+  rateLimitOptions: { maxRequests: 30, windowMs: 60000 }, // Same budget as GET /api/share/[shareToken]
+  validateInput: false // No request body
+})
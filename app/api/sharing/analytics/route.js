@@ -1,8 +1,6 @@
 import { NextResponse } from 'next/server'
 import { propertySharingSystem } from '@/lib/property-sharing'
 import { withAuthenticatedSecurity } from '@/lib/security-middleware'
-import { getServerSession } from 'next-auth'
-import { authOptions } from '@/app/api/auth/[...nextauth]/route'
 import { canManageProperties } from '@/lib/permissions'
 
 /**
@@ -12,9 +10,9 @@ import { canManageProperties } from '@/lib/permissions'
  * POST /api/sharing/analytics - Cleanup expired shares
  */
 
-async function getSharingAnalytics(request) {
+async function getSharingAnalytics(request, { auth }) {
   try {
-    const session = await getServerSession(authOptions)
+    const { session } = auth
     
     // Check if user can manage properties
     if (!canManageProperties(session.user.role)) {
@@ -82,9 +80,9 @@ async function getSharingAnalytics(request) {
   }
 }
 
-async function cleanupExpiredShares(request) {
+async function cleanupExpiredShares(request, { auth }) {
   try {
-    const session = await getServerSession(authOptions)
+    const { session } = auth
     
     // Only master users can perform cleanup
     if (session.user.role !== 'master') {
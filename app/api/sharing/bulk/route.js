@@ -0,0 +1,191 @@
+import { NextResponse } from 'next/server'
+import { z } from 'zod'
+import { propertySharingSystem } from '@/lib/property-sharing'
+import { shareEmailQueue } from '@/lib/share-email'
+import { withAuthenticatedSecurity } from '@/lib/security-middleware'
+import { canManageProperties, ROLES } from '@/lib/permissions'
+
+/**
+ * Bulk Property Sharing API
+ *
+ * POST /api/sharing/bulk - Share several properties with several clients at once
+ * GET /api/sharing/bulk?batchId=... - Email delivery progress for a bulk share
+ */
+
+const MAX_PROPERTIES = 50
+const MAX_CLIENTS = 100
+const MAX_LINKS = 1000
+const EMAIL_PATTERN = /^[^\s@]+@[^\s@]+\.[^\s@]+$/
+
+// Duplicates are dropped below, so the arrays may exceed the per-request limits
+const bulkShareSchema = z.object({
+  propertyIds: z.array(z.string().max(100)).max(MAX_LINKS).optional(),
+  clients: z.array(z.object({
+    email: z.string().max(320),
+    name: z.string().max(200).nullable().optional()
+  })).max(MAX_LINKS).optional(),
+  expiryHours: z.coerce.number().positive().optional(),
+  allowedViews: z.coerce.number().int().positive().nullable().optional(),
+  requireClientInfo: z.boolean().optional(),
+  allowDownloads: z.boolean().optional(),
+  customMessage: z.string().max(2000).nullable().optional(),
+  sendEmails: z.boolean().optional()
+})
+
+async function createBulkSharingLinks(request, { body = {}, auth }) {
+  try {
+    const { session } = auth
+
+    if (!canManageProperties(session.user.role)) {
+      return NextResponse.json(
+        { error: 'Insufficient permissions to share properties' },
+        { status: 403 }
+      )
+    }
+
+    const {
+      propertyIds = [],
+      clients = [],
+      expiryHours = 168, // 7 days default
+      allowedViews = null,
+      requireClientInfo = false,
+      allowDownloads = true,
+      customMessage = null,
+      sendEmails = true
+    } = body
+
+    const uniquePropertyIds = [...new Set(Array.isArray(propertyIds) ? propertyIds : [])]
+
+    // One link per client email; the last name given wins
+    const clientsByEmail = new Map()
+    for (const client of Array.isArray(clients) ? clients : []) {
+      const email = typeof client?.email === 'string' ? client.email.trim().toLowerCase() : ''
+      if (!EMAIL_PATTERN.test(email)) {
+        return NextResponse.json({
+          success: false,
+          error: `Invalid client email: ${client?.email ?? ''}`
+        }, { status: 400 })
+      }
+      clientsByEmail.set(email, { email, name: client.name || null })
+    }
+    const uniqueClients = [...clientsByEmail.values()]
+
+    if (uniquePropertyIds.length === 0 || uniqueClients.length === 0) {
+      return NextResponse.json({
+        success: false,
+        error: 'At least one property and one client are required'
+      }, { status: 400 })
+    }
+
+    if (uniquePropertyIds.length > MAX_PROPERTIES ||
+        uniqueClients.length > MAX_CLIENTS ||
+        uniquePropertyIds.length * uniqueClients.length > MAX_LINKS) {
+      return NextResponse.json({
+        success: false,
+        error: `Bulk sharing is limited to ${MAX_PROPERTIES} properties, ${MAX_CLIENTS} clients and ${MAX_LINKS} links per request`
+      }, { status: 400 })
+    }
+
+    console.log(`🔗 Creating ${uniquePropertyIds.length * uniqueClients.length} sharing links in bulk by ${session.user.email}`)
+
+    const result = await propertySharingSystem.createSharingLinksBulk(uniquePropertyIds, uniqueClients, {
+      expiryHours,
+      allowedViews,
+      requireClientInfo,
+      allowDownloads,
+      customMessage,
+      sendEmails: sendEmails !== false,
+      createdBy: session.user.email
+    })
+
+    if (!result.success) {
+      return NextResponse.json({
+        success: false,
+        error: result.error
+      }, { status: 400 })
+    }
+
+    // Emails are still being rendered and sent; poll GET ?batchId= for progress
+    return NextResponse.json({
+      success: true,
+      message: 'Sharing links created successfully',
+      batch_id: result.batchId,
+      expires_at: result.expiresAt,
+      sharing_links: result.shares.map(share => ({
+        id: share.id,
+        property_id: share.propertyId,
+        client_email: share.clientEmail,
+        url: share.sharingUrl,
+        token: share.shareToken
+      })),
+      emails: result.emails
+    }, { status: 202 })
+
+  } catch (error) {
+    console.error('❌ Failed to create sharing links in bulk:', error)
+
+    return NextResponse.json({
+      success: false,
+      error: 'Failed to create sharing links in bulk',
+      details: error.message
+    }, { status: 500 })
+  }
+}
+
+async function getBulkShareStatus(request, { auth }) {
+  try {
+    const { session } = auth
+
+    if (!canManageProperties(session.user.role)) {
+      return NextResponse.json(
+        { error: 'Insufficient permissions to view sharing links' },
+        { status: 403 }
+      )
+    }
+
+    const { searchParams } = new URL(request.url)
+    const batchId = searchParams.get('batchId')
+
+    if (!batchId) {
+      return NextResponse.json({
+        success: false,
+        error: 'Batch ID is required'
+      }, { status: 400 })
+    }
+
+    // Progress is kept in memory by the instance that created the batch.
+    // Other users' batches (recipient emails included) read as not found.
+    const batch = shareEmailQueue.getBatch(batchId)
+
+    if (!batch || (batch.createdBy !== session.user.email && auth.role !== ROLES.MASTER)) {
+      return NextResponse.json({
+        success: false,
+        error: 'Batch not found'
+      }, { status: 404 })
+    }
+
+    return NextResponse.json({
+      success: true,
+      batch
+    })
+
+  } catch (error) {
+    console.error('❌ Failed to get bulk share status:', error)
+
+    return NextResponse.json({
+      success: false,
+      error: 'Failed to get bulk share status',
+      details: error.message
+    }, { status: 500 })
+  }
+}
+
+export const POST = withAuthenticatedSecurity(createBulkSharingLinks, {
+  requiredRole: 'editor',
+  bodySchema: bulkShareSchema,
+  logAccess: true
+})
+
+export const GET = withAuthenticatedSecurity(getBulkShareStatus, {
+  requiredRole: 'editor'
+})
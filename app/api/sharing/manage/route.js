@@ -1,21 +1,21 @@
 import { NextResponse } from 'next/server'
-import { propertySharingSystem } from '@/lib/property-sharing'
+import { z } from 'zod'
+import { propertySharingSystem, SHARE_STATUSES } from '@/lib/property-sharing'
 import { withAuthenticatedSecurity } from '@/lib/security-middleware'
-import { getServerSession } from 'next-auth'
-import { authOptions } from '@/app/api/auth/[...nextauth]/route'
 import { canManageProperties } from '@/lib/permissions'
 
 /**
  * Sharing Management API
  * 
- * GET /api/sharing/manage - List all sharing links for user
+ * GET /api/sharing/manage - List sharing links for user
+ *   ?status=ACTIVE,EXPIRED,VIEW_LIMIT_REACHED,INACTIVE&limit=50&cursor=...
  * PUT /api/sharing/manage - Update sharing link
  * DELETE /api/sharing/manage - Deactivate sharing link
  */
 
-async function listAllSharingLinks(request) {
+async function listAllSharingLinks(request, { auth }) {
   try {
-    const session = await getServerSession(authOptions)
+    const { session } = auth
     
     // Check if user can manage properties
     if (!canManageProperties(session.user.role)) {
@@ -27,16 +27,26 @@ async function listAllSharingLinks(request) {
 
     const { searchParams } = new URL(request.url)
     const isActive = searchParams.get('active')
-    const limit = parseInt(searchParams.get('limit')) || 50
-    const offset = parseInt(searchParams.get('offset')) || 0
+    const status = searchParams.get('status')
+    const cursor = searchParams.get('cursor')
+    const limit = Math.min(parseInt(searchParams.get('limit')) || 50, 100)
+
+    const statuses = status ? status.split(',').map(value => value.trim().toUpperCase()) : null
+    if (statuses && statuses.some(value => !SHARE_STATUSES.includes(value))) {
+      return NextResponse.json({
+        success: false,
+        error: `Invalid status filter. Use one or more of: ${SHARE_STATUSES.join(', ')}`
+      }, { status: 400 })
+    }
 
     console.log(`📋 Listing all sharing links for user: ${session.user.email}`)
 
     // For master users, show all links; for editors, show only their own
     const filters = {
       isActive: isActive !== null ? isActive === 'true' : null,
-      limit,
-      offset
+      statuses,
+      cursor,
+      limit
     }
 
     // Editors can only see their own sharing links
@@ -50,7 +60,7 @@ async function listAllSharingLinks(request) {
       return NextResponse.json({
         success: false,
         error: result.error
-      }, { status: 500 })
+      }, { status: result.error === 'Invalid pagination cursor' ? 400 : 500 })
     }
 
     return NextResponse.json({
@@ -59,11 +69,12 @@ async function listAllSharingLinks(request) {
       total_count: result.total,
       pagination: {
         limit,
-        offset,
-        has_more: result.shares.length === limit
+        next_cursor: result.nextCursor,
+        has_more: result.hasMore
       },
       filters: {
         active: isActive,
+        status: statuses,
         user_role: session.user.role
       }
     })
@@ -79,9 +90,27 @@ async function listAllSharingLinks(request) {
   }
 }
 
-async function updateSharingLink(request) {
+const updateSharingLinkSchema = z.object({
+  shareId: z.string().optional(),
+  updates: z.object({
+    expires_at: z.string().refine(value => !Number.isNaN(Date.parse(value)), 'Invalid date').optional(),
+    client_email: z.string().email().nullable().optional(),
+    client_name: z.string().max(200).nullable().optional(),
+    allowed_views: z.number().int().positive().nullable().optional(),
+    require_client_info: z.boolean().optional(),
+    allow_downloads: z.boolean().optional(),
+    custom_message: z.string().max(2000).nullable().optional(),
+    is_active: z.boolean().optional()
+  }).optional()
+})
+
+const deactivateSharingLinkSchema = z.object({
+  shareId: z.string().optional()
+})
+
+async function updateSharingLink(request, { body = {}, auth }) {
   try {
-    const session = await getServerSession(authOptions)
+    const { session } = auth
     
     if (!canManageProperties(session.user.role)) {
       return NextResponse.json(
@@ -90,7 +119,6 @@ async function updateSharingLink(request) {
       )
     }
 
-    const body = await request.json()
     const { shareId, updates } = body
 
     if (!shareId) {
@@ -137,9 +165,9 @@ async function updateSharingLink(request) {
   }
 }
 
-async function deactivateSharingLink(request) {
+async function deactivateSharingLink(request, { body = {}, auth }) {
   try {
-    const session = await getServerSession(authOptions)
+    const { session } = auth
     
     if (!canManageProperties(session.user.role)) {
       return NextResponse.json(
@@ -148,7 +176,6 @@ async function deactivateSharingLink(request) {
       )
     }
 
-    const body = await request.json()
     const { shareId } = body
 
     if (!shareId) {
@@ -194,10 +221,12 @@ export const GET = withAuthenticatedSecurity(listAllSharingLinks, {
 
 export const PUT = withAuthenticatedSecurity(updateSharingLink, {
   requiredRole: 'editor',
+  bodySchema: updateSharingLinkSchema,
   logAccess: true
 })
 
 export const DELETE = withAuthenticatedSecurity(deactivateSharingLink, {
   requiredRole: 'editor',
+  bodySchema: deactivateSharingLinkSchema,
   logAccess: true
 })
@@ -2,6 +2,8 @@ import { NextResponse } from 'next/server'
 import { supabaseAdmin } from '@/lib/supabase'
 import { getServerSession } from 'next-auth'
 import { authOptions } from '@/app/api/auth/[...nextauth]/route'
+import { SHARE_FUNCTIONS_SQL, SHARING_ROLLUP_SQL } from '@/lib/property-sharing'
+import { partitionLogTableSQL } from '@/lib/audit-log-retention'
 
 /**
  * Property Sharing System Setup API
@@ -65,6 +67,10 @@ export async function POST(request) {
         created_at TIMESTAMP DEFAULT NOW(),
         updated_at TIMESTAMP DEFAULT NOW()
       );
+
+      -- Lets list filters match VIEW_LIMIT_REACHED without comparing two columns
+      ALTER TABLE property_shares ADD COLUMN IF NOT EXISTS view_limit_reached BOOLEAN
+        GENERATED ALWAYS AS (allowed_views IS NOT NULL AND view_count >= allowed_views) STORED;
     `
 
     try {
@@ -111,15 +117,16 @@ export async function POST(request) {
     
     const logTableSQL = `
       CREATE TABLE IF NOT EXISTS property_sharing_log (
-        id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+        id UUID NOT NULL DEFAULT gen_random_uuid(),
         event_type VARCHAR(100) NOT NULL,
         share_id UUID REFERENCES property_shares(id) ON DELETE CASCADE,
         property_id UUID REFERENCES properties(id) ON DELETE CASCADE,
         details JSONB DEFAULT '{}',
         ip_address INET,
         user_agent TEXT,
-        created_at TIMESTAMP DEFAULT NOW()
-      );
+        created_at TIMESTAMP NOT NULL DEFAULT NOW(),
+        PRIMARY KEY (id, created_at)
+      ) PARTITION BY RANGE (created_at);
     `
 
     try {
@@ -158,6 +165,29 @@ export async function POST(request) {
       })
     }
 
+    // Step 2b: Partition the property_sharing_log table by month (converts an existing table in place)
+    console.log('🗂️ Partitioning property_sharing_log by month...')
+
+    const partitionSQL = partitionLogTableSQL('property_sharing_log')
+
+    try {
+      const { error } = await supabaseAdmin.rpc('exec_sql', { sql: partitionSQL })
+
+      setupResult.steps.push({
+        step: 'partition_log_table',
+        success: !error,
+        error: error?.message,
+        manual_sql: error ? partitionSQL : undefined
+      })
+    } catch (err) {
+      setupResult.steps.push({
+        step: 'partition_log_table',
+        success: false,
+        error: err.message,
+        manual_sql: partitionSQL
+      })
+    }
+
     // Step 3: Create update trigger
     console.log('⚡ Creating update triggers...')
     
@@ -204,6 +234,70 @@ export async function POST(request) {
       })
     }
 
+    // Step 3b: Create daily analytics rollups (tables, triggers, view counting)
+    console.log('📈 Creating sharing analytics rollups...')
+
+    try {
+      const { error } = await supabaseAdmin.rpc('exec_sql', { sql: SHARING_ROLLUP_SQL })
+
+      setupResult.steps.push({
+        step: 'create_analytics_rollups',
+        success: !error,
+        error: error?.message,
+        manual_sql: error ? SHARING_ROLLUP_SQL : undefined
+      })
+    } catch (err) {
+      setupResult.steps.push({
+        step: 'create_analytics_rollups',
+        success: false,
+        error: err.message,
+        manual_sql: SHARING_ROLLUP_SQL
+      })
+    }
+
+    // Step 3c: Create the public share functions (content lookup and atomic view accounting)
+    console.log('👁️ Creating public share functions...')
+
+    try {
+      const { error } = await supabaseAdmin.rpc('exec_sql', { sql: SHARE_FUNCTIONS_SQL })
+
+      setupResult.steps.push({
+        step: 'create_share_functions',
+        success: !error,
+        error: error?.message,
+        manual_sql: error ? SHARE_FUNCTIONS_SQL : undefined
+      })
+    } catch (err) {
+      setupResult.steps.push({
+        step: 'create_share_functions',
+        success: false,
+        error: err.message,
+        manual_sql: SHARE_FUNCTIONS_SQL
+      })
+    }
+
+    // Step 3d: One-time backfill of analytics history; a no-op once the
+    // rollups hold data, so re-running setup never rewrites them
+    console.log('📈 Backfilling sharing analytics rollups...')
+
+    try {
+      const { data: backfilled, error } = await supabaseAdmin.rpc('backfill_sharing_rollups')
+
+      setupResult.steps.push({
+        step: 'backfill_analytics_rollups',
+        success: !error,
+        backfilled: Boolean(backfilled),
+        error: error?.message
+      })
+    } catch (err) {
+      setupResult.steps.push({
+        step: 'backfill_analytics_rollups',
+        success: false,
+        error: err.message,
+        manual_sql: 'SELECT backfill_sharing_rollups();'
+      })
+    }
+
     // Step 4: Create indexes for performance
     console.log('🚀 Creating sharing indexes...')
     
@@ -213,6 +307,11 @@ export async function POST(request) {
       idx_property_shares_created_by: 'CREATE INDEX IF NOT EXISTS idx_property_shares_created_by ON property_shares(created_by);',
       idx_property_shares_expires_at: 'CREATE INDEX IF NOT EXISTS idx_property_shares_expires_at ON property_shares(expires_at);',
       idx_property_shares_active: 'CREATE INDEX IF NOT EXISTS idx_property_shares_active ON property_shares(is_active, expires_at) WHERE is_active = true;',
+      idx_property_shares_expiry_sweep: 'CREATE INDEX IF NOT EXISTS idx_property_shares_expiry_sweep ON property_shares(expires_at) WHERE is_active;',
+      idx_property_shares_view_limit_sweep: 'CREATE INDEX IF NOT EXISTS idx_property_shares_view_limit_sweep ON property_shares(id) WHERE is_active AND allowed_views IS NOT NULL AND view_count >= allowed_views;',
+      idx_property_shares_creator_created: 'CREATE INDEX IF NOT EXISTS idx_property_shares_creator_created ON property_shares(created_by, created_at DESC, id DESC);',
+      idx_property_shares_property_active: 'CREATE INDEX IF NOT EXISTS idx_property_shares_property_active ON property_shares(property_id, is_active);',
+      idx_property_shares_created: 'CREATE INDEX IF NOT EXISTS idx_property_shares_created ON property_shares(created_at DESC, id DESC);',
       idx_property_shares_client_email: 'CREATE INDEX IF NOT EXISTS idx_property_shares_client_email ON property_shares(actual_client_email) WHERE actual_client_email IS NOT NULL;',
       idx_sharing_log_share_id: 'CREATE INDEX IF NOT EXISTS idx_sharing_log_share_id ON property_sharing_log(share_id);',
       idx_sharing_log_event_type: 'CREATE INDEX IF NOT EXISTS idx_sharing_log_event_type ON property_sharing_log(event_type);',
@@ -379,7 +478,7 @@ export async function POST(request) {
 
     // Determine overall success
     const criticalSteps = setupResult.steps.filter(step => 
-      ['create_shares_table', 'create_log_table'].includes(step.step)
+      ['create_shares_table', 'create_log_table', 'create_share_functions', 'create_analytics_rollups'].includes(step.step)
     )
     const criticalSuccess = criticalSteps.every(step => step.success)
     const allTestsPassed = Object.values(testResults).every(t => t.success)
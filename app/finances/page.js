@@ -32,6 +32,8 @@ export default function FinancesPage() {
   const [users, setUsers] = useState([])
   const [createdByFilter, setCreatedByFilter] = useState('')
   const [showExportModal, setShowExportModal] = useState(false)
+  const [nextCursor, setNextCursor] = useState(null)
+  const [loadingMore, setLoadingMore] = useState(false)
 
   useEffect(() => {
     if (status === 'authenticated') {
@@ -44,13 +46,18 @@ export default function FinancesPage() {
     }
   }, [status])
 
-  const fetchFinances = async () => {
+  const fetchFinances = async (cursor = null) => {
     try {
-      setLoading(true)
+      if (cursor) {
+        setLoadingMore(true)
+      } else {
+        setLoading(true)
+      }
       setError('')
       
-      // Build query parameters
+      // Build query parameters (filtering, sorting and paging happen server-side)
       const params = new URLSearchParams()
+      if (cursor) params.append('cursor', cursor)
       if (searchTerm) params.append('clientName', searchTerm)
       if (statusFilter && statusFilter !== 'all') params.append('status', statusFilter)
       if (dateFilter) params.append('startDate', dateFilter)
@@ -61,8 +68,10 @@ export default function FinancesPage() {
       const data = await response.json()
       
       if (response.ok) {
-        setFinances(data.finances || [])
-        setSummary(data.summary || {})
+        setFinances(prev => cursor ? [...prev, ...(data.finances || [])] : (data.finances || []))
+        // Summary covers the whole filtered set and is only sent with the first page
+        if (!cursor) setSummary(data.summary || {})
+        setNextCursor(data.pagination?.nextCursor || null)
       } else {
         console.error('Failed to fetch finances:', data.error)
         setError(data.error || 'Failed to fetch financial records')
@@ -72,6 +81,7 @@ export default function FinancesPage() {
       setError('Network error occurred while fetching financial records')
     } finally {
       setLoading(false)
+      setLoadingMore(false)
     }
   }
 
@@ -211,7 +221,7 @@ export default function FinancesPage() {
             
             <div className={`${isMobile ? 'flex flex-col space-y-2' : 'flex items-center space-x-3'}`}>
               <div className={`${isMobile ? 'text-center text-xs' : 'text-sm'} text-muted-foreground`}>
-                {finances.length} Records {userRole === 'editor' ? '(Your Records)' : ''}
+                {summary.totalRecords ?? finances.length} Records {userRole === 'editor' ? '(Your Records)' : ''}
               </div>
               <div className={`${isMobile ? 'flex flex-col space-y-2' : 'flex items-center space-x-2'}`}>
                 {finances.length > 0 && (
@@ -390,7 +400,7 @@ export default function FinancesPage() {
                   Clear Filters
                 </Button>
                 <Button 
-                  onClick={fetchFinances}
+                  onClick={() => fetchFinances()}
                   size={isMobile ? "sm" : "default"}
                   className={isMobile ? 'w-full' : ''}
                 >
@@ -500,6 +510,20 @@ export default function FinancesPage() {
             ))}
           </div>
         )}
+
+        {nextCursor && (
+          <div className={`flex justify-center ${isMobile ? 'mt-4' : 'mt-6'}`}>
+            <Button
+              variant="outline"
+              size={isMobile ? "sm" : "default"}
+              className={isMobile ? 'w-full' : ''}
+              onClick={() => fetchFinances(nextCursor)}
+              disabled={loadingMore}
+            >
+              {loadingMore ? 'Loading...' : `Load More (${finances.length} of ${summary.totalRecords ?? '?'})`}
+            </Button>
+          </div>
+        )}
       </main>
 
       {/* Export Modal */}
@@ -507,6 +531,10 @@ export default function FinancesPage() {
         isOpen={showExportModal}
         onClose={() => setShowExportModal(false)}
         records={finances}
+        scope={{
+          createdBy: getUserRole(session?.user) !== 'editor' ? createdByFilter : null,
+          filters: { person: searchTerm, status: statusFilter || 'all', dateFrom: dateFilter }
+        }}
         onExport={handleExportSuccess}
       />
     </div>
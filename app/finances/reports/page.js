@@ -13,7 +13,8 @@ import {
   Download, Filter, Search, AlertTriangle, CheckCircle, DollarSign 
 } from 'lucide-react'
 import { getUserRole, canViewAllFinances } from '@/lib/permissions'
-import * as XLSX from 'xlsx'
+import { SORT_OPTIONS, EXPORT_FORMATS, downloadServerExport } from '@/lib/export'
+import { MAX_PAGE_SIZE } from '@/lib/finance-query'
 import jsPDF from 'jspdf'
 import 'jspdf-autotable'
 
@@ -30,6 +31,12 @@ export default function FinanceReportsPage() {
   const [selectedUser, setSelectedUser] = useState('')
   const [statusFilter, setStatusFilter] = useState('')
   const [dateRangeFilter, setDateRangeFilter] = useState('')
+  const [sortBy, setSortBy] = useState('DATE_DESC')
+  
+  // Cursor for the next server-side page
+  const [nextCursor, setNextCursor] = useState(null)
+  const [loadingMore, setLoadingMore] = useState(false)
+  const [exporting, setExporting] = useState(false)
   
   // Users list for masters to select from
   const [users, setUsers] = useState([])
@@ -54,7 +61,7 @@ export default function FinanceReportsPage() {
       
       fetchFinances()
     }
-  }, [status, selectedUser, statusFilter, dateRangeFilter])
+  }, [status, selectedUser, statusFilter, dateRangeFilter, sortBy])
 
   const fetchUsers = async () => {
     try {
@@ -71,27 +78,39 @@ export default function FinanceReportsPage() {
     }
   }
 
-  const fetchFinances = async () => {
+  const buildQueryParams = () => {
+    const params = new URLSearchParams()
+    params.append('sortBy', sortBy)
+    
+    if (selectedUser) params.append('userId', selectedUser)
+    if (statusFilter && statusFilter !== 'all') params.append('status', statusFilter)
+    if (dateRangeFilter) {
+      const [startDate, endDate] = dateRangeFilter.split('/')
+      params.append('startDate', startDate)
+      params.append('endDate', endDate)
+    }
+    return params
+  }
+
+  const fetchFinances = async (cursor = null) => {
     try {
-      setLoading(true)
+      if (cursor) {
+        setLoadingMore(true)
+      } else {
+        setLoading(true)
+      }
       setError('')
       
-      const params = new URLSearchParams()
-      
-      if (selectedUser) params.append('userId', selectedUser)
-      if (statusFilter && statusFilter !== 'all') params.append('status', statusFilter)
-      if (dateRangeFilter) {
-        const [startDate, endDate] = dateRangeFilter.split('/')
-        params.append('startDate', startDate)
-        params.append('endDate', endDate)
-      }
+      const params = buildQueryParams()
+      if (cursor) params.append('cursor', cursor)
       
       const response = await fetch(`/api/finances?${params}`)
       const data = await response.json()
       
       if (response.ok) {
-        setFinances(data.finances || [])
-        setSummary(data.summary || {})
+        setFinances(prev => cursor ? [...prev, ...(data.finances || [])] : (data.finances || []))
+        if (!cursor) setSummary(data.summary || {})
+        setNextCursor(data.pagination?.nextCursor || null)
       } else {
         console.error('Failed to fetch finances:', data.error)
         setError(data.error || 'Failed to fetch financial records')
@@ -101,6 +120,7 @@ export default function FinanceReportsPage() {
       setError('Network error occurred while fetching financial records')
     } finally {
       setLoading(false)
+      setLoadingMore(false)
     }
   }
 
@@ -121,19 +141,63 @@ export default function FinanceReportsPage() {
     }
   }
 
+  // Reports cover every matching record, not only the pages loaded on screen
+  const fetchAllFinances = async () => {
+    const records = []
+    let cursor = null
+    
+    do {
+      const params = buildQueryParams()
+      params.append('limit', String(MAX_PAGE_SIZE))
+      if (cursor) params.append('cursor', cursor)
+      
+      const response = await fetch(`/api/finances?${params}`)
+      const data = await response.json()
+      if (!response.ok) {
+        throw new Error(data.error || 'Failed to fetch financial records')
+      }
+      
+      records.push(...(data.finances || []))
+      cursor = data.pagination?.nextCursor || null
+    } while (cursor)
+    
+    return records
+  }
+
+  const reportFilename = () => `finance_report_${selectedUser || 'all'}_${new Date().toISOString().split('T')[0]}`
+
+  // Streamed by /api/finances/export with the same filters and order
   const exportToExcel = () => {
-    const worksheet = XLSX.utils.json_to_sheet(finances)
-    const workbook = XLSX.utils.book_new()
-    XLSX.utils.book_append_sheet(workbook, worksheet, 'Finance Records')
-    XLSX.writeFile(workbook, `finance_report_${selectedUser || 'all'}_${new Date().toISOString().split('T')[0]}.xlsx`)
+    const [dateFrom, dateTo] = dateRangeFilter ? dateRangeFilter.split('/') : []
+    downloadServerExport({
+      format: EXPORT_FORMATS.EXCEL,
+      filters: { status: statusFilter, dateFrom, dateTo },
+      createdBy: selectedUser,
+      sortBy,
+      filename: reportFilename()
+    })
   }
 
-  const exportToPDF = () => {
+  const exportToPDF = async () => {
+    setExporting(true)
+    setError('')
+    
+    let records
+    try {
+      records = await fetchAllFinances()
+    } catch (error) {
+      console.error('Error fetching finances for PDF export:', error)
+      setError(error.message)
+      return
+    } finally {
+      setExporting(false)
+    }
+    
     const doc = new jsPDF()
     doc.text('Finance Report', 14, 20)
     
     const tableColumn = ['ID', 'Client', 'Amount', 'Status', 'Due Date', 'Property']
-    const tableRows = finances.map(finance => [
+    const tableRows = records.map(finance => [
       finance.id.slice(0, 8),
       finance.client_name,
       formatCurrency(finance.amount),
@@ -148,7 +212,7 @@ export default function FinanceReportsPage() {
       body: tableRows
     })
     
-    doc.save(`finance_report_${selectedUser || 'all'}_${new Date().toISOString().split('T')[0]}.pdf`)
+    doc.save(`${reportFilename()}.pdf`)
   }
 
   return (
@@ -158,7 +222,7 @@ export default function FinanceReportsPage() {
       {/* Filters */}
       <Card className="mb-6">
         <CardContent className="pt-6">
-          <div className="grid grid-cols-1 md:grid-cols-3 gap-4">
+          <div className="grid grid-cols-1 md:grid-cols-4 gap-4">
             {canViewAllFinances(getUserRole(session?.user)) && (
               <Select 
                 value={selectedUser} 
@@ -197,6 +261,20 @@ export default function FinanceReportsPage() {
               placeholder="Date Range" 
               onChange={(e) => setDateRangeFilter(e.target.value)}
             />
+            
+            <Select 
+              value={sortBy} 
+              onValueChange={setSortBy}
+            >
+              <SelectTrigger>
+                <SelectValue placeholder="Sort by" />
+              </SelectTrigger>
+              <SelectContent>
+                {Object.entries(SORT_OPTIONS).map(([key, option]) => (
+                  <SelectItem key={key} value={key}>{option.label}</SelectItem>
+                ))}
+              </SelectContent>
+            </Select>
           </div>
         </CardContent>
       </Card>
@@ -256,9 +334,9 @@ export default function FinanceReportsPage() {
         <Button 
           variant="outline" 
           onClick={exportToPDF} 
-          disabled={finances.length === 0}
+          disabled={finances.length === 0 || exporting}
         >
-          <Download className="h-4 w-4 mr-2" /> Export PDF
+          <Download className="h-4 w-4 mr-2" /> {exporting ? 'Preparing PDF...' : 'Export PDF'}
         </Button>
       </div>
       
@@ -304,6 +382,17 @@ export default function FinanceReportsPage() {
               </TableBody>
             </Table>
           )}
+          {!loading && nextCursor && (
+            <div className="flex justify-center mt-4">
+              <Button 
+                variant="outline" 
+                onClick={() => fetchFinances(nextCursor)} 
+                disabled={loadingMore}
+              >
+                {loadingMore ? 'Loading...' : `Load More (${finances.length} of ${summary.totalRecords ?? '?'})`}
+              </Button>
+            </div>
+          )}
         </CardContent>
       </Card>
     </div>
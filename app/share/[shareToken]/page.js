@@ -71,6 +71,11 @@ export default function SharedPropertyPage() {
       setProperty(data.property)
       setShareInfo(data.share_info)
       setRequiresClientInfo(false)
+
+      // Cached payloads don't count the view; report it separately
+      if (data.view_beacon) {
+        recordView(data.view_beacon)
+      }
       
     } catch (err) {
       console.error('Failed to load shared property:', err)
@@ -80,6 +85,19 @@ export default function SharedPropertyPage() {
     }
   }
 
+  const recordView = async (beaconUrl) => {
+    try {
+      const response = await fetch(beaconUrl, { method: 'POST', keepalive: true })
+      if (!response.ok) return
+
+      const data = await response.json()
+      setShareInfo(prev => prev ? { ...prev, view_count: data.view_count } : prev)
+    } catch (err) {
+      // View counting is best-effort and never blocks the page
+      console.warn('Failed to record share view:', err)
+    }
+  }
+
   const submitClientInfo = async (e) => {
     e.preventDefault()
     
@@ -46,12 +46,15 @@ import { BulkRecordSelector } from "@/components/ui/bulk-record-selector"
 
 import { 
   EXPORT_FORMATS, 
+  SERVER_EXPORT_FORMATS,
   SORT_OPTIONS, 
-  filterFinanceRecords, 
+  queryFinanceRecords, 
   sortFinanceRecords, 
-  exportFinanceRecords,
+  downloadServerExport,
+  buildFinanceQueryParams,
   getFilterOptions
 } from "@/lib/export"
+import { exportFinanceRecordsInWorker } from "@/lib/export-worker-client"
 import {
   getExportPresets,
   saveExportPreset,
@@ -59,25 +62,33 @@ import {
   validatePreset
 } from "@/lib/export-presets"
 
+const EMPTY_FILTERS = {
+  dateFrom: '',
+  dateTo: '',
+  person: '',
+  status: 'all',
+  paymentType: 'all'
+}
+
+/**
+ * `scope` carries the finance page's view: `createdBy` (the user a master
+ * filtered to) is always applied, `filters` seed the modal's filters.
+ */
 export function FinanceExportModal({ 
   isOpen, 
   onClose, 
   records = [], 
+  scope = {},
   onExport 
 }) {
-  const [filters, setFilters] = useState({
-    dateFrom: '',
-    dateTo: '',
-    person: '',
-    status: 'all',
-    paymentType: 'all'
-  })
+  const [filters, setFilters] = useState(EMPTY_FILTERS)
   
   const [sortBy, setSortBy] = useState('DATE_DESC')
   const [exportFormat, setExportFormat] = useState(EXPORT_FORMATS.EXCEL)
   const [filename, setFilename] = useState('finance-records')
   const [showSensitive, setShowSensitive] = useState(true)
   const [isExporting, setIsExporting] = useState(false)
+  const [exportProgress, setExportProgress] = useState(null)
   const [error, setError] = useState('')
   const [presets, setPresets] = useState([])
   const [selectedPreset, setSelectedPreset] = useState('')
@@ -86,6 +97,21 @@ export function FinanceExportModal({
   const [newPresetDescription, setNewPresetDescription] = useState('')
   const [selectedRecordIds, setSelectedRecordIds] = useState([])
   const [useBulkSelection, setUseBulkSelection] = useState(false)
+  const [serverCount, setServerCount] = useState(null)
+
+  const { createdBy } = scope
+
+  // Start from the page's filters each time the modal opens
+  React.useEffect(() => {
+    if (isOpen) {
+      setFilters({ ...EMPTY_FILTERS, ...scope.filters })
+      setSelectedPreset('')
+    }
+  }, [isOpen])
+
+  // CSV/XLSX are exported by the server from the whole table, so their count
+  // comes from the server too; selections and PDFs use the loaded records
+  const serverExport = !useBulkSelection && SERVER_EXPORT_FORMATS.includes(exportFormat)
 
   // Get filter options from records
   const filterOptions = React.useMemo(() => getFilterOptions(records), [records])
@@ -106,28 +132,40 @@ export function FinanceExportModal({
     
     // If using bulk selection, filter to only selected records
     if (useBulkSelection && selectedRecordIds.length > 0) {
-      recordsToProcess = records.filter(record => selectedRecordIds.includes(record.id))
-    } else {
-      // Apply normal filters
-      recordsToProcess = filterFinanceRecords(records, filters)
+      const selectedIds = new Set(selectedRecordIds)
+      recordsToProcess = records.filter(record => selectedIds.has(record.id))
+      return sortFinanceRecords(recordsToProcess, sortBy)
     }
     
-    return sortFinanceRecords(recordsToProcess, sortBy)
+    // Apply normal filters and sorting in one compiled pass
+    return queryFinanceRecords(records, filters, sortBy)
   }, [records, filters, sortBy, useBulkSelection, selectedRecordIds])
 
+  React.useEffect(() => {
+    if (!isOpen || !serverExport) return
+
+    const controller = new AbortController()
+    const params = buildFinanceQueryParams({ filters, createdBy })
+    params.set('summaryOnly', 'true')
+    setServerCount(null)
+
+    fetch(`/api/finances?${params}`, { signal: controller.signal })
+      .then(response => response.ok ? response.json() : null)
+      .then(data => setServerCount(data?.summary?.totalRecords ?? null))
+      .catch(() => {})
+
+    return () => controller.abort()
+  }, [isOpen, serverExport, filters, createdBy])
+
+  const exportCount = serverExport ? serverCount : processedRecords.length
+
   const handleFilterChange = (key, value) => {
     setFilters(prev => ({ ...prev, [key]: value }))
     setError('')
   }
 
   const clearFilters = () => {
-    setFilters({
-      dateFrom: '',
-      dateTo: '',
-      person: '',
-      status: 'all',
-      paymentType: 'all'
-    })
+    setFilters(EMPTY_FILTERS)
     setSelectedPreset('')
     setError('')
   }
@@ -194,7 +232,7 @@ export function FinanceExportModal({
       return
     }
     
-    if (processedRecords.length === 0) {
+    if (exportCount === 0) {
       setError('No records match your filters. Please adjust your criteria.')
       return
     }
@@ -204,12 +242,18 @@ export function FinanceExportModal({
 
     try {
       const options = { showSensitive }
-      const result = await exportFinanceRecords(
-        processedRecords, 
-        exportFormat, 
-        filename, 
-        options
-      )
+
+      // Filtered CSV/XLSX exports are streamed by the server from the whole
+      // table; selections and PDFs are built in a worker from the records loaded here
+      const result = serverExport
+        ? downloadServerExport({ format: exportFormat, filters, createdBy, sortBy, filename, ...options })
+        : await exportFinanceRecordsInWorker(
+          processedRecords, 
+          exportFormat, 
+          filename, 
+          options,
+          ({ done, total }) => setExportProgress(Math.round((done / total) * 100))
+        )
       
       // Call parent callback if provided
       if (onExport) {
@@ -227,12 +271,14 @@ export function FinanceExportModal({
       setError(err.message || 'Export failed. Please try again.')
     } finally {
       setIsExporting(false)
+      setExportProgress(null)
     }
   }
 
   const getFormatIcon = (format) => {
     switch (format) {
       case EXPORT_FORMATS.EXCEL:
+      case EXPORT_FORMATS.CSV:
         return <BarChart3 className="h-4 w-4" />
       case EXPORT_FORMATS.PDF:
         return <FileText className="h-4 w-4" />
@@ -245,6 +291,8 @@ export function FinanceExportModal({
     switch (format) {
       case EXPORT_FORMATS.EXCEL:
         return 'Excel (XLSX)'
+      case EXPORT_FORMATS.CSV:
+        return 'CSV (Comma Separated)'
       case EXPORT_FORMATS.PDF:
         return 'PDF (Portable Document)'
       default:
@@ -377,7 +425,7 @@ export function FinanceExportModal({
             <div className="flex items-center space-x-2">
               <Filter className="h-4 w-4" />
               <h3 className="font-medium">Filters</h3>
-              <Badge variant="outline">{processedRecords.length} records</Badge>
+              <Badge variant="outline">{exportCount ?? '…'} records</Badge>
             </div>
 
             <div className="grid grid-cols-1 sm:grid-cols-2 gap-3 sm:gap-4">
@@ -564,20 +612,22 @@ export function FinanceExportModal({
           </Button>
           <Button 
             onClick={handleExport} 
-            disabled={isExporting || processedRecords.length === 0 || (useBulkSelection && selectedRecordIds.length === 0)}
+            disabled={isExporting || exportCount === 0 || (useBulkSelection && selectedRecordIds.length === 0)}
             className="w-full sm:w-auto order-1 sm:order-2"
           >
             {isExporting ? (
               <>
                 <Loader2 className="mr-2 h-4 w-4 animate-spin" />
-                <span className="hidden sm:inline">Exporting...</span>
+                <span className="hidden sm:inline">
+                  Exporting{exportProgress !== null ? ` ${exportProgress}%` : '...'}
+                </span>
                 <span className="sm:hidden">Export...</span>
               </>
             ) : (
               <>
                 <Download className="mr-2 h-4 w-4" />
-                <span className="hidden sm:inline">Export {processedRecords.length} Records</span>
-                <span className="sm:hidden">Export ({processedRecords.length})</span>
+                <span className="hidden sm:inline">Export {exportCount ?? ''} Records</span>
+                <span className="sm:hidden">Export ({exportCount ?? '…'})</span>
               </>
             )}
           </Button>
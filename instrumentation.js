@@ -0,0 +1,23 @@
+/**
+ * Next.js startup hook: runs once per server instance before requests are served
+ */
+export async function register() {
+  if (process.env.NEXT_RUNTIME === 'nodejs') {
+    // Load the share token index up front so the first public share
+    // requests (and token-guessing floods) never hit an empty guard
+    const { shareTokenGuard } = await import('./lib/share-token-guard')
+    shareTokenGuard.ensureWarm()
+
+    // Deactivate expired and view-limit-reached links in the background
+    const { shareExpirySweeper } = await import('./lib/share-expiry-sweeper')
+    shareExpirySweeper.start()
+
+    // Create upcoming audit log partitions and drop expired ones daily
+    const { auditLogRetention } = await import('./lib/audit-log-retention')
+    auditLogRetention.start()
+
+    // Take the first security scan now, so no request waits for a full scan
+    const { securitySystem } = await import('./lib/security-system')
+    securitySystem.startScanSchedule()
+  }
+}
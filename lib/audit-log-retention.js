@@ -0,0 +1,325 @@
+import { supabaseAdmin } from '@/lib/supabase'
+import { securitySystem } from '@/lib/security-system'
+
+/**
+ * PropMaster 3.0 - Audit log partitions and retention
+ *
+ * security_audit_log and property_sharing_log are range-partitioned by
+ * month on created_at:
+ *
+ * - Reports filter on created_at, so Postgres only scans the partitions
+ *   inside the requested range
+ * - Retention drops whole partitions once their newest possible row is
+ *   older than the retention period - instant, with no DELETE churn or
+ *   vacuum debt. Rows are kept for at least the retention period and at
+ *   most one month longer
+ * - Partitions are created a few months ahead by a daily job; a DEFAULT
+ *   partition catches any row outside them, so audit inserts never fail
+ *
+ * Existing unpartitioned tables are converted in place by
+ * partition_log_table: the old table becomes the `_legacy` partition, so no
+ * rows are copied. It covers everything up to the start of next month (or
+ * the month after its newest row, if later) and monthly partitions begin
+ * there. It is dropped as a whole once that bound is past the retention
+ * period, so legacy rows are kept longer than newer ones.
+ *
+ * Dropping property_sharing_log partitions loses no analytics: the sharing
+ * rollups are counted when shares are created and views recorded, not read
+ * from the log, and their one-time backfill runs right after conversion,
+ * while the legacy partition still holds the full history.
+ */
+
+export const PARTITIONED_LOG_TABLES = ['security_audit_log', 'property_sharing_log']
+
+export const LOG_PARTITION_SQL = `
+  -- Upper bound of a range partition (NULL for DEFAULT or MAXVALUE)
+  CREATE OR REPLACE FUNCTION log_partition_upper_bound(p_partition REGCLASS)
+  RETURNS TIMESTAMP AS $$
+    SELECT substring(pg_get_expr(c.relpartbound, c.oid) FROM 'TO \\(''([^'']+)''\\)')::timestamp
+    FROM pg_class c
+    WHERE c.oid = p_partition
+  $$ LANGUAGE sql STABLE;
+
+  -- Create monthly partitions from the current month through p_months_ahead,
+  -- skipping months an existing partition already covers
+  CREATE OR REPLACE FUNCTION ensure_log_partitions(p_table TEXT, p_months_ahead INTEGER DEFAULT 3)
+  RETURNS JSONB AS $$
+  DECLARE
+    v_month TIMESTAMP := date_trunc('month', NOW()::timestamp);
+    v_covered_until TIMESTAMP;
+    v_start TIMESTAMP;
+    v_name TEXT;
+    v_created JSONB := '[]'::jsonb;
+  BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = p_table::regclass) THEN
+      RAISE EXCEPTION '% is not partitioned', p_table;
+    END IF;
+
+    SELECT MAX(log_partition_upper_bound(i.inhrelid))
+    INTO v_covered_until
+    FROM pg_inherits i
+    WHERE i.inhparent = p_table::regclass;
+
+    FOR i IN 0..p_months_ahead LOOP
+      v_start := v_month + make_interval(months => i);
+      CONTINUE WHEN v_covered_until IS NOT NULL AND v_start < v_covered_until;
+
+      v_name := p_table || '_p' || to_char(v_start, 'YYYYMM');
+      BEGIN
+        EXECUTE format(
+          'CREATE TABLE IF NOT EXISTS %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+          v_name, p_table, v_start, v_start + INTERVAL '1 month'
+        );
+        v_created := v_created || to_jsonb(v_name);
+      EXCEPTION WHEN OTHERS THEN
+        -- Usually rows for this month already sit in the DEFAULT partition
+        RAISE WARNING 'Could not create partition %: %', v_name, SQLERRM;
+      END;
+    END LOOP;
+
+    EXECUTE format('CREATE TABLE IF NOT EXISTS %I PARTITION OF %I DEFAULT', p_table || '_default', p_table);
+
+    RETURN v_created;
+  END;
+  $$ LANGUAGE plpgsql;
+
+  -- Drop partitions whose upper bound is older than the retention period,
+  -- and expired rows that landed in the DEFAULT partition
+  CREATE OR REPLACE FUNCTION drop_expired_log_partitions(p_table TEXT, p_retention_days INTEGER)
+  RETURNS JSONB AS $$
+  DECLARE
+    v_cutoff TIMESTAMP := NOW()::timestamp - make_interval(days => p_retention_days);
+    v_partition RECORD;
+    v_dropped JSONB := '[]'::jsonb;
+    v_default_deleted INTEGER := 0;
+  BEGIN
+    FOR v_partition IN
+      SELECT i.inhrelid::regclass AS name, log_partition_upper_bound(i.inhrelid) AS upper_bound
+      FROM pg_inherits i
+      WHERE i.inhparent = p_table::regclass
+    LOOP
+      IF v_partition.upper_bound IS NOT NULL AND v_partition.upper_bound <= v_cutoff THEN
+        EXECUTE format('DROP TABLE %s', v_partition.name);
+        v_dropped := v_dropped || to_jsonb(v_partition.name::text);
+      END IF;
+    END LOOP;
+
+    IF to_regclass(p_table || '_default') IS NOT NULL THEN
+      EXECUTE format('DELETE FROM %I WHERE created_at < %L', p_table || '_default', v_cutoff);
+      GET DIAGNOSTICS v_default_deleted = ROW_COUNT;
+    END IF;
+
+    RETURN jsonb_build_object('dropped', v_dropped, 'default_rows_deleted', v_default_deleted);
+  END;
+  $$ LANGUAGE plpgsql;
+
+  -- Convert an unpartitioned log table into a partitioned one in place.
+  -- The old table is attached as the _legacy partition, up to the end of
+  -- the month of its newest row. Triggers and RLS policies are recreated
+  -- on the new parent by the setup steps that run after this one.
+  CREATE OR REPLACE FUNCTION partition_log_table(p_table TEXT)
+  RETURNS TEXT AS $$
+  DECLARE
+    v_legacy TEXT := p_table || '_legacy';
+    v_newest TIMESTAMP;
+    v_bound TIMESTAMP;
+    v_row RECORD;
+  BEGIN
+    IF EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = p_table::regclass) THEN
+      RETURN 'already_partitioned';
+    END IF;
+
+    EXECUTE format('LOCK TABLE %I IN ACCESS EXCLUSIVE MODE', p_table);
+    EXECUTE format('ALTER TABLE %I RENAME TO %I', p_table, v_legacy);
+
+    -- Free the index names for the parent; matching indexes are reused
+    -- for this partition when the parent's indexes are created
+    FOR v_row IN
+      SELECT c.relname
+      FROM pg_index x
+      JOIN pg_class c ON c.oid = x.indexrelid
+      WHERE x.indrelid = v_legacy::regclass AND NOT x.indisprimary
+    LOOP
+      EXECUTE format('ALTER INDEX %I RENAME TO %I', v_row.relname, left(v_row.relname, 56) || '_legacy');
+    END LOOP;
+
+    FOR v_row IN
+      SELECT tgname FROM pg_trigger WHERE tgrelid = v_legacy::regclass AND NOT tgisinternal
+    LOOP
+      EXECUTE format('DROP TRIGGER %I ON %I', v_row.tgname, v_legacy);
+    END LOOP;
+
+    EXECUTE format(
+      'CREATE TABLE %I (LIKE %I INCLUDING DEFAULTS INCLUDING CONSTRAINTS, PRIMARY KEY (id, created_at)) PARTITION BY RANGE (created_at)',
+      p_table, v_legacy
+    );
+
+    FOR v_row IN
+      SELECT conname, pg_get_constraintdef(oid) AS definition
+      FROM pg_constraint
+      WHERE conrelid = v_legacy::regclass AND contype = 'f'
+    LOOP
+      EXECUTE format('ALTER TABLE %I ADD CONSTRAINT %I %s', p_table, v_row.conname, v_row.definition);
+    END LOOP;
+
+    -- Undated rows cannot be routed to a range; they go to the oldest one
+    EXECUTE format('UPDATE %I SET created_at = %L WHERE created_at IS NULL', v_legacy, 'epoch'::timestamp);
+    EXECUTE format('ALTER TABLE %I ALTER COLUMN created_at SET NOT NULL', v_legacy);
+
+    EXECUTE format('SELECT MAX(created_at) FROM %I', v_legacy) INTO v_newest;
+    v_bound := date_trunc('month', GREATEST(COALESCE(v_newest, NOW()::timestamp), NOW()::timestamp)) + INTERVAL '1 month';
+
+    EXECUTE format(
+      'ALTER TABLE %I ATTACH PARTITION %I FOR VALUES FROM (MINVALUE) TO (%L)',
+      p_table, v_legacy, v_bound
+    );
+
+    PERFORM ensure_log_partitions(p_table);
+    NOTIFY pgrst, 'reload schema';
+
+    RETURN 'partitioned';
+  END;
+  $$ LANGUAGE plpgsql;
+`
+
+/**
+ * SQL for a setup route: the partition functions, then conversion and
+ * initial partitions for one log table
+ */
+export const partitionLogTableSQL = (table) => `
+  ${LOG_PARTITION_SQL}
+  SELECT partition_log_table('${table}');
+  SELECT ensure_log_partitions('${table}');
+`
+
+export class AuditLogRetention {
+  constructor(options = {}) {
+    this.client = options.client !== undefined ? options.client : supabaseAdmin
+    this.config = {
+      intervalMs: 24 * 60 * 60 * 1000,
+      monthsAhead: 3,
+      retentionMs: {
+        security_audit_log: () => securitySystem.config.security.auditLogRetention,
+        property_sharing_log: () => 365 * 24 * 60 * 60 * 1000
+      },
+      ...options.config
+    }
+
+    this.timer = null
+    this.running = null
+
+    this.metrics = {
+      runs: 0,
+      partitionsCreated: 0,
+      partitionsDropped: 0,
+      defaultRowsDeleted: 0,
+      lastRunAt: null,
+      lastRunMs: null,
+      lastResult: null,
+      lastError: null
+    }
+  }
+
+  start() {
+    if (this.timer || !this.client) return
+    // Run once at startup so next month's partitions exist before it begins
+    this.run().catch(() => {})
+    this.timer = setInterval(() => {
+      this.run().catch(() => {})
+    }, this.config.intervalMs)
+    this.timer.unref?.()
+  }
+
+  stop() {
+    if (this.timer) {
+      clearInterval(this.timer)
+      this.timer = null
+    }
+  }
+
+  /**
+   * Create upcoming partitions and drop expired ones for every log table.
+   * Concurrent callers share the run in progress.
+   */
+  run() {
+    if (!this.running) {
+      this.running = this.maintain().finally(() => {
+        this.running = null
+      })
+    }
+    return this.running
+  }
+
+  async maintain() {
+    const startedAt = Date.now()
+    const result = {}
+
+    try {
+      for (const table of PARTITIONED_LOG_TABLES) {
+        const { data: created, error: createError } = await this.client.rpc('ensure_log_partitions', {
+          p_table: table,
+          p_months_ahead: this.config.monthsAhead
+        })
+        if (createError) throw createError
+
+        const retentionDays = Math.ceil(this.config.retentionMs[table]() / (24 * 60 * 60 * 1000))
+        const { data: expired, error: dropError } = await this.client.rpc('drop_expired_log_partitions', {
+          p_table: table,
+          p_retention_days: retentionDays
+        })
+        if (dropError) throw dropError
+
+        result[table] = {
+          retentionDays,
+          created,
+          dropped: expired.dropped,
+          defaultRowsDeleted: expired.default_rows_deleted
+        }
+        this.metrics.partitionsCreated += created.length
+        this.metrics.partitionsDropped += expired.dropped.length
+        this.metrics.defaultRowsDeleted += expired.default_rows_deleted
+
+        if (expired.dropped.length > 0) {
+          console.log(`🗑️ Dropped expired ${table} partitions: ${expired.dropped.join(', ')}`)
+        }
+      }
+
+      this.metrics.lastResult = result
+      this.metrics.lastError = null
+    } catch (error) {
+      this.metrics.lastError = error.message
+      console.error('Audit log retention failed:', error.message)
+      throw error
+    } finally {
+      this.metrics.runs++
+      this.metrics.lastRunAt = new Date(startedAt).toISOString()
+      this.metrics.lastRunMs = Date.now() - startedAt
+    }
+
+    return result
+  }
+
+  /**
+   * Oldest created_at still guaranteed to be kept for a table
+   */
+  retentionCutoff(table, now = Date.now()) {
+    return new Date(now - this.config.retentionMs[table]())
+  }
+
+  getMetrics() {
+    return {
+      ...this.metrics,
+      running: Boolean(this.running),
+      scheduled: Boolean(this.timer),
+      intervalMs: this.config.intervalMs,
+      monthsAhead: this.config.monthsAhead,
+      retentionDays: Object.fromEntries(
+        PARTITIONED_LOG_TABLES.map(table => [table, Math.ceil(this.config.retentionMs[table]() / (24 * 60 * 60 * 1000))])
+      )
+    }
+  }
+}
+
+// One retention job per process, kept across dev hot reloads
+export const auditLogRetention = globalThis.__propmasterAuditLogRetention ||
+  (globalThis.__propmasterAuditLogRetention = new AuditLogRetention())
@@ -0,0 +1,89 @@
+import { getServerSession } from 'next-auth'
+import { authOptions } from '@/app/api/auth/[...nextauth]/route'
+import { getUserRole, getUserPermissionMask, hasPermissionBit } from '@/lib/permissions'
+import { getUserByEmail } from '@/lib/optimized-queries'
+
+/**
+ * PropMaster 3.0 - Request-scoped auth context
+ *
+ * The session, role and permissions of a request are resolved once and
+ * shared by every middleware layer and the route handler, instead of each
+ * calling getServerSession (and looking up the user row) again.
+ *
+ * - getAuthContext(request) memoizes per request object, so any code that
+ *   has the request gets the same context without re-decoding the session
+ * - The users row is only fetched when a handler asks for it, and at most
+ *   once per request
+ * - permissions is the user's compiled mask (role gates plus their granular
+ *   permissions, compiled once per user), so auth.can() is a single AND
+ * - withSecurity passes the context to handlers as `context.auth`;
+ *   withAuthContext does the same for routes composed without it
+ */
+
+const contexts = new WeakMap()
+
+const ANONYMOUS = Object.freeze({
+  authenticated: false,
+  session: null,
+  user: null,
+  role: null,
+  permissions: 0,
+  can: () => false,
+  getUserRecord: async () => null
+})
+
+/**
+ * @param {Request} request
+ * @returns {Promise<{
+ *   authenticated: boolean,
+ *   session: Object | null,
+ *   user: Object | null,
+ *   role: string | null,
+ *   permissions: number,
+ *   can: (permission: string) => boolean,
+ *   getUserRecord: () => Promise<Object | null>
+ * }>}
+ */
+export function getAuthContext(request) {
+  let context = contexts.get(request)
+  if (!context) {
+    context = resolveAuthContext()
+    contexts.set(request, context)
+  }
+  return context
+}
+
+async function resolveAuthContext() {
+  const session = await getServerSession(authOptions)
+  if (!session?.user) return ANONYMOUS
+
+  const role = getUserRole(session.user)
+  const permissions = getUserPermissionMask(session.user)
+  let userRecord = null
+
+  return {
+    authenticated: true,
+    session,
+    user: session.user,
+    role,
+    permissions,
+    can: (permission) => hasPermissionBit(permissions, permission),
+    getUserRecord() {
+      if (!userRecord) {
+        userRecord = getUserByEmail(session.user.email).then(result => result.error ? null : result.data)
+      }
+      return userRecord
+    }
+  }
+}
+
+/**
+ * Resolve the auth context and pass it to the handler as `context.auth`.
+ * Composes with combineMiddleware; does not reject anonymous requests.
+ */
+export function withAuthContext(handler) {
+  return async (request, context = {}) => {
+    const auth = context.auth || await getAuthContext(request)
+    return handler(request, { ...context, auth })
+  }
+}
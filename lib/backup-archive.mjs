@@ -0,0 +1,159 @@
+import fs from 'fs'
+import { Readable } from 'stream'
+
+/**
+ * PropMaster 3.0 - Backup archive container
+ *
+ * Backups are packed into a plain (uncompressed) tar file whose members are
+ * compressed individually, so a single table or file can be read back
+ * without decompressing the rest of the archive:
+ *
+ *   manifest.json.gz            backup metadata (always first)
+ *   tables/<table>.ndjson.gz    table dumps, copied as written by the export
+ *   files/<bucket>/<path>[.gz]  file attachments
+ *
+ * Member data is streamed: the header is written with a zero size, the data
+ * follows, and the header is rewritten with the real size once the member
+ * is complete. Names longer than ustar allows use GNU long-name records.
+ *
+ * This module only uses Node built-ins so it also runs in the packaging
+ * worker (lib/backup-package-worker.mjs).
+ */
+
+const BLOCK = 512
+const ZERO_BLOCK = Buffer.alloc(BLOCK)
+const LONG_NAME = '././@LongLink'
+
+function writeOctal(buffer, value, offset, length) {
+  buffer.write(value.toString(8).padStart(length - 1, '0') + '\0', offset, length, 'ascii')
+}
+
+function tarHeader(name, size, mtime, type = '0') {
+  const header = Buffer.alloc(BLOCK)
+  header.write(name, 0, 100, 'utf8')
+  writeOctal(header, 0o644, 100, 8)
+  writeOctal(header, 0, 108, 8)
+  writeOctal(header, 0, 116, 8)
+  writeOctal(header, size, 124, 12)
+  writeOctal(header, Math.floor(mtime / 1000), 136, 12)
+  header.fill(0x20, 148, 156) // checksum is computed with its field as spaces
+  header.write(type, 156, 1, 'ascii')
+  header.write('ustar\0', 257, 6, 'ascii')
+  header.write('00', 263, 2, 'ascii')
+
+  let checksum = 0
+  for (let i = 0; i < BLOCK; i++) checksum += header[i]
+  header.write(checksum.toString(8).padStart(6, '0') + '\0 ', 148, 8, 'ascii')
+  return header
+}
+
+const padding = (size) => (BLOCK - (size % BLOCK)) % BLOCK
+
+/**
+ * Sequential tar writer over a file handle
+ */
+export class ArchiveWriter {
+  static async open(filePath) {
+    return new ArchiveWriter(await fs.promises.open(filePath, 'w'))
+  }
+
+  constructor(handle) {
+    this.handle = handle
+    this.position = 0
+    this.entries = []
+  }
+
+  async write(buffer) {
+    await this.handle.write(buffer, 0, buffer.length, this.position)
+    this.position += buffer.length
+  }
+
+  /**
+   * Add a member from an async iterable of Buffers
+   * @returns {Promise<{ name: string, offset: number, size: number }>}
+   */
+  async addEntry(name, content, { mtime = Date.now() } = {}) {
+    const nameBytes = Buffer.from(name, 'utf8')
+    if (nameBytes.length > 100) {
+      const longName = Buffer.concat([nameBytes, Buffer.from([0])])
+      await this.write(tarHeader(LONG_NAME, longName.length, mtime, 'L'))
+      await this.write(longName)
+      await this.write(ZERO_BLOCK.subarray(0, padding(longName.length)))
+    }
+
+    const headerAt = this.position
+    await this.write(tarHeader(name, 0, mtime))
+
+    const offset = this.position
+    for await (const chunk of content) {
+      await this.write(chunk)
+    }
+    const size = this.position - offset
+
+    await this.handle.write(tarHeader(name, size, mtime), 0, BLOCK, headerAt)
+    await this.write(ZERO_BLOCK.subarray(0, padding(size)))
+
+    const entry = { name, offset, size }
+    this.entries.push(entry)
+    return entry
+  }
+
+  /**
+   * Write the end-of-archive blocks and close; returns the archive size
+   */
+  async close() {
+    await this.write(Buffer.alloc(BLOCK * 2))
+    await this.handle.close()
+    return this.position
+  }
+}
+
+/**
+ * Member index of an archive, read from the headers only
+ * @returns {Promise<Array<{ name: string, offset: number, size: number }>>}
+ */
+export async function listArchive(filePath) {
+  const handle = await fs.promises.open(filePath, 'r')
+  const entries = []
+  const header = Buffer.alloc(BLOCK)
+
+  try {
+    let position = 0
+    let longName = null
+
+    while (true) {
+      const { bytesRead } = await handle.read(header, 0, BLOCK, position)
+      if (bytesRead < BLOCK || header.equals(ZERO_BLOCK)) break
+
+      const size = parseInt(header.toString('ascii', 124, 136).replace(/\0.*$/, '').trim(), 8) || 0
+      const type = String.fromCharCode(header[156])
+      const dataAt = position + BLOCK
+
+      if (type === 'L') {
+        const name = Buffer.alloc(size)
+        await handle.read(name, 0, size, dataAt)
+        longName = name.toString('utf8').replace(/\0+$/, '')
+      } else {
+        const name = longName ?? header.toString('utf8', 0, 100).replace(/\0.*$/s, '')
+        entries.push({ name, offset: dataAt, size })
+        longName = null
+      }
+
+      position = dataAt + size + padding(size)
+    }
+  } finally {
+    await handle.close()
+  }
+
+  return entries
+}
+
+/**
+ * Stream one member's bytes, or null when the archive has no such member
+ */
+export async function openArchiveEntry(filePath, name) {
+  const entry = (await listArchive(filePath)).find(candidate => candidate.name === name)
+  if (!entry) return null
+  if (entry.size === 0) return Readable.from([])
+  return fs.createReadStream(filePath, { start: entry.offset, end: entry.offset + entry.size - 1 })
+}
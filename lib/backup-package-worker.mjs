@@ -0,0 +1,52 @@
+import fs from 'fs'
+import zlib from 'zlib'
+import { Readable } from 'stream'
+import { parentPort, workerData } from 'worker_threads'
+import { ArchiveWriter } from './backup-archive.mjs'
+
+/**
+ * PropMaster 3.0 - Backup packaging worker
+ *
+ * Packs a backup into its archive off the main thread, so the server keeps
+ * serving requests while a backup is written. Everything is streamed: each
+ * member is read from the staging directory, gzipped here when asked, and
+ * written to the archive, so memory stays at a few buffers however large
+ * the backup is.
+ *
+ * workerData: {
+ *   archivePath,
+ *   manifest,                                 // JSON string
+ *   entries: [{ name, path, compress }],      // staged files to add
+ *   compressionLevel
+ * }
+ *
+ * Posts { type: 'progress', entry, completed, total } after each member and
+ * { type: 'done', size, entries } at the end.
+ */
+
+const { archivePath, manifest, entries, compressionLevel } = workerData
+
+const gzip = (source) => source.pipe(zlib.createGzip({ level: compressionLevel }))
+
+const archive = await ArchiveWriter.open(archivePath)
+
+try {
+  await archive.addEntry('manifest.json.gz', gzip(Readable.from([Buffer.from(manifest, 'utf8')])))
+
+  let completed = 0
+  for (const entry of entries) {
+    const source = fs.createReadStream(entry.path)
+    const content = entry.compress ? gzip(source) : source
+    source.on('error', error => content.destroy(error))
+
+    await archive.addEntry(entry.name, content)
+    completed++
+    parentPort.postMessage({ type: 'progress', entry: entry.name, completed, total: entries.length })
+  }
+
+  const size = await archive.close()
+  parentPort.postMessage({ type: 'done', size, entries: archive.entries })
+} catch (error) {
+  await archive.handle.close().catch(() => {})
+  throw error
+}
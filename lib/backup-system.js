@@ -2,7 +2,14 @@ import { supabaseAdmin } from '@/lib/supabase'
 import { google } from 'googleapis'
 import fs from 'fs'
 import path from 'path'
+import crypto from 'crypto'
+import { Readable } from 'stream'
+import { pipeline } from 'stream/promises'
+import { Worker } from 'worker_threads'
+import zlib from 'zlib'
 import { format } from 'date-fns'
+import { exportTableToFile, readTableDump, checksumTableDump, CHECKSUM_ALGORITHM } from '@/lib/backup-table-stream'
+import { openArchiveEntry } from '@/lib/backup-archive.mjs'
 
 /**
  * PropMaster 3.0 - Comprehensive Database Backup System
@@ -14,8 +21,20 @@ import { format } from 'date-fns'
  * - Backup verification and integrity checks
  * - Selective table backups
  * - Compression and encryption options
+ *
+ * Tables are streamed to backups/<backup id>/<table>.ndjson.gz in keyset
+ * pages (lib/backup-table-stream.js), so backups use constant memory and
+ * are never truncated by PostgREST's row cap. File attachments are staged
+ * next to them, then a worker thread packs everything into
+ * backups/<backup id>.tar (lib/backup-archive.mjs) and the staging
+ * directory is removed.
  */
 
+const FILE_BUCKETS = ['property-images', 'property-documents', 'receipts']
+
+// Already-compressed formats are stored as-is rather than gzipped again
+const STORED_FILE_PATTERN = /\.(jpe?g|png|webp|gif|heic|pdf|zip|gz|mp4|mov)$/i
+
 export class BackupSystem {
   constructor(options = {}) {
     this.supabase = supabaseAdmin
@@ -24,6 +43,8 @@ export class BackupSystem {
       encryptBackups: true,
       maxBackupAge: 90, // days
       maxBackupsPerType: 10,
+      fileConcurrency: 8, // parallel attachment downloads
+      storageListPageSize: 1000,
       ...options
     }
     
@@ -80,7 +101,8 @@ export class BackupSystem {
       backupType = 'manual',
       includeFiles = true,
       uploadToDrive = true,
-      verifyBackup = true
+      verifyBackup = true,
+      onProgress = null
     } = options
 
     const timestamp = format(new Date(), 'yyyy-MM-dd_HH-mm-ss')
@@ -118,7 +140,7 @@ export class BackupSystem {
       
       for (const tableName of tables) {
         try {
-          const tableBackup = await this.exportTable(tableName)
+          const tableBackup = await this.exportTable(tableName, { backupId, onProgress })
           backup.tables[tableName] = tableBackup
           console.log(`✅ Exported ${tableName}: ${tableBackup.record_count} records`)
         } catch (error) {
@@ -127,7 +149,7 @@ export class BackupSystem {
             success: false,
             error: error.message,
             record_count: 0,
-            data: null
+            file: null
           }
         }
       }
@@ -135,7 +157,7 @@ export class BackupSystem {
       // Step 2: Export file attachments (if enabled)
       if (includeFiles) {
         console.log('📁 Exporting file attachments...')
-        backup.files = await this.exportFiles()
+        backup.files = await this.exportFiles(backupId)
       }
 
       // Step 3: Create backup package
@@ -181,24 +203,30 @@ export class BackupSystem {
   }
 
   /**
-   * Export a single database table
+   * Export a single database table as a gzipped NDJSON dump, page by page.
+   * Progress is logged every 10,000 rows and passed to `onProgress`.
    */
-  async exportTable(tableName) {
-    try {
-      const { data, error, count } = await this.supabase
-        .from(tableName)
-        .select('*', { count: 'exact' })
+  async exportTable(tableName, { backupId, onProgress = null } = {}) {
+    const file = path.join(backupId, `${tableName}.ndjson.gz`)
+    let nextLogAt = 10000
 
-      if (error) {
-        throw new Error(`Database export error: ${error.message}`)
-      }
+    try {
+      const dump = await exportTableToFile(this.supabase, tableName, this.resolveBackupPath(file), {
+        compressionLevel: this.options.compressionLevel,
+        onProgress: (progress) => {
+          if (progress.rows >= nextLogAt) {
+            console.log(`📊 ${tableName}: ${progress.rows} records exported (${this.formatBytes(progress.bytes)})`)
+            nextLogAt = progress.rows + 10000
+          }
+          onProgress?.(progress)
+        }
+      })
 
       return {
         success: true,
-        record_count: count || 0,
-        data: data || [],
-        exported_at: new Date().toISOString(),
-        checksum: this.calculateChecksum(JSON.stringify(data))
+        ...dump,
+        file,
+        exported_at: new Date().toISOString()
       }
     } catch (error) {
       throw new Error(`Failed to export ${tableName}: ${error.message}`)
@@ -206,51 +234,52 @@ export class BackupSystem {
   }
 
   /**
-   * Export file attachments from Supabase Storage
+   * Absolute path of a file stored relative to the backups directory
+   */
+  resolveBackupPath(relativePath) {
+    return path.join(process.cwd(), 'backups', relativePath)
+  }
+
+  /**
+   * Export file attachments from Supabase Storage. Every bucket is listed
+   * recursively and a pool of `fileConcurrency` downloads streams each
+   * object to the backup's staging directory, recording its size and
+   * checksum.
    */
-  async exportFiles() {
+  async exportFiles(backupId) {
     const files = []
+    let failed = 0
     
     try {
-      // Get list of all files in storage buckets
-      const buckets = ['property-images', 'property-documents', 'receipts']
-      
-      for (const bucketName of buckets) {
-        try {
-          const { data: bucketFiles, error } = await this.supabase.storage
-            .from(bucketName)
-            .list()
-
-          if (error) {
-            console.warn(`Warning: Could not access bucket ${bucketName}:`, error.message)
-            continue
-          }
-
-          for (const file of bucketFiles || []) {
-            try {
-              const { data: fileData, error: downloadError } = await this.supabase.storage
-                .from(bucketName)
-                .download(file.name)
-
-              if (!downloadError && fileData) {
-                files.push({
-                  bucket: bucketName,
-                  name: file.name,
-                  size: file.metadata?.size || 0,
-                  last_modified: file.updated_at,
-                  data: await fileData.arrayBuffer()
-                })
-              }
-            } catch (fileError) {
-              console.warn(`Warning: Could not download ${file.name}:`, fileError.message)
+      // Shared by the pool: each download takes the next listed object
+      const objects = this.listStorageObjects()
+
+      const download = async () => {
+        for await (const object of objects) {
+          try {
+            const staged = await this.stageFile(backupId, object.bucket, object.name)
+            if (!staged) {
+              failed++
+              continue
             }
+            files.push({ ...object, ...staged })
+            if (files.length % 500 === 0) {
+              console.log(`📁 Exported ${files.length} files...`)
+            }
+          } catch (fileError) {
+            failed++
+            console.warn(`Warning: Could not download ${object.bucket}/${object.name}:`, fileError.message)
           }
-        } catch (bucketError) {
-          console.warn(`Warning: Could not list files in ${bucketName}:`, bucketError.message)
         }
       }
 
-      console.log(`📁 Exported ${files.length} files`)
+      const concurrency = Math.max(1, this.options.fileConcurrency)
+      await Promise.all(Array.from({ length: concurrency }, download))
+
+      // Downloads finish out of order; keep the archive layout stable
+      files.sort((a, b) => a.bucket.localeCompare(b.bucket) || a.name.localeCompare(b.name))
+
+      console.log(`📁 Exported ${files.length} files${failed > 0 ? ` (${failed} failed)` : ''}`)
       return files
     } catch (error) {
       console.error('Error exporting files:', error)
@@ -259,10 +288,105 @@ export class BackupSystem {
   }
 
   /**
-   * Create compressed backup package
+   * Yield every object in the backup buckets. Storage lists one folder
+   * level at a time, a page at a time; folders (entries without an id)
+   * are descended into.
+   */
+  async *listStorageObjects() {
+    for (const bucketName of FILE_BUCKETS) {
+      yield* this.listStorageFolder(bucketName, '')
+    }
+  }
+
+  /**
+   * A folder that cannot be listed is skipped with a warning; its siblings
+   * and the rest of the bucket are still exported
+   */
+  async *listStorageFolder(bucketName, prefix) {
+    const limit = this.options.storageListPageSize
+
+    for (let offset = 0; ; offset += limit) {
+      let entries
+      try {
+        const { data, error } = await this.supabase.storage
+          .from(bucketName)
+          .list(prefix, { limit, offset, sortBy: { column: 'name', order: 'asc' } })
+
+        if (error) throw new Error(error.message)
+        entries = data
+      } catch (listError) {
+        console.warn(`Warning: Could not list files in ${bucketName}/${prefix}:`, listError.message)
+        return
+      }
+
+      for (const entry of entries || []) {
+        const name = prefix ? `${prefix}/${entry.name}` : entry.name
+        if (entry.id === null) {
+          yield* this.listStorageFolder(bucketName, name)
+        } else {
+          yield {
+            bucket: bucketName,
+            name,
+            last_modified: entry.updated_at
+          }
+        }
+      }
+
+      if (!entries || entries.length < limit) return
+    }
+  }
+
+  /**
+   * Stream one storage object to the staging directory, hashing it as it is
+   * written. Fetched through a signed URL because download() buffers the
+   * whole object into a Blob. Returns null when no URL could be signed.
+   */
+  async stageFile(backupId, bucketName, objectPath) {
+    const { data: signed, error } = await this.supabase.storage
+      .from(bucketName)
+      .createSignedUrl(objectPath, 10 * 60)
+
+    if (error || !signed?.signedUrl) return null
+
+    const file = path.join(backupId, 'files', bucketName, objectPath)
+    const filePath = this.resolveBackupPath(file)
+    if (!filePath.startsWith(this.resolveBackupPath(path.join(backupId, 'files')) + path.sep)) {
+      throw new Error('Object path escapes the backup directory')
+    }
+    fs.mkdirSync(path.dirname(filePath), { recursive: true })
+
+    const response = await fetch(signed.signedUrl)
+    if (!response.ok || !response.body) {
+      throw new Error(`Download failed with status ${response.status}`)
+    }
+
+    const hash = crypto.createHash(CHECKSUM_ALGORITHM)
+    let size = 0
+    await pipeline(
+      Readable.fromWeb(response.body),
+      async function* (source) {
+        for await (const chunk of source) {
+          hash.update(chunk)
+          size += chunk.length
+          yield chunk
+        }
+      },
+      fs.createWriteStream(filePath)
+    )
+
+    return {
+      size,
+      checksum: hash.digest('hex'),
+      checksum_algorithm: CHECKSUM_ALGORITHM,
+      file
+    }
+  }
+
+  /**
+   * Pack the staged table dumps and files into the backup archive.
+   * Runs in a worker thread, streaming, so requests keep being served.
    */
   async createBackupPackage(backup) {
-    const zlib = await import('zlib')
     const backupDir = path.join(process.cwd(), 'backups')
     
     // Ensure backup directory exists
@@ -270,25 +394,87 @@ export class BackupSystem {
       fs.mkdirSync(backupDir, { recursive: true })
     }
 
-    const backupPath = path.join(backupDir, `${backup.id}.json.gz`)
-    
-    // Create compressed backup file
-    const backupData = JSON.stringify(backup, null, 2)
-    const compressed = zlib.gzipSync(backupData, { level: this.options.compressionLevel })
-    
-    fs.writeFileSync(backupPath, compressed)
+    const backupPath = path.join(backupDir, `${backup.id}.tar`)
+    backup.storage.local_path = backupPath
+
+    const entries = []
+    for (const [tableName, table] of Object.entries(backup.tables)) {
+      if (!table.file) continue
+      table.archive_entry = `tables/${tableName}.ndjson.gz`
+      entries.push({ name: table.archive_entry, path: this.resolveBackupPath(table.file), compress: false })
+    }
+    for (const file of backup.files || []) {
+      const compress = !STORED_FILE_PATTERN.test(file.name)
+      file.archive_entry = `files/${file.bucket}/${file.name}${compress ? '.gz' : ''}`
+      entries.push({ name: file.archive_entry, path: this.resolveBackupPath(file.file), compress })
+    }
+
+    const result = await this.runPackagingWorker({
+      archivePath: backupPath,
+      manifest: JSON.stringify(backup),
+      entries,
+      compressionLevel: this.options.compressionLevel
+    })
+
+    // The archive now holds everything that was staged
+    fs.rmSync(this.resolveBackupPath(backup.id), { recursive: true, force: true })
     
     // Update metadata
-    backup.metadata.total_size = Buffer.byteLength(backupData)
-    backup.metadata.compressed_size = compressed.length
-    backup.metadata.compression_ratio = (compressed.length / backup.metadata.total_size * 100).toFixed(2)
+    backup.metadata.total_size =
+      Object.values(backup.tables).reduce((sum, table) => sum + (table.bytes || 0), 0) +
+      (backup.files || []).reduce((sum, file) => sum + (file.size || 0), 0)
+    backup.metadata.compressed_size = result.size
+    backup.metadata.compression_ratio = backup.metadata.total_size > 0
+      ? (result.size / backup.metadata.total_size * 100).toFixed(2)
+      : null
 
     console.log(`📦 Backup package created: ${backupPath}`)
-    console.log(`💾 Size: ${this.formatBytes(backup.metadata.total_size)} → ${this.formatBytes(compressed.length)} (${backup.metadata.compression_ratio}%)`)
+    console.log(`💾 Size: ${this.formatBytes(backup.metadata.total_size)} → ${this.formatBytes(result.size)} (${backup.metadata.compression_ratio}%)`)
     
     return backupPath
   }
 
+  /**
+   * Run lib/backup-package-worker.mjs and resolve with its result
+   */
+  runPackagingWorker(workerData) {
+    return new Promise((resolve, reject) => {
+      // Resolved from this module (and bundled as a worker entry), so it
+      // does not depend on the server's working directory
+      const worker = new Worker(new URL('./backup-package-worker.mjs', import.meta.url), { workerData })
+      let result = null
+      let nextLogAt = 100
+
+      worker.on('message', (message) => {
+        if (message.type === 'done') {
+          result = message
+        } else if (message.type === 'progress' && message.completed >= nextLogAt) {
+          console.log(`📦 Packed ${message.completed}/${message.total} backup entries`)
+          nextLogAt = message.completed + 100
+        }
+      })
+      worker.on('error', reject)
+      worker.on('exit', (code) => {
+        if (result) {
+          resolve(result)
+        } else {
+          reject(new Error(`Backup packaging worker exited with code ${code}`))
+        }
+      })
+    })
+  }
+
+  /**
+   * Gzipped dump of a table: an archive member, or a staged file for
+   * backups whose packaging did not complete
+   */
+  async openTableDump(backup, table) {
+    if (table.archive_entry && backup.storage?.local_path) {
+      return openArchiveEntry(backup.storage.local_path, table.archive_entry)
+    }
+    return this.resolveBackupPath(table.file)
+  }
+
   /**
    * Upload backup to Google Drive
    */
@@ -299,13 +485,13 @@ export class BackupSystem {
 
     try {
       const fileMetadata = {
-        name: `${backup.id}.json.gz`,
+        name: path.basename(backupPath),
         parents: backup.storage.drive_folder_id ? [backup.storage.drive_folder_id] : undefined,
         description: `PropMaster 3.0 Database Backup - ${backup.type} - ${backup.timestamp}`
       }
 
       const media = {
-        mimeType: 'application/gzip',
+        mimeType: backupPath.endsWith('.tar') ? 'application/x-tar' : 'application/gzip',
         body: fs.createReadStream(backupPath)
       }
 
@@ -316,6 +502,7 @@ export class BackupSystem {
       })
 
       console.log(`☁️ Uploaded to Google Drive: ${response.data.name} (${response.data.id})`)
+
       return response.data.id
     } catch (error) {
       console.error('Failed to upload to Google Drive:', error)
@@ -346,7 +533,26 @@ export class BackupSystem {
           checksum_valid: true
         }
 
-        if (tableBackup.success && tableBackup.data) {
+        if (tableBackup.success && (tableBackup.archive_entry || tableBackup.file)) {
+          // Re-read the dump, streaming
+          const dumpSource = await this.openTableDump(backup, tableBackup)
+          if (!dumpSource || (typeof dumpSource === 'string' && !fs.existsSync(dumpSource))) {
+            check.checksum_valid = false
+            verification.issues.push(`Dump missing for table ${tableName}`)
+          } else {
+            const dump = await checksumTableDump(dumpSource)
+            check.checksum_valid = dump.checksum === tableBackup.checksum && dump.records === tableBackup.record_count
+            if (!check.checksum_valid) {
+              verification.issues.push(`Checksum mismatch for table ${tableName}`)
+            }
+          }
+
+          // Fewer rows than counted at the start: deleted meanwhile, or cut short
+          if (tableBackup.expected_count !== null && tableBackup.record_count < tableBackup.expected_count) {
+            verification.issues.push(`Table ${tableName} exported ${tableBackup.record_count} of ${tableBackup.expected_count} records counted at start`)
+          }
+        } else if (tableBackup.success && tableBackup.data) {
+          // Backups from before streaming dumps embed the rows
           const currentChecksum = this.calculateChecksum(JSON.stringify(tableBackup.data))
           check.checksum_valid = currentChecksum === tableBackup.checksum
           
@@ -490,6 +696,13 @@ export class BackupSystem {
             console.log(`🗑️ Deleted local backup: ${backup.storage.local_path}`)
           }
 
+          // Delete staged dumps left by an incomplete backup
+          const dumpDir = this.resolveBackupPath(backup.id)
+          if (fs.existsSync(dumpDir)) {
+            fs.rmSync(dumpDir, { recursive: true, force: true })
+            console.log(`🗑️ Deleted table dumps: ${dumpDir}`)
+          }
+
           // Delete from Google Drive
           if (backup.storage.drive_file_id && this.drive) {
             await this.drive.files.delete({ fileId: backup.storage.drive_file_id })
@@ -591,7 +804,12 @@ export class BackupSystem {
         }
 
         try {
-          const result = await this.restoreTable(tableName, backup.tables[tableName].data)
+          // Older backups embed the rows; newer ones point at a dump file
+          const tableBackup = backup.tables[tableName]
+          const rows = (tableBackup.archive_entry || tableBackup.file)
+            ? await this.readVerifiedTableDump(backup, tableName, tableBackup)
+            : tableBackup.data
+          const result = await this.restoreTable(tableName, rows)
           restoreResults[tableName] = result
           console.log(`✅ Restored ${tableName}: ${result.records_restored} records`)
         } catch (error) {
@@ -626,8 +844,25 @@ export class BackupSystem {
    * Load backup data from file
    */
   async loadBackup(backupId) {
-    const zlib = await import('zlib')
+    const archivePath = path.join(process.cwd(), 'backups', `${backupId}.tar`)
     const backupPath = path.join(process.cwd(), 'backups', `${backupId}.json.gz`)
+
+    if (fs.existsSync(archivePath)) {
+      // Only the manifest is read; table dumps are streamed when restored
+      try {
+        const manifest = await openArchiveEntry(archivePath, 'manifest.json.gz')
+        if (!manifest) return null
+
+        const chunks = []
+        for await (const chunk of manifest.pipe(zlib.createGunzip())) {
+          chunks.push(chunk)
+        }
+        return JSON.parse(Buffer.concat(chunks).toString('utf8'))
+      } catch (error) {
+        console.error(`Failed to load backup ${backupId}:`, error)
+        return null
+      }
+    }
     
     if (!fs.existsSync(backupPath)) {
       return null
@@ -645,10 +880,31 @@ export class BackupSystem {
   }
 
   /**
-   * Restore a single table from backup data
+   * Check a table's dump is present and intact, then open it for reading.
+   * Runs before restoreTable clears the table, so a missing or corrupt dump
+   * fails the restore without touching existing data.
+   */
+  async readVerifiedTableDump(backup, tableName, tableBackup) {
+    const source = await this.openTableDump(backup, tableBackup)
+    if (!source || (typeof source === 'string' && !fs.existsSync(source))) {
+      throw new Error(`Dump missing for table ${tableName}`)
+    }
+
+    const dump = await checksumTableDump(source)
+    if (tableBackup.checksum && dump.checksum !== tableBackup.checksum) {
+      throw new Error(`Dump checksum mismatch for table ${tableName}`)
+    }
+
+    return readTableDump(await this.openTableDump(backup, tableBackup))
+  }
+
+  /**
+   * Restore a single table from backup data: an array of rows, or an async
+   * iterable of row batches (a streamed dump)
    */
   async restoreTable(tableName, tableData) {
-    if (!Array.isArray(tableData)) {
+    const streamed = tableData && typeof tableData[Symbol.asyncIterator] === 'function'
+    if (!Array.isArray(tableData) && !streamed) {
       throw new Error(`Invalid table data for ${tableName}`)
     }
 
@@ -666,9 +922,16 @@ export class BackupSystem {
       // Step 2: Insert backup data in batches
       const batchSize = 100
       let totalRestored = 0
+      let totalRecords = 0
+
+      const batches = streamed ? tableData : (async function* () {
+        for (let i = 0; i < tableData.length; i += batchSize) {
+          yield tableData.slice(i, i + batchSize)
+        }
+      })()
 
-      for (let i = 0; i < tableData.length; i += batchSize) {
-        const batch = tableData.slice(i, i + batchSize)
+      for await (const batch of batches) {
+        totalRecords += batch.length
         
         const { data, error } = await this.supabase
           .from(tableName)
@@ -685,7 +948,7 @@ export class BackupSystem {
       return {
         success: true,
         records_restored: totalRestored,
-        total_records: tableData.length
+        total_records: totalRecords
       }
     } catch (error) {
       throw new Error(`Failed to restore ${tableName}: ${error.message}`)
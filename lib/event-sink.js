@@ -0,0 +1,313 @@
+import { supabaseAdmin } from '@/lib/supabase'
+
+/**
+ * PropMaster 3.0 - Buffered audit event sink
+ *
+ * Audit rows (security_audit_log, property_sharing_log) are queued in memory
+ * and written with multi-row inserts, so request handlers never wait on a
+ * database round trip to record an event.
+ *
+ * - Bounded queue: when full, the oldest event of the lowest severity is
+ *   dropped to make room, and an incoming event is only dropped if nothing
+ *   queued is less severe
+ * - Batches are written when `batchSize` events are queued or
+ *   `flushIntervalMs` after the first queued event, whichever comes first
+ * - A batch the database rejects for its data (a bad value, a constraint)
+ *   is split in halves until the offending rows are isolated; only those
+ *   are counted as failed
+ * - Batches that fail for any other reason are retried once, one flush
+ *   interval later, then counted as failed
+ * - All sinks are flushed on SIGTERM/SIGINT and before the process exits
+ */
+
+export const SEVERITY_LEVELS = ['LOW', 'MEDIUM', 'HIGH', 'CRITICAL']
+
+const severityRank = (severity) => Math.max(SEVERITY_LEVELS.indexOf(severity), 0)
+
+// SQLSTATE classes 22 (data exception) and 23 (integrity constraint) are
+// caused by individual rows; anything else fails every row alike
+const isRowError = (error) => /^2[23][0-9A-Z]{3}$/.test(error?.code || '')
+
+/**
+ * FIFO with O(1) push/shift; the backing array is compacted occasionally
+ */
+class EventQueue {
+  constructor() {
+    this.items = []
+    this.head = 0
+  }
+
+  get length() {
+    return this.items.length - this.head
+  }
+
+  push(item) {
+    this.items.push(item)
+  }
+
+  shift() {
+    if (this.head >= this.items.length) return undefined
+    const item = this.items[this.head]
+    this.items[this.head++] = undefined
+    if (this.head > 1024 && this.head * 2 > this.items.length) {
+      this.items = this.items.slice(this.head)
+      this.head = 0
+    }
+    return item
+  }
+}
+
+export class EventSink {
+  constructor(table, options = {}) {
+    this.table = table
+    this.client = options.client !== undefined ? options.client : supabaseAdmin
+    this.config = {
+      maxQueueSize: 5000,
+      batchSize: 200,
+      flushIntervalMs: 1000,
+      maxRetries: 1,
+      ...options.config
+    }
+
+    // One FIFO per severity level, so eviction never scans the queue
+    this.queues = SEVERITY_LEVELS.map(() => new EventQueue())
+    this.size = 0
+    this.timer = null
+    this.flushing = null
+
+    this.metrics = {
+      enqueued: 0,
+      written: 0,
+      dropped: 0,
+      droppedBySeverity: Object.fromEntries(SEVERITY_LEVELS.map(level => [level, 0])),
+      failed: 0,
+      batches: 0,
+      lastFlushAt: null,
+      lastError: null
+    }
+  }
+
+  /**
+   * Queue a row for insertion. Returns false if the row was dropped.
+   */
+  enqueue(row, severity = 'LOW') {
+    if (!this.client) {
+      return false
+    }
+
+    const rank = severityRank(severity)
+
+    if (this.size >= this.config.maxQueueSize) {
+      const lowest = this.queues.findIndex(queue => queue.length > 0)
+      if (lowest === -1 || lowest >= rank) {
+        this.recordDrop(rank)
+        return false
+      }
+      this.queues[lowest].shift()
+      this.size--
+      this.recordDrop(lowest)
+    }
+
+    this.queues[rank].push({ row, attempts: 0 })
+    this.size++
+    this.metrics.enqueued++
+
+    if (this.size >= this.config.batchSize) {
+      this.flush()
+    } else {
+      this.scheduleFlush()
+    }
+
+    return true
+  }
+
+  scheduleFlush() {
+    if (this.timer) return
+    this.timer = setTimeout(() => {
+      this.timer = null
+      this.flush()
+    }, this.config.flushIntervalMs)
+    this.timer.unref?.()
+  }
+
+  recordDrop(rank) {
+    this.metrics.dropped++
+    this.metrics.droppedBySeverity[SEVERITY_LEVELS[rank]]++
+  }
+
+  /**
+   * Take up to `batchSize` events, most severe first
+   */
+  takeBatch() {
+    const batch = []
+    for (let rank = this.queues.length - 1; rank >= 0 && batch.length < this.config.batchSize; rank--) {
+      const queue = this.queues[rank]
+      while (queue.length > 0 && batch.length < this.config.batchSize) {
+        batch.push({ ...queue.shift(), rank })
+      }
+    }
+    this.size -= batch.length
+    return batch
+  }
+
+  /**
+   * Write everything queued. Concurrent callers share the same flush.
+   */
+  flush() {
+    if (this.timer) {
+      clearTimeout(this.timer)
+      this.timer = null
+    }
+
+    if (!this.flushing) {
+      this.flushing = this.drain().finally(() => {
+        this.flushing = null
+        // Rows queued after drain() returned, or requeued after a failed
+        // batch, would otherwise wait for the next enqueue
+        if (this.size > 0) {
+          this.scheduleFlush()
+        }
+      })
+    }
+    return this.flushing
+  }
+
+  async drain() {
+    while (this.size > 0) {
+      const batch = this.takeBatch()
+      const error = await this.insertEntries(batch)
+
+      if (!error) {
+        this.recordWritten(batch.length)
+        continue
+      }
+
+      this.metrics.lastError = error.message
+      console.error(`Failed to write ${batch.length} events to ${this.table}:`, error.message)
+
+      // Stop here; the flush timer retries what was requeued
+      if (!(await this.isolateRejectedRows(batch, error))) {
+        return
+      }
+    }
+  }
+
+  /**
+   * Insert entries' rows; resolves with the error, or null on success
+   */
+  async insertEntries(entries) {
+    try {
+      const { error } = await this.client
+        .from(this.table)
+        .insert(entries.map(entry => entry.row))
+      return error || null
+    } catch (error) {
+      return error
+    }
+  }
+
+  recordWritten(count) {
+    this.metrics.written += count
+    this.metrics.batches++
+    this.metrics.lastFlushAt = new Date().toISOString()
+  }
+
+  /**
+   * Handle entries whose insert failed with `error`. Row errors are narrowed
+   * down by writing halves, so one bad row costs about 2·log2(batchSize)
+   * inserts and only rejected rows are counted as failed. Other errors
+   * requeue the entries for a retry. Resolves false when draining should stop.
+   */
+  async isolateRejectedRows(entries, error) {
+    if (!isRowError(error)) {
+      this.requeue(entries)
+      return false
+    }
+
+    if (entries.length === 1) {
+      this.metrics.failed++
+      return true
+    }
+
+    const middle = Math.ceil(entries.length / 2)
+    for (const half of [entries.slice(0, middle), entries.slice(middle)]) {
+      const halfError = await this.insertEntries(half)
+      if (!halfError) {
+        this.recordWritten(half.length)
+      } else if (!(await this.isolateRejectedRows(half, halfError))) {
+        this.requeue(entries.slice(entries.indexOf(half[half.length - 1]) + 1))
+        return false
+      }
+    }
+    return true
+  }
+
+  /**
+   * Queue entries again if they have retries left; the rest are failed
+   */
+  requeue(entries) {
+    for (const entry of entries) {
+      if (entry.attempts < this.config.maxRetries) {
+        entry.attempts++
+        this.queues[entry.rank].push(entry)
+        this.size++
+      } else {
+        this.metrics.failed++
+      }
+    }
+  }
+
+  getMetrics() {
+    return {
+      table: this.table,
+      queueDepth: this.size,
+      queueDepthBySeverity: Object.fromEntries(
+        SEVERITY_LEVELS.map((level, rank) => [level, this.queues[rank].length])
+      ),
+      maxQueueSize: this.config.maxQueueSize,
+      batchSize: this.config.batchSize,
+      flushIntervalMs: this.config.flushIntervalMs,
+      ...this.metrics,
+      droppedBySeverity: { ...this.metrics.droppedBySeverity }
+    }
+  }
+}
+
+// Survive dev hot reloads: one set of sinks and shutdown hooks per process
+const registry = globalThis.__propmasterEventSinks || (globalThis.__propmasterEventSinks = new Map())
+
+function getSink(table, options) {
+  if (!registry.has(table)) {
+    registry.set(table, new EventSink(table, options))
+  }
+  return registry.get(table)
+}
+
+export const securityAuditSink = getSink('security_audit_log')
+export const sharingLogSink = getSink('property_sharing_log')
+
+export function flushAllEventSinks() {
+  return Promise.all([...registry.values()].map(sink => sink.flush()))
+}
+
+export function getEventSinkMetrics() {
+  return Object.fromEntries([...registry.values()].map(sink => [sink.table, sink.getMetrics()]))
+}
+
+if (typeof process !== 'undefined' && typeof process.once === 'function' && !globalThis.__propmasterEventSinkHooks) {
+  globalThis.__propmasterEventSinkHooks = true
+
+  process.once('beforeExit', () => {
+    flushAllEventSinks()
+  })
+
+  for (const signal of ['SIGTERM', 'SIGINT']) {
+    process.once(signal, async () => {
+      await flushAllEventSinks().catch(() => {})
+      // Re-raise for the default handler unless someone else is listening
+      if (process.listenerCount(signal) === 0) {
+        process.kill(process.pid, signal)
+      }
+    })
+  }
+}
@@ -0,0 +1,299 @@
+/**
+ * PropMaster 3.0 - Shared TTL expiry for in-memory security state
+ *
+ * ExpiringMap and ExpiringSet entries carry an absolute expiry. All of them
+ * register expiries with one ExpiryScheduler: a binary min-heap in three
+ * parallel arrays (time, owner, key), drained by a single interval tick.
+ * Nothing is allocated per entry beyond the heap slots, unlike one
+ * setTimeout closure per entry.
+ *
+ * - Reads check the expiry, so an entry is never visible after it expires,
+ *   even before the tick removes it
+ * - Extending or deleting an entry leaves its old heap slot behind; a slot
+ *   whose time no longer matches its entry is skipped when popped, and the
+ *   heap is rebuilt once stale slots outnumber live ones
+ * - Each tick removes at most `maxPerTick` entries, so a mass expiry after
+ *   a flood is spread over several ticks instead of one long pause
+ */
+
+export class ExpiryScheduler {
+  constructor(options = {}) {
+    this.config = {
+      tickMs: 1000,
+      maxPerTick: 10000,
+      ...options
+    }
+
+    this.times = []
+    this.owners = []
+    this.keys = []
+    this.stale = 0
+    this.timer = null
+
+    this.metrics = {
+      expired: 0,
+      skipped: 0,
+      compactions: 0,
+      lastTickAt: null
+    }
+  }
+
+  get length() {
+    return this.times.length
+  }
+
+  schedule(owner, key, expiresAt) {
+    let index = this.times.length
+    this.times.push(expiresAt)
+    this.owners.push(owner)
+    this.keys.push(key)
+
+    // Sift up
+    while (index > 0) {
+      const parent = (index - 1) >> 1
+      if (this.times[parent] <= expiresAt) break
+      this.move(parent, index)
+      index = parent
+    }
+    this.place(index, expiresAt, owner, key)
+
+    this.start()
+  }
+
+  /**
+   * An earlier slot for an entry no longer applies (extended or deleted)
+   */
+  invalidate(count = 1) {
+    this.stale += count
+    if (this.stale > 1024 && this.stale * 2 > this.times.length) {
+      this.compact()
+    }
+  }
+
+  /**
+   * Expire every entry due at `now`, up to `limit` entries
+   */
+  run(now = Date.now(), limit = Infinity) {
+    let removed = 0
+    while (this.times.length > 0 && this.times[0] <= now && removed < limit) {
+      const expiresAt = this.times[0]
+      const owner = this.owners[0]
+      const key = this.keys[0]
+      this.pop()
+
+      if (owner.expire(key, expiresAt)) {
+        removed++
+        this.metrics.expired++
+      } else {
+        this.stale = Math.max(0, this.stale - 1)
+        this.metrics.skipped++
+      }
+    }
+
+    this.metrics.lastTickAt = now
+    if (this.times.length === 0) this.stop()
+    return removed
+  }
+
+  start() {
+    if (this.timer) return
+    this.timer = setInterval(() => this.run(Date.now(), this.config.maxPerTick), this.config.tickMs)
+    this.timer.unref?.()
+  }
+
+  stop() {
+    if (this.timer) {
+      clearInterval(this.timer)
+      this.timer = null
+    }
+  }
+
+  pop() {
+    const last = this.times.length - 1
+    const time = this.times[last]
+    const owner = this.owners[last]
+    const key = this.keys[last]
+    this.times.pop()
+    this.owners.pop()
+    this.keys.pop()
+    if (last === 0) return
+
+    // Sift the last slot down from the root
+    let index = 0
+    const length = this.times.length
+    while (true) {
+      const left = index * 2 + 1
+      if (left >= length) break
+      const right = left + 1
+      const child = right < length && this.times[right] < this.times[left] ? right : left
+      if (this.times[child] >= time) break
+      this.move(child, index)
+      index = child
+    }
+    this.place(index, time, owner, key)
+  }
+
+  /**
+   * Drop slots that no longer match their entry and re-heapify
+   */
+  compact() {
+    const times = []
+    const owners = []
+    const keys = []
+    for (let i = 0; i < this.times.length; i++) {
+      if (this.owners[i].expiryOf(this.keys[i]) === this.times[i]) {
+        times.push(this.times[i])
+        owners.push(this.owners[i])
+        keys.push(this.keys[i])
+      }
+    }
+
+    const order = times.map((_, i) => i).sort((a, b) => times[a] - times[b])
+    this.times = order.map(i => times[i])
+    this.owners = order.map(i => owners[i])
+    this.keys = order.map(i => keys[i])
+    this.stale = 0
+    this.metrics.compactions++
+  }
+
+  move(from, to) {
+    this.times[to] = this.times[from]
+    this.owners[to] = this.owners[from]
+    this.keys[to] = this.keys[from]
+  }
+
+  place(index, time, owner, key) {
+    this.times[index] = time
+    this.owners[index] = owner
+    this.keys[index] = key
+  }
+
+  getMetrics() {
+    return {
+      ...this.metrics,
+      scheduled: this.times.length,
+      stale: this.stale,
+      ticking: this.timer !== null
+    }
+  }
+}
+
+/**
+ * Map whose entries expire at an absolute time (epoch ms)
+ */
+export class ExpiringMap {
+  constructor(scheduler = securityExpiry) {
+    this.scheduler = scheduler
+    // key -> { value, expiresAt }
+    this.entries = new Map()
+  }
+
+  get(key, now = Date.now()) {
+    const entry = this.entries.get(key)
+    return entry && entry.expiresAt > now ? entry.value : undefined
+  }
+
+  has(key, now = Date.now()) {
+    const entry = this.entries.get(key)
+    return entry !== undefined && entry.expiresAt > now
+  }
+
+  set(key, value, expiresAt) {
+    const entry = this.entries.get(key)
+    if (entry) {
+      entry.value = value
+      if (entry.expiresAt === expiresAt) return this
+      entry.expiresAt = expiresAt
+      this.scheduler.invalidate()
+    } else {
+      this.entries.set(key, { value, expiresAt })
+    }
+    this.scheduler.schedule(this, key, expiresAt)
+    return this
+  }
+
+  delete(key) {
+    if (!this.entries.delete(key)) return false
+    this.scheduler.invalidate()
+    return true
+  }
+
+  clear() {
+    this.scheduler.invalidate(this.entries.size)
+    this.entries.clear()
+  }
+
+  /**
+   * Entries not yet removed by the scheduler, which may include some that
+   * expired since its last tick
+   */
+  get size() {
+    return this.entries.size
+  }
+
+  expiryOf(key) {
+    return this.entries.get(key)?.expiresAt
+  }
+
+  /**
+   * Called by the scheduler; false when the entry was extended or removed
+   */
+  expire(key, expiresAt) {
+    const entry = this.entries.get(key)
+    if (!entry || entry.expiresAt !== expiresAt) return false
+    this.entries.delete(key)
+    return true
+  }
+
+  * liveEntries(now = Date.now()) {
+    for (const [key, entry] of this.entries) {
+      if (entry.expiresAt > now) yield [key, entry.value, entry.expiresAt]
+    }
+  }
+
+  * [Symbol.iterator]() {
+    for (const [key, value] of this.liveEntries()) yield [key, value]
+  }
+}
+
+/**
+ * Set of keys that expire at an absolute time (epoch ms)
+ */
+export class ExpiringSet {
+  constructor(scheduler = securityExpiry) {
+    this.map = new ExpiringMap(scheduler)
+  }
+
+  add(key, expiresAt) {
+    this.map.set(key, true, expiresAt)
+    return this
+  }
+
+  has(key, now = Date.now()) {
+    return this.map.has(key, now)
+  }
+
+  delete(key) {
+    return this.map.delete(key)
+  }
+
+  clear() {
+    this.map.clear()
+  }
+
+  get size() {
+    return this.map.size
+  }
+
+  expiryOf(key) {
+    return this.map.expiryOf(key)
+  }
+
+  * [Symbol.iterator]() {
+    for (const [key] of this.map.liveEntries()) yield key
+  }
+}
+
+// One scheduler per process for all security TTLs, kept across dev hot reloads
+export const securityExpiry = globalThis.__propmasterSecurityExpiry ||
+  (globalThis.__propmasterSecurityExpiry = new ExpiryScheduler())
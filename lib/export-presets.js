@@ -23,9 +23,14 @@ export const DEFAULT_PRESETS = [
     id: 'current-month',
     name: 'Current Month',
     description: 'Records from this month',
+    // Getters so long-running processes (the export API) never use a stale month
     filters: {
-      dateFrom: new Date(new Date().getFullYear(), new Date().getMonth(), 1).toISOString().split('T')[0],
-      dateTo: new Date().toISOString().split('T')[0],
+      get dateFrom() {
+        return new Date(new Date().getFullYear(), new Date().getMonth(), 1).toISOString().split('T')[0]
+      },
+      get dateTo() {
+        return new Date().toISOString().split('T')[0]
+      },
       person: '',
       status: 'all',
       paymentType: 'all'
@@ -0,0 +1,99 @@
+import { exportFinanceRecords, downloadBlob } from './export'
+
+/**
+ * Run client-side finance exports in a Web Worker so formatting, workbook
+ * generation and PDF layout never block the page.
+ */
+
+const TEXT_FIELDS = ['id', 'client_name', 'payment_type', 'status', 'property_name', 'created_at', 'due_date', 'next_payment_date', 'notes']
+
+export function supportsExportWorker() {
+  return typeof window !== 'undefined' && typeof Worker !== 'undefined'
+}
+
+/**
+ * Pack records into two ArrayBuffers (amounts and UTF-8 JSON text columns)
+ * that can be transferred to the worker instead of structured-cloned
+ */
+export function packExportRecords(records) {
+  const count = records.length
+  const amounts = new Float64Array(count)
+  const columns = {}
+  for (const field of TEXT_FIELDS) {
+    columns[field] = new Array(count)
+  }
+
+  for (let i = 0; i < count; i++) {
+    const record = records[i]
+    amounts[i] = Number(record.amount) || 0 // null or blank amounts export as ₹0
+    columns.id[i] = record.id ?? null
+    columns.client_name[i] = record.client_name ?? null
+    columns.payment_type[i] = record.payment_type ?? null
+    columns.status[i] = record.status ?? null
+    columns.property_name[i] = record.properties?.name ?? null
+    columns.created_at[i] = record.created_at ?? null
+    columns.due_date[i] = record.due_date ?? null
+    columns.next_payment_date[i] = record.next_payment_date ?? null
+    columns.notes[i] = record.notes ?? null
+  }
+
+  const text = new TextEncoder().encode(JSON.stringify(columns))
+  return {
+    payload: { count, amounts: amounts.buffer, text: text.buffer },
+    transfer: [amounts.buffer, text.buffer]
+  }
+}
+
+/**
+ * Build an export file in a worker.
+ * `onProgress({ phase, done, total })` is called while rows are formatted.
+ *
+ * @returns {Promise<{ blob: Blob, count: number }>}
+ */
+export function buildExportInWorker(records, format, { options = {}, onProgress } = {}) {
+  return new Promise((resolve, reject) => {
+    const worker = new Worker(new URL('./export.worker.js', import.meta.url), { type: 'module' })
+
+    worker.onmessage = (event) => {
+      const message = event.data
+      if (message.type === 'progress') {
+        onProgress?.(message)
+        return
+      }
+
+      worker.terminate()
+      if (message.type === 'done') {
+        resolve({ blob: message.blob, count: message.count })
+      } else {
+        reject(new Error(message.message || 'Export failed'))
+      }
+    }
+
+    worker.onerror = (event) => {
+      worker.terminate()
+      reject(new Error(event.message || 'Export worker failed to start'))
+    }
+
+    const { payload, transfer } = packExportRecords(records)
+    worker.postMessage({ format, options, payload }, transfer)
+  })
+}
+
+/**
+ * Drop-in replacement for exportFinanceRecords that builds the file in a
+ * worker and downloads it. Falls back to the main thread without Worker support.
+ */
+export async function exportFinanceRecordsInWorker(records, format, filename = 'finance-records', options = {}, onProgress) {
+  if (!supportsExportWorker()) {
+    return exportFinanceRecords(records, format, filename, options)
+  }
+
+  if (records.length === 0) {
+    throw new Error('No data to export')
+  }
+
+  const { blob, count } = await buildExportInWorker(records, format, { options, onProgress })
+  downloadBlob(blob, `${filename}.${format}`)
+
+  return { success: true, count }
+}
@@ -34,9 +34,13 @@ const loadPDFLibraries = async () => {
 
 export const EXPORT_FORMATS = {
   EXCEL: 'xlsx',
+  CSV: 'csv',
   PDF: 'pdf'
 }
 
+// Formats that /api/finances/export can stream straight from the database
+export const SERVER_EXPORT_FORMATS = [EXPORT_FORMATS.CSV, EXPORT_FORMATS.EXCEL]
+
 export const SORT_OPTIONS = {
   DATE_ASC: { field: 'created_at', direction: 'asc', label: 'Date (Oldest First)' },
   DATE_DESC: { field: 'created_at', direction: 'desc', label: 'Date (Newest First)' },
@@ -48,66 +52,121 @@ export const SORT_OPTIONS = {
   STATUS_DESC: { field: 'status', direction: 'desc', label: 'Status (Z to A)' }
 }
 
+/**
+ * Compile a filter spec into a single predicate.
+ * Bounds are parsed and the search term is prepared once, so evaluating a
+ * record does no Date or string allocation.
+ */
+export function compileFinanceFilter(filters = {}) {
+  const fromMs = filters.dateFrom ? Date.parse(filters.dateFrom) : -Infinity
+  const toMs = filters.dateTo ? Date.parse(filters.dateTo + 'T23:59:59') : Infinity
+  const hasDateRange = Boolean(filters.dateFrom || filters.dateTo)
+
+  const searchTerm = filters.person ? filters.person.trim() : ''
+  const personPattern = searchTerm
+    ? new RegExp(searchTerm.replace(/[.*+?^${}()|[\]\\]/g, '\\$&'), 'i')
+    : null
+
+  const status = filters.status && filters.status !== 'all' ? filters.status : null
+  const paymentType = filters.paymentType && filters.paymentType !== 'all' ? filters.paymentType : null
+
+  return (record) => {
+    if (hasDateRange) {
+      const recordMs = Date.parse(record.created_at)
+      if (recordMs < fromMs || recordMs > toMs) return false
+    }
+    if (personPattern !== null && !(record.client_name && personPattern.test(record.client_name))) return false
+    if (status !== null && record.status !== status) return false
+    if (paymentType !== null && record.payment_type !== paymentType) return false
+    return true
+  }
+}
+
 /**
  * Filter finance records based on criteria
  */
 export function filterFinanceRecords(records, filters) {
-  return records.filter(record => {
-    // Date range filter
-    if (filters.dateFrom || filters.dateTo) {
-      const recordDate = new Date(record.created_at)
-      if (filters.dateFrom && recordDate < new Date(filters.dateFrom)) return false
-      if (filters.dateTo && recordDate > new Date(filters.dateTo + 'T23:59:59')) return false
-    }
+  const matches = compileFinanceFilter(filters)
+  const result = []
+  for (let i = 0; i < records.length; i++) {
+    if (matches(records[i])) result.push(records[i])
+  }
+  return result
+}
 
-    // Person filter (client name)
-    if (filters.person && filters.person.trim()) {
-      const searchTerm = filters.person.toLowerCase().trim()
-      if (!record.client_name?.toLowerCase().includes(searchTerm)) return false
-    }
+/**
+ * Precompute one numeric sort key per record.
+ * Strings are lowercased once and replaced by their rank among the distinct
+ * values, so every comparison during the sort is a typed-array lookup.
+ */
+function buildSortKeys(records, field) {
+  const n = records.length
+  const keys = new Float64Array(n)
 
-    // Status filter
-    if (filters.status && filters.status !== 'all') {
-      if (record.status !== filters.status) return false
+  if (field === 'amount') {
+    for (let i = 0; i < n; i++) {
+      keys[i] = parseFloat(records[i].amount) || 0
     }
+    return keys
+  }
 
-    // Payment type filter
-    if (filters.paymentType && filters.paymentType !== 'all') {
-      if (record.payment_type !== filters.paymentType) return false
+  if (field === 'created_at') {
+    for (let i = 0; i < n; i++) {
+      const ms = Date.parse(records[i].created_at)
+      keys[i] = Number.isNaN(ms) ? -Infinity : ms
     }
+    return keys
+  }
 
-    return true
-  })
+  const lowered = new Array(n)
+  const distinct = new Set()
+  for (let i = 0; i < n; i++) {
+    const value = records[i][field]
+    lowered[i] = typeof value === 'string' ? value.toLowerCase() : ''
+    distinct.add(lowered[i])
+  }
+
+  const ranks = new Map()
+  const sorted = [...distinct].sort()
+  for (let r = 0; r < sorted.length; r++) {
+    ranks.set(sorted[r], r)
+  }
+  for (let i = 0; i < n; i++) {
+    keys[i] = ranks.get(lowered[i])
+  }
+  return keys
 }
 
 /**
- * Sort finance records
+ * Sort finance records (decorate-sort-undecorate).
+ * Sorts an index array against precomputed keys; ties keep input order.
  */
 export function sortFinanceRecords(records, sortOption) {
   const { field, direction } = SORT_OPTIONS[sortOption] || SORT_OPTIONS.DATE_DESC
-  
-  return [...records].sort((a, b) => {
-    let aValue = a[field]
-    let bValue = b[field]
-
-    // Handle different data types
-    if (field === 'amount') {
-      aValue = parseFloat(aValue) || 0
-      bValue = parseFloat(bValue) || 0
-    } else if (field === 'created_at') {
-      aValue = new Date(aValue)
-      bValue = new Date(bValue)
-    } else if (typeof aValue === 'string') {
-      aValue = aValue?.toLowerCase() || ''
-      bValue = bValue?.toLowerCase() || ''
-    }
+  const n = records.length
+  const keys = buildSortKeys(records, field)
 
-    let comparison = 0
-    if (aValue < bValue) comparison = -1
-    if (aValue > bValue) comparison = 1
+  const order = new Uint32Array(n)
+  for (let i = 0; i < n; i++) order[i] = i
 
-    return direction === 'desc' ? -comparison : comparison
-  })
+  if (direction === 'desc') {
+    order.sort((a, b) => (keys[b] - keys[a]) || (a - b))
+  } else {
+    order.sort((a, b) => (keys[a] - keys[b]) || (a - b))
+  }
+
+  const result = new Array(n)
+  for (let i = 0; i < n; i++) {
+    result[i] = records[order[i]]
+  }
+  return result
+}
+
+/**
+ * Filter and sort in one call
+ */
+export function queryFinanceRecords(records, filters = {}, sortOption = 'DATE_DESC') {
+  return sortFinanceRecords(filterFinanceRecords(records, filters), sortOption)
 }
 
 /**
@@ -138,10 +197,10 @@ function formatDate(dateString) {
 }
 
 /**
- * Prepare data for export
+ * Format a single record as an export row (column name -> display value)
  */
-function prepareExportData(records, includeFields = {}) {
-  return records.map(record => ({
+export function formatExportRow(record, includeFields = {}) {
+  return {
     ID: record.id?.slice(0, 8) || '',
     'Client Name': record.client_name || '',
     'Amount': includeFields.showSensitive !== false ? formatCurrency(record.amount) : '[HIDDEN]',
@@ -152,10 +211,53 @@ function prepareExportData(records, includeFields = {}) {
     'Due Date': record.due_date ? formatDate(record.due_date) : '',
     'Next Payment': record.next_payment_date ? formatDate(record.next_payment_date) : '',
     'Notes': includeFields.showSensitive !== false ? (record.notes || '') : '[HIDDEN]'
-  }))
+  }
+}
+
+export const EXPORT_COLUMNS = Object.keys(formatExportRow({}))
+
+/**
+ * Prepare data for export
+ */
+function prepareExportData(records, includeFields = {}) {
+  return records.map(record => formatExportRow(record, includeFields))
 }
 
 
+/**
+ * Save a Blob as a file download
+ */
+export function downloadBlob(blob, filename) {
+  const url = URL.createObjectURL(blob)
+  const link = document.createElement('a')
+  link.href = url
+  link.download = filename
+  document.body.appendChild(link)
+  link.click()
+  link.remove()
+  URL.revokeObjectURL(url)
+}
+
+/**
+ * Build the finance workbook from prepared export rows
+ */
+export function buildExcelWorkbook(data) {
+  const wb = XLSX.utils.book_new()
+  const ws = XLSX.utils.json_to_sheet(data)
+
+  // Auto-size columns
+  ws['!cols'] = Object.keys(data[0]).map(key => {
+    let wch = key.length
+    for (let i = 0; i < data.length; i++) {
+      wch = Math.max(wch, String(data[i][key] || '').length)
+    }
+    return { wch }
+  })
+
+  XLSX.utils.book_append_sheet(wb, ws, 'Finance Records')
+  return wb
+}
+
 /**
  * Export to Excel
  */
@@ -166,29 +268,74 @@ export function exportToExcel(records, filename = 'finance-records', options = {
     throw new Error('No data to export')
   }
 
-  // Create workbook and worksheet
-  const wb = XLSX.utils.book_new()
-  const ws = XLSX.utils.json_to_sheet(data)
+  // Save file
+  XLSX.writeFile(buildExcelWorkbook(data), `${filename}.xlsx`)
+  
+  return { success: true, count: data.length }
+}
 
-  // Auto-size columns
-  const colWidths = Object.keys(data[0]).map(key => ({
-    wch: Math.max(
-      key.length,
-      ...data.map(row => String(row[key] || '').length)
-    )
-  }))
-  ws['!cols'] = colWidths
 
-  // Add worksheet to workbook
-  XLSX.utils.book_append_sheet(wb, ws, 'Finance Records')
+/**
+ * Encode one CSV line (RFC 4180). Cells that a spreadsheet would read as a
+ * formula are prefixed with a quote.
+ */
+export function toCsvLine(values) {
+  return values.map(value => {
+    let cell = value === null || value === undefined ? '' : String(value)
+    if (/^[=+\-@\t\r]/.test(cell)) {
+      cell = `'${cell}`
+    }
+    return /[",\r\n]/.test(cell) ? `"${cell.replace(/"/g, '""')}"` : cell
+  }).join(',') + '\r\n'
+}
+
+/**
+ * Build a CSV Blob from prepared export rows
+ */
+export function buildCsvBlob(data) {
+  const lines = [toCsvLine(EXPORT_COLUMNS)]
+  for (const row of data) {
+    lines.push(toCsvLine(EXPORT_COLUMNS.map(column => row[column])))
+  }
+
+  // BOM so Excel opens the file as UTF-8
+  return new Blob(['\ufeff', ...lines], { type: 'text/csv;charset=utf-8' })
+}
+
+/**
+ * Export to CSV
+ */
+export function exportToCSV(records, filename = 'finance-records', options = {}) {
+  const data = prepareExportData(records, options)
+
+  if (data.length === 0) {
+    throw new Error('No data to export')
+  }
+
+  downloadBlob(buildCsvBlob(data), `${filename}.csv`)
 
-  // Save file
-  XLSX.writeFile(wb, `${filename}.xlsx`)
-  
   return { success: true, count: data.length }
 }
 
 
+export const PDF_TABLE_STYLES = {
+  styles: {
+    fontSize: 6,
+    cellPadding: 1,
+    overflow: 'linebreak',
+    halign: 'left'
+  },
+  headStyles: {
+    fillColor: [41, 128, 185],
+    textColor: [255, 255, 255],
+    fontStyle: 'bold'
+  },
+  alternateRowStyles: {
+    fillColor: [245, 245, 245]
+  },
+  margin: { top: 10, right: 10, bottom: 10, left: 10 }
+}
+
 /**
  * Export to PDF
  */
@@ -264,21 +411,7 @@ export async function exportToPDF(records, filename = 'finance-records', options
           head: [headers],
           body: rows,
           startY: 35,
-          styles: { 
-            fontSize: 6,
-            cellPadding: 1,
-            overflow: 'linebreak',
-            halign: 'left'
-          },
-          headStyles: { 
-            fillColor: [41, 128, 185],
-            textColor: [255, 255, 255],
-            fontStyle: 'bold'
-          },
-          alternateRowStyles: { 
-            fillColor: [245, 245, 245] 
-          },
-          margin: { top: 10, right: 10, bottom: 10, left: 10 }
+          ...PDF_TABLE_STYLES
         })
       } catch (tableError) {
         console.error('autoTable error:', tableError)
@@ -309,6 +442,56 @@ export async function exportToPDF(records, filename = 'finance-records', options
   }
 }
 
+/**
+ * Query params selecting finance records on the server: a filter spec plus
+ * the creator scope (ignored by the server for editors)
+ */
+export function buildFinanceQueryParams({ filters = {}, createdBy } = {}) {
+  const params = new URLSearchParams()
+
+  for (const key of ['dateFrom', 'dateTo', 'person', 'status', 'paymentType']) {
+    if (filters[key] && filters[key] !== 'all') {
+      params.set(key, filters[key])
+    }
+  }
+  if (createdBy && createdBy !== 'all') params.set('createdBy', createdBy)
+
+  return params
+}
+
+/**
+ * Build the /api/finances/export URL for a filter spec and sort option
+ */
+export function buildFinanceExportUrl({ format = EXPORT_FORMATS.CSV, filters = {}, createdBy, sortBy = 'DATE_DESC', filename, showSensitive = true } = {}) {
+  const params = buildFinanceQueryParams({ filters, createdBy })
+  params.set('format', format)
+  params.set('sortBy', sortBy)
+
+  if (filename) params.set('filename', filename)
+  if (showSensitive === false) params.set('showSensitive', 'false')
+
+  return `/api/finances/export?${params.toString()}`
+}
+
+/**
+ * Let the browser download a streamed server export, so no records are
+ * loaded or rendered in the tab
+ */
+export function downloadServerExport(options = {}) {
+  if (typeof window === 'undefined') {
+    throw new Error('Server exports can only be started from the browser')
+  }
+
+  const link = document.createElement('a')
+  link.href = buildFinanceExportUrl(options)
+  link.rel = 'noopener'
+  document.body.appendChild(link)
+  link.click()
+  link.remove()
+
+  return { success: true, count: null, streamed: true }
+}
+
 /**
  * Main export function
  */
@@ -317,6 +500,8 @@ export async function exportFinanceRecords(records, format, filename = 'finance-
     switch (format) {
       case EXPORT_FORMATS.EXCEL:
         return exportToExcel(records, filename, options)
+      case EXPORT_FORMATS.CSV:
+        return exportToCSV(records, filename, options)
       case EXPORT_FORMATS.PDF:
         return await exportToPDF(records, filename, options)
       default:
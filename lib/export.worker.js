@@ -0,0 +1,113 @@
+import * as XLSX from 'xlsx'
+import { jsPDF } from 'jspdf'
+import autoTable from 'jspdf-autotable'
+import {
+  EXPORT_FORMATS,
+  EXPORT_COLUMNS,
+  PDF_TABLE_STYLES,
+  formatExportRow,
+  buildExcelWorkbook,
+  buildCsvBlob
+} from './export'
+
+/**
+ * Finance export worker
+ *
+ * Receives records packed by lib/export-worker-client.js (transferred, not
+ * copied), formats them and builds the XLSX/CSV/PDF file off the main thread.
+ *
+ * In:  { format, options, payload: { count, amounts, text } }
+ * Out: { type: 'progress', phase, done, total }
+ *      { type: 'done', blob, count } | { type: 'error', message }
+ */
+
+const PROGRESS_EVERY = 2000
+
+function unpackRecords(payload) {
+  const amounts = new Float64Array(payload.amounts)
+  const columns = JSON.parse(new TextDecoder().decode(payload.text))
+  const records = new Array(payload.count)
+
+  for (let i = 0; i < payload.count; i++) {
+    records[i] = {
+      id: columns.id[i],
+      client_name: columns.client_name[i],
+      amount: amounts[i],
+      payment_type: columns.payment_type[i],
+      status: columns.status[i],
+      properties: columns.property_name[i] ? { name: columns.property_name[i] } : null,
+      created_at: columns.created_at[i],
+      due_date: columns.due_date[i],
+      next_payment_date: columns.next_payment_date[i],
+      notes: columns.notes[i]
+    }
+  }
+  return records
+}
+
+function formatRows(records, options) {
+  const rows = new Array(records.length)
+  for (let i = 0; i < records.length; i++) {
+    rows[i] = formatExportRow(records[i], options)
+    if ((i + 1) % PROGRESS_EVERY === 0) {
+      self.postMessage({ type: 'progress', phase: 'formatting', done: i + 1, total: records.length })
+    }
+  }
+  return rows
+}
+
+function buildPdfBlob(data) {
+  const doc = new jsPDF('l', 'mm', 'a4')
+
+  doc.setFontSize(16)
+  doc.text('Finance Records Export', 14, 15)
+  doc.setFontSize(10)
+  doc.text(`Generated on: ${new Date().toLocaleString('en-IN')}`, 14, 25)
+  doc.text(`Total Records: ${data.length}`, 14, 30)
+
+  autoTable(doc, {
+    head: [EXPORT_COLUMNS],
+    body: data.map(row => EXPORT_COLUMNS.map(column => {
+      const value = row[column]
+      return value ? String(value).replace(/[\r\n]+/g, ' ').trim() : ''
+    })),
+    startY: 35,
+    ...PDF_TABLE_STYLES
+  })
+
+  return doc.output('blob')
+}
+
+function buildBlob(format, data) {
+  switch (format) {
+    case EXPORT_FORMATS.EXCEL: {
+      const buffer = XLSX.write(buildExcelWorkbook(data), { bookType: 'xlsx', type: 'array' })
+      return new Blob([buffer], { type: 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet' })
+    }
+    case EXPORT_FORMATS.CSV:
+      return buildCsvBlob(data)
+    case EXPORT_FORMATS.PDF:
+      return buildPdfBlob(data)
+    default:
+      throw new Error(`Unsupported export format: ${format}`)
+  }
+}
+
+self.onmessage = (event) => {
+  const { format, options = {}, payload } = event.data
+
+  try {
+    const records = unpackRecords(payload)
+    if (records.length === 0) {
+      throw new Error('No data to export')
+    }
+
+    const data = formatRows(records, options)
+    self.postMessage({ type: 'progress', phase: 'building', done: records.length, total: records.length })
+
+    const blob = buildBlob(format, data)
+    self.postMessage({ type: 'done', blob, count: records.length })
+  } catch (error) {
+    self.postMessage({ type: 'error', message: error.message })
+  }
+}
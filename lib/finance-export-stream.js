@@ -0,0 +1,316 @@
+import zlib from 'zlib'
+import { Readable, pipeline } from 'stream'
+import { supabase } from './supabase'
+import { EXPORT_FORMATS, EXPORT_COLUMNS, formatExportRow, toCsvLine } from './export'
+import { applyFinanceFilters, applyFinanceSort, encodeCursor, MAX_PAGE_SIZE } from './finance-query'
+
+/**
+ * PropMaster 3.0 - Streaming finance export
+ *
+ * Reads finance records in keyset (cursor) pages and encodes each page
+ * straight into a CSV or XLSX byte stream. The stream is pull-based, so the
+ * next page is only fetched once the client has consumed the previous one:
+ * memory use is bounded by one page no matter how many rows are exported.
+ */
+
+export const EXPORT_CONTENT_TYPES = {
+  [EXPORT_FORMATS.CSV]: 'text/csv; charset=utf-8',
+  [EXPORT_FORMATS.EXCEL]: 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+}
+
+/**
+ * Yield finance records page by page for a filter spec and sort option
+ */
+export async function* fetchFinancePages({ client = supabase, createdBy = null, filters = {}, sortBy = 'DATE_DESC', pageSize = MAX_PAGE_SIZE } = {}) {
+  let cursor = null
+
+  while (true) {
+    let query = client
+      .from('finances')
+      .select(`
+        *,
+        properties:property_id(id, name)
+      `)
+
+    if (createdBy) {
+      query = query.eq('created_by', createdBy)
+    }
+
+    query = applyFinanceSort(applyFinanceFilters(query, filters), sortBy, cursor).limit(pageSize)
+
+    const { data, error } = await query
+    if (error) {
+      throw error
+    }
+
+    if (data.length > 0) {
+      yield data
+    }
+    if (data.length < pageSize) {
+      return
+    }
+
+    cursor = encodeCursor(data[data.length - 1], sortBy)
+  }
+}
+
+/**
+ * CSV: a UTF-8 BOM and header line, then one chunk per page
+ */
+async function* csvChunks(pages, options) {
+  yield Buffer.from('\ufeff' + toCsvLine(EXPORT_COLUMNS), 'utf8')
+
+  for await (const page of pages) {
+    let chunk = ''
+    for (const record of page) {
+      const row = formatExportRow(record, options)
+      chunk += toCsvLine(EXPORT_COLUMNS.map(column => row[column]))
+    }
+    yield Buffer.from(chunk, 'utf8')
+  }
+}
+
+// XML 1.0 forbids most control characters, even escaped
+const escapeXml = (value) => String(value ?? '')
+  .replace(/[\u0000-\u0008\u000B\u000C\u000E-\u001F]/g, '')
+  .replace(/&/g, '&amp;')
+  .replace(/</g, '&lt;')
+  .replace(/>/g, '&gt;')
+  .replace(/"/g, '&quot;')
+
+const xlsxRow = (values) => '<row>' + values
+  .map(value => `<c t="inlineStr"><is><t xml:space="preserve">${escapeXml(value)}</t></is></c>`)
+  .join('') + '</row>'
+
+// Column widths can't be measured without buffering, so use fixed ones
+const XLSX_COLUMN_WIDTHS = [10, 28, 16, 16, 12, 28, 24, 24, 24, 40]
+
+/**
+ * Worksheet XML with inline strings, so no shared-string table has to be
+ * held in memory
+ */
+async function* worksheetChunks(pages, options) {
+  const cols = XLSX_COLUMN_WIDTHS
+    .map((width, i) => `<col min="${i + 1}" max="${i + 1}" width="${width}" customWidth="1"/>`)
+    .join('')
+
+  yield '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n' +
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">' +
+    `<cols>${cols}</cols><sheetData>` + xlsxRow(EXPORT_COLUMNS)
+
+  for await (const page of pages) {
+    let chunk = ''
+    for (const record of page) {
+      const row = formatExportRow(record, options)
+      chunk += xlsxRow(EXPORT_COLUMNS.map(column => row[column]))
+    }
+    yield chunk
+  }
+
+  yield '</sheetData></worksheet>'
+}
+
+const XLSX_PARTS = {
+  '[Content_Types].xml': '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n' +
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">' +
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>' +
+    '<Default Extension="xml" ContentType="application/xml"/>' +
+    '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>' +
+    '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>' +
+    '</Types>',
+  '_rels/.rels': '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n' +
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">' +
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>' +
+    '</Relationships>',
+  'xl/workbook.xml': '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n' +
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">' +
+    '<sheets><sheet name="Finance Records" sheetId="1" r:id="rId1"/></sheets>' +
+    '</workbook>',
+  'xl/_rels/workbook.xml.rels': '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n' +
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">' +
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>' +
+    '</Relationships>'
+}
+
+const CRC_TABLE = (() => {
+  const table = new Uint32Array(256)
+  for (let n = 0; n < 256; n++) {
+    let c = n
+    for (let k = 0; k < 8; k++) {
+      c = c & 1 ? 0xedb88320 ^ (c >>> 1) : c >>> 1
+    }
+    table[n] = c >>> 0
+  }
+  return table
+})()
+
+function crc32(crc, buffer) {
+  crc = ~crc
+  for (let i = 0; i < buffer.length; i++) {
+    crc = CRC_TABLE[(crc ^ buffer[i]) & 0xff] ^ (crc >>> 8)
+  }
+  return ~crc >>> 0
+}
+
+function dosDateTime(date) {
+  return {
+    time: (date.getHours() << 11) | (date.getMinutes() << 5) | Math.floor(date.getSeconds() / 2),
+    date: ((date.getFullYear() - 1980) << 9) | ((date.getMonth() + 1) << 5) | date.getDate()
+  }
+}
+
+// General purpose flags: sizes follow the data (bit 3), UTF-8 names (bit 11)
+const ZIP_FLAGS = 0x0808
+const ZIP_DEFLATE = 8
+
+/**
+ * Minimal streaming ZIP writer. Each entry is deflated as it is produced and
+ * its CRC and sizes are written in a trailing data descriptor, so nothing is
+ * buffered beyond zlib's window. Entries are async iterables of strings or
+ * Buffers. Uses 32-bit offsets (archives up to 4 GiB).
+ */
+async function* zipChunks(entries) {
+  const { time, date } = dosDateTime(new Date())
+  const directory = []
+  let offset = 0
+
+  for (const [name, content] of entries) {
+    const nameBytes = Buffer.from(name, 'utf8')
+    const entry = { nameBytes, offset, crc: 0, compressedSize: 0, size: 0 }
+
+    const header = Buffer.alloc(30)
+    header.writeUInt32LE(0x04034b50, 0)
+    header.writeUInt16LE(20, 4)
+    header.writeUInt16LE(ZIP_FLAGS, 6)
+    header.writeUInt16LE(ZIP_DEFLATE, 8)
+    header.writeUInt16LE(time, 10)
+    header.writeUInt16LE(date, 12)
+    header.writeUInt16LE(nameBytes.length, 26)
+    yield Buffer.concat([header, nameBytes])
+    offset += header.length + nameBytes.length
+
+    async function* measured() {
+      for await (const part of content) {
+        const buffer = Buffer.isBuffer(part) ? part : Buffer.from(part, 'utf8')
+        entry.crc = crc32(entry.crc, buffer)
+        entry.size += buffer.length
+        yield buffer
+      }
+    }
+
+    const deflated = pipeline(Readable.from(measured()), zlib.createDeflateRaw(), () => {})
+    for await (const chunk of deflated) {
+      entry.compressedSize += chunk.length
+      yield chunk
+    }
+    offset += entry.compressedSize
+
+    if (offset > 0xffffffff) {
+      throw new Error('Export exceeds the 4 GiB ZIP limit')
+    }
+
+    const descriptor = Buffer.alloc(16)
+    descriptor.writeUInt32LE(0x08074b50, 0)
+    descriptor.writeUInt32LE(entry.crc, 4)
+    descriptor.writeUInt32LE(entry.compressedSize, 8)
+    descriptor.writeUInt32LE(entry.size, 12)
+    yield descriptor
+    offset += descriptor.length
+
+    directory.push(entry)
+  }
+
+  const centralStart = offset
+  for (const entry of directory) {
+    const record = Buffer.alloc(46)
+    record.writeUInt32LE(0x02014b50, 0)
+    record.writeUInt16LE(20, 4)
+    record.writeUInt16LE(20, 6)
+    record.writeUInt16LE(ZIP_FLAGS, 8)
+    record.writeUInt16LE(ZIP_DEFLATE, 10)
+    record.writeUInt16LE(time, 12)
+    record.writeUInt16LE(date, 14)
+    record.writeUInt32LE(entry.crc, 16)
+    record.writeUInt32LE(entry.compressedSize, 20)
+    record.writeUInt32LE(entry.size, 24)
+    record.writeUInt16LE(entry.nameBytes.length, 28)
+    record.writeUInt32LE(entry.offset, 42)
+    yield Buffer.concat([record, entry.nameBytes])
+    offset += record.length + entry.nameBytes.length
+  }
+
+  const end = Buffer.alloc(22)
+  end.writeUInt32LE(0x06054b50, 0)
+  end.writeUInt16LE(directory.length, 8)
+  end.writeUInt16LE(directory.length, 10)
+  end.writeUInt32LE(offset - centralStart, 12)
+  end.writeUInt32LE(centralStart, 16)
+  yield end
+}
+
+async function* once(value) {
+  yield value
+}
+
+function xlsxChunks(pages, options) {
+  return zipChunks([
+    ...Object.entries(XLSX_PARTS).map(([name, xml]) => [name, once(xml)]),
+    ['xl/worksheets/sheet1.xml', worksheetChunks(pages, options)]
+  ])
+}
+
+/**
+ * Wrap an async iterator of Buffers as a pull-based web ReadableStream
+ */
+function toReadableStream(iterator) {
+  return new ReadableStream({
+    async pull(controller) {
+      try {
+        const { value, done } = await iterator.next()
+        if (done) {
+          controller.close()
+        } else {
+          controller.enqueue(new Uint8Array(value.buffer, value.byteOffset, value.byteLength))
+        }
+      } catch (error) {
+        console.error('Finance export stream failed:', error)
+        controller.error(error)
+      }
+    },
+    async cancel() {
+      await iterator.return?.()
+    }
+  })
+}
+
+/**
+ * Open a streaming export. The first page is fetched before returning, so
+ * query errors surface as a normal error response instead of a broken download.
+ *
+ * @returns {{ stream: ReadableStream, contentType: string, firstPageSize: number }}
+ */
+export async function openFinanceExport({ format = EXPORT_FORMATS.CSV, showSensitive = true, ...queryOptions } = {}) {
+  if (!EXPORT_CONTENT_TYPES[format]) {
+    throw new Error(`Unsupported streaming export format: ${format}`)
+  }
+
+  const source = fetchFinancePages(queryOptions)
+  const first = await source.next()
+
+  async function* pages() {
+    if (first.done) return
+    yield first.value
+    yield* source
+  }
+
+  const options = { showSensitive }
+  const chunks = format === EXPORT_FORMATS.CSV
+    ? csvChunks(pages(), options)
+    : xlsxChunks(pages(), options)
+
+  return {
+    stream: toReadableStream(chunks),
+    contentType: EXPORT_CONTENT_TYPES[format],
+    firstPageSize: first.done ? 0 : first.value.length
+  }
+}
@@ -0,0 +1,315 @@
+import { SORT_OPTIONS } from './export'
+import { getUserRole, canViewAllFinances } from './permissions'
+
+/**
+ * PropMaster 3.0 - Server-side finance query builder
+ *
+ * Translates the finance filter spec (date range, person, status, payment
+ * type) and every FINANCE_SORT_OPTIONS ordering into PostgREST filters with keyset
+ * (cursor) pagination, so list, report and export endpoints never have to
+ * load the full `finances` table.
+ */
+
+export const DEFAULT_PAGE_SIZE = 50
+export const MAX_PAGE_SIZE = 500
+
+// Columns that can be NULL are ordered NULLS LAST and need extra cursor handling
+const NULLABLE_SORT_FIELDS = new Set(['amount', 'client_name', 'status', 'updated_at'])
+
+// SORT_OPTIONS plus the list's default order, most recently changed first
+export const FINANCE_SORT_OPTIONS = {
+  UPDATED_DESC: { field: 'updated_at', direction: 'desc', label: 'Last Updated' },
+  ...SORT_OPTIONS
+}
+
+/**
+ * Indexes backing the filters and orderings above. Each ordering is
+ * (created_by, field, id) so editor-scoped pages stay index-only.
+ */
+export const FINANCE_QUERY_INDEXES = {
+  idx_finances_creator_created_id: {
+    sql: 'CREATE INDEX IF NOT EXISTS idx_finances_creator_created_id ON finances(created_by, created_at DESC, id);',
+    purpose: 'Keyset pagination for date orderings scoped by creator'
+  },
+  idx_finances_created_id: {
+    sql: 'CREATE INDEX IF NOT EXISTS idx_finances_created_id ON finances(created_at DESC, id);',
+    purpose: 'Keyset pagination for date orderings across all creators'
+  },
+  idx_finances_creator_updated_id: {
+    sql: 'CREATE INDEX IF NOT EXISTS idx_finances_creator_updated_id ON finances(created_by, updated_at DESC, id);',
+    purpose: 'Keyset pagination for the default (last updated) ordering scoped by creator'
+  },
+  idx_finances_updated_id: {
+    sql: 'CREATE INDEX IF NOT EXISTS idx_finances_updated_id ON finances(updated_at DESC, id);',
+    purpose: 'Keyset pagination for the default (last updated) ordering across all creators'
+  },
+  idx_finances_amount_id: {
+    sql: 'CREATE INDEX IF NOT EXISTS idx_finances_amount_id ON finances(created_by, amount, id);',
+    purpose: 'Keyset pagination for amount orderings'
+  },
+  idx_finances_client_name_id: {
+    sql: 'CREATE INDEX IF NOT EXISTS idx_finances_client_name_id ON finances(created_by, client_name, id);',
+    purpose: 'Keyset pagination for name orderings'
+  },
+  idx_finances_status_id: {
+    sql: 'CREATE INDEX IF NOT EXISTS idx_finances_status_id ON finances(created_by, status, id);',
+    purpose: 'Keyset pagination for status orderings'
+  },
+  idx_finances_payment_type: {
+    sql: 'CREATE INDEX IF NOT EXISTS idx_finances_payment_type ON finances(payment_type, created_at DESC) WHERE payment_type IS NOT NULL;',
+    purpose: 'Optimize payment type filtering'
+  },
+  idx_finances_client_name_trgm: {
+    sql: `
+      CREATE EXTENSION IF NOT EXISTS pg_trgm;
+      CREATE INDEX IF NOT EXISTS idx_finances_client_name_trgm ON finances USING gin(client_name gin_trgm_ops);
+    `,
+    purpose: 'Optimize substring (ILIKE) person search'
+  }
+}
+
+export const FINANCE_QUERY_FUNCTIONS = {
+  get_finance_summary: {
+    sql: `
+      CREATE OR REPLACE FUNCTION get_finance_summary(
+        p_created_by UUID DEFAULT NULL,
+        p_property_id UUID DEFAULT NULL,
+        p_status TEXT DEFAULT NULL,
+        p_payment_type TEXT DEFAULT NULL,
+        p_person TEXT DEFAULT NULL,
+        p_start TIMESTAMP DEFAULT NULL,
+        p_end TIMESTAMP DEFAULT NULL
+      )
+      RETURNS JSONB AS $$
+        SELECT jsonb_build_object(
+          'totalReceivables', COALESCE(SUM(amount), 0),
+          'totalReceived', COALESCE(SUM(amount) FILTER (WHERE status = 'paid'), 0),
+          'pendingAmount', COALESCE(SUM(amount) FILTER (WHERE status = 'pending'), 0),
+          'overdueAmount', COALESCE(SUM(amount) FILTER (WHERE status = 'overdue'), 0),
+          'totalRecords', COUNT(*),
+          'paidRecords', COUNT(*) FILTER (WHERE status = 'paid'),
+          'pendingRecords', COUNT(*) FILTER (WHERE status = 'pending'),
+          'overdueRecords', COUNT(*) FILTER (WHERE status = 'overdue')
+        )
+        FROM finances
+        WHERE (p_created_by IS NULL OR created_by = p_created_by)
+          AND (p_property_id IS NULL OR property_id = p_property_id)
+          AND (p_status IS NULL OR status = p_status)
+          AND (p_payment_type IS NULL OR payment_type = p_payment_type)
+          AND (p_person IS NULL OR client_name ILIKE '%' || p_person || '%')
+          AND (p_start IS NULL OR created_at >= p_start)
+          AND (p_end IS NULL OR created_at <= p_end);
+      $$ LANGUAGE sql STABLE;
+    `,
+    purpose: 'Filtered finance aggregates without returning rows'
+  }
+}
+
+// Date-only upper bounds include the whole day, matching filterFinanceRecords
+const normalizeEndDate = (value) => /^\d{4}-\d{2}-\d{2}$/.test(value) ? `${value}T23:59:59.999` : value
+
+const isSet = (value) => value !== null && value !== undefined && value !== '' && value !== 'all'
+
+/**
+ * Read a finance query from URL search params.
+ * Accepts both the API names (startDate, clientName) and the export filter
+ * spec names (dateFrom, person) so presets can be passed through unchanged.
+ */
+export function parseFinanceQuery(searchParams, { defaultSortBy = 'UPDATED_DESC' } = {}) {
+  const sortBy = searchParams.get('sortBy')
+  const limit = parseInt(searchParams.get('limit')) || DEFAULT_PAGE_SIZE
+  const endDate = searchParams.get('endDate') || searchParams.get('dateTo')
+
+  return {
+    filters: {
+      propertyId: searchParams.get('propertyId'),
+      status: searchParams.get('status'),
+      paymentType: searchParams.get('paymentType'),
+      person: searchParams.get('clientName') || searchParams.get('person'),
+      startDate: searchParams.get('startDate') || searchParams.get('dateFrom'),
+      endDate: endDate ? normalizeEndDate(endDate) : null
+    },
+    sortBy: FINANCE_SORT_OPTIONS[sortBy] ? sortBy : defaultSortBy,
+    limit: Math.min(Math.max(limit, 1), MAX_PAGE_SIZE),
+    cursor: searchParams.get('cursor'),
+    summaryOnly: searchParams.get('summaryOnly') === 'true' || searchParams.get('summary') === 'only'
+  }
+}
+
+/**
+ * Apply the filter spec to a PostgREST query on finances
+ */
+export function applyFinanceFilters(query, filters = {}) {
+  if (isSet(filters.propertyId)) {
+    query = query.eq('property_id', filters.propertyId)
+  }
+  if (isSet(filters.status)) {
+    query = query.eq('status', filters.status)
+  }
+  if (isSet(filters.paymentType)) {
+    query = query.eq('payment_type', filters.paymentType)
+  }
+  if (isSet(filters.person) && filters.person.trim()) {
+    query = query.ilike('client_name', `%${filters.person.trim()}%`)
+  }
+  if (isSet(filters.startDate)) {
+    query = query.gte('created_at', filters.startDate)
+  }
+  if (isSet(filters.endDate)) {
+    query = query.lte('created_at', filters.endDate)
+  }
+  return query
+}
+
+export function encodeCursor(record, sortBy) {
+  const { field } = FINANCE_SORT_OPTIONS[sortBy] || SORT_OPTIONS.DATE_DESC
+  return Buffer.from(JSON.stringify({ v: record[field] ?? null, id: record.id })).toString('base64url')
+}
+
+export function decodeCursor(cursor) {
+  if (!cursor) return null
+  try {
+    const parsed = JSON.parse(Buffer.from(cursor, 'base64url').toString('utf8'))
+    return parsed && parsed.id ? parsed : null
+  } catch {
+    return null
+  }
+}
+
+// Quote a value for use inside a PostgREST or() filter
+const quoteFilterValue = (value) => `"${String(value).replace(/\\/g, '\\\\').replace(/"/g, '\\"')}"`
+
+/**
+ * Apply ordering plus the keyset condition for the page after `cursor`.
+ * Rows are ordered by (field, id) with NULLs last; id is always ascending
+ * so ties break deterministically in both directions.
+ */
+export function applyFinanceSort(query, sortBy, cursor = null) {
+  const { field, direction } = FINANCE_SORT_OPTIONS[sortBy] || SORT_OPTIONS.DATE_DESC
+  const ascending = direction === 'asc'
+
+  query = query
+    .order(field, { ascending, nullsFirst: false })
+    .order('id', { ascending: true })
+
+  const position = decodeCursor(cursor)
+  if (!position) {
+    return query
+  }
+
+  const id = quoteFilterValue(position.id)
+
+  if (position.v === null) {
+    // Already inside the trailing NULL block
+    return query.is(field, null).gt('id', position.id)
+  }
+
+  const value = quoteFilterValue(position.v)
+  const op = ascending ? 'gt' : 'lt'
+  const conditions = [`${field}.${op}.${value}`, `and(${field}.eq.${value},id.gt.${id})`]
+  if (NULLABLE_SORT_FIELDS.has(field)) {
+    conditions.push(`${field}.is.null`)
+  }
+
+  return query.or(conditions.join(','))
+}
+
+/**
+ * RPC arguments for get_finance_summary
+ */
+export function financeSummaryArgs(filters = {}, createdBy = null) {
+  return {
+    p_created_by: createdBy || null,
+    p_property_id: isSet(filters.propertyId) ? filters.propertyId : null,
+    p_status: isSet(filters.status) ? filters.status : null,
+    p_payment_type: isSet(filters.paymentType) ? filters.paymentType : null,
+    p_person: isSet(filters.person) && filters.person.trim() ? filters.person.trim() : null,
+    p_start: isSet(filters.startDate) ? filters.startDate : null,
+    p_end: isSet(filters.endDate) ? filters.endDate : null
+  }
+}
+
+// PostgREST reports an unknown function as PGRST202, Postgres as 42883
+const isMissingFunction = (error) => error?.code === 'PGRST202' || error?.code === '42883'
+
+/**
+ * Filtered finance aggregates from get_finance_summary. Until the function
+ * is installed (database setup or optimize), the same figures are summed
+ * from id/amount/status pages instead.
+ * @returns {Promise<{ data: Object | null, error: Object | null }>}
+ */
+export async function fetchFinanceSummary(client, filters = {}, createdBy = null) {
+  const result = await client.rpc('get_finance_summary', financeSummaryArgs(filters, createdBy))
+  if (!isMissingFunction(result.error)) {
+    return result
+  }
+
+  console.warn('get_finance_summary is not installed, summing finance rows instead:', result.error.message)
+
+  const summary = {
+    totalReceivables: 0,
+    totalReceived: 0,
+    pendingAmount: 0,
+    overdueAmount: 0,
+    totalRecords: 0,
+    paidRecords: 0,
+    pendingRecords: 0,
+    overdueRecords: 0
+  }
+  let lastId = null
+
+  while (true) {
+    let query = client.from('finances').select('id, amount, status')
+    if (createdBy) {
+      query = query.eq('created_by', createdBy)
+    }
+    if (lastId) {
+      query = query.gt('id', lastId)
+    }
+    query = applyFinanceFilters(query, filters).order('id', { ascending: true }).limit(MAX_PAGE_SIZE)
+
+    const { data, error } = await query
+    if (error) {
+      return { data: null, error }
+    }
+
+    for (const { amount, status } of data) {
+      const value = Number(amount) || 0
+      summary.totalReceivables += value
+      summary.totalRecords++
+      if (status === 'paid') {
+        summary.totalReceived += value
+        summary.paidRecords++
+      } else if (status === 'pending') {
+        summary.pendingAmount += value
+        summary.pendingRecords++
+      } else if (status === 'overdue') {
+        summary.overdueAmount += value
+        summary.overdueRecords++
+      }
+    }
+
+    if (data.length < MAX_PAGE_SIZE) {
+      return { data: summary, error: null }
+    }
+    lastId = data[data.length - 1].id
+  }
+}
+
+/**
+ * Resolve which creator's records a user may query, matching /api/finances:
+ * editors are always scoped to themselves, masters may pick a user or see all.
+ */
+export function resolveFinanceScope(user, searchParams) {
+  const userRole = getUserRole(user)
+
+  if (userRole === 'editor') {
+    return user.userId
+  }
+
+  if (canViewAllFinances(userRole)) {
+    return searchParams.get('userId') || searchParams.get('createdBy') || null
+  }
+
+  return user.userId
+}
@@ -0,0 +1,388 @@
+import { supabase, supabaseAdmin } from './supabase'
+
+/**
+ * PropMaster 3.0 - Finance Rollups
+ *
+ * Pre-aggregated finance tables that back the financial dashboard.
+ * Rows are kept up to date incrementally by a trigger on `finances`
+ * (each insert/update/delete applies a +1/-1 delta), and a compaction
+ * job prunes empty buckets and can rebuild everything from scratch.
+ *
+ * Dashboard requests read the rollups through `get_finance_dashboard`
+ * instead of scanning `finances`.
+ */
+
+// Sentinel used for rollup keys where the source column is NULL
+export const ROLLUP_NULL_UUID = '00000000-0000-0000-0000-000000000000'
+
+export const FINANCE_ROLLUP_SQL = {
+  finance_daily_rollup: {
+    sql: `
+      CREATE TABLE IF NOT EXISTS finance_daily_rollup (
+        day DATE NOT NULL,
+        created_by UUID NOT NULL DEFAULT '${ROLLUP_NULL_UUID}',
+        status VARCHAR(50) NOT NULL,
+        record_count INTEGER NOT NULL DEFAULT 0,
+        total_amount DECIMAL(15,2) NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, created_by, status)
+      );
+      CREATE INDEX IF NOT EXISTS idx_finance_daily_rollup_creator_day ON finance_daily_rollup(created_by, day DESC);
+    `,
+    purpose: 'Per-day, per-status, per-creator totals for revenue and status breakdowns'
+  },
+
+  finance_client_rollup: {
+    sql: `
+      CREATE TABLE IF NOT EXISTS finance_client_rollup (
+        created_by UUID NOT NULL DEFAULT '${ROLLUP_NULL_UUID}',
+        client_name VARCHAR(255) NOT NULL,
+        property_id UUID NOT NULL DEFAULT '${ROLLUP_NULL_UUID}',
+        record_count INTEGER NOT NULL DEFAULT 0,
+        total_amount DECIMAL(15,2) NOT NULL DEFAULT 0,
+        paid_amount DECIMAL(15,2) NOT NULL DEFAULT 0,
+        outstanding_amount DECIMAL(15,2) NOT NULL DEFAULT 0,
+        PRIMARY KEY (created_by, client_name, property_id)
+      );
+      CREATE INDEX IF NOT EXISTS idx_finance_client_rollup_paid ON finance_client_rollup(created_by, paid_amount DESC);
+    `,
+    purpose: 'Per-creator, per-client, per-property totals for top clients and active client counts'
+  },
+
+  finance_rollup_functions: {
+    sql: `
+      CREATE OR REPLACE FUNCTION finance_rollup_apply(r finances, delta INTEGER)
+      RETURNS void AS $$
+      BEGIN
+        INSERT INTO finance_daily_rollup (day, created_by, status, record_count, total_amount)
+        VALUES (
+          COALESCE(r.created_at, NOW())::date,
+          COALESCE(r.created_by, '${ROLLUP_NULL_UUID}'::uuid),
+          COALESCE(r.status, 'pending'),
+          delta,
+          delta * COALESCE(r.amount, 0)
+        )
+        ON CONFLICT (day, created_by, status) DO UPDATE SET
+          record_count = finance_daily_rollup.record_count + EXCLUDED.record_count,
+          total_amount = finance_daily_rollup.total_amount + EXCLUDED.total_amount;
+
+        IF COALESCE(TRIM(r.client_name), '') <> '' THEN
+          INSERT INTO finance_client_rollup (created_by, client_name, property_id, record_count, total_amount, paid_amount, outstanding_amount)
+          VALUES (
+            COALESCE(r.created_by, '${ROLLUP_NULL_UUID}'::uuid),
+            TRIM(r.client_name),
+            COALESCE(r.property_id, '${ROLLUP_NULL_UUID}'::uuid),
+            delta,
+            delta * COALESCE(r.amount, 0),
+            CASE WHEN r.status = 'paid' THEN delta * COALESCE(r.amount, 0) ELSE 0 END,
+            CASE WHEN r.status IN ('pending', 'overdue') THEN delta * COALESCE(r.amount, 0) ELSE 0 END
+          )
+          ON CONFLICT (created_by, client_name, property_id) DO UPDATE SET
+            record_count = finance_client_rollup.record_count + EXCLUDED.record_count,
+            total_amount = finance_client_rollup.total_amount + EXCLUDED.total_amount,
+            paid_amount = finance_client_rollup.paid_amount + EXCLUDED.paid_amount,
+            outstanding_amount = finance_client_rollup.outstanding_amount + EXCLUDED.outstanding_amount;
+        END IF;
+      END;
+      $$ LANGUAGE plpgsql;
+
+      CREATE OR REPLACE FUNCTION finance_rollup_trigger()
+      RETURNS TRIGGER AS $$
+      BEGIN
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+          PERFORM finance_rollup_apply(OLD, -1);
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+          PERFORM finance_rollup_apply(NEW, 1);
+        END IF;
+        RETURN NULL;
+      END;
+      $$ LANGUAGE plpgsql;
+
+      -- Removes buckets whose deltas have cancelled out
+      CREATE OR REPLACE FUNCTION compact_finance_rollups()
+      RETURNS INTEGER AS $$
+      DECLARE
+        removed INTEGER := 0;
+        n INTEGER;
+      BEGIN
+        DELETE FROM finance_daily_rollup WHERE record_count = 0;
+        GET DIAGNOSTICS n = ROW_COUNT;
+        removed := removed + n;
+        DELETE FROM finance_client_rollup WHERE record_count = 0;
+        GET DIAGNOSTICS n = ROW_COUNT;
+        RETURN removed + n;
+      END;
+      $$ LANGUAGE plpgsql;
+
+      -- Full backfill, used on setup and to repair drift
+      CREATE OR REPLACE FUNCTION rebuild_finance_rollups()
+      RETURNS void AS $$
+      BEGIN
+        LOCK TABLE finances IN SHARE MODE;
+        TRUNCATE finance_daily_rollup, finance_client_rollup;
+
+        INSERT INTO finance_daily_rollup (day, created_by, status, record_count, total_amount)
+        SELECT
+          COALESCE(created_at, NOW())::date,
+          COALESCE(created_by, '${ROLLUP_NULL_UUID}'::uuid),
+          COALESCE(status, 'pending'),
+          COUNT(*),
+          COALESCE(SUM(amount), 0)
+        FROM finances
+        GROUP BY 1, 2, 3;
+
+        INSERT INTO finance_client_rollup (created_by, client_name, property_id, record_count, total_amount, paid_amount, outstanding_amount)
+        SELECT
+          COALESCE(created_by, '${ROLLUP_NULL_UUID}'::uuid),
+          TRIM(client_name),
+          COALESCE(property_id, '${ROLLUP_NULL_UUID}'::uuid),
+          COUNT(*),
+          COALESCE(SUM(amount), 0),
+          COALESCE(SUM(amount) FILTER (WHERE status = 'paid'), 0),
+          COALESCE(SUM(amount) FILTER (WHERE status IN ('pending', 'overdue')), 0)
+        FROM finances
+        WHERE COALESCE(TRIM(client_name), '') <> ''
+        GROUP BY 1, 2, 3;
+      END;
+      $$ LANGUAGE plpgsql;
+    `,
+    purpose: 'Incremental delta, compaction and rebuild functions for finance rollups'
+  },
+
+  finance_rollup_trigger: {
+    sql: `
+      DROP TRIGGER IF EXISTS finance_rollup_sync ON finances;
+      CREATE TRIGGER finance_rollup_sync
+        AFTER INSERT OR DELETE OR UPDATE OF amount, status, created_by, client_name, property_id, created_at
+        ON finances
+        FOR EACH ROW EXECUTE FUNCTION finance_rollup_trigger();
+    `,
+    purpose: 'Keep rollups in sync with every change to finances'
+  },
+
+  get_finance_dashboard: {
+    sql: `
+      CREATE OR REPLACE FUNCTION get_finance_dashboard(
+        p_created_by UUID DEFAULT NULL,
+        p_months INTEGER DEFAULT 8,
+        p_top_clients INTEGER DEFAULT 5
+      )
+      RETURNS JSONB AS $$
+        WITH daily AS (
+          SELECT day, status, record_count, total_amount
+          FROM finance_daily_rollup
+          WHERE p_created_by IS NULL OR created_by = p_created_by
+        ),
+        clients AS (
+          SELECT client_name, property_id, record_count, paid_amount, outstanding_amount
+          FROM finance_client_rollup
+          WHERE record_count > 0 AND (p_created_by IS NULL OR created_by = p_created_by)
+        ),
+        months AS (
+          SELECT generate_series(
+            date_trunc('month', CURRENT_DATE) - make_interval(months => GREATEST(p_months, 1) - 1),
+            date_trunc('month', CURRENT_DATE),
+            interval '1 month'
+          )::date AS month
+        )
+        SELECT jsonb_build_object(
+          'paymentStatus', COALESCE((
+            SELECT jsonb_agg(jsonb_build_object('status', status, 'count', cnt, 'amount', amt) ORDER BY cnt DESC)
+            FROM (
+              SELECT status, SUM(record_count) AS cnt, SUM(total_amount) AS amt
+              FROM daily GROUP BY status HAVING SUM(record_count) > 0
+            ) s
+          ), '[]'::jsonb),
+          'monthlyRevenue', COALESCE((
+            SELECT jsonb_agg(jsonb_build_object('month', m.month, 'revenue', COALESCE(r.revenue, 0)) ORDER BY m.month)
+            FROM months m
+            LEFT JOIN (
+              SELECT date_trunc('month', day)::date AS month, SUM(total_amount) AS revenue
+              FROM daily
+              WHERE status = 'paid' AND day >= (SELECT MIN(month) FROM months)
+              GROUP BY 1
+            ) r ON r.month = m.month
+          ), '[]'::jsonb),
+          'topClients', COALESCE((
+            SELECT jsonb_agg(jsonb_build_object('name', client_name, 'totalPaid', total_paid, 'properties', properties) ORDER BY total_paid DESC)
+            FROM (
+              SELECT client_name, SUM(paid_amount) AS total_paid,
+                COUNT(DISTINCT property_id) FILTER (WHERE property_id <> '${ROLLUP_NULL_UUID}'::uuid) AS properties
+              FROM clients
+              GROUP BY client_name
+              ORDER BY total_paid DESC
+              LIMIT p_top_clients
+            ) c
+          ), '[]'::jsonb),
+          'activeClients', (
+            SELECT COUNT(*) FROM (
+              SELECT client_name FROM clients GROUP BY client_name HAVING SUM(outstanding_amount) > 0
+            ) a
+          ),
+          'totalProperties', (
+            SELECT COUNT(DISTINCT property_id) FROM clients WHERE property_id <> '${ROLLUP_NULL_UUID}'::uuid
+          )
+        );
+      $$ LANGUAGE sql STABLE;
+    `,
+    purpose: 'Single-call dashboard aggregation over the rollup tables'
+  }
+}
+
+/**
+ * Create rollup tables, functions and trigger, then backfill from finances
+ */
+export async function setupFinanceRollups() {
+  const client = supabaseAdmin || supabase
+  const results = {}
+
+  for (const [name, config] of Object.entries(FINANCE_ROLLUP_SQL)) {
+    try {
+      const { error } = await client.rpc('exec_sql', { sql: config.sql })
+      results[name] = error
+        ? { created: false, error: error.message, purpose: config.purpose, manual_sql: config.sql }
+        : { created: true, purpose: config.purpose }
+    } catch (err) {
+      results[name] = { created: false, error: err.message, purpose: config.purpose, manual_sql: config.sql }
+    }
+  }
+
+  const allCreated = Object.values(results).every(r => r.created)
+  let backfill = { success: false, skipped: !allCreated }
+
+  if (allCreated) {
+    const { error } = await client.rpc('rebuild_finance_rollups')
+    backfill = { success: !error, error: error?.message }
+  }
+
+  return {
+    success: allCreated && backfill.success,
+    steps: results,
+    backfill
+  }
+}
+
+/**
+ * Periodic compaction job: drop empty buckets left behind by deletes and
+ * status changes. Pass `rebuild: true` to re-aggregate from finances.
+ */
+export async function compactFinanceRollups(options = {}) {
+  const { rebuild = false } = options
+  const client = supabaseAdmin || supabase
+
+  if (rebuild) {
+    const { error } = await client.rpc('rebuild_finance_rollups')
+    return { success: !error, rebuilt: !error, removed: 0, error: error?.message }
+  }
+
+  const { data, error } = await client.rpc('compact_finance_rollups')
+  return { success: !error, rebuilt: false, removed: data || 0, error: error?.message }
+}
+
+const STATUS_LABELS = {
+  paid: 'Paid',
+  pending: 'Pending',
+  overdue: 'Overdue',
+  partial: 'Partial',
+  cancelled: 'Cancelled'
+}
+
+const toNumber = (value) => parseFloat(value) || 0
+
+/**
+ * Build the financial dashboard payload from rollups.
+ * `createdBy` scopes every figure to a single creator (null = all records).
+ */
+export async function getFinanceDashboard(options = {}) {
+  const { createdBy = null, months = 8, topClients = 5, listLimit = 5 } = options
+
+  const today = new Date().toISOString().split('T')[0]
+  const in30Days = new Date(Date.now() + 30 * 24 * 60 * 60 * 1000).toISOString().split('T')[0]
+
+  // Recent and upcoming lists are bounded index scans, not aggregations
+  let recentQuery = supabase
+    .from('finances')
+    .select('id, client_name, amount, status, due_date, created_at, properties:property_id(id, name)')
+    .order('updated_at', { ascending: false })
+    .limit(listLimit)
+
+  let upcomingQuery = supabase
+    .from('finances')
+    .select('id, client_name, amount, status, due_date, properties:property_id(id, name)')
+    .in('status', ['pending', 'overdue'])
+    .gte('due_date', today)
+    .lte('due_date', in30Days)
+    .order('due_date', { ascending: true })
+    .limit(listLimit)
+
+  if (createdBy) {
+    recentQuery = recentQuery.eq('created_by', createdBy)
+    upcomingQuery = upcomingQuery.eq('created_by', createdBy)
+  }
+
+  const [rollupResult, recentResult, upcomingResult] = await Promise.all([
+    supabase.rpc('get_finance_dashboard', {
+      p_created_by: createdBy,
+      p_months: months,
+      p_top_clients: topClients
+    }),
+    recentQuery,
+    upcomingQuery
+  ])
+
+  const error = rollupResult.error || recentResult.error || upcomingResult.error
+  if (error) {
+    return { data: null, error, source: 'rollups' }
+  }
+
+  const rollups = rollupResult.data || {}
+
+  const statusTotals = {}
+  const paymentStatus = (rollups.paymentStatus || []).map(row => {
+    const amount = toNumber(row.amount)
+    const count = parseInt(row.count) || 0
+    statusTotals[row.status] = { amount, count }
+    return {
+      status: STATUS_LABELS[row.status] || row.status,
+      count,
+      amount
+    }
+  })
+
+  const revenueByMonth = (rollups.monthlyRevenue || []).map(row => ({
+    month: new Date(`${row.month}T00:00:00`).toLocaleString('en-US', { month: 'short' }),
+    revenue: toNumber(row.revenue)
+  }))
+  // No revenue targets are stored, so bars are scaled against the best month
+  const target = Math.max(1, ...revenueByMonth.map(m => m.revenue))
+  const monthlyRevenue = revenueByMonth.map(m => ({ ...m, target }))
+
+  const totalReceivables = Object.values(statusTotals).reduce((sum, s) => sum + s.amount, 0)
+  const totalTransactions = Object.values(statusTotals).reduce((sum, s) => sum + s.count, 0)
+
+  return {
+    data: {
+      summary: {
+        totalReceivables,
+        totalReceived: statusTotals.paid?.amount || 0,
+        pendingAmount: statusTotals.pending?.amount || 0,
+        overdueAmount: statusTotals.overdue?.amount || 0,
+        totalProperties: rollups.totalProperties || 0,
+        activeClients: rollups.activeClients || 0,
+        totalTransactions,
+        thisMonthRevenue: monthlyRevenue[monthlyRevenue.length - 1]?.revenue || 0
+      },
+      recentTransactions: recentResult.data || [],
+      upcomingPayments: upcomingResult.data || [],
+      monthlyRevenue,
+      paymentStatus,
+      topClients: (rollups.topClients || []).map(client => ({
+        name: client.name,
+        totalPaid: toNumber(client.totalPaid),
+        properties: client.properties || 0
+      }))
+    },
+    error: null,
+    source: 'rollups'
+  }
+}
@@ -7,9 +7,235 @@ export const PERMISSIONS = {
   viewer: ['property_view_available'],
 };
 
+// Granular permissions; a user's stored list replaces the role defaults
+export const PERMISSION_KEYS = {
+  // Properties
+  PROPERTIES_VIEW: 'properties_view',
+  PROPERTIES_CREATE: 'properties_create',
+  PROPERTIES_EDIT: 'properties_edit',
+  PROPERTIES_DELETE: 'properties_delete',
+  PROPERTIES_SHARE: 'properties_share',
+
+  // Finance
+  FINANCE_VIEW: 'finance_view',
+  FINANCE_CREATE: 'finance_create',
+  FINANCE_EDIT: 'finance_edit',
+  FINANCE_DELETE: 'finance_delete',
+  FINANCE_REPORTS: 'finance_reports',
+
+  // Users
+  USERS_VIEW: 'users_view',
+  USERS_MANAGE: 'users_manage',
+  USERS_PERMISSIONS: 'users_permissions',
+
+  // Settings
+  SETTINGS_VIEW: 'settings_view',
+  SETTINGS_EDIT: 'settings_edit',
+
+  // Dashboard
+  DASHBOARD_VIEW: 'dashboard_view',
+  DASHBOARD_ANALYTICS: 'dashboard_analytics'
+};
+
+// Default granular permissions per role (including legacy database roles).
+// The lists are shared by every caller of getUserPermissions, so they are frozen.
+export const DEFAULT_ROLE_PERMISSIONS = {
+  master: Object.values(PERMISSION_KEYS), // All permissions
+  admin: [
+    PERMISSION_KEYS.PROPERTIES_VIEW,
+    PERMISSION_KEYS.PROPERTIES_CREATE,
+    PERMISSION_KEYS.PROPERTIES_EDIT,
+    PERMISSION_KEYS.PROPERTIES_DELETE,
+    PERMISSION_KEYS.PROPERTIES_SHARE,
+    PERMISSION_KEYS.FINANCE_VIEW,
+    PERMISSION_KEYS.FINANCE_CREATE,
+    PERMISSION_KEYS.FINANCE_EDIT,
+    PERMISSION_KEYS.FINANCE_DELETE,
+    PERMISSION_KEYS.FINANCE_REPORTS,
+    PERMISSION_KEYS.USERS_VIEW,
+    PERMISSION_KEYS.DASHBOARD_VIEW,
+    PERMISSION_KEYS.DASHBOARD_ANALYTICS
+  ],
+  viewer: [
+    PERMISSION_KEYS.PROPERTIES_VIEW,
+    PERMISSION_KEYS.FINANCE_VIEW,
+    PERMISSION_KEYS.DASHBOARD_VIEW
+  ],
+  client: [
+    PERMISSION_KEYS.PROPERTIES_VIEW, // Only via shared links
+    PERMISSION_KEYS.DASHBOARD_VIEW
+  ],
+  pending: [] // No permissions
+};
+
+for (const list of Object.values(DEFAULT_ROLE_PERMISSIONS)) Object.freeze(list);
+
+// Permission bitsets: every permission name owns one bit, and each role's
+// permissions are compiled into a single integer once at load, so checks
+// are one AND instead of array scans. Bits are assigned here explicitly,
+// independent of the lists above: only ever add a name with the next free
+// bit, never renumber or reuse one.
+export const PERMISSION_BITS = Object.freeze({
+  // Role gates
+  delete: 1 << 0,
+  manage_users: 1 << 1,
+  finance_all: 1 << 2,
+  property_all: 1 << 3,
+  finance_own: 1 << 4,
+  property_manage: 1 << 5,
+  property_view_available: 1 << 6,
+
+  // Granular permissions
+  properties_view: 1 << 7,
+  properties_create: 1 << 8,
+  properties_edit: 1 << 9,
+  properties_delete: 1 << 10,
+  properties_share: 1 << 11,
+  finance_view: 1 << 12,
+  finance_create: 1 << 13,
+  finance_edit: 1 << 14,
+  finance_delete: 1 << 15,
+  finance_reports: 1 << 16,
+  users_view: 1 << 17,
+  users_manage: 1 << 18,
+  users_permissions: 1 << 19,
+  settings_view: 1 << 20,
+  settings_edit: 1 << 21,
+  dashboard_view: 1 << 22,
+  dashboard_analytics: 1 << 23
+});
+
+const PERMISSION_NAMES = Object.keys(PERMISSION_BITS);
+
+for (const name of [...Object.values(PERMISSIONS).flat(), ...Object.values(PERMISSION_KEYS)]) {
+  if (!PERMISSION_BITS[name]) {
+    throw new Error(`Permission ${name} has no bit in PERMISSION_BITS`);
+  }
+}
+
+export const ALL_PERMISSIONS = Object.values(PERMISSION_BITS).reduce((mask, bit) => mask | bit, 0);
+
+// Compile a list of permission names ('*' means all) into a mask
+export const toPermissionMask = (names) => {
+  let mask = 0;
+  for (const name of names || []) {
+    if (name === '*') return ALL_PERMISSIONS;
+    mask |= PERMISSION_BITS[name] || 0;
+  }
+  return mask;
+};
+
+// Expand a mask back into permission names
+export const fromPermissionMask = (mask) =>
+  PERMISSION_NAMES.filter((name) => (mask & PERMISSION_BITS[name]) !== 0);
+
+const ROLE_MASKS = Object.freeze(
+  Object.fromEntries(
+    [...new Set([...Object.keys(PERMISSIONS), ...Object.keys(DEFAULT_ROLE_PERMISSIONS)])].map((role) => [
+      role,
+      role === 'master'
+        ? ALL_PERMISSIONS
+        : toPermissionMask(PERMISSIONS[role]) | toPermissionMask(DEFAULT_ROLE_PERMISSIONS[role])
+    ])
+  )
+);
+
+export const getRolePermissionMask = (role) => ROLE_MASKS[role] || 0;
+
+// Stored permission lists are JSON text; identical strings (mostly '[]')
+// are parsed once, into frozen arrays shared by every caller
+const parsedPermissionLists = new Map();
+
+export const parsePermissionList = (value) => {
+  if (Array.isArray(value)) return value;
+  if (typeof value !== 'string' || value === '') return [];
+
+  let list = parsedPermissionLists.get(value);
+  if (!list) {
+    try {
+      const parsed = JSON.parse(value);
+      list = Object.freeze(Array.isArray(parsed) ? parsed : []);
+    } catch {
+      list = Object.freeze([]);
+    }
+    if (parsedPermissionLists.size >= 1000) parsedPermissionLists.clear();
+    parsedPermissionLists.set(value, list);
+  }
+  return list;
+};
+
+export const hasPermissionBit = (mask, permission) => (mask & (PERMISSION_BITS[permission] || 0)) !== 0;
+
+// Masks of frozen lists (role defaults, parsed stored lists) are compiled once
+const listMasks = new WeakMap();
+
+const listMask = (list) => {
+  if (!Array.isArray(list) || !Object.isFrozen(list)) return toPermissionMask(list);
+  let mask = listMasks.get(list);
+  if (mask === undefined) {
+    mask = toPermissionMask(list);
+    listMasks.set(list, mask);
+  }
+  return mask;
+};
+
+// Permission checks over a mask or a list of names
+export const hasPermission = (permissions, permission) =>
+  hasPermissionBit(typeof permissions === 'number' ? permissions : listMask(permissions), permission);
+
+// Names of a user's granular permissions; a custom list overrides the role's defaults
+export const getUserPermissions = (role, customPermissions = null) => {
+  if (customPermissions && Array.isArray(customPermissions)) {
+    return customPermissions;
+  }
+  return DEFAULT_ROLE_PERMISSIONS[role] || [];
+};
+
+// A user's mask: the role gates plus getUserPermissions. A stored '[]' is the
+// column default and what the admin form saves when nothing is customised,
+// so it means the role defaults rather than no permissions.
+export const compileUserPermissions = (role, customPermissions = null) => {
+  const custom = parsePermissionList(customPermissions);
+  const gates = role === 'master' ? ALL_PERMISSIONS : toPermissionMask(PERMISSIONS[role]);
+  return gates | listMask(getUserPermissions(role, custom.length > 0 ? custom : null));
+};
+
+// Compiled masks by user id, reused while the user's role and stored list
+// are unchanged
+const userPermissionMasks = new Map();
+
+const permissionSource = (value) =>
+  Array.isArray(value) ? JSON.stringify(value) : (typeof value === 'string' ? value : '');
+
+export const getUserPermissionMask = (user) => {
+  if (!user) return 0;
+
+  const role = getUserRole(user);
+  const source = permissionSource(user.permissions);
+  const id = user.userId || user.id || user.email;
+
+  const cached = userPermissionMasks.get(id);
+  if (cached && cached.role === role && cached.source === source) {
+    return cached.mask;
+  }
+
+  const mask = compileUserPermissions(role, source);
+  if (userPermissionMasks.size >= 1000) userPermissionMasks.clear();
+  userPermissionMasks.set(id, { role, source, mask });
+  return mask;
+};
+
+export const canAccessDashboard = (permissions) => hasPermission(permissions, PERMISSION_KEYS.DASHBOARD_VIEW);
+
 // Check if a role has a specific permission
-export const can = (role, action) =>
-  PERMISSIONS[role]?.includes(action) || PERMISSIONS[role]?.includes('*');
+export const can = (role, action) => hasPermissionBit(getRolePermissionMask(role), action);
+
+// True when the role has any of the permissions in `mask`
+const canAny = (role, mask) => (getRolePermissionMask(role) & mask) !== 0;
+
+const FINANCE_OWN_MASK = PERMISSION_BITS.finance_own | PERMISSION_BITS.finance_all;
+const PROPERTY_MANAGE_MASK = PERMISSION_BITS.property_manage | PERMISSION_BITS.property_all;
+const PROPERTY_VIEW_MASK = PERMISSION_BITS.property_view_available | PROPERTY_MANAGE_MASK;
 
 // Role hierarchy for easy checking
 export const ROLES = {
@@ -22,9 +248,9 @@ export const ROLES = {
 export const canDeleteProperty = (role) => can(role, 'delete');
 export const canManageUsers = (role) => can(role, 'manage_users');
 export const canViewAllFinances = (role) => can(role, 'finance_all');
-export const canManageOwnFinances = (role) => can(role, 'finance_own') || can(role, 'finance_all');
-export const canManageProperties = (role) => can(role, 'property_manage') || can(role, 'property_all');
-export const canViewAvailableProperties = (role) => can(role, 'property_view_available') || can(role, 'property_manage') || can(role, 'property_all');
+export const canManageOwnFinances = (role) => canAny(role, FINANCE_OWN_MASK);
+export const canManageProperties = (role) => canAny(role, PROPERTY_MANAGE_MASK);
+export const canViewAvailableProperties = (role) => canAny(role, PROPERTY_VIEW_MASK);
 export const canAccessArchive = (role) => role === ROLES.MASTER; // Archive is master-only
 
 // Default role for new users
@@ -1,6 +1,11 @@
 import { supabaseAdmin } from '@/lib/supabase'
 import { v4 as uuidv4 } from 'uuid'
 import crypto from 'crypto'
+import { sharingLogSink } from '@/lib/event-sink'
+import { shareCache } from '@/lib/share-cache'
+import { shareTokenGuard } from '@/lib/share-token-guard'
+import { shareExpirySweeper } from '@/lib/share-expiry-sweeper'
+import { renderShareEmail, shareEmailQueue } from '@/lib/share-email'
 
 /**
  * PropMaster 3.0 - Secure Property Sharing System
@@ -14,6 +19,556 @@ import crypto from 'crypto'
  * - View tracking and analytics
  */
 
+// Views are the bulk of the log and the first to go under backpressure.
+// Analytics never read these rows: record_share_view counts views into the
+// rollups and share inserts count themselves, so dropped log rows only
+// thin the audit trail.
+const SHARING_EVENT_SEVERITY = {
+  PROPERTY_VIEWED: 'LOW',
+  SHARE_CREATED: 'MEDIUM',
+  SHARE_UPDATED: 'MEDIUM',
+  SHARE_DEACTIVATED: 'MEDIUM',
+  SHARES_CLEANUP: 'MEDIUM'
+}
+
+const SHARE_VIEW_ERRORS = {
+  INVALID_SHARE_TOKEN: {
+    error: 'Invalid or expired sharing link',
+    errorCode: 'INVALID_SHARE_TOKEN'
+  },
+  EXPIRED_LINK: {
+    error: 'This sharing link has expired',
+    errorCode: 'EXPIRED_LINK'
+  },
+  VIEW_LIMIT_EXCEEDED: {
+    error: 'This sharing link has reached its view limit',
+    errorCode: 'VIEW_LIMIT_EXCEEDED'
+  },
+  CLIENT_INFO_REQUIRED: {
+    error: 'Client information required to view this property',
+    errorCode: 'CLIENT_INFO_REQUIRED',
+    requiresClientInfo: true
+  }
+}
+
+/**
+ * Public share functions.
+ * - get_share_content: read-only payload for ungated shares (cacheable)
+ * - record_share_view: atomic view accounting. The guarded UPDATE takes the
+ *   row lock, so concurrent views are serialized and can never exceed
+ *   allowed_views; only a rejected view pays for a second lookup. The view
+ *   is added to the daily rollups (rollup_share_view, SHARING_ROLLUP_SQL)
+ *   in the same transaction.
+ */
+export const SHARE_FUNCTIONS_SQL = `
+  DROP FUNCTION IF EXISTS record_share_view(TEXT, TEXT, TEXT);
+
+  CREATE OR REPLACE FUNCTION share_property_payload(p_property_id UUID, p_allow_downloads BOOLEAN)
+  RETURNS JSONB AS $$
+    SELECT jsonb_build_object(
+      'id', p.id,
+      'name', p.name,
+      'location', p.location,
+      'price', p.price,
+      'description', p.description,
+      'cover_image', p.cover_image,
+      'images', COALESCE(to_jsonb(p.images), '[]'::jsonb),
+      'maps_link', p.maps_link,
+      'status', p.status,
+      'created_at', p.created_at
+    ) || CASE
+      WHEN p_allow_downloads THEN jsonb_build_object('documents', COALESCE(to_jsonb(p.documents), '[]'::jsonb))
+      ELSE '{}'::jsonb
+    END
+    FROM properties p
+    WHERE p.id = p_property_id;
+  $$ LANGUAGE sql STABLE;
+
+  CREATE OR REPLACE FUNCTION share_info_payload(s property_shares)
+  RETURNS JSONB AS $$
+    SELECT jsonb_build_object(
+      'id', s.id,
+      'property_id', s.property_id,
+      'expires_at', s.expires_at,
+      'custom_message', s.custom_message,
+      'allow_downloads', s.allow_downloads,
+      'view_count', s.view_count,
+      'allowed_views', s.allowed_views,
+      'client_name', s.client_name,
+      'client_email', s.client_email,
+      'created_by', s.created_by
+    );
+  $$ LANGUAGE sql STABLE;
+
+  CREATE OR REPLACE FUNCTION get_share_content(p_share_token TEXT)
+  RETURNS JSONB AS $$
+  DECLARE
+    v_share property_shares%ROWTYPE;
+  BEGIN
+    SELECT * INTO v_share FROM property_shares
+    WHERE share_token = p_share_token AND is_active = true;
+
+    IF NOT FOUND THEN
+      RETURN jsonb_build_object('status', 'INVALID_SHARE_TOKEN');
+    END IF;
+
+    IF v_share.expires_at <= NOW() THEN
+      RETURN jsonb_build_object('status', 'EXPIRED_LINK');
+    END IF;
+
+    -- View limits and client info have to be enforced per view
+    IF v_share.allowed_views IS NOT NULL OR v_share.require_client_info THEN
+      RETURN jsonb_build_object('status', 'GATED');
+    END IF;
+
+    RETURN jsonb_build_object(
+      'status', 'OK',
+      'share', share_info_payload(v_share),
+      'property', share_property_payload(v_share.property_id, v_share.allow_downloads)
+    );
+  END;
+  $$ LANGUAGE plpgsql STABLE;
+
+  CREATE OR REPLACE FUNCTION record_share_view(
+    p_share_token TEXT,
+    p_client_name TEXT DEFAULT NULL,
+    p_client_email TEXT DEFAULT NULL,
+    p_include_property BOOLEAN DEFAULT true
+  )
+  RETURNS JSONB AS $$
+  DECLARE
+    v_share property_shares%ROWTYPE;
+  BEGIN
+    UPDATE property_shares
+    SET view_count = view_count + 1,
+        last_viewed_at = NOW(),
+        actual_client_name = COALESCE(NULLIF(p_client_name, ''), actual_client_name),
+        actual_client_email = COALESCE(NULLIF(p_client_email, ''), actual_client_email)
+    WHERE share_token = p_share_token
+      AND is_active = true
+      AND expires_at > NOW()
+      AND (allowed_views IS NULL OR view_count < allowed_views)
+      AND (NOT require_client_info OR (COALESCE(p_client_name, '') <> '' AND COALESCE(p_client_email, '') <> ''))
+    RETURNING * INTO v_share;
+
+    IF FOUND THEN
+      PERFORM rollup_share_view(v_share, p_client_name, p_client_email);
+    ELSE
+      SELECT * INTO v_share FROM property_shares
+      WHERE share_token = p_share_token AND is_active = true;
+
+      IF NOT FOUND THEN
+        RETURN jsonb_build_object('status', 'INVALID_SHARE_TOKEN');
+      END IF;
+
+      -- Deactivation is left to the expiry sweeper
+      IF v_share.expires_at <= NOW() THEN
+        RETURN jsonb_build_object('status', 'EXPIRED_LINK');
+      END IF;
+
+      IF v_share.allowed_views IS NOT NULL AND v_share.view_count >= v_share.allowed_views THEN
+        RETURN jsonb_build_object('status', 'VIEW_LIMIT_EXCEEDED');
+      END IF;
+
+      RETURN jsonb_build_object('status', 'CLIENT_INFO_REQUIRED');
+    END IF;
+
+    RETURN jsonb_build_object(
+      'status', 'OK',
+      'share', share_info_payload(v_share),
+      'property', CASE
+        WHEN p_include_property THEN share_property_payload(v_share.property_id, v_share.allow_downloads)
+        ELSE NULL
+      END
+    );
+  END;
+  $$ LANGUAGE plpgsql;
+
+  -- Deactivate up to p_batch_size expired and p_batch_size view-limit-reached
+  -- links, oldest first, skipping rows locked by in-flight views. Expired
+  -- links keep deactivated_at NULL so they still count as expired rather
+  -- than deactivated early; view-limited links are closed now.
+  CREATE OR REPLACE FUNCTION sweep_expired_shares(p_batch_size INTEGER DEFAULT 500)
+  RETURNS JSONB AS $$
+  DECLARE
+    v_expired JSONB;
+    v_view_limited JSONB;
+  BEGIN
+    WITH batch AS (
+      SELECT id FROM property_shares
+      WHERE is_active AND expires_at <= NOW()
+      ORDER BY expires_at
+      LIMIT p_batch_size
+      FOR UPDATE SKIP LOCKED
+    ), swept AS (
+      UPDATE property_shares s
+      SET is_active = false
+      FROM batch
+      WHERE s.id = batch.id
+      RETURNING s.id, s.share_token
+    )
+    SELECT COALESCE(jsonb_agg(jsonb_build_object('id', id, 'share_token', share_token)), '[]'::jsonb)
+    INTO v_expired FROM swept;
+
+    WITH batch AS (
+      SELECT id FROM property_shares
+      WHERE is_active AND allowed_views IS NOT NULL AND view_count >= allowed_views
+      ORDER BY id
+      LIMIT p_batch_size
+      FOR UPDATE SKIP LOCKED
+    ), swept AS (
+      UPDATE property_shares s
+      SET is_active = false,
+          deactivated_at = NOW()
+      FROM batch
+      WHERE s.id = batch.id
+      RETURNING s.id, s.share_token
+    )
+    SELECT COALESCE(jsonb_agg(jsonb_build_object('id', id, 'share_token', share_token)), '[]'::jsonb)
+    INTO v_view_limited FROM swept;
+
+    RETURN jsonb_build_object('expired', v_expired, 'view_limited', v_view_limited);
+  END;
+  $$ LANGUAGE plpgsql;
+`
+
+/**
+ * Daily sharing rollups, so analytics never scan property_shares.
+ * - property_sharing_daily: per (day, property, creator) shares created,
+ *   views and unique clients. Shares created are counted by a trigger on
+ *   property_shares, views by record_share_view as they are accepted.
+ *   shares_expiring is an expiry-day histogram of shares that were not
+ *   deactivated before expiry, maintained by the same trigger; it answers
+ *   "how many shares are live" and "how many expired" by day.
+ * - property_sharing_daily_clients: per-day views by client email, for
+ *   unique client counts and top clients across a date range.
+ * The rollups do not depend on property_sharing_log, which is written in
+ * batches that may be shed under load and is dropped by retention. Days are
+ * UTC, like the TIMESTAMP columns they are derived from.
+ */
+export const SHARING_ROLLUP_SQL = `
+  CREATE TABLE IF NOT EXISTS property_sharing_daily (
+    day DATE NOT NULL,
+    property_id UUID NOT NULL REFERENCES properties(id) ON DELETE CASCADE,
+    created_by VARCHAR(255) NOT NULL,
+    shares_created INTEGER NOT NULL DEFAULT 0,
+    shares_expiring INTEGER NOT NULL DEFAULT 0,
+    views INTEGER NOT NULL DEFAULT 0,
+    unique_clients INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, property_id, created_by)
+  );
+
+  CREATE TABLE IF NOT EXISTS property_sharing_daily_clients (
+    day DATE NOT NULL,
+    property_id UUID NOT NULL REFERENCES properties(id) ON DELETE CASCADE,
+    created_by VARCHAR(255) NOT NULL,
+    client_email VARCHAR(255) NOT NULL,
+    client_name VARCHAR(255),
+    views INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, property_id, created_by, client_email)
+  );
+
+  CREATE INDEX IF NOT EXISTS idx_sharing_daily_creator ON property_sharing_daily(created_by, day);
+  CREATE INDEX IF NOT EXISTS idx_sharing_daily_property ON property_sharing_daily(property_id, day);
+  CREATE INDEX IF NOT EXISTS idx_sharing_daily_clients_creator ON property_sharing_daily_clients(created_by, day);
+
+  -- Only reachable through the service role
+  ALTER TABLE property_sharing_daily ENABLE ROW LEVEL SECURITY;
+  ALTER TABLE property_sharing_daily_clients ENABLE ROW LEVEL SECURITY;
+
+  -- Rollups used to be fed from property_sharing_log
+  DROP TRIGGER IF EXISTS rollup_property_sharing_log ON property_sharing_log;
+  DROP FUNCTION IF EXISTS rollup_sharing_event();
+  DROP FUNCTION IF EXISTS rebuild_sharing_rollups();
+
+  -- Count one accepted view; called by record_share_view
+  CREATE OR REPLACE FUNCTION rollup_share_view(
+    p_share property_shares,
+    p_client_name TEXT DEFAULT NULL,
+    p_client_email TEXT DEFAULT NULL
+  )
+  RETURNS VOID AS $$
+  DECLARE
+    v_day DATE := NOW()::date;
+    v_client_email TEXT := lower(COALESCE(NULLIF(p_client_email, ''), NULLIF(p_share.client_email, '')));
+    v_new_client BOOLEAN := false;
+  BEGIN
+    IF v_client_email IS NOT NULL THEN
+      INSERT INTO property_sharing_daily_clients (day, property_id, created_by, client_email, client_name, views)
+      VALUES (
+        v_day, p_share.property_id, p_share.created_by, v_client_email,
+        COALESCE(NULLIF(p_client_name, ''), NULLIF(p_share.client_name, '')), 1
+      )
+      ON CONFLICT (day, property_id, created_by, client_email)
+      DO UPDATE SET
+        views = property_sharing_daily_clients.views + 1,
+        client_name = COALESCE(EXCLUDED.client_name, property_sharing_daily_clients.client_name)
+      RETURNING (xmax = 0) INTO v_new_client;
+    END IF;
+
+    INSERT INTO property_sharing_daily (day, property_id, created_by, views, unique_clients)
+    VALUES (v_day, p_share.property_id, p_share.created_by, 1, CASE WHEN v_new_client THEN 1 ELSE 0 END)
+    ON CONFLICT (day, property_id, created_by)
+    DO UPDATE SET
+      views = property_sharing_daily.views + 1,
+      unique_clients = property_sharing_daily.unique_clients + EXCLUDED.unique_clients;
+  END;
+  $$ LANGUAGE plpgsql;
+
+  -- Shares created, and the expiry histogram. Expired shares stay in the
+  -- histogram (the sweeper only flips is_active); deactivation before expiry
+  -- sets deactivated_at and takes the share out
+  CREATE OR REPLACE FUNCTION rollup_share_expiry()
+  RETURNS TRIGGER AS $$
+  BEGIN
+    IF TG_OP = 'INSERT' THEN
+      INSERT INTO property_sharing_daily (day, property_id, created_by, shares_created)
+      VALUES (COALESCE(NEW.created_at, NOW())::date, NEW.property_id, NEW.created_by, 1)
+      ON CONFLICT (day, property_id, created_by)
+      DO UPDATE SET shares_created = property_sharing_daily.shares_created + 1;
+    END IF;
+
+    IF TG_OP <> 'INSERT' AND (COALESCE(OLD.is_active, true) OR OLD.deactivated_at IS NULL) THEN
+      UPDATE property_sharing_daily
+      SET shares_expiring = shares_expiring - 1
+      WHERE day = OLD.expires_at::date
+        AND property_id = OLD.property_id
+        AND created_by = OLD.created_by;
+    END IF;
+
+    IF TG_OP <> 'DELETE' AND (COALESCE(NEW.is_active, true) OR NEW.deactivated_at IS NULL) THEN
+      INSERT INTO property_sharing_daily (day, property_id, created_by, shares_expiring)
+      VALUES (NEW.expires_at::date, NEW.property_id, NEW.created_by, 1)
+      ON CONFLICT (day, property_id, created_by)
+      DO UPDATE SET shares_expiring = property_sharing_daily.shares_expiring + 1;
+    END IF;
+
+    RETURN NULL;
+  END;
+  $$ LANGUAGE plpgsql;
+
+  DROP TRIGGER IF EXISTS rollup_property_shares_insert ON property_shares;
+  DROP TRIGGER IF EXISTS rollup_property_shares_update ON property_shares;
+  DROP TRIGGER IF EXISTS rollup_property_shares_delete ON property_shares;
+
+  CREATE TRIGGER rollup_property_shares_insert
+    AFTER INSERT ON property_shares
+    FOR EACH ROW EXECUTE FUNCTION rollup_share_expiry();
+
+  -- View accounting updates view_count only, so it never fires this
+  CREATE TRIGGER rollup_property_shares_update
+    AFTER UPDATE OF expires_at, is_active, deactivated_at, property_id, created_by ON property_shares
+    FOR EACH ROW
+    WHEN (
+      OLD.expires_at::date IS DISTINCT FROM NEW.expires_at::date OR
+      OLD.property_id IS DISTINCT FROM NEW.property_id OR
+      OLD.created_by IS DISTINCT FROM NEW.created_by OR
+      (COALESCE(OLD.is_active, true) OR OLD.deactivated_at IS NULL) IS DISTINCT FROM
+        (COALESCE(NEW.is_active, true) OR NEW.deactivated_at IS NULL)
+    )
+    EXECUTE FUNCTION rollup_share_expiry();
+
+  CREATE TRIGGER rollup_property_shares_delete
+    AFTER DELETE ON property_shares
+    FOR EACH ROW EXECUTE FUNCTION rollup_share_expiry();
+
+  -- One-time backfill of history recorded before the rollups existed, from
+  -- property_shares and whatever property_sharing_log still holds. Does
+  -- nothing once the rollups have any rows, so it can never overwrite them.
+  CREATE OR REPLACE FUNCTION backfill_sharing_rollups()
+  RETURNS BOOLEAN AS $$
+  BEGIN
+    LOCK TABLE property_sharing_daily, property_sharing_daily_clients IN EXCLUSIVE MODE;
+
+    IF EXISTS (SELECT 1 FROM property_sharing_daily) OR EXISTS (SELECT 1 FROM property_sharing_daily_clients) THEN
+      RETURN false;
+    END IF;
+
+    INSERT INTO property_sharing_daily (day, property_id, created_by, shares_created)
+    SELECT created_at::date, property_id, created_by, COUNT(*)
+    FROM property_shares
+    GROUP BY 1, 2, 3;
+
+    INSERT INTO property_sharing_daily (day, property_id, created_by, shares_expiring)
+    SELECT expires_at::date, property_id, created_by, COUNT(*)
+    FROM property_shares
+    WHERE COALESCE(is_active, true) OR deactivated_at IS NULL
+    GROUP BY 1, 2, 3
+    ON CONFLICT (day, property_id, created_by)
+    DO UPDATE SET shares_expiring = EXCLUDED.shares_expiring;
+
+    INSERT INTO property_sharing_daily_clients (day, property_id, created_by, client_email, client_name, views)
+    SELECT l.created_at::date, s.property_id, s.created_by, lower(l.details->>'clientEmail'),
+           MAX(NULLIF(l.details->>'clientName', '')), COUNT(*)
+    FROM property_sharing_log l
+    JOIN property_shares s ON s.id = COALESCE(l.share_id, (l.details->>'shareId')::uuid)
+    WHERE l.event_type = 'PROPERTY_VIEWED' AND COALESCE(l.details->>'clientEmail', '') <> ''
+    GROUP BY 1, 2, 3, 4;
+
+    INSERT INTO property_sharing_daily (day, property_id, created_by, views)
+    SELECT l.created_at::date, s.property_id, s.created_by, COUNT(*)
+    FROM property_sharing_log l
+    JOIN property_shares s ON s.id = COALESCE(l.share_id, (l.details->>'shareId')::uuid)
+    WHERE l.event_type = 'PROPERTY_VIEWED'
+    GROUP BY 1, 2, 3
+    ON CONFLICT (day, property_id, created_by)
+    DO UPDATE SET views = EXCLUDED.views;
+
+    UPDATE property_sharing_daily d
+    SET unique_clients = c.clients
+    FROM (
+      SELECT day, property_id, created_by, COUNT(*) AS clients
+      FROM property_sharing_daily_clients
+      GROUP BY 1, 2, 3
+    ) c
+    WHERE d.day = c.day AND d.property_id = c.property_id AND d.created_by = c.created_by;
+
+    RETURN true;
+  END;
+  $$ LANGUAGE plpgsql;
+
+  -- Analytics for a date range, read from rollups only.
+  -- activeShares counts shares still live now; expiredShares counts shares
+  -- whose expiry fell inside the range.
+  CREATE OR REPLACE FUNCTION get_sharing_analytics(
+    p_start_date DATE,
+    p_end_date DATE,
+    p_property_id UUID DEFAULT NULL,
+    p_created_by TEXT DEFAULT NULL,
+    p_top_clients INTEGER DEFAULT 50
+  )
+  RETURNS JSONB AS $$
+    WITH scoped AS (
+      SELECT * FROM property_sharing_daily
+      WHERE (p_property_id IS NULL OR property_id = p_property_id)
+        AND (p_created_by IS NULL OR created_by = p_created_by)
+    ),
+    in_range AS (
+      SELECT * FROM scoped WHERE day BETWEEN p_start_date AND p_end_date
+    ),
+    live AS (
+      SELECT property_id, SUM(shares_expiring) AS active
+      FROM scoped
+      WHERE day >= CURRENT_DATE
+      GROUP BY property_id
+    ),
+    clients AS (
+      SELECT * FROM property_sharing_daily_clients
+      WHERE day BETWEEN p_start_date AND p_end_date
+        AND (p_property_id IS NULL OR property_id = p_property_id)
+        AND (p_created_by IS NULL OR created_by = p_created_by)
+    ),
+    by_property AS (
+      SELECT COALESCE(p.name, 'Unknown Property') AS name,
+             SUM(t.shares) AS shares, SUM(t.views) AS views, SUM(t.active) AS active
+      FROM (
+        SELECT property_id, SUM(shares_created) AS shares, SUM(views) AS views, 0 AS active
+        FROM in_range GROUP BY property_id
+        UNION ALL
+        SELECT property_id, 0, 0, active FROM live
+      ) t
+      LEFT JOIN properties p ON p.id = t.property_id
+      GROUP BY 1
+      HAVING SUM(t.shares) > 0 OR SUM(t.views) > 0
+    ),
+    by_month AS (
+      SELECT to_char(day, 'YYYY-MM') AS month, SUM(shares_created) AS shares, SUM(views) AS views
+      FROM in_range
+      GROUP BY 1
+      HAVING SUM(shares_created) > 0 OR SUM(views) > 0
+    ),
+    by_day AS (
+      SELECT day, SUM(views) AS views FROM in_range GROUP BY day
+    ),
+    top_clients AS (
+      SELECT client_email, MAX(client_name) AS name, SUM(views) AS views,
+             COUNT(DISTINCT property_id) AS properties
+      FROM clients
+      GROUP BY client_email
+      ORDER BY SUM(views) DESC
+      LIMIT p_top_clients
+    )
+    SELECT jsonb_build_object(
+      'summary', jsonb_build_object(
+        'totalShares', (SELECT COALESCE(SUM(shares_created), 0) FROM in_range),
+        'activeShares', (SELECT COALESCE(SUM(active), 0) FROM live),
+        'expiredShares', (SELECT COALESCE(SUM(shares_expiring), 0) FROM in_range WHERE day < CURRENT_DATE),
+        'totalViews', (SELECT COALESCE(SUM(views), 0) FROM in_range),
+        'uniqueClients', (SELECT COUNT(DISTINCT client_email) FROM clients)
+      ),
+      'byProperty', (SELECT COALESCE(jsonb_object_agg(name, jsonb_build_object(
+        'totalShares', shares, 'totalViews', views, 'activeShares', active
+      )), '{}'::jsonb) FROM by_property),
+      'byMonth', (SELECT COALESCE(jsonb_object_agg(month, jsonb_build_object(
+        'shares', shares, 'views', views
+      )), '{}'::jsonb) FROM by_month),
+      'topClients', (SELECT COALESCE(jsonb_object_agg(client_email, jsonb_build_object(
+        'name', COALESCE(name, 'Unknown'), 'views', views, 'propertiesViewed', properties
+      )), '{}'::jsonb) FROM top_clients),
+      'viewTrends', (SELECT COALESCE(jsonb_agg(jsonb_build_object(
+        'date', day, 'views', views
+      ) ORDER BY day), '[]'::jsonb) FROM by_day)
+    );
+  $$ LANGUAGE sql STABLE;
+`
+
+/**
+ * Reject unknown, deactivated and expired tokens from memory.
+ * Returns an error result, or the guard verdict when the token may be valid.
+ */
+async function guardShareToken(shareToken) {
+  const verdict = await shareTokenGuard.check(shareToken)
+  if (!verdict.allowed) {
+    return { rejected: { success: false, ...SHARE_VIEW_ERRORS[verdict.errorCode] } }
+  }
+  return { verdict }
+}
+
+// Feed database rejections back so repeat requests stay in memory
+function learnShareStatus(shareToken, status) {
+  if (status === 'INVALID_SHARE_TOKEN') {
+    shareTokenGuard.forget(shareToken)
+  } else if (status === 'EXPIRED_LINK') {
+    shareTokenGuard.expire(shareToken)
+  }
+}
+
+export const SHARE_STATUSES = ['ACTIVE', 'EXPIRED', 'VIEW_LIMIT_REACHED', 'INACTIVE']
+
+const MAX_SHARE_PAGE_SIZE = 100
+
+/**
+ * PostgREST predicates matching getShareStatus. view_limit_reached is a
+ * stored generated column, since filters cannot compare two columns.
+ */
+const SHARE_STATUS_PREDICATES = {
+  ACTIVE: (now) => `and(is_active.eq.true,expires_at.gt.${now},view_limit_reached.eq.false)`,
+  VIEW_LIMIT_REACHED: (now) => `and(expires_at.gt.${now},view_limit_reached.eq.true)`,
+  EXPIRED: (now) => `and(expires_at.lte.${now},or(is_active.eq.true,deactivated_at.is.null,view_limit_reached.eq.true))`,
+  INACTIVE: (now) => `and(is_active.eq.false,view_limit_reached.eq.false,or(deactivated_at.not.is.null,expires_at.gt.${now}))`
+}
+
+const encodeShareCursor = (share) => Buffer.from(`${share.created_at}|${share.id}`).toString('base64url')
+
+function decodeShareCursor(cursor) {
+  const [createdAt, id] = Buffer.from(String(cursor), 'base64url').toString('utf8').split('|')
+  if (!createdAt || !/^[\d:.TZ+-]+$/.test(createdAt) || !/^[0-9a-f-]{36}$/i.test(id || '')) {
+    throw new Error('Invalid pagination cursor')
+  }
+  return { createdAt, id }
+}
+
+const toShareInfo = (share) => ({
+  id: share.id,
+  expiresAt: share.expires_at,
+  customMessage: share.custom_message,
+  allowDownloads: share.allow_downloads,
+  viewCount: share.view_count,
+  allowedViews: share.allowed_views,
+  clientName: share.client_name,
+  sharedBy: share.created_by
+})
+
 export class PropertySharingSystem {
   constructor() {
     this.defaultConfig = {
@@ -89,6 +644,8 @@ export class PropertySharingSystem {
         throw new Error(`Failed to create sharing link: ${shareError.message}`)
       }
 
+      shareTokenGuard.track(shareRecord)
+
       // Generate the public sharing URL
       const baseUrl = process.env.NEXT_PUBLIC_SITE_URL || 'http://localhost:3000'
       const sharingUrl = `${baseUrl}/share/${shareToken}`
@@ -129,158 +686,334 @@ export class PropertySharingSystem {
   }
 
   /**
-   * Get property data for sharing (public access)
+   * Share several properties with several clients at once: one link per
+   * property and client, created in a single multi-row insert, and one
+   * invitation per client listing all of their links. Emails are rendered
+   * and sent by the share email queue; progress is kept under `batchId`.
    */
-  async getSharedProperty(shareToken, clientInfo = {}) {
+  async createSharingLinksBulk(propertyIds, clients, options = {}) {
+    const {
+      expiryHours = this.defaultConfig.defaultExpiryHours,
+      allowedViews = null,
+      requireClientInfo = this.defaultConfig.requireClientInfo,
+      allowDownloads = this.defaultConfig.allowDownloads,
+      customMessage = null,
+      sendEmails = true,
+      createdBy
+    } = options
+
     try {
-      // Find the sharing record
-      const { data: shareRecord, error: shareError } = await supabaseAdmin
+      const { data: properties, error: propError } = await supabaseAdmin
+        .from('properties')
+        .select('id, name, location, price')
+        .in('id', propertyIds)
+
+      if (propError) {
+        throw new Error(`Failed to load properties: ${propError.message}`)
+      }
+
+      const foundIds = new Set(properties.map(property => property.id))
+      const missing = propertyIds.filter(id => !foundIds.has(id))
+      if (missing.length > 0) {
+        throw new Error(`Properties not found or access denied: ${missing.join(', ')}`)
+      }
+
+      const batchId = uuidv4()
+      const expiresAt = new Date()
+      expiresAt.setHours(expiresAt.getHours() + Math.min(expiryHours, this.defaultConfig.maxExpiryHours))
+      const baseUrl = process.env.NEXT_PUBLIC_SITE_URL || 'http://localhost:3000'
+
+      const rows = []
+      for (const client of clients) {
+        for (const property of properties) {
+          rows.push({
+            id: uuidv4(),
+            property_id: property.id,
+            share_token: this.generateSecureToken(),
+            expires_at: expiresAt.toISOString(),
+            client_email: client.email,
+            client_name: client.name || null,
+            allowed_views: allowedViews,
+            require_client_info: requireClientInfo,
+            allow_downloads: allowDownloads,
+            custom_message: customMessage,
+            created_by: createdBy,
+            is_active: true,
+            view_count: 0,
+            last_viewed_at: null
+          })
+        }
+      }
+
+      // Every column is generated here, so nothing needs to be read back
+      const { error: insertError } = await supabaseAdmin
         .from('property_shares')
-        .select(`
-          *,
-          properties (
-            id,
-            name,
-            location,
-            price,
-            description,
-            cover_image,
-            images,
-            documents,
-            maps_link,
-            status,
-            created_at
-          )
-        `)
-        .eq('share_token', shareToken)
-        .eq('is_active', true)
-        .single()
+        .insert(rows)
 
-      if (shareError || !shareRecord) {
-        return {
-          success: false,
-          error: 'Invalid or expired sharing link',
-          errorCode: 'INVALID_SHARE_TOKEN'
+      if (insertError) {
+        throw new Error(`Failed to create sharing links: ${insertError.message}`)
+      }
+
+      const propertiesById = new Map(properties.map(property => [property.id, property]))
+      const linksByClient = new Map()
+
+      for (const row of rows) {
+        shareTokenGuard.track(row)
+
+        this.logSharingEvent('SHARE_CREATED', {
+          shareId: row.id,
+          propertyId: row.property_id,
+          createdBy,
+          clientEmail: row.client_email,
+          expiresAt: row.expires_at,
+          batchId
+        })
+
+        const property = propertiesById.get(row.property_id)
+        if (!linksByClient.has(row.client_email)) {
+          linksByClient.set(row.client_email, [])
         }
+        linksByClient.get(row.client_email).push({
+          name: property.name,
+          location: property.location,
+          price: property.price,
+          sharingUrl: `${baseUrl}/share/${row.share_token}`
+        })
+      }
+
+      const emails = sendEmails
+        ? shareEmailQueue.enqueueBatch(batchId, [...linksByClient].map(([email, links]) => ({
+          to: email,
+          email: {
+            properties: links,
+            customMessage,
+            expiresAt: expiresAt.toISOString()
+          }
+        })), { createdBy })
+        : { queued: 0, rejected: 0 }
+
+      return {
+        success: true,
+        batchId,
+        expiresAt: expiresAt.toISOString(),
+        shares: rows.map(row => ({
+          id: row.id,
+          propertyId: row.property_id,
+          clientEmail: row.client_email,
+          shareToken: row.share_token,
+          sharingUrl: `${baseUrl}/share/${row.share_token}`
+        })),
+        emails
+      }
+    } catch (error) {
+      console.error('Failed to create sharing links in bulk:', error)
+      return {
+        success: false,
+        error: error.message
+      }
+    }
+  }
+
+  /**
+   * Get shared property data (public access).
+   * One RPC validates the token, expiry and view limit, increments the view
+   * count atomically and returns the payload; the event log write happens
+   * after the response is built.
+   */
+  async getSharedProperty(shareToken, clientInfo = {}) {
+    try {
+      const { rejected } = await guardShareToken(shareToken)
+      if (rejected) {
+        return rejected
       }
 
-      // Check if link has expired
-      if (new Date() > new Date(shareRecord.expires_at)) {
-        // Deactivate expired link
-        await supabaseAdmin
-          .from('property_shares')
-          .update({ is_active: false })
-          .eq('id', shareRecord.id)
+      const { data: result, error } = await supabaseAdmin.rpc('record_share_view', {
+        p_share_token: shareToken,
+        p_client_name: clientInfo.name || null,
+        p_client_email: clientInfo.email || null
+      })
 
+      if (error) {
+        console.error('record_share_view failed, run POST /api/sharing/setup:', error.message)
         return {
           success: false,
-          error: 'This sharing link has expired',
-          errorCode: 'EXPIRED_LINK'
+          error: 'Failed to load property',
+          errorCode: 'SYSTEM_ERROR'
         }
       }
 
-      // Check view limits
-      if (shareRecord.allowed_views && shareRecord.view_count >= shareRecord.allowed_views) {
+      if (result.status !== 'OK') {
+        learnShareStatus(shareToken, result.status)
         return {
           success: false,
-          error: 'This sharing link has reached its view limit',
-          errorCode: 'VIEW_LIMIT_EXCEEDED'
+          ...SHARE_VIEW_ERRORS[result.status]
         }
       }
 
-      // Check if client info is required
-      if (shareRecord.require_client_info && (!clientInfo.name || !clientInfo.email)) {
+      const { share, property } = result
+
+      // The view is already counted; the log row is written in a later batch
+      this.logSharingEvent('PROPERTY_VIEWED', {
+        shareId: share.id,
+        propertyId: share.property_id,
+        clientEmail: clientInfo.email || share.client_email,
+        clientName: clientInfo.name || share.client_name,
+        viewCount: share.view_count
+      })
+
+      return {
+        success: true,
+        property,
+        shareInfo: toShareInfo(share)
+      }
+    } catch (error) {
+      console.error('Failed to get shared property:', error)
+      return {
+        success: false,
+        error: 'Failed to load property',
+        errorCode: 'SYSTEM_ERROR'
+      }
+    }
+  }
+
+  /**
+   * Get the cacheable payload of a share without counting a view.
+   * Shares with a view limit or required client info come back as
+   * `gated: true` and must go through getSharedProperty instead.
+   */
+  async getShareContent(shareToken) {
+    try {
+      const { rejected, verdict } = await guardShareToken(shareToken)
+      if (rejected) {
+        return rejected
+      }
+      if (verdict.gated) {
+        return { success: true, gated: true }
+      }
+
+      const { data: result, error } = await supabaseAdmin.rpc('get_share_content', {
+        p_share_token: shareToken
+      })
+
+      if (error) {
+        console.error('get_share_content failed, run POST /api/sharing/setup:', error.message)
         return {
           success: false,
-          error: 'Client information required to view this property',
-          errorCode: 'CLIENT_INFO_REQUIRED',
-          requiresClientInfo: true
+          error: 'Failed to load property',
+          errorCode: 'SYSTEM_ERROR'
         }
       }
 
-      // Update view count and last viewed
-      const updateData = {
-        view_count: shareRecord.view_count + 1,
-        last_viewed_at: new Date().toISOString()
+      if (result.status === 'GATED') {
+        return { success: true, gated: true }
       }
 
-      // If client info provided, update it
-      if (clientInfo.name || clientInfo.email) {
-        updateData.actual_client_name = clientInfo.name
-        updateData.actual_client_email = clientInfo.email
+      if (result.status !== 'OK') {
+        learnShareStatus(shareToken, result.status)
+        return {
+          success: false,
+          ...SHARE_VIEW_ERRORS[result.status]
+        }
       }
 
-      await supabaseAdmin
-        .from('property_shares')
-        .update(updateData)
-        .eq('id', shareRecord.id)
+      return {
+        success: true,
+        gated: false,
+        property: result.property,
+        shareInfo: toShareInfo(result.share),
+        propertyId: result.share.property_id
+      }
+    } catch (error) {
+      console.error('Failed to get share content:', error)
+      return {
+        success: false,
+        error: 'Failed to load property',
+        errorCode: 'SYSTEM_ERROR'
+      }
+    }
+  }
 
-      // Log the view
-      await this.logSharingEvent('PROPERTY_VIEWED', {
-        shareId: shareRecord.id,
-        propertyId: shareRecord.property_id,
-        clientEmail: clientInfo.email || shareRecord.client_email,
-        clientName: clientInfo.name || shareRecord.client_name,
-        viewCount: shareRecord.view_count + 1
+  /**
+   * Count a view (the share page's view beacon) without loading the property
+   */
+  async recordShareView(shareToken, clientInfo = {}) {
+    try {
+      const { rejected } = await guardShareToken(shareToken)
+      if (rejected) {
+        return rejected
+      }
+
+      const { data: result, error } = await supabaseAdmin.rpc('record_share_view', {
+        p_share_token: shareToken,
+        p_client_name: clientInfo.name || null,
+        p_client_email: clientInfo.email || null,
+        p_include_property: false
       })
 
-      // Prepare property data for sharing
-      const property = shareRecord.properties
-      const sharedPropertyData = {
-        id: property.id,
-        name: property.name,
-        location: property.location,
-        price: property.price,
-        description: property.description,
-        cover_image: property.cover_image,
-        images: property.images || [],
-        maps_link: property.maps_link,
-        status: property.status,
-        created_at: property.created_at
+      if (error) {
+        console.error('record_share_view failed, run POST /api/sharing/setup:', error.message)
+        return {
+          success: false,
+          error: 'Failed to record view',
+          errorCode: 'SYSTEM_ERROR'
+        }
       }
 
-      // Include documents only if downloads are allowed
-      if (shareRecord.allow_downloads) {
-        sharedPropertyData.documents = property.documents || []
+      if (result.status !== 'OK') {
+        learnShareStatus(shareToken, result.status)
+        return {
+          success: false,
+          ...SHARE_VIEW_ERRORS[result.status]
+        }
       }
 
+      const { share } = result
+      this.logSharingEvent('PROPERTY_VIEWED', {
+        shareId: share.id,
+        propertyId: share.property_id,
+        clientEmail: clientInfo.email || share.client_email,
+        clientName: clientInfo.name || share.client_name,
+        viewCount: share.view_count
+      })
+
       return {
         success: true,
-        property: sharedPropertyData,
-        shareInfo: {
-          id: shareRecord.id,
-          expiresAt: shareRecord.expires_at,
-          customMessage: shareRecord.custom_message,
-          allowDownloads: shareRecord.allow_downloads,
-          viewCount: shareRecord.view_count + 1,
-          allowedViews: shareRecord.allowed_views,
-          clientName: shareRecord.client_name,
-          sharedBy: shareRecord.created_by
-        }
+        viewCount: share.view_count,
+        allowedViews: share.allowed_views
       }
     } catch (error) {
-      console.error('Failed to get shared property:', error)
+      console.error('Failed to record share view:', error)
       return {
         success: false,
-        error: 'Failed to load property',
+        error: 'Failed to record view',
         errorCode: 'SYSTEM_ERROR'
       }
     }
   }
 
+
   /**
-   * List all sharing links for a property or user
+   * List sharing links for a property or user, newest first.
+   *
+   * Keyset-paginated on (created_at, id): pass the returned `nextCursor` as
+   * `cursor` for the next page. `statuses` filters on the same rules as
+   * getShareStatus, evaluated in SQL, so expired links match EXPIRED whether
+   * or not the sweeper has deactivated them yet.
    */
   async listSharingLinks(filters = {}) {
     const {
       propertyId = null,
       createdBy = null,
       isActive = null,
-      limit = 50,
-      offset = 0
+      statuses = null,
+      cursor = null,
+      limit = 50
     } = filters
 
     try {
+      const pageSize = Math.min(Math.max(parseInt(limit) || 50, 1), MAX_SHARE_PAGE_SIZE)
+      const now = new Date().toISOString()
+
       let query = supabaseAdmin
         .from('property_shares')
         .select(`
@@ -292,7 +1025,8 @@ export class PropertySharingSystem {
           )
         `)
         .order('created_at', { ascending: false })
-        .range(offset, offset + limit - 1)
+        .order('id', { ascending: false })
+        .limit(pageSize + 1)
 
       if (propertyId) {
         query = query.eq('property_id', propertyId)
@@ -302,20 +1036,45 @@ export class PropertySharingSystem {
         query = query.eq('created_by', createdBy)
       }
 
-      if (isActive !== null) {
-        query = query.eq('is_active', isActive)
+      // The legacy active flag is ACTIVE versus everything else
+      const wanted = statuses || (isActive === true
+        ? ['ACTIVE']
+        : isActive === false ? SHARE_STATUSES.filter(status => status !== 'ACTIVE') : null)
+
+      const conditions = []
+
+      if (wanted) {
+        const predicates = wanted.map(status => SHARE_STATUS_PREDICATES[status]?.(now))
+        if (predicates.length === 0 || predicates.some(predicate => !predicate)) {
+          throw new Error(`Unknown share status filter: ${wanted.join(', ')}`)
+        }
+        conditions.push(`or(${predicates.join(',')})`)
+      }
+
+      if (cursor) {
+        const position = decodeShareCursor(cursor)
+        conditions.push(`or(created_at.lt.${position.createdAt},and(created_at.eq.${position.createdAt},id.lt.${position.id}))`)
       }
 
-      const { data: shares, error } = await query
+      if (conditions.length > 0) {
+        query = query.or(`and(${conditions.join(',')})`)
+      }
+
+      const { data: rows, error } = await query
 
       if (error) {
         throw new Error(`Failed to list sharing links: ${error.message}`)
       }
 
+      const hasMore = rows.length > pageSize
+      const shares = hasMore ? rows.slice(0, pageSize) : rows
+      const last = shares[shares.length - 1]
+      const baseUrl = process.env.NEXT_PUBLIC_SITE_URL || 'http://localhost:3000'
+
       // Process shares to add status and URLs
       const processedShares = shares.map(share => ({
         ...share,
-        sharingUrl: `${process.env.NEXT_PUBLIC_SITE_URL || 'http://localhost:3000'}/share/${share.share_token}`,
+        sharingUrl: `${baseUrl}/share/${share.share_token}`,
         status: this.getShareStatus(share),
         daysUntilExpiry: this.getDaysUntilExpiry(share.expires_at)
       }))
@@ -323,7 +1082,9 @@ export class PropertySharingSystem {
       return {
         success: true,
         shares: processedShares,
-        total: shares.length
+        total: shares.length,
+        hasMore,
+        nextCursor: hasMore ? encodeShareCursor(last) : null
       }
     } catch (error) {
       console.error('Failed to list sharing links:', error)
@@ -375,6 +1136,9 @@ export class PropertySharingSystem {
         throw new Error(`Failed to update sharing link: ${error.message}`)
       }
 
+      shareCache.invalidateShare(shareId)
+      shareTokenGuard.track(data)
+
       // Log the update
       await this.logSharingEvent('SHARE_UPDATED', {
         shareId,
@@ -413,6 +1177,9 @@ export class PropertySharingSystem {
         throw new Error(`Failed to deactivate sharing link: ${error.message}`)
       }
 
+      shareCache.invalidateShare(shareId)
+      shareTokenGuard.track(data)
+
       // Log the deactivation
       await this.logSharingEvent('SHARE_DEACTIVATED', {
         shareId
@@ -443,103 +1210,18 @@ export class PropertySharingSystem {
     } = filters
 
     try {
-      let query = supabaseAdmin
-        .from('property_shares')
-        .select(`
-          *,
-          properties (
-            id,
-            name
-          )
-        `)
-        .gte('created_at', startDate.toISOString())
-        .lte('created_at', endDate.toISOString())
-
-      if (propertyId) {
-        query = query.eq('property_id', propertyId)
-      }
-
-      if (createdBy) {
-        query = query.eq('created_by', createdBy)
-      }
-
-      const { data: shares, error } = await query
+      // Reads daily rollups only; cost depends on the date range, not the number of shares
+      const { data: analytics, error } = await supabaseAdmin.rpc('get_sharing_analytics', {
+        p_start_date: startDate.toISOString().substring(0, 10),
+        p_end_date: endDate.toISOString().substring(0, 10),
+        p_property_id: propertyId,
+        p_created_by: createdBy
+      })
 
       if (error) {
         throw new Error(`Failed to get sharing analytics: ${error.message}`)
       }
 
-      // Calculate analytics
-      const analytics = {
-        summary: {
-          totalShares: shares.length,
-          activeShares: shares.filter(s => s.is_active && new Date(s.expires_at) > new Date()).length,
-          expiredShares: shares.filter(s => new Date(s.expires_at) <= new Date()).length,
-          totalViews: shares.reduce((sum, s) => sum + (s.view_count || 0), 0),
-          uniqueClients: new Set(shares.filter(s => s.actual_client_email).map(s => s.actual_client_email)).size
-        },
-        byProperty: {},
-        byMonth: {},
-        topClients: {},
-        viewTrends: []
-      }
-
-      // Group by property
-      shares.forEach(share => {
-        const propertyName = share.properties?.name || 'Unknown Property'
-        if (!analytics.byProperty[propertyName]) {
-          analytics.byProperty[propertyName] = {
-            totalShares: 0,
-            totalViews: 0,
-            activeShares: 0
-          }
-        }
-        
-        analytics.byProperty[propertyName].totalShares++
-        analytics.byProperty[propertyName].totalViews += share.view_count || 0
-        
-        if (share.is_active && new Date(share.expires_at) > new Date()) {
-          analytics.byProperty[propertyName].activeShares++
-        }
-      })
-
-      // Group by month
-      shares.forEach(share => {
-        const month = new Date(share.created_at).toISOString().substring(0, 7) // YYYY-MM
-        if (!analytics.byMonth[month]) {
-          analytics.byMonth[month] = {
-            shares: 0,
-            views: 0
-          }
-        }
-        
-        analytics.byMonth[month].shares++
-        analytics.byMonth[month].views += share.view_count || 0
-      })
-
-      // Top clients
-      shares.forEach(share => {
-        const clientEmail = share.actual_client_email || share.client_email
-        if (clientEmail) {
-          if (!analytics.topClients[clientEmail]) {
-            analytics.topClients[clientEmail] = {
-              name: share.actual_client_name || share.client_name || 'Unknown',
-              views: 0,
-              properties: new Set()
-            }
-          }
-          
-          analytics.topClients[clientEmail].views += share.view_count || 0
-          analytics.topClients[clientEmail].properties.add(share.property_id)
-        }
-      })
-
-      // Convert sets to counts
-      Object.keys(analytics.topClients).forEach(email => {
-        analytics.topClients[email].propertiesViewed = analytics.topClients[email].properties.size
-        delete analytics.topClients[email].properties
-      })
-
       return {
         success: true,
         analytics,
@@ -558,26 +1240,20 @@ export class PropertySharingSystem {
   }
 
   /**
-   * Clean up expired sharing links
+   * Clean up expired and view-limit-reached sharing links now, instead of
+   * waiting for the next background sweep
    */
   async cleanupExpiredShares() {
     try {
-      const { data, error } = await supabaseAdmin
-        .from('property_shares')
-        .update({ is_active: false })
-        .lt('expires_at', new Date().toISOString())
-        .eq('is_active', true)
-        .select('id')
-
-      if (error) {
-        throw new Error(`Failed to cleanup expired shares: ${error.message}`)
-      }
-
-      const cleanedCount = data?.length || 0
+      const { expired, viewLimited, batches } = await shareExpirySweeper.sweep()
+      const cleanedCount = expired + viewLimited
 
       // Log cleanup
       await this.logSharingEvent('SHARES_CLEANUP', {
-        cleanedCount
+        cleanedCount,
+        expired,
+        viewLimited,
+        batches
       })
 
       return {
@@ -601,19 +1277,30 @@ export class PropertySharingSystem {
     return crypto.randomBytes(32).toString('base64url')
   }
 
+  /**
+   * Status from the row itself, so links the sweeper has not reached yet
+   * read the same as swept ones
+   */
   getShareStatus(share) {
-    if (!share.is_active) {
+    const viewLimitReached = share.allowed_views && share.view_count >= share.allowed_views
+
+    // Deactivated by a user; the sweeper leaves deactivated_at unset for expired links
+    if (!share.is_active && share.deactivated_at && !viewLimitReached) {
       return 'INACTIVE'
     }
-    
-    if (new Date() > new Date(share.expires_at)) {
+
+    if (new Date() >= new Date(share.expires_at)) {
       return 'EXPIRED'
     }
-    
-    if (share.allowed_views && share.view_count >= share.allowed_views) {
+
+    if (viewLimitReached) {
       return 'VIEW_LIMIT_REACHED'
     }
-    
+
+    if (!share.is_active) {
+      return 'INACTIVE'
+    }
+
     return 'ACTIVE'
   }
 
@@ -625,82 +1312,30 @@ export class PropertySharingSystem {
     return Math.max(0, diffDays)
   }
 
+  /**
+   * Queue a sharing event; rows are written to property_sharing_log in batches
+   */
   async logSharingEvent(eventType, details = {}) {
-    try {
-      await supabaseAdmin
-        .from('property_sharing_log')
-        .insert([{
-          event_type: eventType,
-          details,
-          created_at: new Date().toISOString()
-        }])
-    } catch (error) {
-      console.error('Failed to log sharing event:', error)
-    }
+    sharingLogSink.enqueue({
+      event_type: eventType,
+      details,
+      created_at: new Date().toISOString()
+    }, SHARING_EVENT_SEVERITY[eventType] || 'LOW')
   }
 
+
   /**
    * Generate sharing email template
    */
   generateSharingEmail(shareData, propertyData) {
     const { sharingUrl, expiresAt, customMessage } = shareData
-    const { name: propertyName, location, price } = propertyData
-    
-    const expiryDate = new Date(expiresAt).toLocaleDateString()
-    
-    return {
-      subject: `Property Viewing: ${propertyName}`,
-      html: `
-        <div style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto;">
-          <h2 style="color: #2563eb;">Property Viewing Invitation</h2>
-          
-          <p>You have been invited to view the following property:</p>
-          
-          <div style="border: 1px solid #e5e7eb; border-radius: 8px; padding: 20px; margin: 20px 0;">
-            <h3 style="margin-top: 0;">${propertyName}</h3>
-            ${location ? `<p><strong>Location:</strong> ${location}</p>` : ''}
-            ${price ? `<p><strong>Price:</strong> ₹${price.toLocaleString()}</p>` : ''}
-          </div>
-          
-          ${customMessage ? `
-            <div style="background: #f3f4f6; padding: 15px; border-radius: 8px; margin: 20px 0;">
-              <p style="margin: 0;"><em>${customMessage}</em></p>
-            </div>
-          ` : ''}
-          
-          <div style="text-align: center; margin: 30px 0;">
-            <a href="${sharingUrl}" 
-               style="background: #2563eb; color: white; padding: 12px 24px; text-decoration: none; border-radius: 6px; display: inline-block;">
-              View Property
-            </a>
-          </div>
-          
-          <p style="color: #6b7280; font-size: 14px;">
-            This link will expire on ${expiryDate}. 
-            <br>
-            If you have any questions, please contact us directly.
-          </p>
-          
-          <hr style="border: none; border-top: 1px solid #e5e7eb; margin: 30px 0;">
-          <p style="color: #9ca3af; font-size: 12px; text-align: center;">
-            PropMaster Real Estate Management System
-          </p>
-        </div>
-      `,
-      text: `
-        Property Viewing Invitation
-        
-        You have been invited to view: ${propertyName}
-        ${location ? `Location: ${location}` : ''}
-        ${price ? `Price: ₹${price.toLocaleString()}` : ''}
-        
-        ${customMessage ? `Message: ${customMessage}` : ''}
-        
-        View Property: ${sharingUrl}
-        
-        This link will expire on ${expiryDate}.
-      `
-    }
+    const { name, location, price } = propertyData
+
+    return renderShareEmail({
+      properties: [{ name, location, price, sharingUrl }],
+      customMessage,
+      expiresAt
+    })
   }
 }
 
@@ -0,0 +1,168 @@
+import { RedisClient, getRedisConfig } from '@/lib/redis-client'
+import { MemoryRateLimitStore } from '@/lib/rate-limiter'
+
+/**
+ * PropMaster 3.0 - Shared rate limit state
+ *
+ * RedisRateLimitStore keeps rate limit counters and IP blocks in Redis, so
+ * every instance enforces the same budget and sees the same blocks.
+ * Configured with RATE_LIMIT_REDIS_URL (redis://[user:pass@]host:port[/db]);
+ * without it each process uses MemoryRateLimitStore. For local testing,
+ * `yarn redis:stand-in` serves the commands used here on localhost:6379.
+ *
+ * - Counters: MULTI INCRBY + PEXPIREAT EXEC, so the increment and its expiry
+ *   are applied together; expiry is absolute, so repeating it is harmless
+ * - Blocks: one sorted set of IP -> block expiry; instances read it every
+ *   `blockSyncMs` (SecuritySystem), which bounds how long a block takes to
+ *   reach them
+ * - When Redis is unreachable, operations fall back to a per-process
+ *   MemoryRateLimitStore so requests are still limited, and blocks are
+ *   always mirrored there so an outage does not lift them locally
+ */
+
+export class RedisRateLimitStore {
+  constructor(client, options = {}) {
+    this.client = client
+    this.shared = true
+    this.prefix = options.prefix || 'propmaster:'
+    this.blocksKey = `${this.prefix}blocks`
+    this.fallback = new MemoryRateLimitStore()
+
+    this.metrics = {
+      commands: 0,
+      fallbacks: 0,
+      lastError: null,
+      lastErrorAt: null
+    }
+    this.lastWarnedAt = 0
+  }
+
+  counterKey(key) {
+    return `${this.prefix}rl:${key}`
+  }
+
+  async run(operation, fallback) {
+    this.metrics.commands++
+    try {
+      return await operation()
+    } catch (error) {
+      this.metrics.fallbacks++
+      this.metrics.lastError = error.message
+      this.metrics.lastErrorAt = new Date().toISOString()
+
+      const now = Date.now()
+      if (now - this.lastWarnedAt > 60000) {
+        this.lastWarnedAt = now
+        console.warn('⚠️ Shared rate limit store unavailable, using per-process limits:', error.message)
+      }
+      return fallback()
+    }
+  }
+
+  increment(key, amount, expiresAt, now = Date.now()) {
+    return this.run(async () => {
+      const counter = this.counterKey(key)
+      const [count] = await this.client.transaction([
+        ['INCRBY', counter, amount],
+        ['PEXPIREAT', counter, expiresAt]
+      ])
+      return count
+    }, () => this.fallback.increment(key, amount, expiresAt, now))
+  }
+
+  get(key, now = Date.now()) {
+    return this.run(async () => {
+      const count = await this.client.command('GET', this.counterKey(key))
+      return count === null ? 0 : parseInt(count)
+    }, () => this.fallback.get(key, now))
+  }
+
+  block(id, expiresAt) {
+    this.fallback.block(id, expiresAt)
+    return this.run(
+      () => this.client.command('ZADD', this.blocksKey, expiresAt, id),
+      () => null
+    )
+  }
+
+  unblock(id) {
+    this.fallback.unblock(id)
+    return this.run(
+      () => this.client.command('ZREM', this.blocksKey, id),
+      () => null
+    )
+  }
+
+  listBlocks(now = Date.now()) {
+    return this.run(async () => {
+      const [, entries] = await this.client.transaction([
+        ['ZREMRANGEBYSCORE', this.blocksKey, '-inf', now],
+        ['ZRANGEBYSCORE', this.blocksKey, `(${now}`, '+inf', 'WITHSCORES']
+      ])
+      const blocks = []
+      for (let i = 0; i < entries.length; i += 2) {
+        blocks.push({ id: entries[i], expiresAt: Number(entries[i + 1]) })
+      }
+      return blocks
+    }, () => this.fallback.listBlocks(now))
+  }
+
+  clearBlocks() {
+    this.fallback.clearBlocks()
+    return this.run(
+      () => this.client.command('DEL', this.blocksKey),
+      () => null
+    )
+  }
+
+  /**
+   * Drop every counter under this store's prefix
+   */
+  clear() {
+    this.fallback.clear()
+    return this.run(async () => {
+      let cursor = '0'
+      do {
+        const [next, keys] = await this.client.command('SCAN', cursor, 'MATCH', `${this.counterKey('')}*`, 'COUNT', 500)
+        if (keys.length > 0) {
+          await this.client.command('DEL', ...keys)
+        }
+        cursor = next
+      } while (cursor !== '0')
+    }, () => null)
+  }
+
+  /**
+   * Redis expires counters itself; only the fallback needs sweeping
+   */
+  sweep(now = Date.now()) {
+    this.fallback.sweep(now)
+  }
+
+  get size() {
+    return null
+  }
+
+  getMetrics() {
+    return {
+      backend: 'redis',
+      shared: true,
+      connected: this.client.connected,
+      ...this.metrics,
+      fallback: this.fallback.getMetrics()
+    }
+  }
+}
+
+/**
+ * Shared store when RATE_LIMIT_REDIS_URL is set, otherwise per process
+ */
+export function createRateLimitStore() {
+  const config = getRedisConfig(process.env.RATE_LIMIT_REDIS_URL)
+  if (!config) {
+    return new MemoryRateLimitStore()
+  }
+  return new RedisRateLimitStore(new RedisClient(config), {
+    prefix: process.env.RATE_LIMIT_REDIS_PREFIX
+  })
+}
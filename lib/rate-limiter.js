@@ -0,0 +1,174 @@
+import { ExpiringMap, securityExpiry } from '@/lib/expiring-map'
+
+/**
+ * PropMaster 3.0 - Sliding window counter rate limiter
+ *
+ * Each key keeps two counters: requests in the current fixed window and in
+ * the previous one. The sliding count is the current count plus the
+ * previous count weighted by how much of the previous window still overlaps
+ * the sliding window. That is O(1) time and two counters per key, instead
+ * of one timestamp per request, and stays within a few percent of an exact
+ * sliding log while never admitting a burst beyond maxRequests per window.
+ *
+ * Counters live in a pluggable state store with an atomic
+ * increment-with-expiry operation: MemoryRateLimitStore (per process,
+ * below) or RedisRateLimitStore (lib/rate-limit-store.js, shared by all
+ * instances). Windows are aligned to the epoch, so every instance agrees
+ * on which counter a request belongs to and when it expires.
+ */
+
+/**
+ * Per-process state store: counters and blocks in ExpiringMaps, removed
+ * by the shared security expiry tick (lib/expiring-map.js)
+ *
+ * Store interface (all methods may return promises):
+ * - increment(key, amount, expiresAt, now) -> new count; a counter starts
+ *   at zero when missing or expired and expires at `expiresAt` (epoch ms)
+ * - get(key, now) -> count, 0 when missing or expired
+ * - block(id, expiresAt), unblock(id), listBlocks(now) -> [{ id, expiresAt }],
+ *   clearBlocks()
+ * - clear() drops all counters; sweep(now) drops expired entries
+ * - shared: true when other instances see the same state
+ */
+export class MemoryRateLimitStore {
+  constructor(scheduler = securityExpiry) {
+    this.shared = false
+    this.scheduler = scheduler
+    this.counters = new ExpiringMap(scheduler)
+    this.blocks = new ExpiringMap(scheduler)
+  }
+
+  increment(key, amount, expiresAt, now = Date.now()) {
+    const count = (this.counters.get(key, now) || 0) + amount
+    this.counters.set(key, count, expiresAt)
+    return count
+  }
+
+  get(key, now = Date.now()) {
+    return this.counters.get(key, now) || 0
+  }
+
+  block(id, expiresAt) {
+    this.blocks.set(id, true, expiresAt)
+  }
+
+  unblock(id) {
+    this.blocks.delete(id)
+  }
+
+  listBlocks(now = Date.now()) {
+    const blocks = []
+    for (const [id, , expiresAt] of this.blocks.liveEntries(now)) {
+      blocks.push({ id, expiresAt })
+    }
+    return blocks
+  }
+
+  clearBlocks() {
+    this.blocks.clear()
+  }
+
+  clear() {
+    this.counters.clear()
+  }
+
+  sweep(now = Date.now()) {
+    this.scheduler.run(now)
+  }
+
+  get size() {
+    return this.counters.size
+  }
+
+  getMetrics() {
+    return {
+      backend: 'memory',
+      shared: false,
+      counters: this.counters.size,
+      blocks: this.blocks.size
+    }
+  }
+}
+
+export class RateLimiter {
+  constructor(store = new MemoryRateLimitStore()) {
+    this.store = store
+  }
+
+  /**
+   * Count one request for `key` against `maxRequests` per `windowMs`.
+   * Rejected requests are not counted.
+   * @returns {Promise<{ allowed: boolean, remaining: number, count: number, retryAfterMs: number, resetTime: number }>}
+   */
+  async take(key, { maxRequests, windowMs }, now = Date.now()) {
+    const window = Math.floor(now / windowMs)
+    const elapsed = now - window * windowMs
+    const prefix = `${maxRequests}/${windowMs}:${key}:`
+    const currentKey = prefix + window
+
+    // A window's counter is read as "previous" until the next one ends.
+    // Both calls are issued before awaiting, so a networked store sends
+    // them together; the in-memory store answers synchronously.
+    let current = this.store.increment(currentKey, 1, (window + 2) * windowMs, now)
+    let previous = this.store.get(prefix + (window - 1), now)
+    if (current instanceof Promise || previous instanceof Promise) {
+      [current, previous] = await Promise.all([current, previous])
+    }
+
+    const count = previous * (1 - elapsed / windowMs) + current
+    const resetTime = (window + 1) * windowMs
+
+    if (count > maxRequests) {
+      await this.store.increment(currentKey, -1, (window + 2) * windowMs, now)
+      return {
+        allowed: false,
+        remaining: 0,
+        count: Math.ceil(count - 1),
+        retryAfterMs: retryAfter(maxRequests, windowMs, current - 1, previous, elapsed),
+        resetTime
+      }
+    }
+
+    return {
+      allowed: true,
+      remaining: Math.max(0, Math.floor(maxRequests - count)),
+      count: Math.ceil(count),
+      retryAfterMs: 0,
+      resetTime
+    }
+  }
+
+  sweep(now = Date.now()) {
+    return this.store.sweep(now)
+  }
+
+  clear() {
+    return this.store.clear()
+  }
+
+  /**
+   * Number of tracked counters, or null when the store is shared
+   */
+  get size() {
+    return this.store.size
+  }
+}
+
+/**
+ * Milliseconds until the sliding count leaves room for one more request
+ */
+function retryAfter(maxRequests, windowMs, current, previous, elapsed) {
+  const room = maxRequests - 1 - current
+
+  // Room opens up in this window as the previous window slides out
+  if (room >= 0 && previous > 0) {
+    const wait = windowMs * (1 - room / previous) - elapsed
+    if (elapsed + wait < windowMs) {
+      return Math.max(1, Math.ceil(wait))
+    }
+  }
+
+  // Otherwise wait for the next window, where this one becomes "previous"
+  const nextWait = current > 0 ? windowMs * (1 - (maxRequests - 1) / current) : 0
+  return Math.max(1, Math.ceil(windowMs - elapsed + Math.max(0, nextWait)))
+}
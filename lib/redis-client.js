@@ -0,0 +1,288 @@
+import net from 'net'
+import tls from 'tls'
+
+/**
+ * PropMaster 3.0 - Minimal Redis client
+ *
+ * Speaks RESP2 over one pipelined connection: commands are written as soon
+ * as they are issued and replies are matched to them in order, so commands
+ * issued together share a round trip. Enough for short atomic operations
+ * (MULTI/EXEC, INCRBY, sorted sets); no pub/sub or cluster support.
+ *
+ * After a connection failure, commands fail fast until `retryDelayMs` has
+ * passed, so callers on the request path can fall back instead of waiting.
+ */
+
+export class RedisError extends Error {
+  constructor(message, { reply = false } = {}) {
+    super(message)
+    this.name = 'RedisError'
+    // True for error replies from the server, false for connection failures
+    this.reply = reply
+  }
+}
+
+/**
+ * Parse a redis:// or rediss:// URL (user, password and /db are optional)
+ */
+export function getRedisConfig(url) {
+  if (!url) return null
+
+  const parsed = new URL(url)
+  return {
+    host: parsed.hostname || 'localhost',
+    port: parseInt(parsed.port) || 6379,
+    secure: parsed.protocol === 'rediss:',
+    user: parsed.username ? decodeURIComponent(parsed.username) : null,
+    pass: parsed.password ? decodeURIComponent(parsed.password) : null,
+    db: parseInt(parsed.pathname.slice(1)) || 0
+  }
+}
+
+const encodeCommand = (args) => {
+  let output = `*${args.length}\r\n`
+  for (const arg of args) {
+    const value = String(arg)
+    output += `$${Buffer.byteLength(value)}\r\n${value}\r\n`
+  }
+  return output
+}
+
+/**
+ * Parse one reply starting at `offset`; returns null until it is complete
+ */
+function parseReply(buffer, offset) {
+  const end = buffer.indexOf('\r\n', offset)
+  if (end === -1) return null
+
+  const type = String.fromCharCode(buffer[offset])
+  const line = buffer.toString('utf8', offset + 1, end)
+  const next = end + 2
+
+  switch (type) {
+    case '+':
+      return { value: line, offset: next }
+    case '-':
+      return { value: new RedisError(line, { reply: true }), offset: next }
+    case ':':
+      return { value: parseInt(line), offset: next }
+    case '$': {
+      const length = parseInt(line)
+      if (length === -1) return { value: null, offset: next }
+      if (buffer.length < next + length + 2) return null
+      return { value: buffer.toString('utf8', next, next + length), offset: next + length + 2 }
+    }
+    case '*': {
+      const count = parseInt(line)
+      if (count === -1) return { value: null, offset: next }
+      const items = []
+      let position = next
+      for (let i = 0; i < count; i++) {
+        const item = parseReply(buffer, position)
+        if (!item) return null
+        items.push(item.value)
+        position = item.offset
+      }
+      return { value: items, offset: position }
+    }
+    default:
+      throw new RedisError(`Unexpected reply type "${type}"`)
+  }
+}
+
+export class RedisClient {
+  constructor(config, options = {}) {
+    this.config = config
+    this.options = {
+      connectTimeoutMs: 1000,
+      commandTimeoutMs: 500,
+      retryDelayMs: 5000,
+      ...options
+    }
+
+    this.socket = null
+    this.connecting = null
+    this.buffer = Buffer.alloc(0)
+    this.pending = []
+    this.retryAt = 0
+  }
+
+  get connected() {
+    return this.socket !== null && this.connecting === null
+  }
+
+  /**
+   * Send one command; resolves with its reply, rejects with RedisError
+   */
+  async command(...args) {
+    if (!this.socket) {
+      await this.connect()
+    } else if (this.connecting) {
+      await this.connecting
+    }
+    return this.send(args)
+  }
+
+  /**
+   * Send several commands in one write; resolves with their replies in
+   * order, where a command that failed is a RedisError in the array.
+   * Wrap them in MULTI/EXEC (see `transaction`) when they must be atomic.
+   */
+  async pipeline(commands) {
+    if (!this.socket) {
+      await this.connect()
+    } else if (this.connecting) {
+      await this.connecting
+    }
+    const socket = this.socket
+    if (!socket) throw new RedisError('Redis connection closed')
+    socket.cork()
+    const replies = commands.map(args => this.send(args).catch(error => {
+      // Error replies stay in place; connection failures reject the pipeline
+      if (error instanceof RedisError && error.reply) return error
+      throw error
+    }))
+    socket.uncork()
+    return Promise.all(replies)
+  }
+
+  /**
+   * Run commands atomically with MULTI/EXEC; resolves with EXEC's replies
+   */
+  async transaction(commands) {
+    const replies = await this.pipeline([['MULTI'], ...commands, ['EXEC']])
+    const results = replies[replies.length - 1]
+    if (results instanceof RedisError) throw results
+    if (!Array.isArray(results)) throw new RedisError('Redis transaction aborted')
+    const failed = results.find(result => result instanceof RedisError)
+    if (failed) throw failed
+    return results
+  }
+
+  send(args) {
+    return new Promise((resolve, reject) => {
+      if (!this.socket) {
+        reject(new RedisError('Redis connection closed'))
+        return
+      }
+
+      const timer = setTimeout(() => {
+        // Replies are matched by position, so a lost reply poisons the connection
+        this.destroy(new RedisError(`Redis command timed out: ${args[0]}`))
+      }, this.options.commandTimeoutMs)
+
+      this.pending.push({
+        resolve: (value) => { clearTimeout(timer); resolve(value) },
+        reject: (error) => { clearTimeout(timer); reject(error) }
+      })
+      this.socket.write(encodeCommand(args))
+    })
+  }
+
+  connect() {
+    if (this.connecting) return this.connecting
+    if (Date.now() < this.retryAt) {
+      return Promise.reject(new RedisError('Redis unavailable, waiting to reconnect'))
+    }
+
+    this.connecting = this.open().then(
+      () => { this.connecting = null },
+      (error) => {
+        this.connecting = null
+        this.destroy(error)
+        this.retryAt = Date.now() + this.options.retryDelayMs
+        throw error
+      }
+    )
+    return this.connecting
+  }
+
+  async open() {
+    const { host, port, secure } = this.config
+
+    this.socket = await new Promise((resolve, reject) => {
+      const socket = secure
+        ? tls.connect({ host, port, servername: host })
+        : net.connect({ host, port })
+      const timer = setTimeout(() => {
+        socket.destroy()
+        reject(new RedisError(`Redis connection to ${host}:${port} timed out`))
+      }, this.options.connectTimeoutMs)
+
+      socket.once(secure ? 'secureConnect' : 'connect', () => {
+        clearTimeout(timer)
+        resolve(socket)
+      })
+      socket.once('error', (error) => {
+        clearTimeout(timer)
+        reject(error)
+      })
+    })
+
+    this.buffer = Buffer.alloc(0)
+    this.socket.setNoDelay(true)
+    this.socket.on('data', chunk => this.receive(chunk))
+    this.socket.on('error', error => this.destroy(error))
+    this.socket.on('close', () => this.destroy(new RedisError('Redis connection closed')))
+
+    if (this.config.pass) {
+      await this.send(this.config.user
+        ? ['AUTH', this.config.user, this.config.pass]
+        : ['AUTH', this.config.pass])
+    }
+    if (this.config.db) {
+      await this.send(['SELECT', this.config.db])
+    }
+  }
+
+  receive(chunk) {
+    this.buffer = this.buffer.length ? Buffer.concat([this.buffer, chunk]) : chunk
+
+    let offset = 0
+    let reply
+    try {
+      while (offset < this.buffer.length && (reply = parseReply(this.buffer, offset))) {
+        offset = reply.offset
+        const waiting = this.pending.shift()
+        if (!waiting) continue
+        if (reply.value instanceof RedisError) {
+          waiting.reject(reply.value)
+        } else {
+          waiting.resolve(reply.value)
+        }
+      }
+    } catch (error) {
+      this.destroy(error)
+      return
+    }
+
+    this.buffer = this.buffer.subarray(offset)
+  }
+
+  destroy(error) {
+    if (this.socket) {
+      this.socket.removeAllListeners()
+      this.socket.on('error', () => {})
+      this.socket.destroy()
+      this.socket = null
+      this.retryAt = Date.now() + this.options.retryDelayMs
+    }
+
+    const pending = this.pending
+    this.pending = []
+    for (const waiting of pending) {
+      waiting.reject(error)
+    }
+  }
+
+  async close() {
+    if (!this.socket || this.connecting) return
+    try {
+      await this.send(['QUIT'])
+    } catch {
+      // Closing anyway
+    }
+    this.destroy(new RedisError('Redis connection closed'))
+    this.retryAt = 0
+  }
+}
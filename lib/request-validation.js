@@ -0,0 +1,202 @@
+/**
+ * PropMaster 3.0 - JSON request body validation
+ *
+ * Reads and checks a JSON body once, for the security middleware, which
+ * hands the parsed body to the route handler as `context.body`:
+ *
+ * 1. The body is read from the stream with a byte cap; reading stops as
+ *    soon as the cap is passed (or up front, from Content-Length)
+ * 2. A scan of the raw text enforces nesting depth and field count before
+ *    JSON.parse runs, so hostile shapes are rejected without building them
+ * 3. JSON.parse runs with a reviver that checks every string and object
+ *    key as it is created (length, null bytes, path traversal, injection
+ *    patterns)
+ * 4. The route's zod schema, if any, validates the result; its output
+ *    (with defaults applied and unknown keys dropped) becomes the body
+ */
+
+export const REQUEST_LIMITS = {
+  maxBytes: 1024 * 1024, // 1MB
+  maxDepth: 20,
+  maxFields: 5000,
+  maxStringLength: 10000
+}
+
+const SQL_PATTERNS = [
+  /union\s+select/i,
+  /drop\s+table/i,
+  /delete\s+from/i,
+  /insert\s+into/i,
+  /update\s+set/i,
+  /exec\s*\(/i,
+  /script\s*>/i
+]
+
+const XSS_PATTERNS = [
+  /<script/i,
+  /javascript:/i,
+  /on\w+\s*=/i,
+  /<iframe/i,
+  /<object/i,
+  /<embed/i
+]
+
+const QUOTE = 0x22
+const BACKSLASH = 0x5c
+
+/**
+ * Read the body as text, giving up once it passes `maxBytes`.
+ * Returns null when the body is too large.
+ */
+export async function readBodyText(request, maxBytes) {
+  const declared = parseInt(request.headers.get('content-length'))
+  if (declared > maxBytes) return null
+  if (!request.body) return ''
+
+  const reader = request.body.getReader()
+  const chunks = []
+  let size = 0
+
+  while (true) {
+    const { done, value } = await reader.read()
+    if (done) break
+    size += value.byteLength
+    if (size > maxBytes) {
+      await reader.cancel().catch(() => {})
+      return null
+    }
+    chunks.push(value)
+  }
+
+  return Buffer.concat(chunks, size).toString('utf8')
+}
+
+/**
+ * Check nesting depth and field count on the raw JSON text.
+ * Counts object keys and array elements; returns an error message or null.
+ */
+export function checkJsonShape(text, { maxDepth, maxFields }) {
+  let depth = 0
+  let fields = 0
+  let inString = false
+
+  for (let i = 0; i < text.length; i++) {
+    const code = text.charCodeAt(i)
+
+    if (inString) {
+      if (code === BACKSLASH) {
+        i++
+      } else if (code === QUOTE) {
+        inString = false
+      }
+      continue
+    }
+
+    switch (code) {
+      case QUOTE:
+        inString = true
+        break
+      case 0x7b: // {
+      case 0x5b: // [
+        if (++depth > maxDepth) return `Request body is nested deeper than ${maxDepth} levels`
+        fields++
+        break
+      case 0x7d: // }
+      case 0x5d: // ]
+        depth--
+        break
+      case 0x2c: // ,
+        if (++fields > maxFields) return `Request body has more than ${maxFields} fields`
+        break
+    }
+  }
+
+  return null
+}
+
+/**
+ * Read, parse and validate a JSON request body.
+ *
+ * @param {Request} request
+ * @param {Object} [options]
+ * @param {import('zod').ZodTypeAny} [options.schema] - route schema, compiled once at module load
+ * @param {Object} [options.limits] - overrides for REQUEST_LIMITS
+ * @returns {Promise<{ valid: boolean, body?: any, errors: string[], status?: number }>}
+ */
+export async function parseJsonBody(request, { schema = null, limits = {} } = {}) {
+  const { maxBytes, maxDepth, maxFields, maxStringLength } = { ...REQUEST_LIMITS, ...limits }
+
+  let text
+  try {
+    text = await readBodyText(request, maxBytes)
+  } catch (error) {
+    return { valid: false, errors: ['Failed to read request body'], status: 400 }
+  }
+
+  if (text === null) {
+    return { valid: false, errors: ['Request payload too large'], status: 413 }
+  }
+
+  if (text.trim() === '') {
+    text = '{}'
+  }
+
+  const shapeError = checkJsonShape(text, { maxDepth, maxFields })
+  if (shapeError) {
+    return { valid: false, errors: [shapeError], status: 413 }
+  }
+
+  const errors = new Set()
+  let body
+  try {
+    body = JSON.parse(text, (key, value) => {
+      if (key !== '') {
+        checkString(key, key, maxStringLength, errors)
+      }
+      if (typeof value === 'string') {
+        checkString(key, value, maxStringLength, errors)
+      }
+      return value
+    })
+  } catch {
+    return { valid: false, errors: ['Invalid JSON format'], status: 400 }
+  }
+
+  if (errors.size > 0) {
+    return { valid: false, errors: [...errors], status: 400 }
+  }
+
+  if (schema) {
+    const result = schema.safeParse(body)
+    if (!result.success) {
+      return {
+        valid: false,
+        errors: result.error.issues.map(issue => `${issue.path.join('.') || 'body'}: ${issue.message}`),
+        status: 400
+      }
+    }
+    body = result.data
+  }
+
+  return { valid: true, body, errors: [] }
+}
+
+function checkString(key, value, maxStringLength, errors) {
+  const field = key === '' ? 'body' : key
+
+  if (value.length > maxStringLength) {
+    errors.add(`Field ${field} is too long`)
+  }
+  if (value.includes('\0')) {
+    errors.add(`Field ${field} contains null bytes`)
+  }
+  if (value.includes('../') || value.includes('..\\')) {
+    errors.add(`Field ${field} contains path traversal attempt`)
+  }
+  if (SQL_PATTERNS.some(pattern => pattern.test(value))) {
+    errors.add('Potentially malicious input detected')
+  }
+  if (XSS_PATTERNS.some(pattern => pattern.test(value))) {
+    errors.add('Potentially malicious script content detected')
+  }
+}
@@ -0,0 +1,210 @@
+import { SEVERITY_LEVELS } from '@/lib/event-sink'
+
+/**
+ * PropMaster 3.0 - In-memory security event log
+ *
+ * Recent security events for the monitoring API, in a fixed-capacity ring
+ * buffer: the oldest event is overwritten once it is full, so memory is
+ * constant and nothing is ever copied.
+ *
+ * - Per-severity and per-type counts of the buffered events are updated on
+ *   insert and eviction, so they are read without scanning
+ * - Rates come from 10-second buckets covering the last hour, each holding
+ *   its own totals; a bucket is reset when the ring reaches it again
+ * - The last few HIGH/CRITICAL events are kept separately for alerts
+ *
+ * Events are persisted by the audit event sink; this log is only a window.
+ */
+
+const RATE_WINDOWS = { last_1m: 60 * 1000, last_5m: 5 * 60 * 1000, last_1h: 60 * 60 * 1000 }
+
+const severityIndex = (severity) => Math.max(SEVERITY_LEVELS.indexOf(severity), 0)
+
+const increment = (counts, key, amount) => {
+  const count = (counts.get(key) || 0) + amount
+  if (count > 0) {
+    counts.set(key, count)
+  } else {
+    counts.delete(key)
+  }
+}
+
+/**
+ * Fixed-capacity FIFO; push returns the evicted item, if any
+ */
+class RingBuffer {
+  constructor(capacity) {
+    this.capacity = capacity
+    this.items = new Array(capacity)
+    this.start = 0
+    this.length = 0
+  }
+
+  push(item) {
+    const index = (this.start + this.length) % this.capacity
+    if (this.length < this.capacity) {
+      this.items[index] = item
+      this.length++
+      return undefined
+    }
+    const evicted = this.items[this.start]
+    this.items[this.start] = item
+    this.start = (this.start + 1) % this.capacity
+    return evicted
+  }
+
+  /**
+   * Up to `limit` most recent items, oldest first
+   */
+  latest(limit) {
+    const count = Math.min(limit, this.length)
+    const items = new Array(count)
+    for (let i = 0; i < count; i++) {
+      items[i] = this.items[(this.start + this.length - count + i) % this.capacity]
+    }
+    return items
+  }
+
+  clear() {
+    this.items = new Array(this.capacity)
+    this.start = 0
+    this.length = 0
+  }
+}
+
+export class SecurityEventLog {
+  constructor(options = {}) {
+    this.config = {
+      capacity: 1000,
+      highSeverityCapacity: 20,
+      bucketMs: 10 * 1000,
+      horizonMs: RATE_WINDOWS.last_1h,
+      ...options
+    }
+
+    this.events = new RingBuffer(this.config.capacity)
+    this.highSeverity = new RingBuffer(this.config.highSeverityCapacity)
+    this.severityCounts = SEVERITY_LEVELS.map(() => 0)
+    this.typeCounts = new Map()
+    this.totalLogged = 0
+
+    this.buckets = Array.from(
+      { length: Math.ceil(this.config.horizonMs / this.config.bucketMs) },
+      () => ({ index: -1, total: 0, severity: SEVERITY_LEVELS.map(() => 0), types: new Map() })
+    )
+  }
+
+  get size() {
+    return this.events.length
+  }
+
+  add(event, now = Date.now()) {
+    const severity = severityIndex(event.severity)
+
+    const evicted = this.events.push(event)
+    if (evicted) {
+      this.severityCounts[severityIndex(evicted.severity)]--
+      increment(this.typeCounts, evicted.type, -1)
+    }
+    this.severityCounts[severity]++
+    increment(this.typeCounts, event.type, 1)
+    this.totalLogged++
+
+    if (event.severity === 'HIGH' || event.severity === 'CRITICAL') {
+      this.highSeverity.push({ event, at: now })
+    }
+
+    const bucket = this.bucketAt(Math.floor(now / this.config.bucketMs))
+    bucket.total++
+    bucket.severity[severity]++
+    increment(bucket.types, event.type, 1)
+  }
+
+  bucketAt(index) {
+    const bucket = this.buckets[index % this.buckets.length]
+    if (bucket.index !== index) {
+      bucket.index = index
+      bucket.total = 0
+      bucket.severity.fill(0)
+      bucket.types.clear()
+    }
+    return bucket
+  }
+
+  /**
+   * Most recent events, oldest first
+   */
+  recent(limit = 10) {
+    return this.events.latest(limit)
+  }
+
+  /**
+   * HIGH/CRITICAL events logged in the last `withinMs`, newest first
+   */
+  recentHighSeverity(withinMs = RATE_WINDOWS.last_1h, limit = 5, now = Date.now()) {
+    return this.highSeverity.latest(this.highSeverity.length)
+      .filter(({ at }) => at > now - withinMs)
+      .reverse()
+      .slice(0, limit)
+      .map(({ event }) => event)
+  }
+
+  countsBySeverity() {
+    const counts = {}
+    SEVERITY_LEVELS.forEach((level, i) => {
+      if (this.severityCounts[i] > 0) counts[level] = this.severityCounts[i]
+    })
+    return counts
+  }
+
+  countsByType() {
+    return Object.fromEntries(this.typeCounts)
+  }
+
+  /**
+   * Event counts for the last minute, 5 minutes and hour, to bucket resolution
+   */
+  getRates(now = Date.now()) {
+    const current = Math.floor(now / this.config.bucketMs)
+    const rates = {}
+
+    for (const [name, windowMs] of Object.entries(RATE_WINDOWS)) {
+      const span = Math.min(Math.ceil(windowMs / this.config.bucketMs), this.buckets.length)
+      const severity = SEVERITY_LEVELS.map(() => 0)
+      const types = new Map()
+      let total = 0
+
+      for (let index = current - span + 1; index <= current; index++) {
+        const bucket = this.buckets[index % this.buckets.length]
+        if (bucket.index !== index) continue
+        total += bucket.total
+        bucket.severity.forEach((count, i) => { severity[i] += count })
+        for (const [type, count] of bucket.types) increment(types, type, count)
+      }
+
+      rates[name] = {
+        total,
+        per_minute: Math.round(total / (windowMs / 60000) * 100) / 100,
+        by_severity: Object.fromEntries(SEVERITY_LEVELS.map((level, i) => [level, severity[i]])),
+        by_type: Object.fromEntries(types)
+      }
+    }
+
+    return rates
+  }
+
+  /**
+   * Drop buffered events and rates; returns how many events were buffered
+   */
+  clear() {
+    const cleared = this.events.length
+    this.events.clear()
+    this.highSeverity.clear()
+    this.severityCounts.fill(0)
+    this.typeCounts.clear()
+    for (const bucket of this.buckets) {
+      bucket.index = -1
+    }
+    return cleared
+  }
+}
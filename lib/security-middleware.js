@@ -1,5 +1,6 @@
 import { NextResponse } from 'next/server'
 import { securitySystem, withRateLimit, withAuthentication, withSecurityHeaders } from '@/lib/security-system'
+import { parseJsonBody } from '@/lib/request-validation'
 
 /**
  * PropMaster 3.0 - Security Middleware
@@ -11,6 +12,11 @@ import { securitySystem, withRateLimit, withAuthentication, withSecurityHeaders
 /**
  * Enhanced API route wrapper with comprehensive security
  * 
+ * JSON bodies are read and validated once here (see lib/request-validation)
+ * and passed to the handler as `context.body`; pass `bodySchema` (a zod
+ * schema) to validate the body's shape as well. Authenticated requests get
+ * the request's auth context (lib/auth-context) as `context.auth`.
+ *
  * @param {Function} handler - The original API route handler
  * @param {Object} options - Security options
  * @returns {Function} - Enhanced handler with security middleware
@@ -22,33 +28,26 @@ export function withSecurity(handler, options = {}) {
     rateLimit = true,
     rateLimitOptions = {},
     validateInput = true,
+    bodySchema = null,
+    bodyLimits = {},
     logAccess = false,
     sensitiveEndpoint = false
   } = options
 
+  // Per-user limits need the session, so they run after authentication
+  const limitByUser = requireAuth && rateLimitOptions.keyBy && rateLimitOptions.keyBy !== 'ip'
+
   return async (request, context) => {
     try {
       // Apply security headers
       const securityHeaders = withSecurityHeaders()
       
       // Apply rate limiting if enabled
-      if (rateLimit) {
+      if (rateLimit && !limitByUser) {
         const rateLimitResult = await withRateLimit(rateLimitOptions)(request)
         
         if (!rateLimitResult.allowed) {
-          const response = NextResponse.json({
-            error: 'Rate limit exceeded',
-            retryAfter: rateLimitResult.retryAfter,
-            reason: rateLimitResult.reason
-          }, { 
-            status: 429,
-            headers: {
-              'Retry-After': rateLimitResult.retryAfter.toString(),
-              ...securityHeaders
-            }
-          })
-          
-          return response
+          return rateLimitedResponse(rateLimitResult, securityHeaders)
         }
       }
 
@@ -80,9 +79,23 @@ export function withSecurity(handler, options = {}) {
         }
       }
 
-      // Input validation for POST/PUT requests
-      if (validateInput && (request.method === 'POST' || request.method === 'PUT')) {
-        const inputValidation = await validateRequestInput(request)
+      if (rateLimit && limitByUser) {
+        const rateLimitResult = await withRateLimit({
+          ...rateLimitOptions,
+          userId: authResult.user?.email
+        })(request)
+
+        if (!rateLimitResult.allowed) {
+          return rateLimitedResponse(rateLimitResult, securityHeaders)
+        }
+      }
+
+      // Handlers read the session, role and permissions from context.auth
+      let handlerContext = authResult?.auth ? { ...context, auth: authResult.auth } : context
+
+      // Input validation for JSON bodies
+      if (validateInput && BODY_METHODS.includes(request.method) && isJsonRequest(request)) {
+        const inputValidation = await parseJsonBody(request, { schema: bodySchema, limits: bodyLimits })
         
         if (!inputValidation.valid) {
           await securitySystem.logSecurityEvent('INPUT_VALIDATION_FAILED', {
@@ -97,12 +110,15 @@ export function withSecurity(handler, options = {}) {
             error: 'Input validation failed',
             details: inputValidation.errors
           }, { 
-            status: 400,
+            status: inputValidation.status,
             headers: securityHeaders
           })
           
           return response
         }
+
+        handlerContext = { ...handlerContext, body: inputValidation.body }
+        useParsedBody(request, inputValidation.body)
       }
 
       // Log access for sensitive endpoints
@@ -118,7 +134,7 @@ export function withSecurity(handler, options = {}) {
       }
 
       // Call the original handler
-      const response = await handler(request, context)
+      const response = await handler(request, handlerContext)
       
       // Add security headers to the response
       Object.entries(securityHeaders).forEach(([key, value]) => {
@@ -152,6 +168,20 @@ export function withSecurity(handler, options = {}) {
   }
 }
 
+function rateLimitedResponse(rateLimitResult, securityHeaders) {
+  return NextResponse.json({
+    error: 'Rate limit exceeded',
+    retryAfter: rateLimitResult.retryAfter,
+    reason: rateLimitResult.reason
+  }, { 
+    status: 429,
+    headers: {
+      'Retry-After': rateLimitResult.retryAfter.toString(),
+      ...securityHeaders
+    }
+  })
+}
+
 /**
  * Specific middleware for different security levels
  */
@@ -173,7 +203,7 @@ export function withAuthenticatedSecurity(handler, options = {}) {
   return withSecurity(handler, {
     requireAuth: true,
     rateLimit: true,
-    rateLimitOptions: { maxRequests: 120, windowMs: 60000 }, // 120 requests per minute
+    rateLimitOptions: { maxRequests: 120, windowMs: 60000, keyBy: 'user' }, // 120 requests per minute per user
     validateInput: true,
     logAccess: false,
     ...options
@@ -207,120 +237,23 @@ export function withFileUploadSecurity(handler, options = {}) {
   })
 }
 
-/**
- * Input validation helper
- */
-async function validateRequestInput(request) {
-  const errors = []
-  
-  try {
-    const contentType = request.headers.get('content-type') || ''
-    
-    if (contentType.includes('application/json')) {
-      // Validate JSON input
-      const body = await request.text()
-      
-      // Check for excessively large payloads
-      if (body.length > 1024 * 1024) { // 1MB limit
-        errors.push('Request payload too large')
-      }
-      
-      // Parse and validate JSON
-      try {
-        const jsonData = JSON.parse(body)
-        
-        // Check for suspicious patterns
-        const jsonString = JSON.stringify(jsonData)
-        
-        // Check for potential SQL injection patterns
-        const sqlPatterns = [
-          /union\s+select/i,
-          /drop\s+table/i,
-          /delete\s+from/i,
-          /insert\s+into/i,
-          /update\s+set/i,
-          /exec\s*\(/i,
-          /script\s*>/i
-        ]
-        
-        sqlPatterns.forEach(pattern => {
-          if (pattern.test(jsonString)) {
-            errors.push('Potentially malicious input detected')
-          }
-        })
-        
-        // Check for XSS patterns
-        const xssPatterns = [
-          /<script/i,
-          /javascript:/i,
-          /on\w+\s*=/i,
-          /<iframe/i,
-          /<object/i,
-          /<embed/i
-        ]
-        
-        xssPatterns.forEach(pattern => {
-          if (pattern.test(jsonString)) {
-            errors.push('Potentially malicious script content detected')
-          }
-        })
-        
-        // Validate individual fields if it's an object
-        if (typeof jsonData === 'object' && jsonData !== null) {
-          validateObjectFields(jsonData, errors)
-        }
-        
-      } catch (parseError) {
-        errors.push('Invalid JSON format')
-      }
-    }
-    
-  } catch (error) {
-    errors.push('Failed to validate request input')
-  }
-  
-  return {
-    valid: errors.length === 0,
-    errors
-  }
+const BODY_METHODS = ['POST', 'PUT', 'PATCH', 'DELETE']
+
+// JSON bodies, plus requests without a content type or a body (handlers
+// get `{}`). Other untyped bodies are left to the handler, as before.
+function isJsonRequest(request) {
+  const contentType = request.headers.get('content-type')
+  if (contentType) return contentType.includes('application/json')
+  return request.body === null || request.headers.get('content-length') === '0'
 }
 
 /**
- * Validate object fields for common security issues
+ * The body stream has been consumed; handlers that still call
+ * request.json()/text() get the validated body instead of an error
  */
-function validateObjectFields(obj, errors, path = '') {
-  for (const [key, value] of Object.entries(obj)) {
-    const currentPath = path ? `${path}.${key}` : key
-    
-    if (typeof value === 'string') {
-      // Check string length
-      if (value.length > 10000) {
-        errors.push(`Field ${currentPath} is too long`)
-      }
-      
-      // Check for null bytes
-      if (value.includes('\0')) {
-        errors.push(`Field ${currentPath} contains null bytes`)
-      }
-      
-      // Check for path traversal attempts
-      if (value.includes('../') || value.includes('..\\')) {
-        errors.push(`Field ${currentPath} contains path traversal attempt`)
-      }
-      
-    } else if (typeof value === 'object' && value !== null && !Array.isArray(value)) {
-      // Recursively validate nested objects
-      validateObjectFields(value, errors, currentPath)
-      
-    } else if (Array.isArray(value)) {
-      // Validate array items
-      value.forEach((item, index) => {
-        if (typeof item === 'object' && item !== null) {
-          validateObjectFields(item, errors, `${currentPath}[${index}]`)
-        }
-      })
-    }
-  }
+function useParsedBody(request, body) {
+  request.json = async () => body
+  request.text = async () => JSON.stringify(body)
 }
 
 /**
@@ -1,7 +1,11 @@
-import { getServerSession } from 'next-auth'
-import { authOptions } from '@/app/api/auth/[...nextauth]/route'
 import { supabaseAdmin } from '@/lib/supabase'
-import { getUserRole, canManageUsers } from '@/lib/permissions'
+import { canManageUsers } from '@/lib/permissions'
+import { securityAuditSink } from '@/lib/event-sink'
+import { RateLimiter } from '@/lib/rate-limiter'
+import { getAuthContext } from '@/lib/auth-context'
+import { createRateLimitStore } from '@/lib/rate-limit-store'
+import { ExpiringMap, ExpiringSet } from '@/lib/expiring-map'
+import { SecurityEventLog } from '@/lib/security-event-log'
 
 /**
  * PropMaster 3.0 - Enhanced Security System
@@ -19,10 +23,19 @@ import { getUserRole, canManageUsers } from '@/lib/permissions'
 
 export class SecuritySystem {
   constructor() {
-    this.rateLimitStore = new Map()
-    this.securityEvents = []
-    this.blockedIPs = new Set()
-    this.suspiciousActivities = new Map()
+    // Counters and blocks live in the state store (shared across instances
+    // when RATE_LIMIT_REDIS_URL is set); blockedIPs is this instance's copy
+    this.stateStore = createRateLimitStore()
+    this.rateLimitStore = new RateLimiter(this.stateStore)
+    this.securityEvents = new SecurityEventLog({ capacity: 1000 })
+    // Expire through the shared security expiry tick, not a timer per entry
+    this.blockedIPs = new ExpiringSet()
+    this.suspiciousActivities = new ExpiringMap()
+    this.blockSyncTimer = null
+    // Latest vulnerability scan, refreshed on a schedule (see getSecurityScan)
+    this.scanSnapshot = null
+    this.scanInFlight = null
+    this.scanTimer = null
     
     // Configuration
     this.config = {
@@ -30,7 +43,8 @@ export class SecuritySystem {
         windowMs: 15 * 60 * 1000, // 15 minutes
         maxRequests: 100, // per window per IP
         maxAuthAttempts: 5, // auth attempts per window
-        blockDuration: 60 * 60 * 1000 // 1 hour block
+        blockDuration: 60 * 60 * 1000, // 1 hour block
+        blockSyncMs: 5000 // max delay before a block reaches other instances
       },
       security: {
         maxLoginAttempts: 5,
@@ -44,23 +58,32 @@ export class SecuritySystem {
         allowedImageTypes: ['image/jpeg', 'image/png', 'image/webp'],
         allowedDocTypes: ['application/pdf', 'application/msword', 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'],
         maxInputLength: 10000
+      },
+      scan: {
+        intervalMs: 60 * 60 * 1000 // rescan hourly
       }
     }
   }
 
   /**
    * Rate limiting middleware
+   *
+   * Sliding window counter (lib/rate-limiter.js): O(1) per request, three numbers per key.
+   * Keys are per limit, so routes with different limits do not share a budget.
+   * `keyBy` is 'ip' (default), 'user' or 'ip+user'; user keys need `userId`
+   * and fall back to the IP without one.
    */
   async checkRateLimit(request, options = {}) {
     const {
       maxRequests = this.config.rateLimit.maxRequests,
       windowMs = this.config.rateLimit.windowMs,
+      keyBy = 'ip',
+      userId = null,
       skipSuccessfulGET = true
     } = options
 
     const ip = this.getClientIP(request)
-    const now = Date.now()
-    const windowStart = now - windowMs
+    this.startBlockSync()
 
     // Check if IP is blocked
     if (this.blockedIPs.has(ip)) {
@@ -76,66 +99,110 @@ export class SecuritySystem {
       }
     }
 
-    // Get or create rate limit entry
-    if (!this.rateLimitStore.has(ip)) {
-      this.rateLimitStore.set(ip, [])
-    }
+    const key = this.getRateLimitKey(ip, keyBy, userId)
+    const result = await this.rateLimitStore.take(key, { maxRequests, windowMs })
 
-    const requests = this.rateLimitStore.get(ip)
-    
-    // Remove old requests outside the window
-    const validRequests = requests.filter(timestamp => timestamp > windowStart)
-    
     // Check if limit exceeded
-    if (validRequests.length >= maxRequests) {
+    if (!result.allowed) {
       await this.logSecurityEvent('RATE_LIMIT_EXCEEDED', {
         ip,
-        requestCount: validRequests.length,
+        key,
+        requestCount: result.count,
         maxRequests,
         url: request.url
       })
 
-      // Block IP if excessive violations
-      const violations = this.suspiciousActivities.get(ip) || 0
-      if (violations >= 3) {
-        this.blockedIPs.add(ip)
-        setTimeout(() => this.blockedIPs.delete(ip), this.config.rateLimit.blockDuration)
-      } else {
-        this.suspiciousActivities.set(ip, violations + 1)
+      // Block IP if excessive violations (counted across instances)
+      const violationsExpireAt = Date.now() + this.config.rateLimit.blockDuration
+      const violations = await this.stateStore.increment(`violations:${ip}`, 1, violationsExpireAt)
+      this.suspiciousActivities.set(ip, violations, violationsExpireAt)
+      if (violations > 3) {
+        await this.blockIP(ip)
       }
 
       return {
         allowed: false,
         reason: 'RATE_LIMIT_EXCEEDED',
-        retryAfter: Math.ceil(windowMs / 1000),
-        requestCount: validRequests.length,
+        retryAfter: Math.max(1, Math.ceil(result.retryAfterMs / 1000)),
+        requestCount: result.count,
         maxRequests
       }
     }
 
-    // Add current request
-    validRequests.push(now)
-    this.rateLimitStore.set(ip, validRequests)
-
-    // Cleanup old entries periodically
-    if (Math.random() < 0.01) { // 1% chance
-      this.cleanupRateLimitStore()
-    }
-
     return {
       allowed: true,
-      requestCount: validRequests.length,
+      requestCount: result.count,
       maxRequests,
-      resetTime: windowStart + windowMs
+      resetTime: result.resetTime
+    }
+  }
+
+  /**
+   * Block an IP on every instance: this one immediately, others at their
+   * next block sync
+   */
+  async blockIP(ip, durationMs = this.config.rateLimit.blockDuration) {
+    const expiresAt = Date.now() + durationMs
+    this.blockedIPs.add(ip, expiresAt)
+    await this.stateStore.block(ip, expiresAt)
+  }
+
+  async clearBlockedIPs() {
+    const cleared = this.blockedIPs.size
+    this.blockedIPs.clear()
+    await this.stateStore.clearBlocks()
+    return cleared
+  }
+
+  async resetRateLimits() {
+    const reset = this.rateLimitStore.size
+    this.suspiciousActivities.clear()
+    await this.rateLimitStore.clear()
+    return reset
+  }
+
+  /**
+   * With a shared store, mirror its block list every `blockSyncMs`
+   */
+  startBlockSync() {
+    if (this.blockSyncTimer || !this.stateStore.shared) return
+
+    this.blockSyncTimer = setInterval(() => {
+      this.syncBlockedIPs().catch(error => {
+        console.error('Failed to sync blocked IPs:', error.message)
+      })
+    }, this.config.rateLimit.blockSyncMs)
+    this.blockSyncTimer.unref?.()
+    this.syncBlockedIPs().catch(() => {})
+  }
+
+  async syncBlockedIPs() {
+    const blocks = await this.stateStore.listBlocks()
+    const listed = new Set()
+    for (const { id, expiresAt } of blocks) {
+      listed.add(id)
+      this.blockedIPs.add(id, expiresAt)
+    }
+    // Lifted elsewhere (cleared by an admin)
+    for (const ip of this.blockedIPs) {
+      if (!listed.has(ip)) this.blockedIPs.delete(ip)
     }
   }
 
+  getRateLimitKey(ip, keyBy, userId) {
+    if (userId && keyBy === 'user') return `user:${userId}`
+    if (userId && keyBy === 'ip+user') return `ip:${ip}|user:${userId}`
+    return `ip:${ip}`
+  }
+
   /**
    * Enhanced authentication check with security logging
    */
   async authenticateRequest(request, requiredRole = null) {
     try {
-      const session = await getServerSession(authOptions)
+      // Shared with the handler for the rest of the request
+      const auth = await getAuthContext(request)
+      const session = auth.session
       
       if (!session?.user) {
         await this.logSecurityEvent('UNAUTHENTICATED_ACCESS', {
@@ -151,7 +218,7 @@ export class SecuritySystem {
         }
       }
 
-      const userRole = getUserRole(session.user)
+      const userRole = auth.role
       
       // Check role requirements
       if (requiredRole && !this.hasRequiredRole(userRole, requiredRole)) {
@@ -167,6 +234,7 @@ export class SecuritySystem {
           authenticated: true,
           user: session.user,
           authorized: false,
+          auth,
           error: 'Insufficient permissions'
         }
       }
@@ -185,7 +253,8 @@ export class SecuritySystem {
         authenticated: true,
         authorized: true,
         user: session.user,
-        role: userRole
+        role: userRole,
+        auth
       }
     } catch (error) {
       await this.logSecurityEvent('AUTHENTICATION_ERROR', {
@@ -383,13 +452,8 @@ export class SecuritySystem {
       }
     }
 
-    // Store in memory (in production, this should go to a database)
-    this.securityEvents.push(event)
-
-    // Keep only recent events to prevent memory issues
-    if (this.securityEvents.length > 1000) {
-      this.securityEvents = this.securityEvents.slice(-500)
-    }
+    // Recent events and counters for monitoring; the sink below persists them
+    this.securityEvents.add(event)
 
     // Log high severity events immediately
     if (event.severity === 'HIGH' || event.severity === 'CRITICAL') {
@@ -399,21 +463,13 @@ export class SecuritySystem {
       // await this.sendSecurityAlert(event)
     }
 
-    // Store in database for persistence
-    try {
-      if (supabaseAdmin) {
-        await supabaseAdmin
-          .from('security_audit_log')
-          .insert([{
-            event_type: eventType,
-            severity: event.severity,
-            details: event.details,
-            created_at: event.timestamp
-          }])
-      }
-    } catch (error) {
-      console.error('Failed to log security event to database:', error)
-    }
+    // Persisted in batches by the event sink, off the request path
+    securityAuditSink.enqueue({
+      event_type: eventType,
+      severity: event.severity,
+      details: event.details,
+      created_at: event.timestamp
+    }, event.severity)
 
     return event
   }
@@ -430,11 +486,17 @@ export class SecuritySystem {
       limit = 100
     } = options
 
+    // security_audit_log is partitioned by month on created_at, so the date
+    // range limits the scan to the partitions it overlaps. Nothing older
+    // than the retention period is kept, so the range starts no earlier.
+    const retainedFrom = new Date(Date.now() - this.config.security.auditLogRetention)
+    const rangeStart = startDate > retainedFrom ? startDate : retainedFrom
+
     try {
       let query = supabaseAdmin
         .from('security_audit_log')
         .select('*')
-        .gte('created_at', startDate.toISOString())
+        .gte('created_at', rangeStart.toISOString())
         .lte('created_at', endDate.toISOString())
         .order('created_at', { ascending: false })
         .limit(limit)
@@ -460,7 +522,7 @@ export class SecuritySystem {
         byType: {},
         topIPs: {},
         timeRange: {
-          start: startDate.toISOString(),
+          start: rangeStart.toISOString(),
           end: endDate.toISOString()
         }
       }
@@ -496,16 +558,78 @@ export class SecuritySystem {
     }
   }
 
+  /**
+   * Latest security scan snapshot, served without rescanning.
+   * With `refresh` (or before the first scan completes) waits for a rescan;
+   * concurrent callers share one scan in progress.
+   * @returns {Promise<{ scan: Object, cached: boolean, ageMs: number }>}
+   */
+  async getSecurityScan({ refresh = false } = {}) {
+    this.startScanSchedule()
+
+    if (refresh || !this.scanSnapshot) {
+      const scan = await this.refreshSecurityScan()
+      return { scan, cached: false, ageMs: 0 }
+    }
+
+    return {
+      scan: this.scanSnapshot,
+      cached: true,
+      ageMs: Date.now() - Date.parse(this.scanSnapshot.timestamp)
+    }
+  }
+
+  /**
+   * Run a scan unless one is already running; a failed scan keeps the
+   * previous snapshot
+   */
+  refreshSecurityScan() {
+    if (!this.scanInFlight) {
+      const startedAt = Date.now()
+      this.scanInFlight = this.performSecurityScan()
+        .then(result => {
+          if (result.success) {
+            this.scanSnapshot = { ...result, durationMs: Date.now() - startedAt }
+          }
+          return result
+        })
+        .finally(() => {
+          this.scanInFlight = null
+        })
+    }
+    return this.scanInFlight
+  }
+
+  /**
+   * Rescan every `scan.intervalMs`, starting with an immediate scan. Started
+   * at server startup (instrumentation.js); getSecurityScan also starts it
+   * in case the startup hook did not run.
+   */
+  startScanSchedule() {
+    if (this.scanTimer) return
+
+    this.scanTimer = setInterval(() => {
+      this.refreshSecurityScan().catch(() => {})
+    }, this.config.scan.intervalMs)
+    this.scanTimer.unref?.()
+    this.refreshSecurityScan().catch(() => {})
+  }
+
   /**
    * Security vulnerability scan
    */
   async performSecurityScan() {
     const vulnerabilities = []
-    const recommendations = []
 
     try {
+      // The checks are independent; run them together
+      const [envCheck, dbCheck, authCheck] = await Promise.all([
+        this.checkEnvironmentSecurity(),
+        this.checkDatabaseSecurity(),
+        this.checkAuthenticationSecurity()
+      ])
+
       // Check environment configuration
-      const envCheck = await this.checkEnvironmentSecurity()
       if (envCheck.issues.length > 0) {
         vulnerabilities.push({
           type: 'ENVIRONMENT_CONFIGURATION',
@@ -516,7 +640,6 @@ export class SecuritySystem {
       }
 
       // Check database security
-      const dbCheck = await this.checkDatabaseSecurity()
       if (dbCheck.issues.length > 0) {
         vulnerabilities.push({
           type: 'DATABASE_SECURITY',
@@ -527,7 +650,6 @@ export class SecuritySystem {
       }
 
       // Check authentication security
-      const authCheck = await this.checkAuthenticationSecurity()
       if (authCheck.issues.length > 0) {
         vulnerabilities.push({
           type: 'AUTHENTICATION_SECURITY',
@@ -659,17 +781,7 @@ export class SecuritySystem {
   }
 
   cleanupRateLimitStore() {
-    const now = Date.now()
-    const windowMs = this.config.rateLimit.windowMs
-    
-    for (const [ip, requests] of this.rateLimitStore.entries()) {
-      const validRequests = requests.filter(timestamp => timestamp > now - windowMs)
-      if (validRequests.length === 0) {
-        this.rateLimitStore.delete(ip)
-      } else {
-        this.rateLimitStore.set(ip, validRequests)
-      }
-    }
+    this.rateLimitStore.sweep()
   }
 
   async checkEnvironmentSecurity() {
@@ -708,11 +820,11 @@ export class SecuritySystem {
 
     try {
       // Check RLS policies
-      const { data: policies, error } = await supabaseAdmin
+      const { count, error } = await supabaseAdmin
         .from('pg_policies')
-        .select('*')
+        .select('*', { count: 'exact', head: true })
 
-      if (error || !policies || policies.length === 0) {
+      if (error || !count) {
         issues.push('Row Level Security policies may not be properly configured')
         recommendations.push('Ensure RLS policies are enabled and properly configured for all tables')
       }
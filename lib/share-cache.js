@@ -0,0 +1,167 @@
+import crypto from 'crypto'
+
+/**
+ * PropMaster 3.0 - Public share payload cache
+ *
+ * Caches the immutable part of a share (property fields, images, documents
+ * when downloads are allowed, share presentation settings) per token, with a
+ * strong ETag. View counting is not part of the payload: the share page
+ * reports views through the /api/share/[shareToken]/view beacon.
+ *
+ * Entries are dropped when the share or its property changes on this
+ * instance; the TTL bounds staleness on other instances and shared caches.
+ */
+
+// Browsers revalidate after 30s, shared caches after 60s; either may serve
+// a stale copy for another 60s while revalidating in the background.
+// Invalidation is per instance and cannot reach CDNs or browsers, so a
+// deactivated share can still be served for up to two minutes (s-maxage +
+// stale-while-revalidate); keep the sum small.
+export const SHARE_CACHE_MAX_AGE = 30
+export const SHARE_CACHE_S_MAXAGE = 60
+export const SHARE_CACHE_SWR = 60
+
+export class ShareCache {
+  constructor(options = {}) {
+    this.maxEntries = options.maxEntries || 1000
+    this.ttlMs = options.ttlMs || SHARE_CACHE_S_MAXAGE * 1000
+
+    // token -> entry, in least-recently-used order
+    this.entries = new Map()
+    this.tokensByShare = new Map()
+    this.tokensByProperty = new Map()
+    this.loading = new Map()
+
+    this.stats = { hits: 0, misses: 0, invalidations: 0 }
+  }
+
+  get(shareToken) {
+    const entry = this.entries.get(shareToken)
+    if (!entry) return null
+
+    if (Date.now() >= entry.validUntil) {
+      this.delete(shareToken)
+      return null
+    }
+
+    this.entries.delete(shareToken)
+    this.entries.set(shareToken, entry)
+    return entry
+  }
+
+  /**
+   * Cache a payload. `expiresAt` is the share expiry; an entry never
+   * outlives the share it belongs to.
+   */
+  set(shareToken, { shareId, propertyId, expiresAt, body }) {
+    this.delete(shareToken)
+
+    const json = JSON.stringify(body)
+    const entry = {
+      shareId,
+      propertyId,
+      json,
+      etag: `"${crypto.createHash('sha1').update(json).digest('base64url')}"`,
+      expiresAtMs: new Date(expiresAt).getTime(),
+      validUntil: Math.min(Date.now() + this.ttlMs, new Date(expiresAt).getTime())
+    }
+
+    this.entries.set(shareToken, entry)
+    this.index(this.tokensByShare, shareId, shareToken)
+    this.index(this.tokensByProperty, propertyId, shareToken)
+
+    if (this.entries.size > this.maxEntries) {
+      this.delete(this.entries.keys().next().value)
+    }
+    return entry
+  }
+
+  /**
+   * Return the cached entry, or run `loader` once per token even when many
+   * requests miss at the same time. The loader resolves to
+   * `{ cacheable, share, body }`; non-cacheable results are passed through.
+   */
+  async getOrLoad(shareToken, loader) {
+    const cached = this.get(shareToken)
+    if (cached) {
+      this.stats.hits++
+      return { entry: cached }
+    }
+
+    this.stats.misses++
+    if (!this.loading.has(shareToken)) {
+      const pending = Promise.resolve()
+        .then(loader)
+        .then(result => result.cacheable
+          ? { entry: this.set(shareToken, { ...result.share, body: result.body }) }
+          : { result })
+        .finally(() => this.loading.delete(shareToken))
+      this.loading.set(shareToken, pending)
+    }
+    return this.loading.get(shareToken)
+  }
+
+  invalidateShare(shareId) {
+    this.invalidateIndexed(this.tokensByShare, shareId)
+  }
+
+  invalidateProperty(propertyId) {
+    this.invalidateIndexed(this.tokensByProperty, propertyId)
+  }
+
+  invalidateIndexed(indexMap, key) {
+    const tokens = indexMap.get(key)
+    if (!tokens) return
+    for (const token of [...tokens]) {
+      this.delete(token)
+      this.stats.invalidations++
+    }
+  }
+
+  index(indexMap, key, shareToken) {
+    if (!indexMap.has(key)) indexMap.set(key, new Set())
+    indexMap.get(key).add(shareToken)
+  }
+
+  unindex(indexMap, key, shareToken) {
+    const tokens = indexMap.get(key)
+    if (!tokens) return
+    tokens.delete(shareToken)
+    if (tokens.size === 0) indexMap.delete(key)
+  }
+
+  delete(shareToken) {
+    const entry = this.entries.get(shareToken)
+    if (!entry) return
+    this.entries.delete(shareToken)
+    this.unindex(this.tokensByShare, entry.shareId, shareToken)
+    this.unindex(this.tokensByProperty, entry.propertyId, shareToken)
+  }
+
+  /**
+   * Cache-Control for an entry; max-age never runs past the share expiry
+   */
+  cacheControl(entry) {
+    const secondsLeft = Math.max(0, Math.floor((entry.expiresAtMs - Date.now()) / 1000))
+    const maxAge = Math.min(SHARE_CACHE_MAX_AGE, secondsLeft)
+    const sMaxAge = Math.min(SHARE_CACHE_S_MAXAGE, secondsLeft)
+    const swr = Math.min(SHARE_CACHE_SWR, Math.max(0, secondsLeft - sMaxAge))
+    return `public, max-age=${maxAge}, s-maxage=${sMaxAge}, stale-while-revalidate=${swr}`
+  }
+
+  getStats() {
+    return { ...this.stats, size: this.entries.size, maxEntries: this.maxEntries }
+  }
+}
+
+// One cache per process, kept across dev hot reloads
+export const shareCache = globalThis.__propmasterShareCache || (globalThis.__propmasterShareCache = new ShareCache())
+
+/**
+ * Drop cached share payloads for properties that were updated or deleted
+ */
+export function invalidateSharedProperties(propertyIds = []) {
+  for (const propertyId of propertyIds) {
+    shareCache.invalidateProperty(propertyId)
+  }
+}
@@ -0,0 +1,359 @@
+import { SmtpClient, getSmtpConfig } from '@/lib/smtp-client'
+
+/**
+ * PropMaster 3.0 - Share invitation emails
+ *
+ * - Templates are compiled once at load into static parts and slots, so
+ *   rendering is a single pass with HTML escaping, not re-parsing markup
+ * - ShareEmailQueue renders and sends invitations off the request path,
+ *   a few workers at a time, each reusing one SMTP connection, and keeps
+ *   per-batch progress for the bulk sharing API
+ */
+
+const HTML_ESCAPES = { '&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;' }
+
+export const escapeHtml = (value) => String(value).replace(/[&<>"']/g, ch => HTML_ESCAPES[ch])
+
+/**
+ * Compile a template with `{{name}}` (escaped) and `{{{name}}}` (raw) slots.
+ * Missing values render as empty strings.
+ */
+export function compileTemplate(source, { escape = escapeHtml } = {}) {
+  const parts = source.split(/(\{\{\{?\w+\}?\}\})/).map(token => {
+    const match = /^\{\{(\{?)(\w+)\}?\}\}$/.exec(token)
+    return match ? { key: match[2], raw: match[1] === '{' } : token
+  })
+
+  return (values) => {
+    let output = ''
+    for (const part of parts) {
+      if (typeof part === 'string') {
+        output += part
+      } else {
+        const value = values[part.key]
+        if (value !== null && value !== undefined) {
+          output += part.raw ? value : escape(value)
+        }
+      }
+    }
+    return output
+  }
+}
+
+const plain = { escape: String }
+
+const renderPropertyHtml = compileTemplate(`
+          <div style="border: 1px solid #e5e7eb; border-radius: 8px; padding: 20px; margin: 20px 0;">
+            <h3 style="margin-top: 0;">{{name}}</h3>
+            {{{locationLine}}}
+            {{{priceLine}}}
+            <div style="text-align: center; margin: 20px 0 0;">
+              <a href="{{sharingUrl}}"
+                 style="background: #2563eb; color: white; padding: 12px 24px; text-decoration: none; border-radius: 6px; display: inline-block;">
+                View Property
+              </a>
+            </div>
+          </div>`)
+
+const renderLocationHtml = compileTemplate('<p><strong>Location:</strong> {{location}}</p>')
+const renderPriceHtml = compileTemplate('<p><strong>Price:</strong> ₹{{price}}</p>')
+
+const renderMessageHtml = compileTemplate(`
+          <div style="background: #f3f4f6; padding: 15px; border-radius: 8px; margin: 20px 0;">
+            <p style="margin: 0;"><em>{{customMessage}}</em></p>
+          </div>`)
+
+const renderEmailHtml = compileTemplate(`
+        <div style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto;">
+          <h2 style="color: #2563eb;">Property Viewing Invitation</h2>
+
+          <p>{{greeting}}</p>
+          {{{properties}}}
+          {{{message}}}
+
+          <p style="color: #6b7280; font-size: 14px;">
+            {{expiryNote}}
+            <br>
+            If you have any questions, please contact us directly.
+          </p>
+
+          <hr style="border: none; border-top: 1px solid #e5e7eb; margin: 30px 0;">
+          <p style="color: #9ca3af; font-size: 12px; text-align: center;">
+            PropMaster Real Estate Management System
+          </p>
+        </div>
+      `)
+
+const renderPropertyText = compileTemplate(`
+        {{name}}
+        {{locationLine}}
+        {{priceLine}}
+        View Property: {{sharingUrl}}
+`, plain)
+
+const renderEmailText = compileTemplate(`
+        Property Viewing Invitation
+
+        {{greeting}}
+        {{properties}}
+        {{messageLine}}
+
+        {{expiryNote}}
+      `, plain)
+
+const formatPrice = (price) => Number(price).toLocaleString()
+
+/**
+ * Render a sharing invitation for one or more properties.
+ *
+ * @param {Object} input
+ * @param {Array<{ name, location, price, sharingUrl }>} input.properties
+ * @param {string} [input.customMessage]
+ * @param {string} input.expiresAt - earliest expiry of the included links
+ * @returns {{ subject: string, html: string, text: string }}
+ */
+export function renderShareEmail({ properties, customMessage = null, expiresAt }) {
+  const single = properties.length === 1
+  const greeting = single
+    ? 'You have been invited to view the following property:'
+    : `You have been invited to view the following ${properties.length} properties:`
+  const linkWord = single ? 'This link' : 'These links'
+  const expiryNote = `${linkWord} will expire on ${new Date(expiresAt).toLocaleDateString()}.`
+
+  let propertiesHtml = ''
+  let propertiesText = ''
+  for (const property of properties) {
+    const hasPrice = property.price !== null && property.price !== undefined && property.price !== ''
+    propertiesHtml += renderPropertyHtml({
+      name: property.name,
+      sharingUrl: property.sharingUrl,
+      locationLine: property.location ? renderLocationHtml({ location: property.location }) : '',
+      priceLine: hasPrice ? renderPriceHtml({ price: formatPrice(property.price) }) : ''
+    })
+    propertiesText += renderPropertyText({
+      name: property.name,
+      sharingUrl: property.sharingUrl,
+      locationLine: property.location ? `Location: ${property.location}` : '',
+      priceLine: hasPrice ? `Price: ₹${formatPrice(property.price)}` : ''
+    })
+  }
+
+  return {
+    subject: single
+      ? `Property Viewing: ${properties[0].name}`
+      : `Property Viewing: ${properties.length} properties shared with you`,
+    html: renderEmailHtml({
+      greeting,
+      properties: propertiesHtml,
+      message: customMessage ? renderMessageHtml({ customMessage }) : '',
+      expiryNote
+    }),
+    text: renderEmailText({
+      greeting,
+      properties: propertiesText,
+      messageLine: customMessage ? `Message: ${customMessage}` : '',
+      expiryNote
+    })
+  }
+}
+
+export class ShareEmailQueue {
+  constructor(options = {}) {
+    this.createTransport = options.createTransport || (() => {
+      const config = getSmtpConfig()
+      return config ? new SmtpClient(config) : null
+    })
+    this.config = {
+      concurrency: 2,
+      maxQueueSize: 5000,
+      maxAttempts: 3,
+      retryDelayMs: 2000,
+      maxTrackedBatches: 100,
+      ...options.config
+    }
+
+    this.jobs = []
+    this.head = 0
+    this.pendingRetries = 0
+    this.workers = 0
+    this.batches = new Map()
+
+    this.metrics = {
+      queued: 0,
+      sent: 0,
+      failed: 0,
+      skipped: 0,
+      rejected: 0,
+      retried: 0,
+      lastSentAt: null,
+      lastError: null
+    }
+  }
+
+  get depth() {
+    return this.jobs.length - this.head
+  }
+
+  /**
+   * Queue one email per message. Each message is `{ to, email }`, where
+   * `email` is the renderShareEmail input; rendering happens in the worker.
+   * Messages beyond the queue capacity are rejected and counted on the batch.
+   * `createdBy` is kept on the batch so only its creator can read it.
+   */
+  enqueueBatch(batchId, messages, { createdBy = null } = {}) {
+    const batch = {
+      id: batchId,
+      createdBy,
+      total: messages.length,
+      queued: 0,
+      sent: 0,
+      failed: 0,
+      skipped: 0,
+      rejected: 0,
+      errors: [],
+      createdAt: new Date().toISOString(),
+      completedAt: null
+    }
+    this.trackBatch(batch)
+
+    for (const message of messages) {
+      if (this.depth + this.pendingRetries >= this.config.maxQueueSize) {
+        batch.rejected++
+        this.metrics.rejected++
+        continue
+      }
+      this.jobs.push({ batchId, to: message.to, email: message.email, attempts: 0 })
+      batch.queued++
+      this.metrics.queued++
+    }
+
+    this.completeIfDone(batch)
+    this.startWorkers()
+    return { queued: batch.queued, rejected: batch.rejected }
+  }
+
+  trackBatch(batch) {
+    this.batches.set(batch.id, batch)
+    if (this.batches.size <= this.config.maxTrackedBatches) return
+
+    for (const [id, tracked] of this.batches) {
+      if (tracked.completedAt) {
+        this.batches.delete(id)
+        return
+      }
+    }
+  }
+
+  getBatch(batchId) {
+    const batch = this.batches.get(batchId)
+    if (!batch) return null
+    const settled = batch.sent + batch.failed + batch.skipped
+    return {
+      ...batch,
+      pending: batch.queued - settled,
+      errors: [...batch.errors],
+      status: batch.completedAt ? 'completed' : 'sending'
+    }
+  }
+
+  next() {
+    if (this.head >= this.jobs.length) return null
+    const job = this.jobs[this.head]
+    this.jobs[this.head++] = undefined
+    if (this.head > 1024 && this.head * 2 > this.jobs.length) {
+      this.jobs = this.jobs.slice(this.head)
+      this.head = 0
+    }
+    return job
+  }
+
+  startWorkers() {
+    while (this.workers < this.config.concurrency && this.depth > 0) {
+      this.workers++
+      this.runWorker().finally(() => {
+        this.workers--
+        // Jobs requeued while this worker was closing its connection
+        if (this.depth > 0) this.startWorkers()
+      })
+    }
+  }
+
+  async runWorker() {
+    const transport = this.createTransport()
+    try {
+      let job
+      while ((job = this.next())) {
+        await this.process(job, transport)
+        // Let request handlers run between messages
+        await new Promise(resolve => setImmediate(resolve))
+      }
+    } finally {
+      await transport?.close().catch(() => {})
+    }
+  }
+
+  async process(job, transport) {
+    if (!transport) {
+      this.settle(job, 'skipped', 'SMTP is not configured')
+      return
+    }
+
+    try {
+      const message = renderShareEmail(job.email)
+      await transport.send({ to: job.to, ...message })
+      this.metrics.lastSentAt = new Date().toISOString()
+      this.settle(job, 'sent')
+    } catch (error) {
+      transport.reset()
+      job.attempts++
+      this.metrics.lastError = error.message
+
+      if (job.attempts >= this.config.maxAttempts) {
+        console.error(`Failed to send share email to ${job.to}:`, error.message)
+        this.settle(job, 'failed', error.message)
+        return
+      }
+
+      this.metrics.retried++
+      this.pendingRetries++
+      const timer = setTimeout(() => {
+        this.pendingRetries--
+        this.jobs.push(job)
+        this.startWorkers()
+      }, this.config.retryDelayMs * job.attempts)
+      timer.unref?.()
+    }
+  }
+
+  settle(job, outcome, error = null) {
+    this.metrics[outcome]++
+    const batch = this.batches.get(job.batchId)
+    if (!batch) return
+
+    batch[outcome]++
+    if (error && batch.errors.length < 10) {
+      batch.errors.push({ to: job.to, error })
+    }
+    this.completeIfDone(batch)
+  }
+
+  completeIfDone(batch) {
+    if (batch.sent + batch.failed + batch.skipped === batch.queued) {
+      batch.completedAt = new Date().toISOString()
+    }
+  }
+
+  getMetrics() {
+    return {
+      ...this.metrics,
+      queueDepth: this.depth,
+      pendingRetries: this.pendingRetries,
+      workers: this.workers,
+      trackedBatches: this.batches.size
+    }
+  }
+}
+
+// One queue per process, kept across dev hot reloads
+export const shareEmailQueue = globalThis.__propmasterShareEmailQueue ||
+  (globalThis.__propmasterShareEmailQueue = new ShareEmailQueue())
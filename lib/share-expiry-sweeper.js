@@ -0,0 +1,144 @@
+import { supabaseAdmin } from '@/lib/supabase'
+import { shareCache } from '@/lib/share-cache'
+import { shareTokenGuard } from '@/lib/share-token-guard'
+
+/**
+ * PropMaster 3.0 - Sharing link expiry sweeper
+ *
+ * Deactivates expired and view-limit-reached sharing links in the
+ * background, in bounded batches (sweep_expired_shares, which walks the
+ * partial indexes on active shares and skips rows locked by live views).
+ *
+ * Nothing depends on the sweep having run: getShareStatus, the share token
+ * guard and the share RPCs all check expires_at and view limits themselves,
+ * so the sweeper only tidies is_active and never runs in the request path.
+ */
+
+export class ShareExpirySweeper {
+  constructor(options = {}) {
+    this.client = options.client !== undefined ? options.client : supabaseAdmin
+    this.config = {
+      intervalMs: 5 * 60 * 1000,
+      batchSize: 500,
+      maxBatchesPerRun: 20,
+      ...options.config
+    }
+
+    this.timer = null
+    this.running = null
+
+    this.metrics = {
+      runs: 0,
+      batches: 0,
+      expired: 0,
+      viewLimited: 0,
+      lastRunAt: null,
+      lastRunMs: null,
+      lastRunDeactivated: 0,
+      maxRunMs: 0,
+      totalRunMs: 0,
+      lastBatchMs: null,
+      maxBatchMs: 0,
+      lastError: null
+    }
+  }
+
+  start() {
+    if (this.timer || !this.client) return
+    this.timer = setInterval(() => {
+      this.sweep().catch(() => {})
+    }, this.config.intervalMs)
+    this.timer.unref?.()
+  }
+
+  stop() {
+    if (this.timer) {
+      clearInterval(this.timer)
+      this.timer = null
+    }
+  }
+
+  /**
+   * Run one sweep. Concurrent callers share the sweep in progress.
+   * @returns {Promise<{ expired: number, viewLimited: number, batches: number }>}
+   */
+  sweep() {
+    if (!this.running) {
+      this.running = this.runBatches().finally(() => {
+        this.running = null
+      })
+    }
+    return this.running
+  }
+
+  async runBatches() {
+    const startedAt = Date.now()
+    const result = { expired: 0, viewLimited: 0, batches: 0 }
+
+    try {
+      for (let i = 0; i < this.config.maxBatchesPerRun; i++) {
+        const batchStartedAt = Date.now()
+        const { data, error } = await this.client.rpc('sweep_expired_shares', {
+          p_batch_size: this.config.batchSize
+        })
+
+        if (error) throw error
+
+        const batchMs = Date.now() - batchStartedAt
+        this.metrics.lastBatchMs = batchMs
+        this.metrics.maxBatchMs = Math.max(this.metrics.maxBatchMs, batchMs)
+        this.metrics.batches++
+        result.batches++
+
+        this.forgetSwept(data.expired)
+        this.forgetSwept(data.view_limited)
+        result.expired += data.expired.length
+        result.viewLimited += data.view_limited.length
+
+        // A short batch means nothing is left to sweep
+        if (data.expired.length < this.config.batchSize && data.view_limited.length < this.config.batchSize) {
+          break
+        }
+      }
+    } catch (error) {
+      this.metrics.lastError = error.message
+      console.error('Share expiry sweep failed:', error.message)
+      throw error
+    } finally {
+      const runMs = Date.now() - startedAt
+      this.metrics.runs++
+      this.metrics.expired += result.expired
+      this.metrics.viewLimited += result.viewLimited
+      this.metrics.lastRunAt = new Date(startedAt).toISOString()
+      this.metrics.lastRunMs = runMs
+      this.metrics.lastRunDeactivated = result.expired + result.viewLimited
+      this.metrics.maxRunMs = Math.max(this.metrics.maxRunMs, runMs)
+      this.metrics.totalRunMs += runMs
+    }
+
+    return result
+  }
+
+  forgetSwept(shares = []) {
+    for (const share of shares) {
+      shareTokenGuard.forget(share.share_token)
+      shareCache.invalidateShare(share.id)
+    }
+  }
+
+  getMetrics() {
+    const { totalRunMs, ...metrics } = this.metrics
+    return {
+      ...metrics,
+      running: Boolean(this.running),
+      scheduled: Boolean(this.timer),
+      averageRunMs: this.metrics.runs > 0 ? Math.round(totalRunMs / this.metrics.runs) : null,
+      intervalMs: this.config.intervalMs,
+      batchSize: this.config.batchSize
+    }
+  }
+}
+
+// One sweeper per process, kept across dev hot reloads
+export const shareExpirySweeper = globalThis.__propmasterShareExpirySweeper ||
+  (globalThis.__propmasterShareExpirySweeper = new ShareExpirySweeper())
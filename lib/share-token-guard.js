@@ -0,0 +1,347 @@
+import { supabaseAdmin } from '@/lib/supabase'
+
+/**
+ * PropMaster 3.0 - Share token guard
+ *
+ * Rejects unknown, deactivated and expired share tokens without touching the
+ * share tables, so token-guessing floods on the public share routes cost
+ * memory lookups instead of queries.
+ *
+ * - Index: every active share token -> share id, expiry and gating flags,
+ *   warmed from property_shares on first use
+ * - Incremental syncs (rows updated since the last sync) run at most once
+ *   every few seconds, shared by all concurrent callers: awaited on a miss
+ *   or before rejecting an expired entry, and in the background otherwise,
+ *   so shares created, extended or regated on other instances are picked up
+ * - A miss is rejected when the index synced successfully within the sync
+ *   interval; with a cold index or a failed sync it is passed on to the
+ *   database rather than rejected
+ * - Negative cache: bounded LRU of tokens known to be invalid. Expired
+ *   tokens stay in the index instead, so they keep answering EXPIRED_LINK
+ *
+ * The guard only ever rejects. Accepted tokens are still validated by the
+ * database, and a database rejection is fed back into the guard.
+ */
+
+const TOKEN_PATTERN = /^[A-Za-z0-9_-]{16,128}$/
+const SYNC_OVERLAP_MS = 5000
+
+// Columns are TIMESTAMP (no zone) holding UTC values
+const parseTimestamp = (value) => {
+  if (!value) return Infinity
+  const text = String(value)
+  return Date.parse(/[zZ]|[+-]\d{2}:?\d{2}$/.test(text) ? text : `${text}Z`)
+}
+
+export class ShareTokenGuard {
+  constructor(options = {}) {
+    this.client = options.client !== undefined ? options.client : supabaseAdmin
+    this.config = {
+      negativeCacheSize: 10000,
+      negativeTtlMs: 10 * 60 * 1000,
+      syncIntervalMs: 5000,
+      fullRefreshMs: 30 * 60 * 1000,
+      pageSize: 1000,
+      ...options.config
+    }
+
+    this.index = new Map()
+    this.negative = new Map()
+    this.warmed = false
+    this.warming = null
+    this.syncing = null
+    this.lastSyncAt = null
+    this.lastSyncAttemptMs = 0
+    this.lastSyncOk = false
+    this.lastFullRefreshMs = 0
+
+    this.stats = {
+      checked: 0,
+      rejectedMalformed: 0,
+      rejectedNegative: 0,
+      rejectedUnknown: 0,
+      rejectedExpired: 0,
+      allowedUnsynced: 0,
+      syncs: 0,
+      fullRefreshes: 0,
+      lastError: null
+    }
+  }
+
+  /**
+   * Check a token before any share query.
+   * @returns {{ allowed: boolean, errorCode?: string, gated?: boolean, shareId?: string }}
+   */
+  async check(shareToken) {
+    this.stats.checked++
+
+    if (typeof shareToken !== 'string' || !TOKEN_PATTERN.test(shareToken)) {
+      this.stats.rejectedMalformed++
+      return { allowed: false, errorCode: 'INVALID_SHARE_TOKEN' }
+    }
+
+    // Keep expiry and gating current for tokens that are found as well;
+    // this also clears negative entries for shares created meanwhile
+    if (this.warmed && !this.syncing && Date.now() - this.lastSyncAttemptMs >= this.config.syncIntervalMs) {
+      this.sync()
+    }
+
+    if (this.isNegative(shareToken)) {
+      this.stats.rejectedNegative++
+      return { allowed: false, errorCode: 'INVALID_SHARE_TOKEN' }
+    }
+
+    // Without a usable index, let the database decide
+    if (!(await this.ensureWarm())) {
+      return { allowed: true }
+    }
+
+    let entry = this.index.get(shareToken)
+    if (!entry) {
+      // A recent successful sync proves the token unknown; otherwise the
+      // database decides (and its rejection lands in the negative cache)
+      if (!(await this.sync())) {
+        this.stats.allowedUnsynced++
+        return { allowed: true }
+      }
+      entry = this.index.get(shareToken)
+      if (!entry) {
+        this.stats.rejectedUnknown++
+        this.remember(shareToken)
+        return { allowed: false, errorCode: 'INVALID_SHARE_TOKEN' }
+      }
+    }
+
+    if (Date.now() >= entry.expiresAtMs) {
+      // The share may have been extended on another instance
+      await this.sync()
+      entry = this.index.get(shareToken)
+      if (!entry) {
+        this.stats.rejectedNegative++
+        return { allowed: false, errorCode: 'INVALID_SHARE_TOKEN' }
+      }
+      if (Date.now() >= entry.expiresAtMs) {
+        this.stats.rejectedExpired++
+        return { allowed: false, errorCode: 'EXPIRED_LINK' }
+      }
+    }
+
+    return { allowed: true, gated: entry.gated, shareId: entry.shareId }
+  }
+
+  /**
+   * Record a share created or updated on this instance
+   */
+  track(share) {
+    if (!share?.share_token) return
+
+    if (share.is_active === false) {
+      this.forget(share.share_token)
+      return
+    }
+
+    this.negative.delete(share.share_token)
+    this.index.set(share.share_token, {
+      shareId: share.id,
+      expiresAtMs: parseTimestamp(share.expires_at),
+      gated: (share.allowed_views !== null && share.allowed_views !== undefined) || Boolean(share.require_client_info)
+    })
+  }
+
+  /**
+   * Record a token the database reported as expired
+   */
+  expire(shareToken) {
+    const entry = this.index.get(shareToken)
+    this.negative.delete(shareToken)
+    this.index.set(shareToken, {
+      shareId: entry?.shareId ?? null,
+      expiresAtMs: Math.min(entry?.expiresAtMs ?? Infinity, Date.now()),
+      gated: entry?.gated ?? false
+    })
+  }
+
+  /**
+   * Drop a token that is no longer valid (deactivated, or rejected by the database)
+   */
+  forget(shareToken) {
+    this.index.delete(shareToken)
+    this.remember(shareToken)
+  }
+
+  forgetShare(shareId) {
+    for (const [token, entry] of this.index) {
+      if (entry.shareId === shareId) {
+        this.forget(token)
+      }
+    }
+  }
+
+  isNegative(shareToken) {
+    const expiresAt = this.negative.get(shareToken)
+    if (expiresAt === undefined) return false
+    if (Date.now() >= expiresAt) {
+      this.negative.delete(shareToken)
+      return false
+    }
+    return true
+  }
+
+  remember(shareToken) {
+    this.negative.delete(shareToken)
+    this.negative.set(shareToken, Date.now() + this.config.negativeTtlMs)
+    if (this.negative.size > this.config.negativeCacheSize) {
+      this.negative.delete(this.negative.keys().next().value)
+    }
+  }
+
+  /**
+   * Load all active, unexpired shares once (and again every fullRefreshMs)
+   */
+  async ensureWarm() {
+    if (!this.client) return false
+
+    if (!this.warming && Date.now() - this.lastFullRefreshMs >= this.config.fullRefreshMs) {
+      this.warming = this.fullRefresh().finally(() => {
+        this.warming = null
+      })
+    }
+
+    // A stale but warm index keeps serving while the refresh runs
+    if (this.warmed) return true
+    return this.warming || false
+  }
+
+  async fullRefresh() {
+    const startedAt = new Date().toISOString()
+
+    try {
+      // Only unexpired shares are loaded; keep the expired entries already known
+      const index = new Map()
+      const now = Date.now()
+      for (const [token, entry] of this.index) {
+        if (now >= entry.expiresAtMs) index.set(token, entry)
+      }
+      let lastId = null
+
+      while (true) {
+        let query = this.client
+          .from('property_shares')
+          .select('id, share_token, expires_at, allowed_views, require_client_info')
+          .eq('is_active', true)
+          .gt('expires_at', startedAt)
+          .order('id', { ascending: true })
+          .limit(this.config.pageSize)
+
+        if (lastId) {
+          query = query.gt('id', lastId)
+        }
+
+        const { data, error } = await query
+        if (error) throw error
+
+        for (const share of data) {
+          index.set(share.share_token, {
+            shareId: share.id,
+            expiresAtMs: parseTimestamp(share.expires_at),
+            gated: share.allowed_views !== null || Boolean(share.require_client_info)
+          })
+        }
+
+        if (data.length < this.config.pageSize) break
+        lastId = data[data.length - 1].id
+      }
+
+      this.index = index
+      this.warmed = true
+      this.lastSyncAt = startedAt
+      this.lastSyncAttemptMs = Date.now()
+      this.lastSyncOk = true
+      this.lastFullRefreshMs = Date.now()
+      this.stats.fullRefreshes++
+      return true
+    } catch (error) {
+      this.stats.lastError = error.message
+      console.error('Failed to warm share token index:', error.message)
+      // Retry on the next check instead of hammering the database
+      this.lastFullRefreshMs = Date.now() - this.config.fullRefreshMs + this.config.syncIntervalMs
+      return this.warmed
+    }
+  }
+
+  /**
+   * Pull shares changed since the last sync. Throttled to one query per
+   * syncIntervalMs; concurrent callers wait for the one in flight.
+   * Resolves true when the index is known to be current: the pull (or the
+   * one within the last syncIntervalMs) completed without error.
+   */
+  async sync() {
+    if (this.syncing) {
+      return this.syncing
+    }
+    if (Date.now() - this.lastSyncAttemptMs < this.config.syncIntervalMs) {
+      return this.lastSyncOk
+    }
+
+    this.lastSyncAttemptMs = Date.now()
+    this.syncing = this.pullChanges().then((ok) => {
+      this.lastSyncOk = ok
+      return ok
+    }).finally(() => {
+      this.syncing = null
+    })
+    return this.syncing
+  }
+
+  async pullChanges() {
+    // Overlap by a few seconds to tolerate clock skew; re-applying rows is harmless
+    const startedAt = new Date(Date.now() - SYNC_OVERLAP_MS).toISOString()
+
+    try {
+      let query = this.client
+        .from('property_shares')
+        .select('id, share_token, expires_at, allowed_views, require_client_info, is_active, updated_at')
+        .order('updated_at', { ascending: true })
+        .limit(this.config.pageSize)
+
+      if (this.lastSyncAt) {
+        query = query.gte('updated_at', this.lastSyncAt)
+      }
+
+      const { data, error } = await query
+      if (error) throw error
+
+      for (const share of data) {
+        this.track(share)
+      }
+
+      this.stats.syncs++
+
+      // A full page means more changes are pending; continue from the last row next time
+      if (data.length === this.config.pageSize) {
+        this.lastSyncAt = data[data.length - 1].updated_at
+        return false
+      }
+      this.lastSyncAt = startedAt
+      return true
+    } catch (error) {
+      this.stats.lastError = error.message
+      console.error('Failed to sync share token index:', error.message)
+      return false
+    }
+  }
+
+  getStats() {
+    return {
+      ...this.stats,
+      warmed: this.warmed,
+      indexSize: this.index.size,
+      negativeCacheSize: this.negative.size,
+      lastSyncAt: this.lastSyncAt
+    }
+  }
+}
+
+// One guard per process, kept across dev hot reloads
+export const shareTokenGuard = globalThis.__propmasterShareTokenGuard ||
+  (globalThis.__propmasterShareTokenGuard = new ShareTokenGuard())
@@ -0,0 +1,236 @@
+import net from 'net'
+import tls from 'tls'
+import os from 'os'
+import crypto from 'crypto'
+
+/**
+ * PropMaster 3.0 - Minimal SMTP client
+ *
+ * Enough SMTP to hand mail to a relay: EHLO, STARTTLS, AUTH PLAIN,
+ * MAIL/RCPT/DATA, with one connection reused for a run of messages.
+ * Bodies are base64 encoded, so no line is ever dot-stuffed or too long.
+ *
+ * Configured from SMTP_HOST, SMTP_PORT, SMTP_SECURE, SMTP_USER, SMTP_PASS
+ * and SMTP_FROM. In development it defaults to the local stand-in started
+ * by `yarn smtp:sink` (localhost:2525).
+ */
+
+const COMMAND_TIMEOUT_MS = 30000
+
+export function getSmtpConfig() {
+  const isDevelopment = process.env.NODE_ENV !== 'production'
+  const host = process.env.SMTP_HOST || (isDevelopment ? 'localhost' : null)
+
+  if (!host) return null
+
+  const secure = process.env.SMTP_SECURE === 'true'
+  return {
+    host,
+    port: parseInt(process.env.SMTP_PORT) || (process.env.SMTP_HOST ? (secure ? 465 : 587) : 2525),
+    secure,
+    user: process.env.SMTP_USER || null,
+    pass: process.env.SMTP_PASS || null,
+    from: process.env.SMTP_FROM || 'PropMaster <no-reply@propmaster.local>'
+  }
+}
+
+// Header values never carry line breaks, so they cannot inject headers
+const headerValue = (value) => String(value).replace(/[\r\n]+/g, ' ')
+
+const encodeHeader = (value) => /^[\x20-\x7e]*$/.test(value)
+  ? value
+  : `=?UTF-8?B?${Buffer.from(value, 'utf8').toString('base64')}?=`
+
+const base64Lines = (value) => Buffer.from(value, 'utf8').toString('base64').replace(/.{76}/g, '$&\r\n')
+
+const addressOf = (value) => {
+  const match = /<([^>]+)>/.exec(value)
+  return match ? match[1] : value
+}
+
+/**
+ * Build a multipart/alternative message
+ */
+export function buildMimeMessage({ from, to, subject, text, html }) {
+  const boundary = `pm-${crypto.randomBytes(12).toString('hex')}`
+  const domain = addressOf(from).split('@')[1] || 'propmaster.local'
+
+  return [
+    `From: ${headerValue(from)}`,
+    `To: ${headerValue(to)}`,
+    `Subject: ${encodeHeader(headerValue(subject))}`,
+    `Date: ${new Date().toUTCString()}`,
+    `Message-ID: <${crypto.randomUUID()}@${domain}>`,
+    'MIME-Version: 1.0',
+    `Content-Type: multipart/alternative; boundary="${boundary}"`,
+    '',
+    `--${boundary}`,
+    'Content-Type: text/plain; charset=UTF-8',
+    'Content-Transfer-Encoding: base64',
+    '',
+    base64Lines(text),
+    `--${boundary}`,
+    'Content-Type: text/html; charset=UTF-8',
+    'Content-Transfer-Encoding: base64',
+    '',
+    base64Lines(html),
+    `--${boundary}--`,
+    ''
+  ].join('\r\n')
+}
+
+/**
+ * Line reader over a socket that resolves one (possibly multi-line) reply at a time
+ */
+class ReplyReader {
+  constructor(socket) {
+    this.attach(socket)
+  }
+
+  attach(socket) {
+    this.socket = socket
+    this.buffer = ''
+    this.lines = []
+    this.waiting = null
+    this.error = null
+
+    socket.on('data', chunk => {
+      this.buffer += chunk.toString('utf8')
+      let index
+      while ((index = this.buffer.indexOf('\r\n')) !== -1) {
+        this.lines.push(this.buffer.slice(0, index))
+        this.buffer = this.buffer.slice(index + 2)
+      }
+      this.deliver()
+    })
+    socket.on('error', error => {
+      this.error = error
+      this.deliver()
+    })
+    socket.on('close', () => {
+      this.error = this.error || new Error('SMTP connection closed')
+      this.deliver()
+    })
+  }
+
+  deliver() {
+    if (!this.waiting) return
+
+    const end = this.lines.findIndex(line => line[3] !== '-')
+    if (end !== -1) {
+      const lines = this.lines.splice(0, end + 1)
+      const { resolve } = this.waiting
+      this.waiting = null
+      resolve({ code: parseInt(lines[lines.length - 1].slice(0, 3)), lines })
+    } else if (this.error) {
+      const { reject } = this.waiting
+      this.waiting = null
+      reject(this.error)
+    }
+  }
+
+  read() {
+    return new Promise((resolve, reject) => {
+      const timer = setTimeout(() => {
+        this.waiting = null
+        reject(new Error('SMTP server timed out'))
+      }, COMMAND_TIMEOUT_MS)
+
+      this.waiting = {
+        resolve: (reply) => { clearTimeout(timer); resolve(reply) },
+        reject: (error) => { clearTimeout(timer); reject(error) }
+      }
+      this.deliver()
+    })
+  }
+}
+
+export class SmtpClient {
+  constructor(config) {
+    this.config = config
+    this.socket = null
+    this.reader = null
+  }
+
+  async command(line, expected) {
+    if (line !== null) {
+      this.socket.write(`${line}\r\n`)
+    }
+    const reply = await this.reader.read()
+    if (!expected.includes(reply.code)) {
+      const shown = line && line.startsWith('AUTH') ? 'AUTH' : line
+      throw new Error(`SMTP ${shown || 'greeting'} failed: ${reply.lines.join(' ')}`)
+    }
+    return reply
+  }
+
+  connect() {
+    const { host, port, secure } = this.config
+    return new Promise((resolve, reject) => {
+      const socket = secure
+        ? tls.connect({ host, port, servername: host }, () => resolve(socket))
+        : net.connect({ host, port }, () => resolve(socket))
+      socket.once('error', reject)
+    })
+  }
+
+  async open() {
+    if (this.socket) return
+
+    this.socket = await this.connect()
+    this.reader = new ReplyReader(this.socket)
+    await this.command(null, [220])
+
+    let hello = await this.command(`EHLO ${os.hostname()}`, [250])
+
+    if (!this.config.secure && hello.lines.some(line => /STARTTLS/i.test(line))) {
+      await this.command('STARTTLS', [220])
+      this.socket.removeAllListeners('data')
+      this.socket.removeAllListeners('close')
+      this.socket = await new Promise((resolve, reject) => {
+        const upgraded = tls.connect({ socket: this.socket, servername: this.config.host }, () => resolve(upgraded))
+        upgraded.once('error', reject)
+      })
+      this.reader.attach(this.socket)
+      hello = await this.command(`EHLO ${os.hostname()}`, [250])
+    }
+
+    if (this.config.user) {
+      const credentials = Buffer.from(`\0${this.config.user}\0${this.config.pass || ''}`).toString('base64')
+      await this.command(`AUTH PLAIN ${credentials}`, [235])
+    }
+  }
+
+  /**
+   * Send one message over the open connection (opening it if needed)
+   */
+  async send({ to, subject, text, html }) {
+    await this.open()
+
+    const from = this.config.from
+    await this.command(`MAIL FROM:<${headerValue(addressOf(from))}>`, [250])
+    await this.command(`RCPT TO:<${headerValue(addressOf(to))}>`, [250, 251])
+    await this.command('DATA', [354])
+    this.socket.write(buildMimeMessage({ from, to, subject, text, html }))
+    await this.command('.', [250])
+  }
+
+  async close() {
+    if (!this.socket) return
+    try {
+      await this.command('QUIT', [221])
+    } catch {
+      // The message is already accepted; a failed QUIT changes nothing
+    }
+    this.reset()
+  }
+
+  /**
+   * Drop the connection without QUIT, e.g. after a failed transaction
+   */
+  reset() {
+    this.socket?.destroy()
+    this.socket = null
+    this.reader = null
+  }
+}
@@ -0,0 +1,147 @@
+#!/usr/bin/env node
+
+/**
+ * Export Query Benchmark for PropMaster 3.0
+ *
+ * Compares the compiled filter/sort engine in lib/export.js against the
+ * previous per-record Date/toLowerCase implementation on synthetic finance
+ * records, and checks that both produce the same rows in the same order.
+ *
+ * Usage: node scripts/benchmark-export-query.mjs [--sizes=10000,100000,1000000] [--runs=3]
+ */
+
+import { filterFinanceRecords, sortFinanceRecords, SORT_OPTIONS } from '../lib/export.js'
+
+const args = Object.fromEntries(
+  process.argv.slice(2)
+    .filter(arg => arg.startsWith('--'))
+    .map(arg => arg.slice(2).split('='))
+)
+
+const SIZES = (args.sizes || '10000,100000,1000000').split(',').map(Number)
+const RUNS = parseInt(args.runs) || 3
+
+// Previous implementation, kept verbatim as the baseline
+function legacyFilterFinanceRecords(records, filters) {
+  return records.filter(record => {
+    if (filters.dateFrom || filters.dateTo) {
+      const recordDate = new Date(record.created_at)
+      if (filters.dateFrom && recordDate < new Date(filters.dateFrom)) return false
+      if (filters.dateTo && recordDate > new Date(filters.dateTo + 'T23:59:59')) return false
+    }
+    if (filters.person && filters.person.trim()) {
+      const searchTerm = filters.person.toLowerCase().trim()
+      if (!record.client_name?.toLowerCase().includes(searchTerm)) return false
+    }
+    if (filters.status && filters.status !== 'all') {
+      if (record.status !== filters.status) return false
+    }
+    if (filters.paymentType && filters.paymentType !== 'all') {
+      if (record.payment_type !== filters.paymentType) return false
+    }
+    return true
+  })
+}
+
+function legacySortFinanceRecords(records, sortOption) {
+  const { field, direction } = SORT_OPTIONS[sortOption] || SORT_OPTIONS.DATE_DESC
+  return [...records].sort((a, b) => {
+    let aValue = a[field]
+    let bValue = b[field]
+    if (field === 'amount') {
+      aValue = parseFloat(aValue) || 0
+      bValue = parseFloat(bValue) || 0
+    } else if (field === 'created_at') {
+      aValue = new Date(aValue)
+      bValue = new Date(bValue)
+    } else if (typeof aValue === 'string') {
+      aValue = aValue?.toLowerCase() || ''
+      bValue = bValue?.toLowerCase() || ''
+    }
+    let comparison = 0
+    if (aValue < bValue) comparison = -1
+    if (aValue > bValue) comparison = 1
+    return direction === 'desc' ? -comparison : comparison
+  })
+}
+
+const FIRST_NAMES = ['Aarav', 'Diya', 'John', 'Jane', 'Priya', 'Rohan', 'Meera', 'Vikram', 'Anaya', 'Kabir']
+const LAST_NAMES = ['Sharma', 'Smith', 'Patel', 'Iyer', 'Khan', 'Reddy', 'Brown', 'Gupta', 'Nair', 'Das']
+const STATUSES = ['paid', 'pending', 'overdue', 'partial']
+const PAYMENT_TYPES = ['rent', 'deposit', 'maintenance', 'installment']
+
+function generateRecords(count) {
+  const records = new Array(count)
+  const start = Date.UTC(2023, 0, 1)
+  const span = 3 * 365 * 24 * 60 * 60 * 1000
+  let seed = 42
+  const random = () => {
+    seed = (seed * 1664525 + 1013904223) % 4294967296
+    return seed / 4294967296
+  }
+
+  for (let i = 0; i < count; i++) {
+    records[i] = {
+      id: `fin-${i.toString(16).padStart(8, '0')}`,
+      client_name: `${FIRST_NAMES[Math.floor(random() * 10)]} ${LAST_NAMES[Math.floor(random() * 10)]}`,
+      amount: Math.round(random() * 2000000),
+      status: STATUSES[Math.floor(random() * STATUSES.length)],
+      payment_type: PAYMENT_TYPES[Math.floor(random() * PAYMENT_TYPES.length)],
+      created_at: new Date(start + Math.floor(random() * span)).toISOString()
+    }
+  }
+  return records
+}
+
+function time(fn) {
+  let best = Infinity
+  let result
+  for (let run = 0; run < RUNS; run++) {
+    const started = process.hrtime.bigint()
+    result = fn()
+    const elapsed = Number(process.hrtime.bigint() - started) / 1e6
+    best = Math.min(best, elapsed)
+  }
+  return { ms: best, result }
+}
+
+const WIDTHS = [12, 20, 12, 12, 10, 6]
+const row = (cells) => cells.map((cell, i) => String(cell).padEnd(WIDTHS[i])).join('')
+
+const sameOrder = (a, b) => a.length === b.length && a.every((record, i) => record === b[i])
+
+const FILTERS = {
+  dateFrom: '2024-01-01',
+  dateTo: '2025-06-30',
+  person: 'sharma',
+  status: 'all',
+  paymentType: 'all'
+}
+
+console.log(`Export query benchmark (best of ${RUNS} runs, times in ms)\n`)
+console.log(row(['records', 'case', 'legacy', 'compiled', 'speedup', 'match']))
+
+for (const size of SIZES) {
+  const records = generateRecords(size)
+  const cases = [
+    ['filter', () => legacyFilterFinanceRecords(records, FILTERS), () => filterFinanceRecords(records, FILTERS)],
+    ...['DATE_DESC', 'AMOUNT_ASC', 'NAME_ASC', 'STATUS_DESC'].map(option => [
+      `sort ${option}`,
+      () => legacySortFinanceRecords(records, option),
+      () => sortFinanceRecords(records, option)
+    ])
+  ]
+
+  for (const [name, legacy, compiled] of cases) {
+    const before = time(legacy)
+    const after = time(compiled)
+    console.log(row([
+      size.toLocaleString('en-US'),
+      name,
+      before.ms.toFixed(1),
+      after.ms.toFixed(1),
+      `${(before.ms / after.ms).toFixed(1)}x`,
+      sameOrder(before.result, after.result) ? 'yes' : 'NO'
+    ]))
+  }
+}
@@ -0,0 +1,128 @@
+#!/usr/bin/env node
+
+/**
+ * Rate Limiter Benchmark for PropMaster 3.0
+ *
+ * Compares the sliding window counter in lib/rate-limiter.js, on its
+ * in-memory state store, against the previous timestamp-array
+ * implementation of SecuritySystem.checkRateLimit, on a simulated stream
+ * of requests from many clients at a steady rate, and reports time per
+ * check, retained heap and the share of requests allowed.
+ *
+ * Usage: node --expose-gc --import ./scripts/register-alias.mjs scripts/benchmark-rate-limit.mjs [--keys=1000] [--requests=1000000] [--limits=100/900000,5000/60000]
+ */
+
+import { RateLimiter } from '../lib/rate-limiter.js'
+
+const args = Object.fromEntries(
+  process.argv.slice(2)
+    .filter(arg => arg.startsWith('--'))
+    .map(arg => arg.slice(2).split('='))
+)
+
+const KEYS = parseInt(args.keys) || 1000
+const REQUESTS = parseInt(args.requests) || 1000000
+const LIMITS = (args.limits || '100/900000,5000/60000').split(',').map(limit => {
+  const [maxRequests, windowMs] = limit.split('/').map(Number)
+  return { maxRequests, windowMs }
+})
+
+// Previous implementation, kept verbatim as the baseline (minus logging and blocking)
+class LegacyRateLimiter {
+  constructor() {
+    this.rateLimitStore = new Map()
+  }
+
+  take(ip, { maxRequests, windowMs }, now) {
+    const windowStart = now - windowMs
+
+    if (!this.rateLimitStore.has(ip)) {
+      this.rateLimitStore.set(ip, [])
+    }
+
+    const requests = this.rateLimitStore.get(ip)
+    const validRequests = requests.filter(timestamp => timestamp > windowStart)
+
+    if (validRequests.length >= maxRequests) {
+      return { allowed: false }
+    }
+
+    validRequests.push(now)
+    this.rateLimitStore.set(ip, validRequests)
+
+    if (Math.random() < 0.01) {
+      for (const [key, timestamps] of this.rateLimitStore.entries()) {
+        const valid = timestamps.filter(timestamp => timestamp > now - windowMs)
+        if (valid.length === 0) {
+          this.rateLimitStore.delete(key)
+        } else {
+          this.rateLimitStore.set(key, valid)
+        }
+      }
+    }
+
+    return { allowed: true }
+  }
+}
+
+// Deterministic request stream: clients round-robin at 125% of each limit,
+// so both implementations allow most requests and reject the excess
+function* requestStream({ maxRequests, windowMs }) {
+  const stepMs = windowMs / maxRequests / KEYS / 1.25
+  let now = Date.now()
+  for (let i = 0; i < REQUESTS; i++) {
+    now += stepMs
+    yield [`ip:10.0.${(i % KEYS) >> 8}.${(i % KEYS) & 255}`, Math.floor(now)]
+  }
+}
+
+function heapUsed() {
+  globalThis.gc?.()
+  return process.memoryUsage().heapUsed
+}
+
+async function run(limiter, limit, stream) {
+  const decisions = new Uint8Array(REQUESTS)
+  const heapBefore = heapUsed()
+  const started = process.hrtime.bigint()
+
+  let i = 0
+  for (const [key, now] of stream) {
+    decisions[i++] = (await limiter.take(key, limit, now)).allowed ? 1 : 0
+    // Stands in for the once-a-second expiry tick on simulated time
+    if (i % 10000 === 0) limiter.sweep?.(now)
+  }
+
+  const elapsedNs = Number(process.hrtime.bigint() - started)
+  const retainedBytes = heapUsed() - heapBefore
+  return { nsPerOp: elapsedNs / REQUESTS, retainedBytes, decisions }
+}
+
+const WIDTHS = [16, 16, 16, 14, 14, 10, 14, 14]
+const row = (cells) => cells.map((cell, i) => String(cell).padEnd(WIDTHS[i])).join('')
+const kb = (bytes) => `${Math.max(0, bytes / 1024).toFixed(0)} KB`
+
+console.log(`Rate limiter benchmark: ${REQUESTS.toLocaleString('en-US')} checks over ${KEYS.toLocaleString('en-US')} clients`)
+if (!globalThis.gc) {
+  console.log('(run with --expose-gc for accurate retained heap figures)')
+}
+console.log()
+console.log(row(['limit', 'legacy allowed', 'window allowed', 'legacy ns/op', 'window ns/op', 'speedup', 'legacy heap', 'window heap']))
+
+for (const limit of LIMITS) {
+  const legacy = await run(new LegacyRateLimiter(), limit, requestStream(limit))
+  const sliding = await run(new RateLimiter(), limit, requestStream(limit))
+
+  const allowedShare = ({ decisions }) => `${(decisions.reduce((sum, d) => sum + d, 0) / REQUESTS * 100).toFixed(1)}%`
+
+  console.log(row([
+    `${limit.maxRequests}/${limit.windowMs / 1000}s`,
+    allowedShare(legacy),
+    allowedShare(sliding),
+    legacy.nsPerOp.toFixed(0),
+    sliding.nsPerOp.toFixed(0),
+    `${(legacy.nsPerOp / sliding.nsPerOp).toFixed(1)}x`,
+    kb(legacy.retainedBytes),
+    kb(sliding.retainedBytes)
+  ]))
+}
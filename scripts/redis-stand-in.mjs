@@ -0,0 +1,278 @@
+#!/usr/bin/env node
+
+/**
+ * Local Redis stand-in for PropMaster 3.0
+ *
+ * Serves the handful of Redis commands the shared rate limit store uses
+ * (lib/rate-limit-store.js), in memory, so several app instances can share
+ * rate limits and IP blocks locally without installing Redis. Start it and
+ * run each instance with RATE_LIMIT_REDIS_URL=redis://localhost:6379.
+ *
+ * Supported: PING, AUTH, SELECT, QUIT, GET, INCRBY, PEXPIREAT, PTTL, DEL,
+ * ZADD, ZREM, ZRANGEBYSCORE, ZREMRANGEBYSCORE, SCAN, DBSIZE, FLUSHALL,
+ * MULTI/EXEC/DISCARD.
+ *
+ * Usage: node scripts/redis-stand-in.mjs [--port=6379]
+ */
+
+import net from 'net'
+
+const args = Object.fromEntries(
+  process.argv.slice(2)
+    .filter(arg => arg.startsWith('--'))
+    .map(arg => arg.slice(2).split('='))
+)
+
+const PORT = parseInt(args.port) || 6379
+
+// key -> { value: string | Map<member, score>, expiresAt: number | null }
+const data = new Map()
+
+class ReplyError {
+  constructor(message) {
+    this.message = message
+  }
+}
+
+const OK = Symbol('OK')
+const QUEUED = Symbol('QUEUED')
+
+const encode = (value) => {
+  if (value === OK) return '+OK\r\n'
+  if (value === QUEUED) return '+QUEUED\r\n'
+  if (value instanceof ReplyError) return `-${value.message}\r\n`
+  if (value === null || value === undefined) return '$-1\r\n'
+  if (typeof value === 'number') return `:${value}\r\n`
+  if (Array.isArray(value)) return `*${value.length}\r\n${value.map(encode).join('')}`
+  const text = String(value)
+  return `$${Buffer.byteLength(text)}\r\n${text}\r\n`
+}
+
+const lookup = (key) => {
+  const entry = data.get(key)
+  if (entry && entry.expiresAt !== null && entry.expiresAt <= Date.now()) {
+    data.delete(key)
+    return undefined
+  }
+  return entry
+}
+
+const sortedSet = (key, create = false) => {
+  const entry = lookup(key)
+  if (entry) {
+    return entry.value instanceof Map ? entry.value : new ReplyError('WRONGTYPE Operation against a key holding the wrong kind of value')
+  }
+  if (!create) return null
+  const members = new Map()
+  data.set(key, { value: members, expiresAt: null })
+  return members
+}
+
+const parseBound = (bound) => {
+  if (bound === '-inf') return { value: -Infinity, exclusive: false }
+  if (bound === '+inf' || bound === 'inf') return { value: Infinity, exclusive: false }
+  if (bound.startsWith('(')) return { value: Number(bound.slice(1)), exclusive: true }
+  return { value: Number(bound), exclusive: false }
+}
+
+const inRange = (score, min, max) =>
+  (min.exclusive ? score > min.value : score >= min.value) &&
+  (max.exclusive ? score < max.value : score <= max.value)
+
+const globToRegExp = (pattern) =>
+  new RegExp(`^${pattern.replace(/[.+^${}()|[\]\\]/g, '\\$&').replace(/\*/g, '.*').replace(/\?/g, '.')}$`)
+
+const commands = {
+  PING: () => 'PONG',
+  AUTH: () => OK,
+  SELECT: () => OK,
+
+  GET: ([key]) => {
+    const entry = lookup(key)
+    if (!entry) return null
+    return typeof entry.value === 'string' ? entry.value : new ReplyError('WRONGTYPE Operation against a key holding the wrong kind of value')
+  },
+
+  INCRBY: ([key, amount]) => {
+    const entry = lookup(key)
+    const current = entry ? Number(entry.value) : 0
+    if (!Number.isInteger(current) || !/^-?\d+$/.test(amount)) {
+      return new ReplyError('ERR value is not an integer or out of range')
+    }
+    const next = current + parseInt(amount)
+    data.set(key, { value: String(next), expiresAt: entry ? entry.expiresAt : null })
+    return next
+  },
+
+  PEXPIREAT: ([key, timestamp]) => {
+    const entry = lookup(key)
+    if (!entry) return 0
+    entry.expiresAt = Number(timestamp)
+    return 1
+  },
+
+  PTTL: ([key]) => {
+    const entry = lookup(key)
+    if (!entry) return -2
+    return entry.expiresAt === null ? -1 : Math.max(0, entry.expiresAt - Date.now())
+  },
+
+  DEL: (keys) => keys.reduce((deleted, key) => deleted + (lookup(key) && data.delete(key) ? 1 : 0), 0),
+
+  ZADD: ([key, ...pairs]) => {
+    const members = sortedSet(key, true)
+    if (members instanceof ReplyError) return members
+    let added = 0
+    for (let i = 0; i < pairs.length; i += 2) {
+      if (!members.has(pairs[i + 1])) added++
+      members.set(pairs[i + 1], Number(pairs[i]))
+    }
+    return added
+  },
+
+  ZREM: ([key, ...names]) => {
+    const members = sortedSet(key)
+    if (!members || members instanceof ReplyError) return members ? members : 0
+    return names.reduce((removed, name) => removed + (members.delete(name) ? 1 : 0), 0)
+  },
+
+  ZRANGEBYSCORE: ([key, minBound, maxBound, ...options]) => {
+    const members = sortedSet(key)
+    if (!members) return []
+    if (members instanceof ReplyError) return members
+    const min = parseBound(minBound)
+    const max = parseBound(maxBound)
+    const withScores = options.some(option => option.toUpperCase() === 'WITHSCORES')
+    const matches = [...members]
+      .filter(([, score]) => inRange(score, min, max))
+      .sort((a, b) => a[1] - b[1] || (a[0] < b[0] ? -1 : 1))
+    return matches.flatMap(([name, score]) => withScores ? [name, String(score)] : [name])
+  },
+
+  ZREMRANGEBYSCORE: ([key, minBound, maxBound]) => {
+    const members = sortedSet(key)
+    if (!members) return 0
+    if (members instanceof ReplyError) return members
+    const min = parseBound(minBound)
+    const max = parseBound(maxBound)
+    let removed = 0
+    for (const [name, score] of members) {
+      if (inRange(score, min, max)) {
+        members.delete(name)
+        removed++
+      }
+    }
+    return removed
+  },
+
+  // Returns every match in one page
+  SCAN: ([, ...options]) => {
+    let pattern = '*'
+    for (let i = 0; i < options.length; i += 2) {
+      if (options[i].toUpperCase() === 'MATCH') pattern = options[i + 1]
+    }
+    const matcher = globToRegExp(pattern)
+    return ['0', [...data.keys()].filter(key => lookup(key) && matcher.test(key))]
+  },
+
+  DBSIZE: () => [...data.keys()].filter(key => lookup(key)).length,
+
+  FLUSHALL: () => {
+    data.clear()
+    return OK
+  }
+}
+
+/**
+ * Read one command (RESP array or inline) from `buffer` at `offset`
+ */
+function readCommand(buffer, offset) {
+  const end = buffer.indexOf('\r\n', offset)
+  if (end === -1) return null
+
+  if (buffer[offset] !== 0x2a) { // '*'
+    const line = buffer.toString('utf8', offset, end).trim()
+    return { args: line ? line.split(/\s+/) : [], offset: end + 2 }
+  }
+
+  const count = parseInt(buffer.toString('utf8', offset + 1, end))
+  const commandArgs = []
+  let position = end + 2
+  for (let i = 0; i < count; i++) {
+    const lengthEnd = buffer.indexOf('\r\n', position)
+    if (lengthEnd === -1) return null
+    const length = parseInt(buffer.toString('utf8', position + 1, lengthEnd))
+    const start = lengthEnd + 2
+    if (buffer.length < start + length + 2) return null
+    commandArgs.push(buffer.toString('utf8', start, start + length))
+    position = start + length + 2
+  }
+  return { args: commandArgs, offset: position }
+}
+
+let connections = 0
+let processed = 0
+
+const server = net.createServer(socket => {
+  connections++
+  let buffer = Buffer.alloc(0)
+  let transaction = null
+
+  socket.on('data', chunk => {
+    buffer = buffer.length ? Buffer.concat([buffer, chunk]) : chunk
+
+    let offset = 0
+    let parsed
+    let output = ''
+    while ((parsed = readCommand(buffer, offset))) {
+      offset = parsed.offset
+      if (parsed.args.length === 0) continue
+
+      const [name, ...rest] = parsed.args
+      const verb = name.toUpperCase()
+      processed++
+
+      if (verb === 'QUIT') {
+        output += encode(OK)
+        socket.end(output)
+        return
+      } else if (verb === 'MULTI') {
+        transaction = []
+        output += encode(OK)
+      } else if (verb === 'DISCARD') {
+        transaction = null
+        output += encode(OK)
+      } else if (verb === 'EXEC') {
+        const queued = transaction || []
+        transaction = null
+        output += encode(queued.map(([handler, commandArgs]) => handler(commandArgs)))
+      } else if (!commands[verb]) {
+        output += encode(new ReplyError(`ERR unknown command '${name}'`))
+      } else if (transaction) {
+        transaction.push([commands[verb], rest])
+        output += encode(QUEUED)
+      } else {
+        output += encode(commands[verb](rest))
+      }
+    }
+
+    buffer = buffer.subarray(offset)
+    if (output) socket.write(output)
+  })
+
+  socket.on('close', () => connections--)
+  socket.on('error', () => {})
+})
+
+// Drop expired keys in the background, like Redis does
+setInterval(() => {
+  for (const key of data.keys()) lookup(key)
+}, 1000).unref()
+
+server.listen(PORT, () => {
+  console.log(`🧰 Redis stand-in listening on localhost:${PORT}`)
+})
+
+process.on('SIGUSR2', () => {
+  console.log(`📊 ${data.size} keys, ${connections} connections, ${processed} commands`)
+})
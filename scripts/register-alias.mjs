@@ -0,0 +1,34 @@
+import { register } from 'node:module'
+
+/**
+ * Resolve the `@/` import alias (jsconfig.json) outside of Next.js, so lib
+ * modules can be loaded by plain Node scripts and tests:
+ *
+ *   node --import ./scripts/register-alias.mjs <script>
+ *
+ * `@/lib/x` resolves to <repo>/lib/x, trying `.js` and `.mjs` when the
+ * specifier has no extension.
+ */
+
+const hooks = `
+  import fs from 'node:fs'
+  import { fileURLToPath } from 'node:url'
+
+  const root = new URL('../', ${JSON.stringify(import.meta.url)})
+
+  export async function resolve(specifier, context, nextResolve) {
+    if (!specifier.startsWith('@/')) {
+      return nextResolve(specifier, context)
+    }
+
+    const base = new URL(specifier.slice(2), root)
+    for (const candidate of [base.href, base.href + '.js', base.href + '.mjs']) {
+      if (fs.existsSync(fileURLToPath(candidate))) {
+        return nextResolve(candidate, context)
+      }
+    }
+    return nextResolve(base.href, context)
+  }
+`
+
+register(`data:text/javascript,${encodeURIComponent(hooks)}`)
@@ -0,0 +1,100 @@
+#!/usr/bin/env node
+
+/**
+ * Local SMTP stand-in for PropMaster 3.0
+ *
+ * Accepts every message and writes it to an .eml file instead of delivering
+ * it, so share invitation emails can be tested without a mail provider.
+ * The app sends here by default in development (localhost:2525).
+ *
+ * Usage: node scripts/smtp-sink.mjs [--port=2525] [--dir=/tmp/propmaster-outbox]
+ */
+
+import net from 'net'
+import fs from 'fs'
+import path from 'path'
+import os from 'os'
+
+const args = Object.fromEntries(
+  process.argv.slice(2)
+    .filter(arg => arg.startsWith('--'))
+    .map(arg => arg.slice(2).split('='))
+)
+
+const PORT = parseInt(args.port) || 2525
+const OUTBOX = path.resolve(args.dir || path.join(os.tmpdir(), 'propmaster-outbox'))
+
+fs.mkdirSync(OUTBOX, { recursive: true })
+
+let received = 0
+
+const server = net.createServer(socket => {
+  let buffer = ''
+  let inData = false
+  let envelope = { from: null, to: [] }
+
+  const reply = (line) => socket.write(`${line}\r\n`)
+
+  reply('220 propmaster-smtp-sink ready')
+
+  socket.on('data', chunk => {
+    buffer += chunk.toString('utf8')
+
+    while (buffer.length > 0) {
+      if (inData) {
+        const end = buffer.indexOf('\r\n.\r\n')
+        if (end === -1) return
+
+        const message = buffer.slice(0, end).replace(/^\.\./gm, '.')
+        buffer = buffer.slice(end + 5)
+        inData = false
+
+        received++
+        const file = path.join(OUTBOX, `${Date.now()}-${received}.eml`)
+        fs.writeFileSync(file, message)
+        console.log(`📧 #${received} ${envelope.from} -> ${envelope.to.join(', ')} (${message.length} bytes) ${file}`)
+
+        envelope = { from: null, to: [] }
+        reply('250 OK: queued')
+        continue
+      }
+
+      const index = buffer.indexOf('\r\n')
+      if (index === -1) return
+      const line = buffer.slice(0, index)
+      buffer = buffer.slice(index + 2)
+      const verb = line.slice(0, 4).toUpperCase()
+
+      if (verb === 'EHLO' || verb === 'HELO') {
+        reply('250-propmaster-smtp-sink')
+        reply('250 8BITMIME')
+      } else if (verb === 'MAIL') {
+        envelope.from = line.slice(10).trim()
+        reply('250 OK')
+      } else if (verb === 'RCPT') {
+        envelope.to.push(line.slice(8).trim())
+        reply('250 OK')
+      } else if (verb === 'DATA') {
+        inData = true
+        reply('354 End data with <CR><LF>.<CR><LF>')
+      } else if (verb === 'RSET') {
+        envelope = { from: null, to: [] }
+        reply('250 OK')
+      } else if (verb === 'NOOP') {
+        reply('250 OK')
+      } else if (verb === 'QUIT') {
+        reply('221 Bye')
+        socket.end()
+        return
+      } else {
+        reply('250 OK')
+      }
+    }
+  })
+
+  socket.on('error', () => {})
+})
+
+server.listen(PORT, () => {
+  console.log(`📮 SMTP sink listening on localhost:${PORT}, writing messages to ${OUTBOX}`)
+})
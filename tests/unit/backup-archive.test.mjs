@@ -0,0 +1,86 @@
+import test from 'node:test'
+import assert from 'node:assert/strict'
+import fs from 'fs'
+import os from 'os'
+import path from 'path'
+import { spawnSync } from 'child_process'
+import { ArchiveWriter, listArchive, openArchiveEntry } from '@/lib/backup-archive'
+
+const LONG_NAME = `files/property-images/${'nested-folder/'.repeat(8)}photo.jpg`
+const UNICODE_NAME = `files/documents/${'समझौता-'.repeat(12)}.pdf`
+
+const MEMBERS = [
+  { name: 'manifest.json.gz', chunks: [Buffer.from('{"id":"backup"}')] },
+  { name: 'tables/empty.ndjson.gz', chunks: [] },
+  { name: LONG_NAME, chunks: [Buffer.alloc(700, 1), Buffer.alloc(300, 2)] },
+  { name: 'f'.repeat(100), chunks: [Buffer.alloc(512, 3)] },
+  { name: UNICODE_NAME, chunks: [Buffer.from('pdf')] }
+]
+
+async function readAll(stream) {
+  const chunks = []
+  for await (const chunk of stream) chunks.push(chunk)
+  return Buffer.concat(chunks)
+}
+
+async function writeArchive(t) {
+  const dir = await fs.promises.mkdtemp(path.join(os.tmpdir(), 'backup-archive-'))
+  t.after(() => fs.promises.rm(dir, { recursive: true, force: true }))
+
+  const filePath = path.join(dir, 'backup.tar')
+  const writer = await ArchiveWriter.open(filePath)
+  const written = []
+  for (const member of MEMBERS) {
+    written.push(await writer.addEntry(member.name, member.chunks))
+  }
+  const size = await writer.close()
+  return { filePath, written, size }
+}
+
+test('listArchive returns every member in order, including long and empty ones', async (t) => {
+  const { filePath, written, size } = await writeArchive(t)
+
+  assert.equal(size, (await fs.promises.stat(filePath)).size)
+  assert.equal(size % 512, 0)
+  assert.ok(Buffer.byteLength(UNICODE_NAME) > 100)
+
+  const entries = await listArchive(filePath)
+  assert.deepEqual(entries, written)
+  assert.deepEqual(entries.map(entry => entry.name), MEMBERS.map(member => member.name))
+  assert.deepEqual(entries.map(entry => entry.size), [15, 0, 1000, 512, 3])
+})
+
+test('openArchiveEntry streams each member back unchanged', async (t) => {
+  const { filePath } = await writeArchive(t)
+
+  for (const member of MEMBERS) {
+    const stream = await openArchiveEntry(filePath, member.name)
+    assert.ok(stream, member.name)
+    assert.deepEqual(await readAll(stream), Buffer.concat(member.chunks), member.name)
+  }
+})
+
+test('openArchiveEntry returns null for a missing member', async (t) => {
+  const { filePath } = await writeArchive(t)
+
+  assert.equal(await openArchiveEntry(filePath, 'tables/missing.ndjson.gz'), null)
+  // The long-name record itself is not a member
+  assert.equal(await openArchiveEntry(filePath, '././@LongLink'), null)
+})
+
+test('archives extract with tar', async (t) => {
+  const { filePath } = await writeArchive(t)
+  const outDir = path.join(path.dirname(filePath), 'extracted')
+  await fs.promises.mkdir(outDir)
+
+  const result = spawnSync('tar', ['-xf', filePath, '-C', outDir], { encoding: 'utf8' })
+  if (result.error) {
+    t.skip('tar is not installed')
+    return
+  }
+
+  assert.equal(result.status, 0, result.stderr)
+  for (const member of MEMBERS) {
+    assert.deepEqual(await fs.promises.readFile(path.join(outDir, member.name)), Buffer.concat(member.chunks), member.name)
+  }
+})
@@ -0,0 +1,101 @@
+import test from 'node:test'
+import assert from 'node:assert/strict'
+import { ExpiryScheduler, ExpiringMap, ExpiringSet } from '@/lib/expiring-map'
+
+// A private scheduler per test, ticked by hand with explicit times
+const scheduler = (options) => {
+  const instance = new ExpiryScheduler(options)
+  instance.start = () => {}
+  return instance
+}
+
+test('entries are hidden once expired, before any tick', () => {
+  const map = new ExpiringMap(scheduler())
+  map.set('a', 1, 1000)
+
+  assert.equal(map.get('a', 999), 1)
+  assert.equal(map.has('a', 1000), false)
+  assert.equal(map.get('a', 1000), undefined)
+  assert.equal(map.size, 1)
+})
+
+test('run removes due entries in expiry order and leaves the rest', () => {
+  const expiry = scheduler()
+  const map = new ExpiringMap(expiry)
+  const times = [50, 10, 40, 30, 20, 60, 5]
+  times.forEach((time, i) => map.set(`k${i}`, i, time))
+
+  const removed = []
+  const expire = map.expire.bind(map)
+  map.expire = (key, expiresAt) => {
+    removed.push(expiresAt)
+    return expire(key, expiresAt)
+  }
+
+  assert.equal(expiry.run(40), 5)
+  assert.deepEqual(removed, [5, 10, 20, 30, 40])
+  assert.deepEqual([...map.liveEntries(40)].map(([key]) => key), ['k0', 'k5'])
+  assert.equal(expiry.length, 2)
+})
+
+test('extending an entry skips its old slot', () => {
+  const expiry = scheduler()
+  const map = new ExpiringMap(expiry)
+  map.set('a', 1, 100)
+  map.set('a', 2, 300)
+
+  assert.equal(expiry.run(200), 0)
+  assert.equal(expiry.getMetrics().skipped, 1)
+  assert.equal(map.get('a', 200), 2)
+
+  assert.equal(expiry.run(300), 1)
+  assert.equal(map.size, 0)
+})
+
+test('deleted and cleared entries are not expired again', () => {
+  const expiry = scheduler()
+  const map = new ExpiringMap(expiry)
+  map.set('a', 1, 100)
+  map.set('b', 1, 100)
+  map.delete('a')
+  map.clear()
+  map.set('b', 2, 500)
+
+  assert.equal(expiry.run(100), 0)
+  assert.equal(map.get('b', 100), 2)
+})
+
+test('run honours the per-tick limit', () => {
+  const expiry = scheduler()
+  const map = new ExpiringMap(expiry)
+  for (let i = 0; i < 10; i++) map.set(i, i, 10)
+
+  assert.equal(expiry.run(10, 4), 4)
+  assert.equal(map.size, 6)
+  assert.equal(expiry.run(10), 6)
+  assert.equal(map.size, 0)
+})
+
+test('compaction drops stale slots and keeps heap order', () => {
+  const expiry = scheduler()
+  const map = new ExpiringMap(expiry)
+  for (let i = 0; i < 3000; i++) map.set(i % 1000, i, 10000 - i)
+
+  assert.ok(expiry.getMetrics().compactions > 0)
+  assert.ok(expiry.length < 3000)
+
+  assert.equal(expiry.run(8000), 1000)
+  assert.equal(map.size, 0)
+})
+
+test('ExpiringSet shares the same expiry rules', () => {
+  const expiry = scheduler()
+  const set = new ExpiringSet(expiry)
+  set.add('ip', 100)
+
+  assert.equal(set.has('ip', 50), true)
+  assert.equal(set.has('ip', 100), false)
+  assert.equal(set.expiryOf('ip'), 100)
+  expiry.run(100)
+  assert.equal(set.size, 0)
+})
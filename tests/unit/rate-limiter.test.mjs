@@ -0,0 +1,88 @@
+import test from 'node:test'
+import assert from 'node:assert/strict'
+import { ExpiryScheduler } from '@/lib/expiring-map'
+import { RateLimiter, MemoryRateLimitStore } from '@/lib/rate-limiter'
+
+const limit = { maxRequests: 10, windowMs: 1000 }
+
+const limiter = () => {
+  const scheduler = new ExpiryScheduler()
+  scheduler.start = () => {}
+  const store = new MemoryRateLimitStore(scheduler)
+  return { limiter: new RateLimiter(store), store, scheduler }
+}
+
+async function takeMany(rateLimiter, count, now, key = 'ip') {
+  const results = []
+  for (let i = 0; i < count; i++) {
+    results.push(await rateLimiter.take(key, limit, now))
+  }
+  return results
+}
+
+test('allows maxRequests per window, then rejects without counting', async () => {
+  const { limiter: rateLimiter, store } = limiter()
+  const results = await takeMany(rateLimiter, 15, 100)
+
+  assert.equal(results.filter(result => result.allowed).length, 10)
+  assert.equal(results[9].remaining, 0)
+  assert.equal(results[10].allowed, false)
+  assert.equal(store.get(`10/1000:ip:0`, 100), 10)
+})
+
+test('keys are limited independently', async () => {
+  const { limiter: rateLimiter } = limiter()
+  await takeMany(rateLimiter, 10, 100, 'a')
+
+  assert.equal((await rateLimiter.take('a', limit, 100)).allowed, false)
+  assert.equal((await rateLimiter.take('b', limit, 100)).allowed, true)
+})
+
+test('the previous window counts in proportion to its overlap', async () => {
+  const { limiter: rateLimiter } = limiter()
+  await takeMany(rateLimiter, 10, 900)
+
+  // Halfway through the next window, half of the previous 10 still count
+  const results = await takeMany(rateLimiter, 10, 1500)
+  assert.equal(results.filter(result => result.allowed).length, 5)
+
+  // A whole window later the old requests no longer count
+  const later = await takeMany(rateLimiter, 10, 2000)
+  assert.equal(later.filter(result => result.allowed).length, 5)
+})
+
+test('retryAfterMs is when the next request is admitted', async () => {
+  const { limiter: rateLimiter } = limiter()
+  await takeMany(rateLimiter, 10, 900)
+  const results = await takeMany(rateLimiter, 3, 1200)
+  const rejected = results[2]
+
+  assert.equal(rejected.allowed, false)
+  assert.ok(rejected.retryAfterMs > 0)
+  assert.equal((await rateLimiter.take('ip', limit, 1200 + rejected.retryAfterMs - 10)).allowed, false)
+  assert.equal((await rateLimiter.take('ip', limit, 1200 + rejected.retryAfterMs)).allowed, true)
+})
+
+test('counters expire two windows after they start', async () => {
+  const { limiter: rateLimiter, scheduler } = limiter()
+  await rateLimiter.take('ip', limit, 100)
+  assert.equal(rateLimiter.size, 1)
+
+  scheduler.run(1999)
+  assert.equal(rateLimiter.size, 1)
+  scheduler.run(2000)
+  assert.equal(rateLimiter.size, 0)
+})
+
+test('works the same over an asynchronous store', async () => {
+  const { store } = limiter()
+  const asyncStore = {
+    increment: async (...args) => store.increment(...args),
+    get: async (...args) => store.get(...args)
+  }
+  const rateLimiter = new RateLimiter(asyncStore)
+
+  const results = await takeMany(rateLimiter, 12, 100)
+  assert.equal(results.filter(result => result.allowed).length, 10)
+  assert.equal(store.get(`10/1000:ip:0`, 100), 10)
+})